@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+#
+# Script Name: mix_index.py
+# Description:  Índice persistente (SQLite) de la carpeta Mix para detectar duplicados en mover_mix_playerctl.py
+# Author: volteret4
+# Repository: https://github.com/volteret4/
+# License:
+# Notes:
+#   Dependencies:   - python3, mutagen (opcional, tags y duración), fpcalc/chromaprint (opcional, huella)
+#
+#   Cada archivo de audio se guarda con su nombre normalizado, las claves de
+#   artista y título de sus tags, la duración y la huella de chromaprint.
+#   refresh() hace un stat de cada audio (scandir, sin abrirlo) y solo vuelve
+#   a leer los archivos cuyo (mtime, tamaño) ha cambiado; find() busca
+#   en memoria, así que detecta copias renombradas (mismos tags) o
+#   recodificadas (misma huella y duración) que el antiguo find -iname no veía.
+
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from shutil import which
+
+try:
+    from mutagen import File as MutagenFile
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+INDEX_DB_PATH = os.path.expanduser("~/.cache/mover_mix_index.db")
+
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.ogg', '.wav', '.m4a')
+READ_WORKERS = 8
+FINGERPRINT_SECONDS = 30
+DURATION_TOLERANCE = 3.0        # segundos
+MAX_BIT_ERROR = 0.15            # fracción de bits distintos entre huellas
+MAX_FINGERPRINT_OFFSET = 3      # desplazamiento (en enteros) al alinear huellas
+
+FPCALC = which('fpcalc')
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_SUFFIX_RE = re.compile(r'\s*[\(\[].*$')
+
+
+def normalize_key(text):
+    """Minúsculas, sin acentos ni puntuación y con espacios simples"""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION_RE.sub(' ', text.lower())
+    return ' '.join(text.split())
+
+
+def keys_from_filename(filename):
+    """(artista, título) normalizados de un nombre 'Artista - Título (fecha álbum) [sello].ext'"""
+    stem = os.path.splitext(filename)[0]
+    if ' - ' not in stem:
+        return "", normalize_key(_SUFFIX_RE.sub('', stem))
+    artist, title = stem.split(' - ', 1)
+    return normalize_key(artist), normalize_key(_SUFFIX_RE.sub('', title))
+
+
+def read_audio_info(path):
+    """(artista, título, duración) de los tags, o vacíos si no se pueden leer"""
+    if not MUTAGEN_AVAILABLE:
+        return "", "", None
+    try:
+        audio = MutagenFile(path, easy=True)
+        if audio is None:
+            return "", "", None
+        tags = audio.tags or {}
+        artist = (tags.get('artist') or [''])[0]
+        title = (tags.get('title') or [''])[0]
+        duration = getattr(audio.info, 'length', None)
+        return artist, title, duration
+    except Exception as e:
+        print(f"⚠️  No se pudieron leer los tags de {path}: {e}")
+        return "", "", None
+
+
+def fingerprint(path):
+    """Huella chromaprint en bruto (lista de enteros) de los primeros segundos, o None"""
+    if not FPCALC:
+        return None
+    try:
+        result = subprocess.run(
+            [FPCALC, '-raw', '-json', '-length', str(FINGERPRINT_SECONDS), path],
+            capture_output=True, text=True, timeout=60
+        )
+        if result.returncode != 0:
+            return None
+        return json.loads(result.stdout).get('fingerprint') or None
+    except (subprocess.SubprocessError, json.JSONDecodeError, OSError):
+        return None
+
+
+def fingerprint_similar(a, b):
+    """True si las huellas difieren en menos de MAX_BIT_ERROR de sus bits (probando pequeños desfases)"""
+    if not a or not b:
+        return False
+    for offset in range(-MAX_FINGERPRINT_OFFSET, MAX_FINGERPRINT_OFFSET + 1):
+        pairs = list(zip(a[max(offset, 0):], b[max(-offset, 0):]))
+        if len(pairs) < 10:
+            continue
+        errors = sum(bin((x ^ y) & 0xFFFFFFFF).count('1') for x, y in pairs)
+        if errors / (32 * len(pairs)) < MAX_BIT_ERROR:
+            return True
+    return False
+
+
+FILE_COLUMNS = ('path', 'mtime_ns', 'size', 'name_key', 'artist_key', 'title_key',
+                'duration', 'fingerprint', 'artist', 'title')
+
+_INSERT_FILE = (f"INSERT OR REPLACE INTO files ({', '.join(FILE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(FILE_COLUMNS))})")
+
+
+def _read_file(path, stamp):
+    """Fila de files (en el orden de FILE_COLUMNS) de un archivo con su (mtime_ns, tamaño)"""
+    artist, title, duration = read_audio_info(path)
+    fp = fingerprint(path)
+    return (path, stamp[0], stamp[1], normalize_key(os.path.basename(path)),
+            normalize_key(artist), normalize_key(title), duration,
+            ','.join(map(str, fp)) if fp else None, artist, title)
+
+
+class MixIndex:
+    def __init__(self, root, db_path=INDEX_DB_PATH):
+        """
+        Args:
+            root: carpeta Mix
+            db_path: base de datos del índice
+        """
+        self.root = root
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                size INTEGER,
+                name_key TEXT,
+                artist_key TEXT,
+                title_key TEXT,
+                duration REAL,
+                fingerprint TEXT,
+                artist TEXT,
+                title TEXT
+            );
+            CREATE TABLE IF NOT EXISTS folders (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER
+            );
+        ''')
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        if 'artist' not in columns:
+            # Índices sin los tags originales (para las playlists): volver a leerlo todo
+            self.conn.executescript('''
+                ALTER TABLE files ADD COLUMN artist TEXT;
+                ALTER TABLE files ADD COLUMN title TEXT;
+                UPDATE files SET mtime_ns = NULL;
+                DELETE FROM folders;
+            ''')
+        self.conn.commit()
+        self.files = {}     # ruta -> fila, cargado en memoria por load()
+
+    def load(self):
+        self.files = {
+            row[0]: dict(zip(FILE_COLUMNS, row))
+            for row in self.conn.execute(
+                f"SELECT {', '.join(FILE_COLUMNS)} FROM files "
+                "WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (self.root, self._escape_like(self.root.rstrip('/')) + '/%'))
+        }
+
+    @staticmethod
+    def _escape_like(text):
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    def _walk(self):
+        """
+        {ruta: (mtime_ns, tamaño)} de todos los audios y conjunto de carpetas
+        sin cambios. Las carpetas cuyo mtime no ha cambiado no tienen archivos
+        nuevos, borrados ni renombrados, pero sus archivos pueden haberse
+        editado en el sitio (retag, recodificado con el mismo nombre), así que
+        también se hace stat de ellos.
+        """
+        known_folders = dict(self.conn.execute("SELECT path, mtime_ns FROM folders"))
+        to_check, unchanged, folders = {}, set(), {}
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+                folders[directory] = mtime_ns
+                if known_folders.get(directory) == mtime_ns:
+                    unchanged.add(directory)
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir():
+                            pending.append(entry.path)
+                        elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                            st = entry.stat()
+                            to_check[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError as e:
+                # Sin acceso ahora (p.ej. el recurso de red): se conserva lo indexado
+                print(f"⚠️  Error al leer la carpeta {directory}: {e}")
+                unchanged.add(directory)
+        return to_check, unchanged, folders
+
+    def refresh(self):
+        """
+        Sincroniza el índice con la carpeta Mix y lo carga en memoria.
+
+        Returns:
+            (archivos leídos, archivos eliminados)
+        """
+        to_check, unchanged, folders = self._walk()
+        known = {path: (mtime_ns, size) for path, mtime_ns, size
+                 in self.conn.execute("SELECT path, mtime_ns, size FROM files")}
+
+        changed = [path for path, stamp in to_check.items() if known.get(path) != stamp]
+        removed = [(path,) for path in known
+                   if path.startswith(self.root) and os.path.dirname(path) not in unchanged
+                   and path not in to_check]
+
+        if len(changed) > 100:
+            print(f"🗂️  Indexando {len(changed)} archivos de {self.root}...")
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            rows = list(executor.map(_read_file, changed, [to_check[path] for path in changed]))
+
+        gone_folders = [(path,) for path, in self.conn.execute("SELECT path FROM folders")
+                        if path.startswith(self.root) and path not in folders]
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", removed)
+            self.conn.executemany(_INSERT_FILE, rows)
+            self.conn.executemany("DELETE FROM folders WHERE path = ?", gone_folders)
+            self.conn.executemany("INSERT OR REPLACE INTO folders VALUES (?, ?)", folders.items())
+
+        self.load()
+        if rows or removed:
+            print(f"🗂️  Índice de Mix: {len(rows)} archivos leídos, {len(removed)} eliminados")
+        return len(rows), len(removed)
+
+    def add_file(self, path):
+        """Indexa (o vuelve a leer) un archivo concreto sin recorrer la carpeta Mix"""
+        st = os.stat(path)
+        row = _read_file(path, (st.st_mtime_ns, st.st_size))
+        with self.conn:
+            self.conn.execute(_INSERT_FILE, row)
+        self.files[path] = dict(zip(FILE_COLUMNS, row))
+        return self.files[path]
+
+    def remove_file(self, path):
+        """Quita un archivo del índice (movido o borrado)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        self.files.pop(path, None)
+
+    def find(self, song_name="", artist="", title="", path=None):
+        """
+        Duplicados en el índice, en este orden:
+        1. mismos artista y título (tags o nombre 'Artista - Título')
+        2. nombre de archivo que contiene song_name o title como palabras completas
+        3. misma huella de audio y duración parecida a la del archivo path
+
+        Returns:
+            Lista de rutas
+        """
+        artist_key, title_key = normalize_key(artist), normalize_key(title)
+        song_key = normalize_key(song_name)
+
+        exact, by_name = [], []
+        for file in self.files.values():
+            file_artist, file_title = file['artist_key'], file['title_key']
+            if not file_title:
+                file_artist, file_title = keys_from_filename(os.path.basename(file['path']))
+            if title_key and file_title == title_key and (not artist_key or file_artist == artist_key):
+                exact.append(file['path'])
+            elif any(key and f' {key} ' in f" {file['name_key']} " for key in (song_key, title_key)):
+                by_name.append(file['path'])
+
+        found = exact + by_name
+        found.extend(p for p in self._find_by_fingerprint(path) if p not in found)
+        return [p for p in found if os.path.isfile(p)]
+
+    def _find_by_fingerprint(self, path):
+        if not path or not FPCALC or not os.path.isfile(path):
+            return []
+        _, _, duration = read_audio_info(path)
+        candidates = [
+            file for file in self.files.values()
+            if file['fingerprint'] and file['path'] != path
+            and (duration is None or file['duration'] is None
+                 or abs(file['duration'] - duration) <= DURATION_TOLERANCE)
+        ]
+        if not candidates:
+            return []
+        target = fingerprint(path)
+        return [file['path'] for file in candidates
+                if fingerprint_similar(target, [int(v) for v in file['fingerprint'].split(',')])]
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#
+# Script Name: mix_playlists.py
+# Description:  Playlists M3U de Mixxx (una por subcarpeta de Mix) mantenidas de forma incremental
+# Author: volteret4
+# Repository: https://github.com/volteret4/
+# License:
+# Notes:
+#   Dependencies:   - python3, mix_index.py
+#
+#   Cada subcarpeta de Mix tiene su {subcarpeta}.m3u en la raíz de Mix con
+#   rutas relativas y líneas #EXTINF (duración, artista - título) sacadas del
+#   índice de mix_index.py, así que no hay que abrir ningún archivo de audio.
+#   Al mover o copiar una canción solo se reescriben las playlists afectadas
+#   (de forma atómica) y cada RECONCILE_DAYS se reconstruyen todas desde el
+#   índice por si algo se ha cambiado a mano en la carpeta.
+
+import os
+import tempfile
+import time
+
+RECONCILE_DAYS = 7
+
+
+class MixPlaylists:
+    def __init__(self, index):
+        """
+        Args:
+            index: MixIndex de la carpeta Mix
+        """
+        self.index = index
+        self.root = index.root
+        self.index.conn.execute(
+            "CREATE TABLE IF NOT EXISTS playlists_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.index.conn.commit()
+
+    def _playlist_name(self, path):
+        """Subcarpeta de Mix a la que pertenece path, o None si está fuera o en la raíz"""
+        rel_path = os.path.relpath(path, self.root)
+        parts = rel_path.split(os.sep)
+        if len(parts) < 2 or parts[0] in ('..', '.stfolder'):
+            return None
+        return parts[0]
+
+    def _playlist_file(self, name):
+        return os.path.join(self.root, f"{name}.m3u")
+
+    def _read_entries(self, name):
+        """Rutas relativas de la playlist en su orden actual"""
+        try:
+            with open(self._playlist_file(name), encoding='utf-8', errors='replace') as f:
+                return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        except FileNotFoundError:
+            return []
+
+    def _extinf(self, rel_path):
+        file = self.index.files.get(os.path.join(self.root, rel_path)) or {}
+        duration = file.get('duration')
+        seconds = int(round(duration)) if duration else -1
+        artist, title = file.get('artist'), file.get('title')
+        if artist and title:
+            label = f"{artist} - {title}"
+        else:
+            label = title or os.path.splitext(os.path.basename(rel_path))[0]
+        return f"#EXTINF:{seconds},{label}"
+
+    def _write(self, name, entries):
+        """Escribe la playlist en un temporal y la sustituye de una vez (Mixxx nunca lee una a medias)"""
+        lines = ["#EXTM3U"]
+        for rel_path in entries:
+            lines.append(self._extinf(rel_path))
+            lines.append(rel_path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=f".{name}.", suffix=".m3u.tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.chmod(tmp_path, 0o644)   # mkstemp lo crea 0600
+            os.replace(tmp_path, self._playlist_file(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def update(self, added=(), removed=()):
+        """
+        Actualiza el índice y las playlists afectadas por archivos añadidos o quitados.
+
+        Returns:
+            Nombres de las playlists reescritas
+        """
+        changes = {}     # playlist -> (rutas añadidas, rutas quitadas)
+        for path in removed:
+            self.index.remove_file(path)
+            name = self._playlist_name(path)
+            if name:
+                changes.setdefault(name, ([], set()))[1].add(os.path.relpath(path, self.root))
+        for path in added:
+            self.index.add_file(path)
+            name = self._playlist_name(path)
+            if name:
+                changes.setdefault(name, ([], set()))[0].append(os.path.relpath(path, self.root))
+
+        for name, (new_entries, gone) in changes.items():
+            entries = [entry for entry in self._read_entries(name) if entry not in gone]
+            entries.extend(entry for entry in new_entries if entry not in entries)
+            self._write(name, entries)
+        return sorted(changes)
+
+    def reconcile_due(self, subfolders):
+        """True si toca reconstruirlo todo: pasó RECONCILE_DAYS o falta alguna playlist"""
+        row = self.index.conn.execute(
+            "SELECT value FROM playlists_meta WHERE key = 'last_reconcile'").fetchone()
+        if not row or time.time() - float(row[0]) > RECONCILE_DAYS * 86400:
+            return True
+        return any(not os.path.exists(self._playlist_file(name)) for name in subfolders)
+
+    def reconcile(self, subfolders):
+        """
+        Reconstruye las playlists de subfolders desde el índice (conservando el
+        orden de las entradas que siguen existiendo) y borra las de carpetas que
+        ya no existen.
+        """
+        self.index.refresh()
+
+        by_playlist = {name: [] for name in subfolders}
+        for path in self.index.files:
+            name = self._playlist_name(path)
+            if name in by_playlist:
+                by_playlist[name].append(os.path.relpath(path, self.root))
+
+        for name, current in by_playlist.items():
+            current_set = set(current)
+            entries = [entry for entry in self._read_entries(name) if entry in current_set]
+            known = set(entries)
+            entries.extend(sorted(entry for entry in current if entry not in known))
+            self._write(name, entries)
+
+        for m3u_file in os.listdir(self.root):
+            if m3u_file.endswith('.m3u') and m3u_file[:-len('.m3u')] not in by_playlist:
+                os.remove(os.path.join(self.root, m3u_file))
+
+        with self.index.conn:
+            self.index.conn.execute(
+                "INSERT OR REPLACE INTO playlists_meta VALUES ('last_reconcile', ?)", (str(time.time()),))
@@ -20,7 +20,6 @@ import requests
 import hashlib
 import random
 import string
-from pathlib import Path
 from dotenv import load_dotenv
 
 import re
@@ -31,6 +30,9 @@ from PyQt6.QtWidgets import (QWidget, QApplication, QDialog, QVBoxLayout, QHBoxL
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QKeySequence, QPixmap, QPalette, QColor
 
+from mix_index import MixIndex
+from mix_playlists import MixPlaylists
+
 # Configuración de Airsonic Advanced
 load_dotenv()
 AIRSONIC_URL = os.getenv("AIRSONIC_URL")  # CAMBIAR POR TU URL
@@ -309,6 +311,8 @@ class MusicMover:
         self.mixxx_path = "/mnt/windows/Mix"  # CHANGE!!
         self.db_path = os.environ.get('MFUZZ_DB')
         self.temp_download_path = "/tmp/airsonic_downloads"  # Carpeta temporal para descargas
+        self.mix_index = MixIndex(self.mixxx_path)
+        self.playlists = MixPlaylists(self.mix_index)
 
         # Crear carpeta temporal si no existe
         os.makedirs(self.temp_download_path, exist_ok=True)
@@ -652,33 +656,14 @@ class MusicMover:
         except Exception as e:
             print(f"Error limpiando archivos temporales: {e}")
 
-    def find_duplicates(self, song_name, artist="", title=""):
-        """Buscar duplicados en todas las subcarpetas de Mix"""
-        duplicates = []
-
-        # Buscar por nombre completo de canción
-        if song_name:
-            cmd = ['find', self.mixxx_path, '-iname', f"*{song_name}*"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.stdout.strip():
-                duplicates.extend(result.stdout.strip().split('\n'))
-
-        # Buscar también por título si existe
-        if title:
-            cmd = ['find', self.mixxx_path, '-iname', f"*{title}*"]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.stdout.strip():
-                for dup in result.stdout.strip().split('\n'):
-                    if dup not in duplicates:
-                        duplicates.append(dup)
-
-        # Filtrar archivos válidos y eliminar duplicados
-        valid_duplicates = []
-        for dup in duplicates:
-            if os.path.isfile(dup) and dup not in valid_duplicates:
-                valid_duplicates.append(dup)
-
-        return valid_duplicates
+    def find_duplicates(self, song_name, artist="", title="", path=None):
+        """Buscar duplicados en todas las subcarpetas de Mix (índice persistente, ver mix_index.py)"""
+        try:
+            self.mix_index.refresh()
+        except Exception as e:
+            print(f"Error actualizando el índice de Mix: {e}")
+            self.mix_index.load()
+        return self.mix_index.find(song_name, artist, title, path)
 
     def get_subfolders(self):
         """Obtener subcarpetas del directorio Mix"""
@@ -857,27 +842,20 @@ class MusicMover:
         except:
             return ""
 
-    def update_playlists(self):
-        """Actualizar playlists de Mixxx"""
+    def update_playlists(self, added=None, removed=None):
+        """
+        Actualizar playlists de Mixxx (ver mix_playlists.py). Con added/removed
+        solo se tocan las entradas afectadas; sin ellos, o si toca la
+        reconstrucción periódica, se regeneran todas desde el índice.
+        """
         try:
-            # Eliminar playlists existentes
-            for m3u_file in Path(self.mixxx_path).glob("*.m3u"):
-                m3u_file.unlink()
-
-            # Crear nuevas playlists
-            for subfolder in self.get_subfolders():
-                subfolder_path = os.path.join(self.mixxx_path, subfolder)
-                playlist_file = os.path.join(self.mixxx_path, f"{subfolder}.m3u")
-
-                with open(playlist_file, 'w') as f:
-                    for root, dirs, files in os.walk(subfolder_path):
-                        for file in files:
-                            if file.lower().endswith(('.mp3', '.flac', '.ogg', '.wav', '.m4a')):
-                                file_path = os.path.join(root, file)
-                                # Escribir ruta relativa
-                                rel_path = os.path.relpath(file_path, self.mixxx_path)
-                                f.write(f"{rel_path}\n")
-
+            subfolders = self.get_subfolders()
+            if (added is None and removed is None) or self.playlists.reconcile_due(subfolders):
+                for path in removed or []:
+                    self.mix_index.remove_file(path)
+                self.playlists.reconcile(subfolders)
+            else:
+                self.playlists.update(added or [], removed or [])
         except Exception as e:
             print(f"Error actualizando playlists: {e}")
 
@@ -1955,7 +1933,8 @@ def main():
         duplicates = mover.find_duplicates(
             track_info['song_name'],
             track_info.get('artist', ''),
-            track_info.get('title', '')
+            track_info.get('title', ''),
+            track_info.get('path')
         )
 
         # Obtener subcarpetas
@@ -1991,6 +1970,7 @@ def main():
 
                         # Actualizar comentario
                         mover.set_tags(new_file, comment, rename=False)
+                        added, removed = [new_file], [duplicates[0]]
 
                     elif duplicates and dialog.action == 'copy':
                         # Copiar archivo original a nueva ubicación
@@ -2000,6 +1980,7 @@ def main():
                         # Establecer tags
                         time.sleep(2)  # Esperar a que se complete la copia
                         new_file = mover.set_tags(new_file, comment, rename=True)
+                        added, removed = [new_file], []
 
                         success = mover.add_to_lastfm_loved(track_info['artist'], track_info['title'])
                         if success:
@@ -2015,6 +1996,7 @@ def main():
                         # Establecer tags
                         time.sleep(2)  # Esperar a que se complete la copia
                         new_file = mover.set_tags(new_file, comment, rename=True)
+                        added, removed = [new_file], []
 
                         success = mover.add_to_lastfm_loved(track_info['artist'], track_info['title'])
                         if success:
@@ -2022,8 +2004,8 @@ def main():
                         else:
                             show_notification("Last.fm", "Error al añadir canción a loved tracks", urgent=True)
 
-                    # Actualizar playlists
-                    mover.update_playlists()
+                    # Actualizar playlists (solo las entradas afectadas)
+                    mover.update_playlists(added=added, removed=removed)
 
                     # Llamar al script de Spotify si existe
                     try:
@@ -6,7 +6,9 @@
 # Repository: https://github.com/volteret4/
 # License:
 # Notes:
-#   Dependencies:  - python3, caldav, dotenv, feedparser
+#   Dependencies:  - python3, caldav, icalendar, dotenv, feedparser
+#   Los eventos existentes se consultan en un índice local (caldav_index.py)
+#   y el feed se descarga de forma condicional con feed_poller.py
 #
 
 import requests
@@ -14,10 +16,12 @@ import feedparser
 import re
 from datetime import datetime, timezone, date
 from caldav import DAVClient
-from icalendar import Event, Calendar
 from dotenv import load_dotenv
 import os
 
+from caldav_index import CalDAVSyncIndex, default_index_path
+from feed_poller import FeedPoller
+
 load_dotenv()
 
 def determine_release_type(title):
@@ -34,17 +38,29 @@ def determine_release_type(title):
     # Default to album if no EP indicators found
     return "Album"
 
-def parse_atom_feed(feed_url):
-    """Parse the Atom feed and extract album release information."""
-    feed = feedparser.parse(feed_url)
-
-    if feed.bozo:
-        raise ValueError("Invalid feed format or malformed XML.")
+def parse_atom_feed(feed_url, poller=None, only_new=True):
+    """
+    Parse the Atom feed and extract album release information.
+
+    Con un FeedPoller la descarga es condicional (ETag/Last-Modified) y,
+    si only_new, solo se devuelven las entradas no vistas en ejecuciones anteriores.
+    Las entradas no se marcan como vistas hasta llamar a poller.confirm(feed_url).
+    """
+    if poller:
+        result = poller.poll(feed_url, kind='atom', respect_schedule=False, mark_seen=False)
+        entries = result.new_entries if only_new else result.entries
+        print(f"Feed status {result.status or 'cached'}: {len(entries)} entries to process")
+    else:
+        feed = feedparser.parse(feed_url)
+
+        if feed.bozo:
+            raise ValueError("Invalid feed format or malformed XML.")
+        entries = feed.entries
 
     releases = []
     date_pattern = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")  # Match dates in YYYY-MM-DD format
 
-    for entry in feed.entries:
+    for entry in entries:
         title = entry.title.strip()  # Limpiar espacios extra
         content = entry.summary
 
@@ -72,30 +88,8 @@ def parse_atom_feed(feed_url):
 
     return releases
 
-def get_existing_events(calendar):
-    """Retrieve existing events from the calendar to avoid duplicates."""
-    existing_events = set()
-
-    for event in calendar.events():
-        try:
-            cal = Calendar.from_ical(event.data)
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    summary = str(component.get("SUMMARY")).strip()
-                    dtstart = component.get("DTSTART").dt
-
-                    # Convert datetime to date if necessary
-                    if isinstance(dtstart, datetime):
-                        dtstart = dtstart.date()
-
-                    existing_events.add((summary, dtstart))
-        except Exception as e:
-            print(f"Error parsing existing event: {e}")
-
-    return existing_events
-
-def create_caldav_event(client_url, username, password, calendar_name, event_data):
-    """Connect to CalDAV and create events if they do not already exist."""
+def get_calendar(client_url, username, password, calendar_name, create=False):
+    """Connect to CalDAV and retrieve the calendar."""
     client = DAVClient(client_url, username=username, password=password)
     principal = client.principal()
     calendars = principal.calendars()
@@ -103,95 +97,36 @@ def create_caldav_event(client_url, username, password, calendar_name, event_dat
     # Buscar el calendario por nombre
     calendar = next((c for c in calendars if c.name == calendar_name), None)
     if calendar is None:
+        if not create:
+            print(f"Calendar '{calendar_name}' not found.")
+            return None
         print(f"Calendar '{calendar_name}' not found. Creating a new one.")
         calendar = principal.make_calendar(name=calendar_name)
 
-    # Obtener eventos existentes para evitar duplicados
-    existing_events = get_existing_events(calendar)
-
-    for event in event_data:
-        event_title = event["title"].strip()
-        event_date = event["release_date"]
-
-        # Verificar si el evento ya existe
-        if (event_title, event_date) in existing_events:
-            print(f"Skipping duplicate event: {event_title} ({event_date})")
-            continue
-
-        # Crear nuevo evento de todo el día
-        cal_event = Event()
-        cal_event.add("summary", event_title)
-
-        # Para eventos de todo el día, usar solo la fecha sin hora ni timezone
-        cal_event.add("dtstart", event_date)
-        cal_event.add("dtend", event_date)
-
-        # Marcar como evento de todo el día
-        cal_event['dtstart'].params['VALUE'] = 'DATE'
-        cal_event['dtend'].params['VALUE'] = 'DATE'
-
-        cal_event.add("description", f"Release Date for {event_title}")
-
-        calendar.save_event(cal_event.to_ical())
-        print(f"Added all-day event: {event_title} ({event_date})")
-
-# ELIMINAR DUPLICADOS
-def get_calendar(client_url, username, password, calendar_name):
-    """Connect to CalDAV and retrieve the calendar."""
-    client = DAVClient(client_url, username=username, password=password)
-    principal = client.principal()
-    calendars = principal.calendars()
-
-    # Buscar el calendario por nombre
-    calendar = next((c for c in calendars if c.name == calendar_name), None)
-    if calendar is None:
-        print(f"Calendar '{calendar_name}' not found.")
-        return None
-
     return calendar
 
-def find_duplicate_events(calendar):
-    """Find duplicate events in the calendar."""
-    events_by_key = {}  # Diccionario para almacenar eventos únicos (key = (title, date))
-    duplicate_events = []  # Lista de eventos duplicados para eliminar
+def create_caldav_event(client_url, username, password, calendar_name, event_data, index_path=None):
+    """
+    Connect to CalDAV and create events if they do not already exist.
 
-    for event in calendar.events():
-        try:
-            cal = Calendar.from_ical(event.data)
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    title = str(component.get("SUMMARY"))
-                    dtstart = component.get("DTSTART").dt
-
-                    if isinstance(dtstart, datetime):
-                        dtstart = dtstart.date()  # Convertir a objeto date
-
-                    key = (title, dtstart)
-
-                    if key in events_by_key:
-                        duplicate_events.append(event)  # Marcar como duplicado
-                    else:
-                        events_by_key[key] = event  # Guardar como único
-
-        except Exception as e:
-            print(f"Error parsing event: {e}")
+    Los duplicados se comprueban contra el índice local (sincronizado por
+    ctag/sync-collection) y los eventos nuevos se suben en paralelo.
+    Devuelve el índice para poder reutilizarlo (p.ej. para borrar duplicados).
+    """
+    calendar = get_calendar(client_url, username, password, calendar_name, create=True)
 
-    return duplicate_events
+    index = CalDAVSyncIndex(calendar, index_path or default_index_path(calendar_name))
+    index.refresh()
 
-def remove_duplicate_events(calendar):
-    """Remove duplicate events from the calendar."""
-    duplicate_events = find_duplicate_events(calendar)
+    created = index.add_events(event_data)
+    print(f"{created} new events created.")
+    return index
 
-    if not duplicate_events:
-        print("No duplicate events found.")
-        return
-
-    for event in duplicate_events:
-        try:
-            event.delete()
-            print(f"Deleted duplicate event: {event.url}")
-        except Exception as e:
-            print(f"Error deleting event: {e}")
+# ELIMINAR DUPLICADOS
+def remove_duplicate_events(index):
+    """Remove duplicate events from the calendar using the local index."""
+    index.refresh()
+    index.remove_duplicates()
 
 
 if __name__ == "__main__":
@@ -204,17 +139,17 @@ if __name__ == "__main__":
     password = os.getenv("RADICALE_PW")
     calendar_name = "discos"
 
-    # Parsear el feed Atom
-    releases = parse_atom_feed(atom_feed_url)
+    # Parsear el feed Atom (solo entradas nuevas desde la última ejecución)
+    poller = FeedPoller()
+    releases = parse_atom_feed(atom_feed_url, poller=poller)
 
     # Conectar a CalDAV y agregar eventos sin duplicados
-    create_caldav_event(caldav_url, username, password, calendar_name, releases)
+    index = create_caldav_event(caldav_url, username, password, calendar_name, releases)
+    poller.confirm(atom_feed_url)
 
     print("Events successfully processed!")
 
     # Duplicados por tabaco
-    calendar = get_calendar(caldav_url, username, password, calendar_name)
-
-    if calendar:
-        remove_duplicate_events(calendar)
+    remove_duplicate_events(index)
+    index.close()
     print("Duplicados por tabaco.")
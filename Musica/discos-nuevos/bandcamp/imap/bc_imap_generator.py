@@ -7,6 +7,7 @@ Versión 2: Con botones de acción y API para gestionar correos
 
 import os
 import re
+import sys
 import email
 import json
 from pathlib import Path
@@ -24,6 +25,11 @@ from email.utils import parsedate_to_datetime
 from datetime import datetime
 from datetime import datetime
 
+# Motor compartido de extracción de enlaces (Musica/discos-nuevos/music_links.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from music_links import extract_bandcamp_link as find_bandcamp_link
+from music_links import find_bandcamp_player, bandcamp_iframe
+
 
 class IMAPConfig:
     """Configuración para conexión IMAP"""
@@ -367,56 +373,12 @@ def process_imap_folder(mail, folder_name, genre, mark_as_read=True, include_rea
 def extract_bandcamp_link(email_content):
     """
     Extrae el enlace de Bandcamp del texto del correo.
-    Busca diferentes patrones comunes en correos de Bandcamp.
+    El correo se recorre una sola vez con el motor compartido de music_links.
     """
-    # Lista de patrones para buscar, en orden de prioridad
-    patterns = [
-        # Patrón 1: "check it out here" con enlace en href
-        r'check\s+it\s+out\s+here.*?href=["\']([^"\']+bandcamp\.com[^"\']*)["\']',
-
-        # Patrón 2: href antes de "check it out here" (común en HTML)
-        r'href=["\']([^"\']+bandcamp\.com[^"\']*)["\'].*?check\s+it\s+out\s+here',
-
-        # Patrón 3: "check it out here" seguido de URL en texto plano
-        r'check\s+it\s+out\s+here[^\n]*?(https?://[^\s<]+bandcamp\.com[^\s<]*)',
-
-        # Patrón 4: Cualquier enlace de bandcamp en el correo (fallback)
-        r'href=["\']([^"\']*bandcamp\.com/(?:album|track)/[^"\']+)["\']',
-
-        # Patrón 5: URL directa de album/track en texto
-        r'(https?://[^\s<]+bandcamp\.com/(?:album|track)/[^\s<]+)',
-    ]
-
-    for i, pattern in enumerate(patterns):
-        match = re.search(pattern, email_content, re.IGNORECASE | re.DOTALL)
-        if match:
-            link = match.group(1)
-
-            # Limpiar el enlace
-            link = link.strip().rstrip('.,;!?>')
-
-            # Decodificar entidades HTML comunes
-            link = link.replace('&amp;', '&')
-            link = link.replace('&lt;', '<')
-            link = link.replace('&gt;', '>')
-
-            # Limpiar parámetros de tracking pero mantener la URL base
-            # Los parámetros UTM son solo tracking, la página funciona sin ellos
-            if '?' in link:
-                base_url, params = link.split('?', 1)
-                link = base_url
-
-            # Eliminar cualquier cosa después de espacios o caracteres extraños
-            link = link.split()[0] if ' ' in link else link
-
-            # Si el enlace es relativo, completarlo
-            if link.startswith('/'):
-                # Esto no debería pasar, pero por si acaso
-                continue
-
-            # Verificar que es un enlace válido de Bandcamp con album o track
-            if 'bandcamp.com' in link and ('/album/' in link or '/track/' in link):
-                return link
+    link, reason = find_bandcamp_link(email_content)
+    if link:
+        print(f"       🔗 URL extraída ({reason}): {link[:100]}...")
+        return link
 
     return None
 
@@ -424,112 +386,17 @@ def extract_bandcamp_link(email_content):
 def fetch_bandcamp_embed_from_html(html_content):
     """
     Extrae el código embed del contenido HTML de una página de Bandcamp.
-    Usa múltiples métodos para encontrar los IDs necesarios.
+    Busca TralbumData, EmbedData, atributos data-*, album_id/track_id e iframes
+    del reproductor con los patrones precompilados de music_links.find_bandcamp_player.
     """
     try:
         print(f"       📄 Analizando HTML ({len(html_content)} caracteres)")
 
-        # MÉTODO 1: Buscar en el bloque TralbumData (más común)
-        tralbum_data_match = re.search(
-            r'var\s+TralbumData\s*=\s*(\{.+?\});',
-            html_content,
-            re.DOTALL
-        )
-
-        if tralbum_data_match:
-            try:
-                tralbum_json_str = tralbum_data_match.group(1)
-
-                # Buscar album_id
-                album_id_match = re.search(r'"?album_id"?\s*:\s*(\d+)', tralbum_json_str)
-                if album_id_match:
-                    album_id = album_id_match.group(1)
-                    print(f"       ✓ album_id encontrado en TralbumData: {album_id}")
-                    embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                    return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-                # Buscar track_id si es un track
-                item_type_match = re.search(r'"?item_type"?\s*:\s*"?(track|album)"?', tralbum_json_str)
-                if item_type_match and item_type_match.group(1) == 'track':
-                    track_id_match = re.search(r'"?id"?\s*:\s*(\d+)', tralbum_json_str)
-                    if track_id_match:
-                        track_id = track_id_match.group(1)
-                        print(f"       ✓ track_id encontrado en TralbumData: {track_id}")
-                        embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                        return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-            except Exception as e:
-                print(f"       ⚠️  Error en TralbumData: {e}")
-
-        # MÉTODO 2: Buscar en EmbedData
-        embed_data_match = re.search(
-            r'var\s+EmbedData\s*=\s*(\{.+?\});',
-            html_content,
-            re.DOTALL
-        )
-
-        if embed_data_match:
-            try:
-                embed_json_str = embed_data_match.group(1)
-
-                album_id_match = re.search(r'"?album_id"?\s*:\s*(\d+)', embed_json_str)
-                if album_id_match:
-                    album_id = album_id_match.group(1)
-                    print(f"       ✓ album_id encontrado en EmbedData: {album_id}")
-                    embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                    return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-                track_id_match = re.search(r'"?track_id"?\s*:\s*(\d+)', embed_json_str)
-                if track_id_match:
-                    track_id = track_id_match.group(1)
-                    print(f"       ✓ track_id encontrado en EmbedData: {track_id}")
-                    embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                    return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-            except Exception as e:
-                print(f"       ⚠️  Error en EmbedData: {e}")
-
-        # MÉTODO 3: Buscar directamente en el HTML
-        # Buscar album_id en cualquier parte
-        album_id_patterns = [
-            r'data-band-id="(\d+)".*?data-item-id="(\d+)".*?data-item-type="album"',
-            r'"?album_id"?\s*:\s*(\d+)',
-            r'album[=/](\d{8,12})',
-        ]
-
-        for pattern in album_id_patterns:
-            match = re.search(pattern, html_content, re.DOTALL)
-            if match:
-                album_id = match.group(2) if len(match.groups()) > 1 else match.group(1)
-                print(f"       ✓ album_id encontrado (búsqueda general): {album_id}")
-                embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        # Buscar track_id
-        track_id_patterns = [
-            r'data-band-id="(\d+)".*?data-item-id="(\d+)".*?data-item-type="track"',
-            r'"?track_id"?\s*:\s*(\d+)',
-            r'track[=/](\d{8,12})',
-        ]
-
-        for pattern in track_id_patterns:
-            match = re.search(pattern, html_content, re.DOTALL)
-            if match:
-                track_id = match.group(2) if len(match.groups()) > 1 else match.group(1)
-                print(f"       ✓ track_id encontrado (búsqueda general): {track_id}")
-                embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        # MÉTODO 4: Buscar el iframe embed directo
-        iframe_match = re.search(
-            r'<iframe[^>]*src=["\']([^"\']*EmbeddedPlayer[^"\']*)["\']',
-            html_content,
-            re.IGNORECASE
-        )
-        if iframe_match:
-            embed_url = iframe_match.group(1)
-            if embed_url.startswith('//'):
-                embed_url = 'https:' + embed_url
-            print(f"       ✓ iframe embed encontrado directamente")
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
+        embed_url, source = find_bandcamp_player(html_content)
+        if embed_url:
+            player_id = embed_url.split('EmbeddedPlayer/', 1)[-1].split('/', 1)[0]
+            print(f"       ✓ {player_id} encontrado ({source})")
+            return bandcamp_iframe(embed_url)
 
         print(f"       ❌ No se encontró embed en ningún método")
 
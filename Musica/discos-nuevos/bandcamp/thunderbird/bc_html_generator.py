@@ -6,6 +6,7 @@ Lee correos de carpetas de Thunderbird y extrae enlaces de Bandcamp
 
 import os
 import re
+import sys
 import mailbox
 import email
 from pathlib import Path
@@ -17,56 +18,27 @@ import urllib.request
 import time
 from html.parser import HTMLParser
 
+# Motor compartido de extracción de enlaces (Musica/discos-nuevos/music_links.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from music_links import extract_bandcamp_link as find_bandcamp_link, bandcamp_mentions
+from music_links import find_bandcamp_player, bandcamp_iframe
+
 
 def extract_bandcamp_link(email_content):
     """
     Extrae el enlace de Bandcamp del texto del correo.
-    Busca diferentes patrones comunes en correos de Bandcamp.
+    El correo se recorre una sola vez con el motor compartido de music_links.
     """
-    # Lista de patrones para buscar, en orden de prioridad
-    patterns = [
-        # Patrón 1: "check it out here" con enlace en href
-        r'check\s+it\s+out\s+here.*?href=["\']([^"\']+bandcamp\.com[^"\']*)["\']',
-
-        # Patrón 2: href antes de "check it out here" (común en HTML)
-        r'href=["\']([^"\']+bandcamp\.com[^"\']*)["\'].*?check\s+it\s+out\s+here',
-
-        # Patrón 3: "check it out here" seguido de URL en texto plano
-        r'check\s+it\s+out\s+here[^\n]*?(https?://[^\s<]+bandcamp\.com[^\s<]*)',
-
-        # Patrón 4: Cualquier enlace de bandcamp en el correo (fallback)
-        r'href=["\']([^"\']*bandcamp\.com/(?:album|track)/[^"\']+)["\']',
-
-        # Patrón 5: URL directa de album/track en texto
-        r'(https?://[^\s<]+bandcamp\.com/(?:album|track)/[^\s<]+)',
-    ]
-
-    for i, pattern in enumerate(patterns):
-        match = re.search(pattern, email_content, re.IGNORECASE | re.DOTALL)
-        if match:
-            link = match.group(1)
-
-            # Limpiar el enlace
-            link = link.strip().rstrip('.,;!?>')
-
-            # Decodificar entidades HTML comunes
-            link = link.replace('&amp;', '&')
-
-            # Si el enlace es relativo, completarlo
-            if link.startswith('/'):
-                # Esto no debería pasar, pero por si acaso
-                continue
-
-            # Verificar que es un enlace válido de Bandcamp con album o track
-            if 'bandcamp.com' in link and ('/album/' in link or '/track/' in link):
-                print(f"    🔗 URL extraída (patrón {i+1}): {link[:100]}...")
-                return link
+    link, reason = find_bandcamp_link(email_content)
+    if link:
+        print(f"    🔗 URL extraída ({reason}): {link[:100]}...")
+        return link
 
     # Debug: buscar cualquier mención de bandcamp
-    bandcamp_mentions = re.findall(r'bandcamp\.com[^\s<>"\']{0,100}', email_content, re.IGNORECASE)
-    if bandcamp_mentions:
+    mentions = bandcamp_mentions(email_content)
+    if mentions:
         print(f"    ⚠️  Menciones de bandcamp encontradas pero no pudieron extraerse:")
-        for mention in bandcamp_mentions[:3]:  # Solo mostrar las primeras 3
+        for mention in mentions:
             print(f"       {mention[:80]}")
 
     return None
@@ -96,100 +68,17 @@ class BandcampEmbedParser(HTMLParser):
 def fetch_bandcamp_embed_from_html(html_content):
     """
     Extrae el código embed del contenido HTML de una página de Bandcamp.
-    Busca en múltiples ubicaciones con patrones flexibles.
+    Busca TralbumData, EmbedData, atributos data-*, album_id/track_id e iframes
+    del reproductor con los patrones precompilados de music_links.find_bandcamp_player.
     """
     try:
         print(f"    📄 Analizando HTML ({len(html_content)} caracteres)")
 
-        # MÉTODO 1: Buscar en el bloque TralbumData (más común)
-        # Este es el lugar principal donde Bandcamp guarda la info
-        tralbum_data_match = re.search(
-            r'var\s+TralbumData\s*=\s*(\{[^;]+\});',
-            html_content,
-            re.DOTALL
-        )
-
-        if tralbum_data_match:
-            try:
-                import json
-                # Intentar parsear el JSON
-                tralbum_json_str = tralbum_data_match.group(1)
-                # Limpiar el JSON (a veces tiene comentarios o trailing commas)
-                tralbum_json_str = re.sub(r',\s*}', '}', tralbum_json_str)
-                tralbum_json_str = re.sub(r',\s*]', ']', tralbum_json_str)
-
-                # Buscar los IDs dentro del texto JSON sin parsearlo completamente
-                album_id_in_tralbum = re.search(r'"?album_id"?\s*:\s*(\d+)', tralbum_json_str)
-                track_id_in_tralbum = re.search(r'"?id"?\s*:\s*(\d+)', tralbum_json_str)
-                item_type_match = re.search(r'"?item_type"?\s*:\s*"?(track|album)"?', tralbum_json_str)
-
-                if album_id_in_tralbum:
-                    album_id = album_id_in_tralbum.group(1)
-                    print(f"    ✓ album_id encontrado en TralbumData: {album_id}")
-                    embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                    return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-                # Si es un track, buscar de manera diferente
-                if item_type_match and item_type_match.group(1) == 'track':
-                    if track_id_in_tralbum:
-                        track_id = track_id_in_tralbum.group(1)
-                        print(f"    ✓ track_id encontrado: {track_id}")
-                        embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                        return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-            except Exception as e:
-                print(f"    ⚠️  Error procesando TralbumData: {e}")
-
-        # MÉTODO 2: Buscar en window.pagedata o data attributes
-        pagedata_match = re.search(r'data-tralbum=["\']?(\d+)["\']?', html_content)
-        if pagedata_match:
-            album_id = pagedata_match.group(1)
-            print(f"    ✓ album_id en data-tralbum: {album_id}")
-            embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        # MÉTODO 3: Buscar directamente "album_id" o "track_id" en cualquier parte
-        album_id_anywhere = re.search(r'["\']?album_id["\']?\s*:\s*(\d+)', html_content)
-        if album_id_anywhere:
-            album_id = album_id_anywhere.group(1)
-            print(f"    ✓ album_id encontrado (búsqueda general): {album_id}")
-            embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        track_id_anywhere = re.search(r'["\']?track_id["\']?\s*:\s*(\d+)', html_content)
-        if track_id_anywhere:
-            track_id = track_id_anywhere.group(1)
-            print(f"    ✓ track_id encontrado (búsqueda general): {track_id}")
-            embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        # MÉTODO 4: Buscar el iframe embed directo (si ya está en la página)
-        iframe_match = re.search(
-            r'<iframe[^>]*src=["\']([^"\']*EmbeddedPlayer[^"\']*)["\']',
-            html_content,
-            re.IGNORECASE
-        )
-        if iframe_match:
-            embed_url = iframe_match.group(1)
-            if embed_url.startswith('//'):
-                embed_url = 'https:' + embed_url
-            print(f"    ✓ iframe embed encontrado directamente")
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        # MÉTODO 5: Buscar en el código JavaScript
-        # A veces el ID está en formato: album/1234567890
-        embed_in_js = re.search(r'album[=/](\d{8,12})', html_content)
-        if embed_in_js:
-            album_id = embed_in_js.group(1)
-            print(f"    ✓ album_id encontrado en JavaScript: {album_id}")
-            embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        track_in_js = re.search(r'track[=/](\d{8,12})', html_content)
-        if track_in_js:
-            track_id = track_in_js.group(1)
-            print(f"    ✓ track_id encontrado en JavaScript: {track_id}")
-            embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
+        embed_url, source = find_bandcamp_player(html_content)
+        if embed_url:
+            player_id = embed_url.split('EmbeddedPlayer/', 1)[-1].split('/', 1)[0]
+            print(f"    ✓ {player_id} encontrado ({source})")
+            return bandcamp_iframe(embed_url)
 
         # DEBUG: Mostrar un fragmento del HTML para ayudar a diagnosticar
         print(f"    ✗ No se encontró album_id ni track_id")
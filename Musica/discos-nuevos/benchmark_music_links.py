@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark del motor de enlaces (music_links.py) frente a las funciones
+anteriores de los generadores (una lista de re.search por patrón).
+
+Corpus: ficheros .html / .eml / .txt y buzones mbox de Thunderbird.
+Por defecto usa los HTML generados que hay en el repositorio.
+
+Uso:
+    python benchmark_music_links.py
+    python benchmark_music_links.py ~/correos/*.eml ~/.thunderbird/xxx/Mail/Local\\ Folders/Bandcamp
+    python benchmark_music_links.py --repeat 20 --pages ~/bandcamp_paginas/
+"""
+
+import re
+import sys
+import time
+import email
+import mailbox
+import argparse
+from pathlib import Path
+
+from music_links import find_links, links_by_service, extract_bandcamp_link, find_bandcamp_player
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_CORPUS = [
+    BASE_DIR / 'bandcamp' / 'imap' / 'bandcamp_html',
+    BASE_DIR / 'bandcamp' / 'thunderbird' / 'bandcamp_html',
+    BASE_DIR / 'rss' / 'freshrss_embeds',
+]
+
+
+# ---------------------------------------------------------------------------
+# Versiones anteriores (copiadas de bc_imap_generator.py y freshrss_html_generator.py,
+# sin los print)
+# ---------------------------------------------------------------------------
+
+def legacy_extract_bandcamp_link(email_content):
+    patterns = [
+        r'check\s+it\s+out\s+here.*?href=["\']([^"\']+bandcamp\.com[^"\']*)["\']',
+        r'href=["\']([^"\']+bandcamp\.com[^"\']*)["\'].*?check\s+it\s+out\s+here',
+        r'check\s+it\s+out\s+here[^\n]*?(https?://[^\s<]+bandcamp\.com[^\s<]*)',
+        r'href=["\']([^"\']*bandcamp\.com/(?:album|track)/[^"\']+)["\']',
+        r'(https?://[^\s<]+bandcamp\.com/(?:album|track)/[^\s<]+)',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, email_content, re.IGNORECASE | re.DOTALL)
+        if match:
+            link = match.group(1).strip().rstrip('.,;!?>').replace('&amp;', '&')
+            link = link.split('?', 1)[0]
+            if link.startswith('/'):
+                continue
+            if 'bandcamp.com' in link and ('/album/' in link or '/track/' in link):
+                return link
+    return None
+
+
+def legacy_extract_all(text):
+    bandcamp = []
+    for pattern in (r'https?://[a-zA-Z0-9-]+\.bandcamp\.com/(?:album|track)/[a-zA-Z0-9-]+',
+                    r'https?://bandcamp\.com/[a-zA-Z0-9-]+'):
+        bandcamp.extend(re.findall(pattern, text))
+
+    video_ids = []
+    for pattern in (r'https?://(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})',
+                    r'https?://(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]{11})',
+                    r'https?://youtu\.be/([a-zA-Z0-9_-]{11})'):
+        video_ids.extend(re.findall(pattern, text))
+
+    soundcloud = []
+    for pattern in (r'https?://soundcloud\.com/[a-zA-Z0-9-_]+/[a-zA-Z0-9-_]+',
+                    r'https?://(?:w|m)\.soundcloud\.com/[a-zA-Z0-9-_]+/[a-zA-Z0-9-_]+'):
+        soundcloud.extend(re.findall(pattern, text))
+
+    return {
+        'bandcamp': list(set(bandcamp)),
+        'youtube': [f"https://www.youtube.com/embed/{vid}" for vid in set(video_ids)],
+        'soundcloud': list(set(soundcloud)),
+    }
+
+
+def legacy_find_player(html_content):
+    player = 'https://bandcamp.com/EmbeddedPlayer/{}={}/'
+
+    for block_re in (r'var\s+TralbumData\s*=\s*(\{.+?\});', r'var\s+EmbedData\s*=\s*(\{.+?\});'):
+        block = re.search(block_re, html_content, re.DOTALL)
+        if block:
+            data = block.group(1)
+            album = re.search(r'"?album_id"?\s*:\s*(\d+)', data)
+            if album:
+                return player.format('album', album.group(1))
+            if 'TralbumData' in block_re:
+                item_type = re.search(r'"?item_type"?\s*:\s*"?(track|album)"?', data)
+                if item_type and item_type.group(1) == 'track':
+                    track = re.search(r'"?id"?\s*:\s*(\d+)', data)
+                    if track:
+                        return player.format('track', track.group(1))
+            else:
+                track = re.search(r'"?track_id"?\s*:\s*(\d+)', data)
+                if track:
+                    return player.format('track', track.group(1))
+
+    for kind in ('album', 'track'):
+        for pattern in (rf'data-band-id="(\d+)".*?data-item-id="(\d+)".*?data-item-type="{kind}"',
+                        rf'"?{kind}_id"?\s*:\s*(\d+)',
+                        rf'{kind}[=/](\d{{8,12}})'):
+            match = re.search(pattern, html_content, re.DOTALL)
+            if match:
+                return player.format(kind, match.group(match.lastindex))
+
+    iframe = re.search(r'<iframe[^>]*src=["\']([^"\']*EmbeddedPlayer[^"\']*)["\']', html_content, re.IGNORECASE)
+    if iframe:
+        return iframe.group(1)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def _message_text(message):
+    parts = []
+    for part in message.walk():
+        if part.get_content_type() in ('text/plain', 'text/html'):
+            payload = part.get_payload(decode=True)
+            if payload:
+                parts.append(payload.decode('utf-8', errors='ignore'))
+    return '\n'.join(parts)
+
+
+def load_corpus(paths):
+    """Devuelve una lista de textos (cuerpos de correo o páginas HTML)"""
+    texts = []
+    for path in paths:
+        path = Path(path).expanduser()
+        if path.is_dir():
+            files = sorted(p for p in path.rglob('*') if p.is_file())
+        elif path.is_file():
+            files = [path]
+        else:
+            print(f"⚠️  No existe: {path}")
+            continue
+
+        for file_path in files:
+            suffix = file_path.suffix.lower()
+            if suffix in ('.html', '.htm', '.txt'):
+                texts.append(file_path.read_text(encoding='utf-8', errors='ignore'))
+            elif suffix == '.eml':
+                with open(file_path, 'rb') as f:
+                    texts.append(_message_text(email.message_from_binary_file(f)))
+            elif not suffix:
+                # Buzón mbox de Thunderbird (sin extensión)
+                try:
+                    for message in mailbox.mbox(str(file_path)):
+                        texts.append(_message_text(message))
+                except Exception as e:
+                    print(f"⚠️  {file_path} no es un mbox: {e}")
+    return texts
+
+
+def bench(label, func, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<38} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de extracción de enlaces musicales')
+    parser.add_argument('paths', nargs='*', help='Ficheros o carpetas (.html, .eml, mbox)')
+    parser.add_argument('--pages', nargs='*', default=[],
+                        help='Páginas de álbum de Bandcamp guardadas (para find_bandcamp_player)')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por prueba')
+    args = parser.parse_args()
+
+    texts = load_corpus(args.paths or DEFAULT_CORPUS)
+    if not texts:
+        print("❌ Corpus vacío")
+        return 1
+
+    size_mb = sum(len(t) for t in texts) / 1e6
+    print(f"📚 Corpus: {len(texts)} textos, {size_mb:.1f} MB, {args.repeat} repeticiones\n")
+
+    print("🔗 Enlace principal de Bandcamp (correos)")
+    old = bench('re.search por patrón (anterior)', legacy_extract_bandcamp_link, texts, args.repeat)
+    new = bench('music_links.extract_bandcamp_link', extract_bandcamp_link, texts, args.repeat)
+    print(f"  ⚡ x{old / new:.1f}\n")
+
+    print("🎵 Bandcamp + YouTube + SoundCloud (artículos)")
+    old = bench('7 re.findall (anterior)', legacy_extract_all, texts, args.repeat)
+    new = bench('music_links.links_by_service', links_by_service, texts, args.repeat)
+    print(f"  ⚡ x{old / new:.1f}\n")
+
+    # Comprobar que se encuentran los mismos enlaces
+    differences = 0
+    for text in texts:
+        before = legacy_extract_all(text)
+        after = links_by_service(text)
+        for service in before:
+            if set(before[service]) != set(after[service]):
+                differences += 1
+                break
+    total_links = sum(len(l.url or '') > 0 for t in texts for l in find_links(t))
+    print(f"🔍 {total_links} enlaces encontrados; textos con resultados distintos: {differences}\n")
+
+    pages = load_corpus(args.pages) if args.pages else texts
+    print(f"💿 Reproductor en páginas de Bandcamp ({len(pages)} páginas)")
+    old = bench('una docena de re.search (anterior)', legacy_find_player, pages, args.repeat)
+    new = bench('music_links.find_bandcamp_player', find_bandcamp_player, pages, args.repeat)
+    print(f"  ⚡ x{old / new:.1f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+#
+# Script Name: caldav_index.py
+# Description: Índice local (SQLite) de un calendario CalDAV sincronizado con ctag y sync-collection
+# Author: volteret4
+# Repository: https://github.com/volteret4/
+# License:
+# Notes:
+#   Dependencies:  - python3, caldav, icalendar
+#
+#   Guarda (href, uid, etag, summary, fecha) de cada evento. En cada ejecución
+#   solo se consulta el ctag del calendario; si ha cambiado se pide al servidor
+#   un REPORT sync-collection con el último sync-token y se descargan (con
+#   calendar-multiget) únicamente los eventos nuevos o modificados. Si el
+#   servidor no admite sync-collection se compara el listado de etags
+#   (PROPFIND Depth: 1) con el índice.
+#
+
+import os
+import sqlite3
+import hashlib
+import xml.etree.ElementTree as ET
+from datetime import datetime, date
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from icalendar import Calendar, Event
+
+NS = {
+    'd': 'DAV:',
+    'c': 'urn:ietf:params:xml:ns:caldav',
+    'cs': 'http://calendarserver.org/ns/',
+}
+
+PROPFIND_CTAG = """<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:" xmlns:cs="http://calendarserver.org/ns/">
+  <d:prop>
+    <cs:getctag/>
+    <d:sync-token/>
+  </d:prop>
+</d:propfind>"""
+
+SYNC_COLLECTION = """<?xml version="1.0" encoding="utf-8"?>
+<d:sync-collection xmlns:d="DAV:">
+  <d:sync-token>{token}</d:sync-token>
+  <d:sync-level>1</d:sync-level>
+  <d:prop>
+    <d:getetag/>
+  </d:prop>
+</d:sync-collection>"""
+
+PROPFIND_ETAGS = """<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:">
+  <d:prop>
+    <d:getetag/>
+  </d:prop>
+</d:propfind>"""
+
+CALENDAR_MULTIGET = """<?xml version="1.0" encoding="utf-8"?>
+<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:prop>
+    <d:getetag/>
+    <c:calendar-data/>
+  </d:prop>
+{hrefs}
+</c:calendar-multiget>"""
+
+MULTIGET_BATCH = 100
+DEFAULT_WORKERS = 8
+
+
+def default_index_path(calendar_name):
+    """Ruta por defecto del índice: ~/.cache/caldav_index/<calendario>.db"""
+    cache_dir = os.getenv('CALDAV_INDEX_DIR', os.path.expanduser('~/.cache/caldav_index'))
+    return os.path.join(cache_dir, f"{calendar_name}.db")
+
+
+def event_uid(summary, event_date):
+    """UID determinista para un lanzamiento: el mismo disco siempre genera el mismo recurso"""
+    key = f"{summary.strip()}|{event_date.isoformat()}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest() + '@add_release_calendar'
+
+
+def _escape_xml(text):
+    return (text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;'))
+
+
+class CalDAVSyncIndex:
+    """Índice local de eventos de un calendario CalDAV"""
+
+    def __init__(self, calendar, db_path):
+        self.calendar = calendar
+        self.client = calendar.client
+        self.url = str(calendar.url)
+        if not self.url.endswith('/'):
+            self.url += '/'
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                href TEXT PRIMARY KEY,
+                uid TEXT,
+                etag TEXT,
+                summary TEXT,
+                dtstart TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_key ON events(summary, dtstart);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self.conn.commit()
+
+    # ------------------------------------------------------------------
+    # Metadatos (ctag / sync-token)
+    # ------------------------------------------------------------------
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # ------------------------------------------------------------------
+    # Peticiones WebDAV
+    # ------------------------------------------------------------------
+
+    def _request(self, method, body, depth):
+        headers = {'Content-Type': 'application/xml; charset=utf-8', 'Depth': str(depth)}
+        response = self.client.request(self.url, method, body, headers)
+        return response
+
+    def _absolute(self, href):
+        return urljoin(self.url, href)
+
+    def _relative(self, href):
+        """Normaliza un href al path del servidor para usarlo como clave"""
+        return urlparse(self._absolute(href)).path
+
+    def _fetch_ctag(self):
+        response = self._request('PROPFIND', PROPFIND_CTAG, 0)
+        tree = ET.fromstring(response.raw)
+        ctag = tree.find('.//cs:getctag', NS)
+        token = tree.find('.//d:sync-token', NS)
+        return (ctag.text if ctag is not None else None,
+                token.text if token is not None else None)
+
+    def _sync_collection(self, token):
+        """
+        Devuelve (cambiados, borrados, nuevo_token).
+        cambiados: {href: etag}; borrados: [href]
+        """
+        body = SYNC_COLLECTION.format(token=_escape_xml(token or ''))
+        response = self._request('REPORT', body, 1)
+        if response.status >= 400:
+            raise RuntimeError(f"sync-collection devolvió {response.status}")
+
+        tree = ET.fromstring(response.raw)
+        changed, deleted = {}, []
+
+        for resp in tree.findall('d:response', NS):
+            href = resp.findtext('d:href', default='', namespaces=NS)
+            if not href or self._relative(href) == urlparse(self.url).path:
+                continue
+
+            status = resp.findtext('d:status', default='', namespaces=NS)
+            if ' 404 ' in f" {status} ":
+                deleted.append(self._relative(href))
+                continue
+
+            etag = resp.findtext('.//d:getetag', default='', namespaces=NS)
+            changed[self._relative(href)] = etag
+
+        new_token = tree.findtext('d:sync-token', default=None, namespaces=NS)
+        return changed, deleted, new_token
+
+    def _list_collection(self):
+        """Listado completo {href: etag} con PROPFIND Depth: 1 (servidores sin sync-collection)"""
+        response = self._request('PROPFIND', PROPFIND_ETAGS, 1)
+        if response.status >= 400:
+            raise RuntimeError(f"PROPFIND devolvió {response.status}")
+
+        tree = ET.fromstring(response.raw)
+        listing = {}
+        for resp in tree.findall('d:response', NS):
+            href = resp.findtext('d:href', default='', namespaces=NS)
+            etag = resp.findtext('.//d:getetag', default='', namespaces=NS)
+            # La propia colección (y subcolecciones) no tienen etag de evento
+            if not href or not etag or self._relative(href) == urlparse(self.url).path:
+                continue
+            listing[self._relative(href)] = etag
+        return listing
+
+    def _multiget(self, hrefs):
+        """Descarga en bloque los eventos indicados. Devuelve [(href, etag, ical)]"""
+        results = []
+        for i in range(0, len(hrefs), MULTIGET_BATCH):
+            batch = hrefs[i:i + MULTIGET_BATCH]
+            body = CALENDAR_MULTIGET.format(
+                hrefs='\n'.join(f"  <d:href>{_escape_xml(h)}</d:href>" for h in batch)
+            )
+            response = self._request('REPORT', body, 1)
+            tree = ET.fromstring(response.raw)
+
+            for resp in tree.findall('d:response', NS):
+                href = resp.findtext('d:href', default='', namespaces=NS)
+                etag = resp.findtext('.//d:getetag', default='', namespaces=NS)
+                data = resp.findtext('.//c:calendar-data', default='', namespaces=NS)
+                if href and data:
+                    results.append((self._relative(href), etag, data))
+        return results
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_event(ical_data):
+        """Extrae (uid, summary, fecha) del primer VEVENT"""
+        cal = Calendar.from_ical(ical_data)
+        for component in cal.walk():
+            if component.name == "VEVENT":
+                summary = str(component.get("SUMMARY", "")).strip()
+                dtstart = component.get("DTSTART").dt
+                if isinstance(dtstart, datetime):
+                    dtstart = dtstart.date()
+                return str(component.get("UID", "")), summary, dtstart.isoformat()
+        return None
+
+    def refresh(self):
+        """Sincroniza el índice con el servidor transfiriendo solo los cambios"""
+        ctag, server_token = self._fetch_ctag()
+        if ctag and ctag == self._get_meta('ctag'):
+            print("Calendar unchanged (ctag), using local index.")
+            return
+
+        known = dict(self.conn.execute("SELECT href, etag FROM events"))
+        token = self._get_meta('sync_token')
+        try:
+            changed, deleted, new_token = self._sync_collection(token)
+        except Exception as e:
+            # Token caducado o servidor sin sync-collection: listado completo.
+            # Los eventos locales solo se borran cuando el listado ha funcionado
+            print(f"Sync token rejected ({e}), doing full sync.")
+            try:
+                changed, _, new_token = self._sync_collection(None)
+            except Exception as e:
+                print(f"sync-collection not available ({e}), listing with PROPFIND.")
+                changed, new_token = self._list_collection(), None
+            deleted = [href for href in known if href not in changed]
+
+        to_fetch = [href for href, etag in changed.items() if known.get(href) != etag or not etag]
+
+        rows = []
+        for href, etag, data in self._multiget(to_fetch):
+            try:
+                parsed = self._parse_event(data)
+            except Exception as e:
+                print(f"Error parsing event {href}: {e}")
+                continue
+            if parsed:
+                uid, summary, dtstart = parsed
+                rows.append((href, uid, etag, summary, dtstart))
+
+        self.conn.executemany("DELETE FROM events WHERE href = ?", [(h,) for h in deleted])
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO events (href, uid, etag, summary, dtstart) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        if ctag:
+            self._set_meta('ctag', ctag)
+        if new_token or server_token:
+            self._set_meta('sync_token', new_token or server_token)
+        self.conn.commit()
+
+        print(f"Index refreshed: {len(rows)} updated, {len(deleted)} deleted.")
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def existing_keys(self):
+        """Conjunto de (summary, fecha) presentes en el calendario"""
+        return {
+            (summary, date.fromisoformat(dtstart))
+            for summary, dtstart in self.conn.execute("SELECT summary, dtstart FROM events")
+        }
+
+    def find_duplicates(self):
+        """Devuelve [(href, etag)] de los eventos sobrantes con el mismo (summary, fecha)"""
+        rows = self.conn.execute("""
+            SELECT href, etag FROM events e
+            WHERE rowid NOT IN (
+                SELECT MIN(rowid) FROM events GROUP BY summary, dtstart
+            )
+        """).fetchall()
+        return rows
+
+    # ------------------------------------------------------------------
+    # Escrituras
+    # ------------------------------------------------------------------
+
+    def _put_event(self, uid, ical):
+        href = urlparse(self._absolute(f"{uid.split('@')[0]}.ics")).path
+        headers = {'Content-Type': 'text/calendar; charset=utf-8', 'If-None-Match': '*'}
+        response = self.client.request(self._absolute(href), 'PUT', ical, headers)
+        etag = response.headers.get('ETag', '') if hasattr(response, 'headers') else ''
+        return href, response.status, etag
+
+    def add_events(self, events, workers=DEFAULT_WORKERS):
+        """
+        Crea en paralelo los eventos que no estén ya en el índice.
+        events: lista de dicts con 'title' y 'release_date'.
+        Devuelve el número de eventos creados.
+        """
+        existing = self.existing_keys()
+        pending = {}
+
+        for event in events:
+            title = event["title"].strip()
+            event_date = event["release_date"]
+            if (title, event_date) in existing:
+                print(f"Skipping duplicate event: {title} ({event_date})")
+                continue
+
+            uid = event_uid(title, event_date)
+            if uid in pending:
+                continue
+
+            cal_event = Event()
+            cal_event.add("uid", uid)
+            cal_event.add("summary", title)
+            cal_event.add("dtstamp", datetime.now())
+            # Para eventos de todo el día, usar solo la fecha sin hora ni timezone
+            cal_event.add("dtstart", event_date)
+            cal_event.add("dtend", event_date)
+            cal_event['dtstart'].params['VALUE'] = 'DATE'
+            cal_event['dtend'].params['VALUE'] = 'DATE'
+            cal_event.add("description", f"Release Date for {title}")
+
+            cal = Calendar()
+            cal.add("prodid", "-//volteret4//add_release_calendar//ES")
+            cal.add("version", "2.0")
+            cal.add_component(cal_event)
+
+            pending[uid] = (title, event_date, cal.to_ical().decode('utf-8'))
+
+        created = 0
+        rows = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._put_event, uid, ical): (uid, title, event_date)
+                for uid, (title, event_date, ical) in pending.items()
+            }
+            for future in as_completed(futures):
+                uid, title, event_date = futures[future]
+                try:
+                    href, status, etag = future.result()
+                except Exception as e:
+                    print(f"Error creating event {title}: {e}")
+                    continue
+
+                if status in (200, 201, 204):
+                    created += 1
+                    rows.append((href, uid, etag, title, event_date.isoformat()))
+                    print(f"Added all-day event: {title} ({event_date})")
+                elif status == 412:
+                    # Ya existía un recurso con ese UID
+                    print(f"Skipping duplicate event: {title} ({event_date})")
+                else:
+                    print(f"Error creating event {title}: HTTP {status}")
+
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO events (href, uid, etag, summary, dtstart) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        # Nuestros propios cambios invalidan el ctag: el próximo refresh
+        # los recibirá por sync-collection y solo comparará etags.
+        self.conn.commit()
+        return created
+
+    def delete_events(self, items, workers=DEFAULT_WORKERS):
+        """Borra en paralelo los eventos [(href, etag)] y los quita del índice"""
+        deleted = []
+
+        def _delete(href, etag):
+            headers = {'If-Match': etag} if etag else {}
+            response = self.client.request(self._absolute(href), 'DELETE', '', headers)
+            return response.status
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_delete, href, etag): href for href, etag in items}
+            for future in as_completed(futures):
+                href = futures[future]
+                try:
+                    status = future.result()
+                except Exception as e:
+                    print(f"Error deleting event: {e}")
+                    continue
+                if status in (200, 204, 404):
+                    deleted.append(href)
+                    print(f"Deleted duplicate event: {href}")
+                else:
+                    print(f"Error deleting event {href}: HTTP {status}")
+
+        self.conn.executemany("DELETE FROM events WHERE href = ?", [(h,) for h in deleted])
+        self.conn.commit()
+        return len(deleted)
+
+    def remove_duplicates(self):
+        """Elimina los duplicados detectados en el índice"""
+        duplicates = self.find_duplicates()
+        if not duplicates:
+            print("No duplicate events found.")
+            return 0
+        return self.delete_events(duplicates)
+
+    def close(self):
+        self.conn.close()
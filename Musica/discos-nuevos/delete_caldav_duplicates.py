@@ -1,9 +1,9 @@
 import os
-from datetime import datetime
 from caldav import DAVClient
-from icalendar import Calendar
 from dotenv import load_dotenv
 
+from caldav_index import CalDAVSyncIndex, default_index_path
+
 load_dotenv()
 
 def get_calendar(client_url, username, password, calendar_name):
@@ -20,48 +20,19 @@ def get_calendar(client_url, username, password, calendar_name):
 
     return calendar
 
-def find_duplicate_events(calendar):
-    """Find duplicate events in the calendar."""
-    events_by_key = {}  # Diccionario para almacenar eventos únicos (key = (title, date))
-    duplicate_events = []  # Lista de eventos duplicados para eliminar
-
-    for event in calendar.events():
-        try:
-            cal = Calendar.from_ical(event.data)
-            for component in cal.walk():
-                if component.name == "VEVENT":
-                    title = str(component.get("SUMMARY"))
-                    dtstart = component.get("DTSTART").dt
-
-                    if isinstance(dtstart, datetime):
-                        dtstart = dtstart.date()  # Convertir a objeto date
-
-                    key = (title, dtstart)
-
-                    if key in events_by_key:
-                        duplicate_events.append(event)  # Marcar como duplicado
-                    else:
-                        events_by_key[key] = event  # Guardar como único
-
-        except Exception as e:
-            print(f"Error parsing event: {e}")
-
-    return duplicate_events
-
-def remove_duplicate_events(calendar):
-    """Remove duplicate events from the calendar."""
-    duplicate_events = find_duplicate_events(calendar)
-    
-    if not duplicate_events:
-        print("No duplicate events found.")
-        return
-    
-    for event in duplicate_events:
-        try:
-            event.delete()
-            print(f"Deleted duplicate event: {event.url}")
-        except Exception as e:
-            print(f"Error deleting event: {e}")
+def remove_duplicate_events(calendar, index_path=None):
+    """
+    Remove duplicate events from the calendar.
+
+    Los duplicados se buscan en el índice local (caldav_index.py), que solo
+    descarga del servidor los eventos que han cambiado desde la última vez.
+    """
+    index = CalDAVSyncIndex(calendar, index_path or default_index_path(calendar.name))
+    try:
+        index.refresh()
+        index.remove_duplicates()
+    finally:
+        index.close()
 
 if __name__ == "__main__":
     # CalDAV server information
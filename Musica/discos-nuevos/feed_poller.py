@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+#
+# Script Name: feed_poller.py
+# Description: Sondeo de feeds de lanzamientos (Atom de Muspy/MusicBrainz y API JSON de Muspy)
+#              con peticiones condicionales y planificación adaptativa por feed
+# Author: volteret4
+# Repository: https://github.com/volteret4/
+# License:
+# Notes:
+#   Dependencies:  - python3, requests, feedparser
+#
+#   Por cada feed se guarda en SQLite el ETag/Last-Modified, la última respuesta
+#   y los IDs de entradas ya vistas. Las peticiones llevan If-None-Match /
+#   If-Modified-Since, así que un feed sin cambios devuelve 304 y no se descarga.
+#   El intervalo entre sondeos se acorta cuando el feed cambia y se alarga
+#   cuando no, entre MIN_INTERVAL y MAX_INTERVAL.
+#
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import feedparser
+
+logger = logging.getLogger(__name__)
+
+MIN_INTERVAL = 15 * 60          # 15 minutos
+MAX_INTERVAL = 24 * 60 * 60     # 1 día
+DEFAULT_INTERVAL = 60 * 60      # 1 hora
+
+
+def default_db_path():
+    """Ruta por defecto del estado: ~/.cache/feed_poller.db"""
+    return os.getenv('FEED_POLLER_DB', os.path.expanduser('~/.cache/feed_poller.db'))
+
+
+def _entry_key(entry):
+    """Identificador estable de una entrada Atom o de un objeto JSON de Muspy"""
+    for field in ('id', 'mbid', 'link'):
+        value = entry.get(field)
+        if value:
+            return str(value)
+    return hashlib.sha1(json.dumps(entry, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class PollResult:
+    """Resultado de sondear un feed"""
+
+    def __init__(self, url, status, entries, new_entries, from_cache=False):
+        self.url = url
+        self.status = status            # código HTTP (0 si no se hizo petición)
+        self.entries = entries          # todas las entradas conocidas del feed
+        self.new_entries = new_entries  # entradas no vistas hasta ahora
+        self.from_cache = from_cache    # True si no se descargó el cuerpo (304 o no tocaba)
+
+    @property
+    def changed(self):
+        return bool(self.new_entries)
+
+
+class FeedPoller:
+    """Sondea feeds con GET condicional y guarda el estado en SQLite"""
+
+    def __init__(self, db_path=None, session=None, user_agent="volteret4-feed-poller/1.0"):
+        self.db_path = db_path or default_db_path()
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+
+        self.session = session or requests.Session()
+        self.session.headers.setdefault('User-Agent', user_agent)
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.init_db()
+
+    def init_db(self):
+        conn = self.get_connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS feeds (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                kind TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                last_checked REAL DEFAULT 0,
+                last_changed REAL DEFAULT 0,
+                next_check REAL DEFAULT 0,
+                interval REAL
+            );
+            CREATE TABLE IF NOT EXISTS seen_entries (
+                feed_key TEXT,
+                entry_id TEXT,
+                first_seen REAL,
+                PRIMARY KEY (feed_key, entry_id)
+            );
+        """)
+        conn.commit()
+        conn.close()
+
+    def get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def feed_key(url, params=None):
+        """La clave incluye los parámetros (p.ej. ?mbid=) para distinguir feeds por artista"""
+        if params:
+            return f"{url}?{urlencode(sorted(params.items()))}"
+        return url
+
+    # ------------------------------------------------------------------
+    # Parseo
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse(kind, body):
+        if body is None:
+            return []
+        if kind == 'json':
+            data = json.loads(body)
+            return data if isinstance(data, list) else [data]
+
+        feed = feedparser.parse(body)
+        if feed.bozo and not feed.entries:
+            raise ValueError("Invalid feed format or malformed XML.")
+        return feed.entries
+
+    # ------------------------------------------------------------------
+    # Planificación
+    # ------------------------------------------------------------------
+
+    def is_due(self, key):
+        conn = self.get_connection()
+        row = conn.execute("SELECT next_check FROM feeds WHERE key = ?", (key,)).fetchone()
+        conn.close()
+        return row is None or row[0] <= time.time()
+
+    @staticmethod
+    def _next_interval(interval, changed):
+        interval = interval or DEFAULT_INTERVAL
+        if changed:
+            interval = interval / 2
+        else:
+            interval = interval * 1.5
+        return max(MIN_INTERVAL, min(MAX_INTERVAL, interval))
+
+    # ------------------------------------------------------------------
+    # Sondeo
+    # ------------------------------------------------------------------
+
+    def poll(self, url, params=None, auth=None, kind='atom', respect_schedule=True,
+             mark_seen=True, timeout=30):
+        """
+        Sondea un feed.
+
+        Args:
+            url: URL del feed
+            params: parámetros de la query (forman parte de la clave)
+            auth: tupla (usuario, contraseña) para HTTP basic
+            kind: 'atom' (feedparser) o 'json' (API de Muspy)
+            respect_schedule: si el feed no toca todavía, devuelve lo guardado sin pedir nada
+            mark_seen: si False, las entradas nuevas no se marcan como vistas hasta
+                       llamar a confirm() (para no perderlas si el consumidor falla)
+        """
+        key = self.feed_key(url, params)
+
+        conn = self.get_connection()
+        row = conn.execute(
+            "SELECT etag, last_modified, body, next_check, interval FROM feeds WHERE key = ?",
+            (key,)
+        ).fetchone()
+        conn.close()
+
+        etag, last_modified, cached_body, next_check, interval = row if row else (None, None, None, 0, None)
+
+        if respect_schedule and row and next_check > time.time():
+            entries = self._parse(kind, cached_body)
+            return PollResult(url, 0, entries, self._unseen(key, entries, mark_seen), from_cache=True)
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        response = self.session.get(url, params=params, auth=auth, headers=headers, timeout=timeout)
+        now = time.time()
+
+        if response.status_code == 304:
+            new_interval = self._next_interval(interval, changed=False)
+            with self.lock:
+                conn = self.get_connection()
+                conn.execute(
+                    "UPDATE feeds SET last_checked = ?, next_check = ?, interval = ? WHERE key = ?",
+                    (now, now + new_interval, new_interval, key)
+                )
+                conn.commit()
+                conn.close()
+            logger.debug(f"{key}: 304 Not Modified")
+            entries = self._parse(kind, cached_body)
+            return PollResult(url, 304, entries, self._unseen(key, entries, mark_seen), from_cache=True)
+
+        response.raise_for_status()
+
+        body = response.content
+        entries = self._parse(kind, body)
+        changed_body = body != cached_body
+
+        with self.lock:
+            conn = self.get_connection()
+            new_entries, new_ids = self._diff_seen(conn, key, entries, now)
+
+            new_interval = self._next_interval(interval, changed=changed_body)
+            conn.execute("""
+                INSERT INTO feeds (key, url, kind, etag, last_modified, body,
+                                   last_checked, last_changed, next_check, interval)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    body = excluded.body,
+                    last_checked = excluded.last_checked,
+                    last_changed = CASE WHEN ? THEN excluded.last_changed ELSE feeds.last_changed END,
+                    next_check = excluded.next_check,
+                    interval = excluded.interval
+            """, (key, url, kind, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                  body, now, now, now + new_interval, new_interval, changed_body))
+            if mark_seen:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO seen_entries (feed_key, entry_id, first_seen) VALUES (?, ?, ?)",
+                    new_ids
+                )
+            else:
+                self.pending[key] = new_ids
+            conn.commit()
+            conn.close()
+
+        return PollResult(url, response.status_code, entries, new_entries)
+
+    @staticmethod
+    def _diff_seen(conn, key, entries, now):
+        """Entradas de entries que no están en seen_entries, con sus filas para marcarlas"""
+        seen = {r[0] for r in conn.execute(
+            "SELECT entry_id FROM seen_entries WHERE feed_key = ?", (key,)
+        )}
+
+        new_entries = []
+        new_ids = []
+        for entry in entries:
+            entry_id = _entry_key(entry)
+            if entry_id not in seen:
+                new_entries.append(entry)
+                new_ids.append((key, entry_id, now))
+                seen.add(entry_id)
+        return new_entries, new_ids
+
+    def _unseen(self, key, entries, mark_seen):
+        """
+        Entradas del cuerpo guardado que aún no se han confirmado. El ETag y el
+        cuerpo se guardan en el poll, pero con mark_seen=False las entradas no se
+        marcan hasta confirm(): si el consumidor falló entre medias, el siguiente
+        304 (o resultado de caché) las vuelve a devolver como nuevas.
+        """
+        if not entries:
+            return []
+        with self.lock:
+            conn = self.get_connection()
+            new_entries, new_ids = self._diff_seen(conn, key, entries, time.time())
+            if new_ids and mark_seen:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO seen_entries (feed_key, entry_id, first_seen) VALUES (?, ?, ?)",
+                    new_ids
+                )
+                conn.commit()
+            elif new_ids:
+                self.pending[key] = new_ids
+            conn.close()
+        return new_entries
+
+    def confirm(self, url, params=None):
+        """Marca como vistas las entradas de un poll(mark_seen=False)"""
+        key = self.feed_key(url, params)
+        with self.lock:
+            new_ids = self.pending.pop(key, [])
+            if not new_ids:
+                return
+            conn = self.get_connection()
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_entries (feed_key, entry_id, first_seen) VALUES (?, ?, ?)",
+                new_ids
+            )
+            conn.commit()
+            conn.close()
+
+    def poll_many(self, feeds, workers=8, respect_schedule=True):
+        """
+        Sondea varios feeds en paralelo. Solo hace petición a los que tocan.
+
+        Args:
+            feeds: lista de dicts con los argumentos de poll() (url, params, auth, kind)
+        Returns:
+            lista de PollResult (los feeds con error se registran y se omiten)
+        """
+        def _poll(feed):
+            try:
+                return self.poll(respect_schedule=respect_schedule, **feed)
+            except Exception as e:
+                logger.error(f"Error sondeando {feed.get('url')}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_poll, feeds))
+
+        return [r for r in results if r is not None]
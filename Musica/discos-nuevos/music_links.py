@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Motor compartido de extracción de enlaces musicales
+
+Lo usan los generadores de IMAP, Thunderbird y FreshRSS. En lugar de lanzar
+una lista de re.search(..., re.DOTALL) por servicio sobre todo el cuerpo del
+correo, cada texto se recorre una sola vez con una alternancia precompilada
+que devuelve todos los enlaces (Bandcamp, YouTube, SoundCloud) con su posición.
+
+- Antes del regex, un filtro por los nombres de host literales descarta
+  los textos que no contienen ninguno.
+- Todas las ramas comparten el prefijo literal https?://, así re salta
+  directamente de un "http" al siguiente. Con re.IGNORECASE o con la frase
+  "check it out here" dentro de la alternancia se pierde ese atajo y va
+  varias veces más lento, por eso la frase se busca aparte y solo si hace falta.
+
+Para las páginas de álbum de Bandcamp, cada ID se busca a partir de su ancla
+literal (TralbumData, data-tralbum, album_id...) con patrones precompilados
+y acotados, sin los .*? con DOTALL que recorrían la página entera.
+
+Ver benchmark_music_links.py para medirlo sobre correos y páginas guardados.
+"""
+
+import re
+from collections import namedtuple
+
+# ---------------------------------------------------------------------------
+# Enlaces en correos / artículos
+# ---------------------------------------------------------------------------
+
+# Hosts literales: si un texto no contiene ninguno, no hace falta ni el regex
+HOSTS = ('bandcamp.com', 'youtube.com', 'youtu.be', 'soundcloud.com')
+
+_LINK_RE = re.compile(r"""
+    https?://(?:
+        (?P<bandcamp>(?:(?P<bc_sub>[a-zA-Z0-9-]+)\.)?bandcamp\.com/
+            (?:(?P<bc_kind>album|track)/[a-zA-Z0-9-]+|[a-zA-Z0-9-]+))
+      | (?:www\.|m\.)?youtube\.com/(?:watch\?v=|embed/)(?P<yt_id>[a-zA-Z0-9_-]{11})
+      | youtu\.be/(?P<yt_short>[a-zA-Z0-9_-]{11})
+      | (?P<soundcloud>(?:w\.|m\.)?soundcloud\.com/[a-zA-Z0-9_-]+/[a-zA-Z0-9_-]+)
+    )
+""", re.VERBOSE)
+
+_CTA_RE = re.compile(r'check\s+it\s+out\s+here', re.IGNORECASE)
+
+Link = namedtuple('Link', ['service', 'url', 'start', 'end', 'kind'])
+
+
+def find_links(text):
+    """
+    Recorre el texto una vez y devuelve todos los enlaces encontrados.
+
+    Returns:
+        Lista de Link(service, url, start, end, kind) en orden de aparición.
+        service: 'bandcamp', 'youtube' o 'soundcloud'.
+        kind: 'album'/'track'/'page' para Bandcamp; el ID de vídeo para YouTube.
+    """
+    if not text or not any(host in text for host in HOSTS):
+        return []
+
+    links = []
+    append = links.append
+    for match in _LINK_RE.finditer(text):
+        group = match.lastgroup
+
+        if group == 'bandcamp':
+            kind = match.group('bc_kind')
+            if kind:
+                append(Link('bandcamp', match.group(0), match.start(), match.end(), kind))
+            elif not match.group('bc_sub'):
+                # Páginas de bandcamp.com/... (no las de artista.bandcamp.com/music)
+                append(Link('bandcamp', match.group(0), match.start(), match.end(), 'page'))
+        elif group == 'soundcloud':
+            append(Link('soundcloud', match.group(0), match.start(), match.end(), None))
+        else:
+            video_id = match.group(group)
+            append(Link('youtube', f"https://www.youtube.com/embed/{video_id}",
+                        match.start(), match.end(), video_id))
+
+    return links
+
+
+def links_by_service(text):
+    """
+    Devuelve {'bandcamp': [...], 'youtube': [...], 'soundcloud': [...]}
+    con las URLs únicas de cada servicio, en orden de aparición.
+    """
+    result = {'bandcamp': [], 'youtube': [], 'soundcloud': []}
+    seen = set()
+    for link in find_links(text):
+        if link.url not in seen:
+            seen.add(link.url)
+            result[link.service].append(link.url)
+    return result
+
+
+def extract_bandcamp_link(email_content):
+    """
+    Enlace principal de Bandcamp de un correo de novedades.
+
+    Misma prioridad que los patrones anteriores: primero el enlace de
+    álbum/track que sigue a "check it out here", después el anterior a esa
+    frase y, si no la hay, el primer enlace de álbum/track del correo.
+
+    Returns:
+        (url, motivo) o (None, None)
+    """
+    releases = [l for l in find_links(email_content)
+                if l.service == 'bandcamp' and l.kind != 'page']
+    if not releases:
+        return None, None
+
+    cta = _CTA_RE.search(email_content)
+    if cta:
+        after = next((l for l in releases if l.start >= cta.end()), None)
+        if after:
+            return after.url, 'después de "check it out here"'
+        return releases[0].url, 'antes de "check it out here"'
+
+    return releases[0].url, 'primer enlace de álbum/track'
+
+
+def bandcamp_mentions(text, limit=3):
+    """Fragmentos donde aparece bandcamp.com (para depurar correos sin enlace válido)"""
+    return re.findall(r'bandcamp\.com[^\s<>"\']{0,100}', text, re.IGNORECASE)[:limit]
+
+
+# ---------------------------------------------------------------------------
+# IDs en páginas de álbum de Bandcamp
+# ---------------------------------------------------------------------------
+
+_TRALBUM_RE = re.compile(r'var\s+TralbumData\s*=\s*\{')
+_EMBEDDATA_RE = re.compile(r'var\s+EmbedData\s*=\s*\{')
+_ALBUM_ID_RE = re.compile(r'album_id"?\s*:\s*(\d+)')
+_TRACK_ID_RE = re.compile(r'track_id"?\s*:\s*(\d+)')
+_ITEM_TYPE_RE = re.compile(r'item_type"?\s*:\s*"?(track|album)')
+_ID_RE = re.compile(r'"?id"?\s*:\s*(\d+)')
+_DATA_TRALBUM_RE = re.compile(r'data-tralbum=["\']?(\d+)')
+_DATA_ITEM_RE = re.compile(r'data-item-id="(\d+)"[^>]*?data-item-type="(album|track)"')
+_IFRAME_RE = re.compile(r'<iframe[^>]*src=["\']([^"\']*EmbeddedPlayer[^"\']*)["\']', re.IGNORECASE)
+_JS_ALBUM_RE = re.compile(r'album[=/](\d{8,12})')
+_JS_TRACK_RE = re.compile(r'track[=/](\d{8,12})')
+
+EMBED_URL = ('https://bandcamp.com/EmbeddedPlayer/{kind}={item_id}/size=large/bgcol=333333/'
+             'linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/')
+EMBED_IFRAME = '<iframe style="border: 0; width: 400px; height: 120px;" src="{src}" seamless></iframe>'
+
+
+def _js_block(html_content, start_re):
+    """(inicio, fin) del objeto JS que abre start_re, hasta el primer '};'"""
+    match = start_re.search(html_content)
+    if not match:
+        return None
+    end = html_content.find('};', match.end())
+    return match.end() - 1, end if end != -1 else len(html_content)
+
+
+def find_bandcamp_player(html_content):
+    """
+    Localiza el reproductor de una página de Bandcamp.
+
+    Returns:
+        (embed_url, origen) o (None, None). origen describe de dónde salió
+        el ID ('TralbumData', 'EmbedData', 'data-tralbum', 'data-item-id',
+        'búsqueda general', 'iframe', 'JavaScript').
+    """
+    def _url(kind, item_id):
+        return EMBED_URL.format(kind=kind, item_id=item_id)
+
+    # 1. TralbumData
+    block = _js_block(html_content, _TRALBUM_RE)
+    if block:
+        match = _ALBUM_ID_RE.search(html_content, *block)
+        if match:
+            return _url('album', match.group(1)), 'TralbumData'
+        item_type = _ITEM_TYPE_RE.search(html_content, *block)
+        if item_type and item_type.group(1) == 'track':
+            match = _ID_RE.search(html_content, *block)
+            if match:
+                return _url('track', match.group(1)), 'TralbumData'
+
+    # 2. EmbedData
+    block = _js_block(html_content, _EMBEDDATA_RE)
+    if block:
+        match = _ALBUM_ID_RE.search(html_content, *block)
+        if match:
+            return _url('album', match.group(1)), 'EmbedData'
+        match = _TRACK_ID_RE.search(html_content, *block)
+        if match:
+            return _url('track', match.group(1)), 'EmbedData'
+
+    # 3. Atributos data-*
+    match = _DATA_TRALBUM_RE.search(html_content)
+    if match:
+        return _url('album', match.group(1)), 'data-tralbum'
+    match = _DATA_ITEM_RE.search(html_content)
+    if match:
+        return _url(match.group(2), match.group(1)), 'data-item-id'
+
+    # 4. album_id / track_id en cualquier parte
+    match = _ALBUM_ID_RE.search(html_content)
+    if match:
+        return _url('album', match.group(1)), 'búsqueda general'
+    match = _TRACK_ID_RE.search(html_content)
+    if match:
+        return _url('track', match.group(1)), 'búsqueda general'
+
+    # 5. iframe del reproductor ya presente en la página
+    match = _IFRAME_RE.search(html_content)
+    if match:
+        embed_url = match.group(1)
+        if embed_url.startswith('//'):
+            embed_url = 'https:' + embed_url
+        return embed_url, 'iframe'
+
+    # 6. IDs en el código JavaScript (album/1234567890)
+    match = _JS_ALBUM_RE.search(html_content)
+    if match:
+        return _url('album', match.group(1)), 'JavaScript'
+    match = _JS_TRACK_RE.search(html_content)
+    if match:
+        return _url('track', match.group(1)), 'JavaScript'
+
+    return None, None
+
+
+def bandcamp_iframe(embed_url):
+    """Código del iframe con las dimensiones usadas en todos los generadores"""
+    return EMBED_IFRAME.format(src=embed_url)
@@ -13,6 +13,7 @@ CORRECCIONES APLICADAS:
 
 import os
 import re
+import sys
 import json
 import argparse
 import getpass
@@ -20,12 +21,18 @@ import requests
 import urllib.request
 import urllib.error
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from html import escape
 from collections import defaultdict
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 
+# Motor compartido de extracción de enlaces (Musica/discos-nuevos/music_links.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from music_links import links_by_service, find_bandcamp_player, bandcamp_iframe
+
 
 class FreshRSSConfig:
     """Configuración para conexión a FreshRSS"""
@@ -124,20 +131,27 @@ class FreshRSSClient:
             print(f"❌ Error obteniendo categorías: {e}")
             return []
 
-    def get_articles(self, feed_id=None, category=None, count=100, unread_only=False):
+    def get_articles(self, feed_id=None, category=None, count=100, unread_only=False, newer_than=None):
         """
         Obtiene artículos de un feed o categoría específica.
 
+        Recorre las páginas de la API usando el parámetro de continuación
+        hasta reunir `count` artículos (0 = sin límite). Si falla cualquier
+        página lanza RuntimeError en lugar de devolver una lista parcial.
+
         Args:
             feed_id: ID del feed (formato: feed/123)
             category: Nombre de la categoría
             count: Número máximo de artículos a obtener
             unread_only: Si True, solo obtiene artículos no leídos
+            newer_than: Timestamp (segundos) para pedir solo artículos
+                        recibidos después de esa fecha (parámetro `ot`)
         """
         url = f"{self.config.api_url}/reader/api/0/stream/contents"
         headers = {'Authorization': f'GoogleLogin auth={self.config.token}'}
 
-        params = {'n': count, 'output': 'json'}
+        page_size = min(count, 1000) if count > 0 else 1000
+        params = {'n': page_size, 'output': 'json'}
 
         if feed_id:
             params['s'] = feed_id
@@ -149,140 +163,137 @@ class FreshRSSClient:
         if unread_only:
             params['xt'] = 'user/-/state/com.google/read'
 
+        if newer_than:
+            params['ot'] = int(newer_than)
+
+        articles = []
         try:
-            response = self.session.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
+            while True:
+                response = self.session.get(url, headers=headers, params=params)
+                response.raise_for_status()
+                data = response.json()
+
+                for item in data.get('items', []):
+                    article = {
+                        'id': item.get('id', ''),
+                        'title': item.get('title', ''),
+                        'link': item.get('alternate', [{}])[0].get('href', '') if item.get('alternate') else '',
+                        'content': item.get('summary', {}).get('content', ''),
+                        'published': item.get('published', 0),
+                        'crawled': int(item.get('crawlTimeMsec', 0) or 0) // 1000,
+                        'author': item.get('author', ''),
+                        'feed_title': item.get('origin', {}).get('title', ''),
+                        'feed_id': item.get('origin', {}).get('streamId', '')
+                    }
+                    articles.append(article)
+
+                continuation = data.get('continuation')
+                if not continuation or not data.get('items'):
+                    break
+                if count > 0 and len(articles) >= count:
+                    break
 
-            articles = []
-            for item in data.get('items', []):
-                article = {
-                    'id': item.get('id', ''),
-                    'title': item.get('title', ''),
-                    'link': item.get('alternate', [{}])[0].get('href', '') if item.get('alternate') else '',
-                    'content': item.get('summary', {}).get('content', ''),
-                    'published': item.get('published', 0),
-                    'author': item.get('author', ''),
-                    'feed_title': item.get('origin', {}).get('title', ''),
-                    'feed_id': item.get('origin', {}).get('streamId', '')
-                }
-                articles.append(article)
+                params['c'] = continuation
+                if count > 0:
+                    params['n'] = min(page_size, count - len(articles))
 
-            return articles
+            return articles[:count] if count > 0 else articles
 
         except Exception as e:
+            # Sin devolver lo leído hasta ahora: en modo incremental avanzaría
+            # last_crawl por encima de las páginas que faltan
             print(f"❌ Error obteniendo artículos: {e}")
-            return []
+            raise RuntimeError(
+                f"descarga incompleta de {params['s']} ({len(articles)} artículos leídos)") from e
+
+
+class IngestionState:
+    """
+    Estado persistente del modo incremental.
+
+    Guarda por cada feed/categoría la fecha del último artículo recibido,
+    los IDs ya procesados y los embeds acumulados, además de una caché
+    global URL de Bandcamp -> iframe para no volver a resolverla.
+    """
+
+    MAX_IDS_PER_STREAM = 2000
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.data = {'streams': {}, 'bandcamp_embeds': {}}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️  No se pudo leer el estado {self.path}: {e}")
+
+    def _stream(self, stream_id):
+        return self.data['streams'].setdefault(stream_id, {
+            'last_crawl': 0,
+            'item_ids': [],
+            'embeds': {'bandcamp': [], 'youtube': [], 'soundcloud': []}
+        })
+
+    def last_crawl(self, stream_id):
+        with self.lock:
+            return self._stream(stream_id)['last_crawl']
+
+    def processed_ids(self, stream_id):
+        with self.lock:
+            return set(self._stream(stream_id)['item_ids'])
+
+    def get_bandcamp_embed(self, url):
+        return self.data['bandcamp_embeds'].get(url)
+
+    def set_bandcamp_embed(self, url, embed):
+        with self.lock:
+            self.data['bandcamp_embeds'][url] = embed
+
+    def update_stream(self, stream_id, articles, new_embeds):
+        """Añade los artículos y embeds nuevos y devuelve todos los embeds acumulados"""
+        with self.lock:
+            stream = self._stream(stream_id)
+
+            if articles:
+                stream['last_crawl'] = max(
+                    [stream['last_crawl']] + [a.get('crawled', 0) for a in articles]
+                )
+                ids = stream['item_ids'] + [a['id'] for a in articles]
+                stream['item_ids'] = ids[-self.MAX_IDS_PER_STREAM:]
+
+            for service, items in new_embeds.items():
+                known = {(e['url'], e['article_link']) for e in stream['embeds'].get(service, [])}
+                for item in items:
+                    key = (item['url'], item['article_link'])
+                    if key not in known:
+                        stream['embeds'].setdefault(service, []).append(item)
+                        known.add(key)
+
+            return {service: list(items) for service, items in stream['embeds'].items()}
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
 
 
 def fetch_bandcamp_embed_from_html(html_content):
     """
     Extrae el código embed del contenido HTML de una página de Bandcamp.
-    Usa múltiples métodos para encontrar los IDs necesarios.
-    COPIADO EXACTAMENTE DE bc_imap_generator.py que funciona correctamente.
+    Misma búsqueda que bc_imap_generator.py, con el motor compartido de music_links.
     """
     try:
-        # MÉTODO 1: Buscar en el bloque TralbumData (más común)
-        tralbum_data_match = re.search(
-            r'var\s+TralbumData\s*=\s*(\{.+?\});',
-            html_content,
-            re.DOTALL
-        )
-
-        if tralbum_data_match:
-            try:
-                tralbum_json_str = tralbum_data_match.group(1)
-
-                # Buscar album_id
-                album_id_match = re.search(r'"?album_id"?\s*:\s*(\d+)', tralbum_json_str)
-                if album_id_match:
-                    album_id = album_id_match.group(1)
-                    print(f"       ✓ album_id encontrado en TralbumData: {album_id}")
-                    embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                    return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-                # Buscar track_id si es un track
-                item_type_match = re.search(r'"?item_type"?\s*:\s*"?(track|album)"?', tralbum_json_str)
-                if item_type_match and item_type_match.group(1) == 'track':
-                    track_id_match = re.search(r'"?id"?\s*:\s*(\d+)', tralbum_json_str)
-                    if track_id_match:
-                        track_id = track_id_match.group(1)
-                        print(f"       ✓ track_id encontrado en TralbumData: {track_id}")
-                        embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                        return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-            except Exception as e:
-                print(f"       ⚠️  Error en TralbumData: {e}")
-
-        # MÉTODO 2: Buscar en EmbedData
-        embed_data_match = re.search(
-            r'var\s+EmbedData\s*=\s*(\{.+?\});',
-            html_content,
-            re.DOTALL
-        )
-
-        if embed_data_match:
-            try:
-                embed_json_str = embed_data_match.group(1)
-
-                album_id_match = re.search(r'"?album_id"?\s*:\s*(\d+)', embed_json_str)
-                if album_id_match:
-                    album_id = album_id_match.group(1)
-                    print(f"       ✓ album_id encontrado en EmbedData: {album_id}")
-                    embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                    return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-                track_id_match = re.search(r'"?track_id"?\s*:\s*(\d+)', embed_json_str)
-                if track_id_match:
-                    track_id = track_id_match.group(1)
-                    print(f"       ✓ track_id encontrado en EmbedData: {track_id}")
-                    embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                    return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-            except Exception as e:
-                print(f"       ⚠️  Error en EmbedData: {e}")
-
-        # MÉTODO 3: Buscar directamente en el HTML
-        # Buscar album_id en cualquier parte
-        album_id_patterns = [
-            r'data-band-id="(\d+)".*?data-item-id="(\d+)".*?data-item-type="album"',
-            r'"?album_id"?\s*:\s*(\d+)',
-            r'album[=/](\d{8,12})',
-        ]
-
-        for pattern in album_id_patterns:
-            match = re.search(pattern, html_content, re.DOTALL)
-            if match:
-                album_id = match.group(2) if len(match.groups()) > 1 else match.group(1)
-                print(f"       ✓ album_id encontrado (búsqueda general): {album_id}")
-                embed_url = f'https://bandcamp.com/EmbeddedPlayer/album={album_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        # Buscar track_id
-        track_id_patterns = [
-            r'data-band-id="(\d+)".*?data-item-id="(\d+)".*?data-item-type="track"',
-            r'"?track_id"?\s*:\s*(\d+)',
-            r'track[=/](\d{8,12})',
-        ]
-
-        for pattern in track_id_patterns:
-            match = re.search(pattern, html_content, re.DOTALL)
-            if match:
-                track_id = match.group(2) if len(match.groups()) > 1 else match.group(1)
-                print(f"       ✓ track_id encontrado (búsqueda general): {track_id}")
-                embed_url = f'https://bandcamp.com/EmbeddedPlayer/track={track_id}/size=large/bgcol=333333/linkcol=9a64ff/tracklist=false/artwork=small/transparent=true/'
-                return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
-
-        # MÉTODO 4: Buscar el iframe embed directo
-        iframe_match = re.search(
-            r'<iframe[^>]*src=["\']([^"\']*EmbeddedPlayer[^"\']*)["\']',
-            html_content,
-            re.IGNORECASE
-        )
-        if iframe_match:
-            embed_url = iframe_match.group(1)
-            if embed_url.startswith('//'):
-                embed_url = 'https:' + embed_url
-            print(f"       ✓ iframe embed encontrado directamente")
-            return f'<iframe style="border: 0; width: 400px; height: 120px;" src="{embed_url}" seamless></iframe>'
+        embed_url, source = find_bandcamp_player(html_content)
+        if embed_url:
+            player_id = embed_url.split('EmbeddedPlayer/', 1)[-1].split('/', 1)[0]
+            print(f"       ✓ {player_id} encontrado ({source})")
+            return bandcamp_iframe(embed_url)
 
         print(f"       ❌ No se encontró embed en ningún método")
         return None
@@ -340,78 +351,49 @@ def get_bandcamp_embed(url, retry_count=3):
 
 def extract_bandcamp_url(text):
     """Extrae URLs de Bandcamp del texto"""
-    patterns = [
-        r'https?://[a-zA-Z0-9-]+\.bandcamp\.com/(?:album|track)/[a-zA-Z0-9-]+',
-        r'https?://bandcamp\.com/[a-zA-Z0-9-]+',
-    ]
-
-    urls = []
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        urls.extend(matches)
-
-    return list(set(urls))
+    return links_by_service(text)['bandcamp']
 
 
 def extract_youtube_url(text):
-    """Extrae URLs de YouTube del texto"""
-    patterns = [
-        r'https?://(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]{11})',
-        r'https?://(?:www\.)?youtube\.com/embed/([a-zA-Z0-9_-]{11})',
-        r'https?://youtu\.be/([a-zA-Z0-9_-]{11})',
-    ]
-
-    video_ids = []
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        video_ids.extend(matches)
-
+    """Extrae URLs de YouTube del texto (como URL de embed)"""
     # Usar youtube.com normal (youtube-nocookie causa error 153 en algunos videos)
-    urls = [f"https://www.youtube.com/embed/{vid}" for vid in set(video_ids)]
-    return urls
+    return links_by_service(text)['youtube']
 
 
 def extract_soundcloud_url(text):
     """Extrae URLs de SoundCloud del texto"""
-    patterns = [
-        r'https?://soundcloud\.com/[a-zA-Z0-9-_]+/[a-zA-Z0-9-_]+',
-        r'https?://(?:w|m)\.soundcloud\.com/[a-zA-Z0-9-_]+/[a-zA-Z0-9-_]+',
-    ]
-
-    urls = []
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        urls.extend(matches)
-
-    return list(set(urls))
+    return links_by_service(text)['soundcloud']
 
 
-def process_feed(client, feed_id, feed_name, unread_only=False, max_articles=100):
+def extract_embeds_from_articles(articles, state=None):
     """
-    Procesa un feed individual y extrae los embeds de Bandcamp, YouTube y SoundCloud.
+    Extrae los embeds de Bandcamp, YouTube y SoundCloud de una lista de artículos.
+    Si se pasa un estado incremental, reutiliza los embeds de Bandcamp ya resueltos.
     """
-    print(f"\n{'='*80}")
-    print(f"📡 Procesando feed: {feed_name}")
-    print(f"{'='*80}\n")
-
-    articles = client.get_articles(feed_id=feed_id, count=max_articles, unread_only=unread_only)
-
     embeds = {
         'bandcamp': [],
         'youtube': [],
         'soundcloud': []
     }
 
-    print(f"Artículos obtenidos: {len(articles)}")
-
     for i, article in enumerate(articles, 1):
         content = article['content'] + ' ' + article['link']
+        date = datetime.fromtimestamp(article['published']).strftime('%Y-%m-%d %H:%M')
+
+        # Una sola pasada por el artículo para los tres servicios
+        links = links_by_service(content)
 
         # Extraer URLs de Bandcamp
-        bc_urls = extract_bandcamp_url(content)
+        bc_urls = links['bandcamp']
         for url in bc_urls:
             print(f"  [{i}/{len(articles)}] 🎵 Bandcamp encontrado: {url}")
-            embed_code = get_bandcamp_embed(url)
+            embed_code = state.get_bandcamp_embed(url) if state else None
+            if embed_code:
+                print(f"       ✓ Embed en caché")
+            else:
+                embed_code = get_bandcamp_embed(url)
+                if embed_code and state:
+                    state.set_bandcamp_embed(url, embed_code)
 
             if embed_code:
                 embeds['bandcamp'].append({
@@ -421,14 +403,14 @@ def process_feed(client, feed_id, feed_name, unread_only=False, max_articles=100
                     'article_link': article['link'],
                     'author': article['author'],
                     'feed': article['feed_title'],
-                    'date': datetime.fromtimestamp(article['published']).strftime('%Y-%m-%d %H:%M')
+                    'date': date
                 })
                 print(f"       ✓ Embed obtenido")
             else:
                 print(f"       ⚠ No se pudo obtener embed")
 
         # Extraer URLs de YouTube
-        yt_urls = extract_youtube_url(content)
+        yt_urls = links['youtube']
         for url in yt_urls:
             print(f"  [{i}/{len(articles)}] 📺 YouTube encontrado: {url}")
             embeds['youtube'].append({
@@ -437,11 +419,11 @@ def process_feed(client, feed_id, feed_name, unread_only=False, max_articles=100
                 'article_link': article['link'],
                 'author': article['author'],
                 'feed': article['feed_title'],
-                'date': datetime.fromtimestamp(article['published']).strftime('%Y-%m-%d %H:%M')
+                'date': date
             })
 
         # Extraer URLs de SoundCloud
-        sc_urls = extract_soundcloud_url(content)
+        sc_urls = links['soundcloud']
         for url in sc_urls:
             print(f"  [{i}/{len(articles)}] 🔊 SoundCloud encontrado: {url}")
             embeds['soundcloud'].append({
@@ -450,11 +432,47 @@ def process_feed(client, feed_id, feed_name, unread_only=False, max_articles=100
                 'article_link': article['link'],
                 'author': article['author'],
                 'feed': article['feed_title'],
-                'date': datetime.fromtimestamp(article['published']).strftime('%Y-%m-%d %H:%M')
+                'date': date
             })
 
+    return embeds
+
+
+def process_stream(client, stream_id, label, unread_only=False, max_articles=100, state=None):
+    """
+    Descarga los artículos de un stream (feed o categoría) y extrae sus embeds.
+
+    En modo incremental (state != None) solo pide los artículos recibidos
+    desde la última ejecución, descarta los IDs ya procesados y devuelve
+    los embeds acumulados de todas las ejecuciones. Con un last_crawl previo
+    se recorren todas las páginas (max_articles solo limita la primera
+    ejecución): al avanzar last_crawl hasta el artículo más reciente, los
+    que quedaran fuera del límite no se volverían a pedir nunca.
+    """
+    newer_than = state.last_crawl(stream_id) if state else None
+    count = 0 if newer_than else max_articles
+    if stream_id.startswith('user/-/label/'):
+        category = stream_id.split('user/-/label/', 1)[1]
+        articles = client.get_articles(category=category, count=count,
+                                       unread_only=unread_only, newer_than=newer_than)
+    else:
+        articles = client.get_articles(feed_id=stream_id, count=count,
+                                       unread_only=unread_only, newer_than=newer_than)
+
+    if state:
+        seen = state.processed_ids(stream_id)
+        articles = [a for a in articles if a['id'] not in seen]
+        print(f"[{label}] Artículos nuevos desde la última ejecución: {len(articles)}")
+    else:
+        print(f"[{label}] Artículos obtenidos: {len(articles)}")
+
+    embeds = extract_embeds_from_articles(articles, state)
+
+    if state:
+        embeds = state.update_stream(stream_id, articles, embeds)
+
     total = len(embeds['bandcamp']) + len(embeds['youtube']) + len(embeds['soundcloud'])
-    print(f"\n📊 Total encontrados: {total} embeds")
+    print(f"\n📊 [{label}] Total encontrados: {total} embeds")
     print(f"   Bandcamp: {len(embeds['bandcamp'])}")
     print(f"   YouTube: {len(embeds['youtube'])}")
     print(f"   SoundCloud: {len(embeds['soundcloud'])}\n")
@@ -462,80 +480,27 @@ def process_feed(client, feed_id, feed_name, unread_only=False, max_articles=100
     return embeds
 
 
-def process_category(client, category, unread_only=False, max_articles=100):
+def process_feed(client, feed_id, feed_name, unread_only=False, max_articles=100, state=None):
     """
-    Procesa una categoría completa y extrae los embeds.
+    Procesa un feed individual y extrae los embeds de Bandcamp, YouTube y SoundCloud.
     """
     print(f"\n{'='*80}")
-    print(f"📁 Procesando categoría: {category}")
+    print(f"📡 Procesando feed: {feed_name}")
     print(f"{'='*80}\n")
 
-    articles = client.get_articles(category=category, count=max_articles, unread_only=unread_only)
+    return process_stream(client, feed_id, feed_name, unread_only, max_articles, state)
 
-    embeds = {
-        'bandcamp': [],
-        'youtube': [],
-        'soundcloud': []
-    }
-
-    print(f"Artículos obtenidos: {len(articles)}")
 
-    for i, article in enumerate(articles, 1):
-        content = article['content'] + ' ' + article['link']
-
-        # Extraer URLs de Bandcamp
-        bc_urls = extract_bandcamp_url(content)
-        for url in bc_urls:
-            print(f"  [{i}/{len(articles)}] 🎵 Bandcamp encontrado: {url}")
-            embed_code = get_bandcamp_embed(url)
-
-            if embed_code:
-                embeds['bandcamp'].append({
-                    'url': url,
-                    'embed': embed_code,  # Guardamos el código HTML completo del iframe
-                    'title': article['title'],
-                    'article_link': article['link'],
-                    'author': article['author'],
-                    'feed': article['feed_title'],
-                    'date': datetime.fromtimestamp(article['published']).strftime('%Y-%m-%d %H:%M')
-                })
-                print(f"       ✓ Embed obtenido")
-            else:
-                print(f"       ⚠ No se pudo obtener embed")
-
-        # Extraer URLs de YouTube
-        yt_urls = extract_youtube_url(content)
-        for url in yt_urls:
-            print(f"  [{i}/{len(articles)}] 📺 YouTube encontrado: {url}")
-            embeds['youtube'].append({
-                'url': url,
-                'title': article['title'],
-                'article_link': article['link'],
-                'author': article['author'],
-                'feed': article['feed_title'],
-                'date': datetime.fromtimestamp(article['published']).strftime('%Y-%m-%d %H:%M')
-            })
-
-        # Extraer URLs de SoundCloud
-        sc_urls = extract_soundcloud_url(content)
-        for url in sc_urls:
-            print(f"  [{i}/{len(articles)}] 🔊 SoundCloud encontrado: {url}")
-            embeds['soundcloud'].append({
-                'url': url,
-                'title': article['title'],
-                'article_link': article['link'],
-                'author': article['author'],
-                'feed': article['feed_title'],
-                'date': datetime.fromtimestamp(article['published']).strftime('%Y-%m-%d %H:%M')
-            })
-
-    total = len(embeds['bandcamp']) + len(embeds['youtube']) + len(embeds['soundcloud'])
-    print(f"\n📊 Total encontrados: {total} embeds")
-    print(f"   Bandcamp: {len(embeds['bandcamp'])}")
-    print(f"   YouTube: {len(embeds['youtube'])}")
-    print(f"   SoundCloud: {len(embeds['soundcloud'])}\n")
+def process_category(client, category, unread_only=False, max_articles=100, state=None):
+    """
+    Procesa una categoría completa y extrae los embeds.
+    """
+    print(f"\n{'='*80}")
+    print(f"📁 Procesando categoría: {category}")
+    print(f"{'='*80}\n")
 
-    return embeds
+    return process_stream(client, f'user/-/label/{category}', category,
+                          unread_only, max_articles, state)
 
 
 def generate_feed_html(feed_name, embeds, output_dir, items_per_page=8, max_pages_buttons=15):
@@ -1032,7 +997,13 @@ def main():
     parser.add_argument('--unread-only', action='store_true',
                        help='Solo procesar artículos no leídos')
     parser.add_argument('--max-articles', type=int, default=100,
-                       help='Número máximo de artículos a obtener por feed/categoría (default: 100)')
+                       help='Número máximo de artículos a obtener por feed/categoría, 0 = sin límite; en modo incremental solo la primera ejecución (default: 100)')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Solo descargar artículos nuevos desde la última ejecución y acumular embeds')
+    parser.add_argument('--state-file',
+                       help='Archivo de estado del modo incremental (default: <output-dir>/.freshrss_state.json)')
+    parser.add_argument('--workers', type=int, default=4,
+                       help='Número de feeds/categorías a procesar en paralelo (default: 4)')
 
     # Opciones de salida
     parser.add_argument('--output-dir', default='freshrss_embeds',
@@ -1113,9 +1084,15 @@ def main():
         print(f"Máx. artículos: {args.max_articles}")
         print(f"{'='*80}\n")
 
-        all_results = []
+        state = None
+        if args.incremental:
+            state_file = args.state_file or os.path.join(args.output_dir, '.freshrss_state.json')
+            state = IngestionState(state_file)
+            print(f"🔁 Modo incremental (estado: {state_file})\n")
+
+        # Preparar las tareas: (nombre, función, argumentos)
+        jobs = []
 
-        # Procesar feeds individuales
         if args.feeds:
             # Obtener nombres de los feeds
             feeds_list = client.get_feeds()
@@ -1123,28 +1100,41 @@ def main():
 
             for feed_id in args.feeds:
                 feed_name = feeds_dict.get(feed_id, feed_id)
-                embeds = process_feed(
-                    client, feed_id, feed_name,
-                    unread_only=args.unread_only,
-                    max_articles=args.max_articles
-                )
-
-                total = len(embeds['bandcamp']) + len(embeds['youtube']) + len(embeds['soundcloud'])
-                if total > 0:
-                    all_results.append((feed_name, embeds))
+                jobs.append((feed_name, process_feed, (client, feed_id, feed_name)))
 
-        # Procesar categorías
         if args.categories:
             for category in args.categories:
-                embeds = process_category(
-                    client, category,
-                    unread_only=args.unread_only,
-                    max_articles=args.max_articles
-                )
-
-                total = len(embeds['bandcamp']) + len(embeds['youtube']) + len(embeds['soundcloud'])
-                if total > 0:
-                    all_results.append((category, embeds))
+                jobs.append((category, process_category, (client, category)))
+
+        # Procesar feeds y categorías en paralelo
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {
+                executor.submit(func, *func_args,
+                                unread_only=args.unread_only,
+                                max_articles=args.max_articles,
+                                state=state): name
+                for name, func, func_args in jobs
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"❌ Error procesando {name}: {e}")
+
+        if state:
+            state.save()
+
+        # Mantener el orden en que se pidieron
+        all_results = []
+        for name, _, _ in jobs:
+            embeds = results.get(name)
+            if not embeds:
+                continue
+            total = len(embeds['bandcamp']) + len(embeds['youtube']) + len(embeds['soundcloud'])
+            if total > 0:
+                all_results.append((name, embeds))
 
         # Generar archivos HTML
         if all_results:
@@ -3,6 +3,7 @@
 Bot de Telegram multiusuario para buscar lanzamientos musicales usando Muspy y MusicBrainz
 """
 import os
+import sys
 import logging
 import requests
 import json
@@ -22,6 +23,11 @@ from telegram.ext import (
     ConversationHandler
 )
 
+# feed_poller.py está en el directorio padre (compartido con add_release_calendar.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from feed_poller import FeedPoller
+from muspy_client import AsyncMuspyClient
+
 # Configuración de logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -228,6 +234,17 @@ class DatabaseManager:
         conn.commit()
         conn.close()
 
+    def update_artist_mbid(self, artist_id: int, mbid: str):
+        """Guarda el MBID resuelto de un artista que no lo tenía"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("UPDATE artists SET mbid = ? WHERE id = ? AND (mbid IS NULL OR mbid = '')",
+                       (mbid, artist_id))
+
+        conn.commit()
+        conn.close()
+
 class MuspyTelegramBot:
     def __init__(self, telegram_token: str, db_path: str):
         """
@@ -250,6 +267,28 @@ class MuspyTelegramBot:
             "User-Agent": "MuspyTelegramBot/1.0 (telegram-bot)"
         }
 
+        # Sondeo condicional (ETag/Last-Modified) de los endpoints de Muspy
+        self.feed_poller = FeedPoller(os.getenv('FEED_POLLER_DB'))
+
+        # Cliente asíncrono compartido: MusicBrainz a 1 req/s y PUT de Muspy en paralelo
+        self.api = AsyncMuspyClient(self.muspy_base_url, self.mb_headers["User-Agent"])
+
+    async def poll_muspy(self, url: str, auth: Tuple[str, str], params: Dict = None,
+                         respect_schedule: bool = True):
+        """
+        Consulta un endpoint JSON de Muspy a través del FeedPoller.
+
+        Si el feed no ha cambiado (304) o aún no toca volver a consultarlo,
+        devuelve la última respuesta guardada. Lanza requests.HTTPError
+        si Muspy responde con error.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.feed_poller.poll(url, params=params, auth=auth, kind='json',
+                                          respect_schedule=respect_schedule)
+        )
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Comando /start"""
         user_id = self.db.get_or_create_user(
@@ -513,19 +552,16 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
 
         try:
             # Probar conexión con Muspy
-            url = f"{self.muspy_base_url}/artists/{userid}"
-            auth = (email, password)
-
-            response = requests.get(url, auth=auth, timeout=10)
+            status_code = await self.api.check_credentials(email, password, userid)
 
-            if response.status_code == 401:
+            if status_code == 401:
                 await update.message.reply_text(
                     "❌ Credenciales incorrectas. Inténtalo de nuevo con `/muspy`."
                 )
                 return ConversationHandler.END
-            elif response.status_code != 200:
+            elif status_code != 200:
                 await update.message.reply_text(
-                    f"❌ Error al conectar con Muspy (código {response.status_code}). "
+                    f"❌ Error al conectar con Muspy (código {status_code}). "
                     f"Verifica tu User ID e inténtalo más tarde."
                 )
                 return ConversationHandler.END
@@ -575,17 +611,17 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
             url = f"{self.muspy_base_url}/releases/{userid}"
             auth = (email, password)
 
-            response = requests.get(url, auth=auth, timeout=30)
+            # Comando del usuario: siempre consultar (petición condicional, 304 si nada cambió)
+            result = await self.poll_muspy(url, auth, respect_schedule=False)
 
-            if response.status_code != 200:
-                logger.error(f"Error al consultar lanzamientos: {response.status_code}")
-                return []
-
-            releases = response.json()
+            releases = list(result.entries)
             releases.sort(key=lambda x: x.get('date', '9999-99-99'))
 
             return releases
 
+        except requests.HTTPError as e:
+            logger.error(f"Error al consultar lanzamientos: {e.response.status_code}")
+            return []
         except Exception as e:
             logger.error(f"Error obteniendo releases desde Muspy: {e}")
             return []
@@ -609,15 +645,15 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
             url = f"{self.muspy_base_url}/artists/{userid}"
             auth = (email, password)
 
-            response = requests.get(url, auth=auth, timeout=30)
-
-            if response.status_code != 200:
+            try:
+                result = await self.poll_muspy(url, auth, respect_schedule=False)
+            except requests.HTTPError as e:
                 await query.edit_message_text(
-                    f"❌ Error al obtener artistas desde Muspy (código {response.status_code})"
+                    f"❌ Error al obtener artistas desde Muspy (código {e.response.status_code})"
                 )
                 return
 
-            muspy_artists = response.json()
+            muspy_artists = result.entries
 
             if not muspy_artists:
                 await query.edit_message_text(
@@ -638,8 +674,6 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
                 parse_mode='Markdown'
             )
 
-            # Procesar en lotes más pequeños para evitar timeouts
-            batch_size = 20
             last_update_time = datetime.now()
 
             for i, artist_data in enumerate(muspy_artists, 1):
@@ -681,10 +715,6 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
                         # Continuar aunque falle la actualización
                         pass
 
-                # Pausa pequeña para evitar sobrecarga
-                if i % batch_size == 0:
-                    await asyncio.sleep(0.5)
-
             # Construir mensaje de resultado final
             result_text = f"✅ *Importación completada*\n\n"
             result_text += f"📊 Artistas importados: {imported_count}\n"
@@ -787,66 +817,45 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
                 return
 
             email, password, userid = credentials
-            added_count = 0
-            errors = []
             total_artists = len(non_muspy_artists)
             last_update_time = datetime.now()
 
             await query.edit_message_text(
                 f"🔄 *Sincronizando con Muspy...*\n\n"
                 f"📊 Total de artistas: {total_artists}\n"
-                f"⏱️ Tiempo estimado: {total_artists // 30 + 1} min\n"
                 f"🎵 Iniciando sincronización...",
                 parse_mode='Markdown'
             )
 
-            for i, artist in enumerate(non_muspy_artists, 1):
+            async def report_progress(done: int, total: int) -> None:
+                nonlocal last_update_time
                 # Actualizar progreso cada 10 artistas o cada 30 segundos
                 current_time = datetime.now()
                 time_since_update = (current_time - last_update_time).seconds
 
-                if (i % 10 == 0 or i == total_artists or time_since_update >= 30):
-                    try:
-                        progress_text = f"🔄 *Sincronizando con Muspy...*\n\n"
-                        progress_text += f"📊 Progreso: {i}/{total_artists} artistas\n"
-                        progress_text += f"✅ Añadidos: {added_count}\n"
-                        progress_text += f"❌ Errores: {len(errors)}\n"
-                        progress_text += f"⏱️ Restante: ~{(total_artists - i) // 30 + 1} min\n\n"
-                        progress_text += f"🎵 Procesando: *{artist['name'][:50]}*"
+                if done % 10 == 0 or done == total or time_since_update >= 30:
+                    last_update_time = current_time
+                    progress_text = f"🔄 *Sincronizando con Muspy...*\n\n"
+                    progress_text += f"📊 Progreso: {done}/{total} artistas\n"
+                    await query.edit_message_text(progress_text, parse_mode='Markdown')
 
-                        await query.edit_message_text(progress_text, parse_mode='Markdown')
-                        last_update_time = current_time
-
-                    except Exception as update_error:
-                        logger.error(f"Error actualizando progreso: {update_error}")
-                        # Continuar aunque falle la actualización
-                        pass
-
-                if not artist['mbid']:
-                    errors.append(f"❌ {artist['name']} - Sin MBID")
-                    continue  # Solo podemos añadir artistas con MBID
+            # Las PUT van en paralelo; los artistas sin MBID se resuelven en MusicBrainz
+            added, failed = await self.api.follow_artists(
+                non_muspy_artists, email, password, userid, progress=report_progress
+            )
 
-                try:
-                    # Añadir artista a Muspy con timeout controlado
-                    success = await self.add_single_artist_to_muspy(
-                        artist, email, password, userid, timeout_seconds=8
-                    )
+            # Guardar en bloque los MBID resueltos y el estado de sincronización
+            loop = asyncio.get_event_loop()
 
-                    if success:
-                        # Marcar como sincronizado en la base de datos
-                        self.db.update_muspy_status_for_artists(user_id, [artist['id']], True)
-                        added_count += 1
-                    else:
-                        errors.append(f"❌ {artist['name']} - Timeout o error API")
+            def save_results():
+                for artist in added:
+                    self.db.update_artist_mbid(artist['id'], artist['mbid'])
+                self.db.update_muspy_status_for_artists(user_id, [a['id'] for a in added], True)
 
-                except Exception as e:
-                    logger.error(f"Error añadiendo artista {artist['name']} a Muspy: {e}")
-                    errors.append(f"❌ {artist['name']} - Error de conexión")
-                    continue
+            await loop.run_in_executor(None, save_results)
 
-                # Pausa pequeña para no sobrecargar la API de Muspy
-                if i % 10 == 0:
-                    await asyncio.sleep(1)
+            added_count = len(added)
+            errors = [f"❌ {artist['name']} - {reason}" for artist, reason in failed]
 
             # Construir mensaje de resultado final
             result_text = f"✅ *Sincronización completada*\n\n"
@@ -865,7 +874,7 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
 
                 result_text += "\n"
 
-            result_text += "💡 *Nota:* Solo se pueden añadir artistas con MBID válido."
+            result_text += "💡 *Nota:* Los artistas sin MBID se buscan por nombre en MusicBrainz."
 
             await query.edit_message_text(result_text, parse_mode='Markdown')
 
@@ -877,51 +886,6 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
                 parse_mode='Markdown'
             )
 
-    async def add_single_artist_to_muspy(self, artist: Dict, email: str, password: str, userid: str, timeout_seconds: int = 8) -> bool:
-        """
-        Añade un solo artista a Muspy con timeout controlado
-
-        Returns:
-            True si se añade correctamente, False si hay error
-        """
-        try:
-            # Usar asyncio.wait_for para controlar timeout
-            return await asyncio.wait_for(
-                self._add_artist_to_muspy_api(artist, email, password, userid),
-                timeout=timeout_seconds
-            )
-        except asyncio.TimeoutError:
-            logger.warning(f"Timeout añadiendo artista a Muspy: {artist['name']}")
-            return False
-        except Exception as e:
-            logger.error(f"Error en add_single_artist_to_muspy: {e}")
-            return False
-
-    async def _add_artist_to_muspy_api(self, artist: Dict, email: str, password: str, userid: str) -> bool:
-        """
-        Función interna para añadir un artista a Muspy via API
-        """
-        # Ejecutar en thread para no bloquear el loop de asyncio
-        loop = asyncio.get_event_loop()
-
-        def sync_add():
-            url = f"{self.muspy_base_url}/artists/{userid}"
-            auth = (email, password)
-            data = {'mbid': artist['mbid']}
-
-            response = requests.put(url, auth=auth, data=data, timeout=8)
-
-            if response.status_code in [200, 201]:
-                return True
-            elif response.status_code == 400:
-                # El artista ya está seguido, considerar como éxito
-                return True
-            else:
-                logger.warning(f"Error API Muspy {response.status_code} para {artist['name']}")
-                return False
-
-        return await loop.run_in_executor(None, sync_add)
-
     # Mantener métodos existentes para búsqueda y navegación
     async def buscar_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Comando /buscar [artista]"""
@@ -985,44 +949,7 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
             Lista de artistas encontrados con id, name, disambiguation, etc.
         """
         try:
-            url = "https://musicbrainz.org/ws/2/artist/"
-            params = {
-                "query": f"artist:{artist_name}",
-                "fmt": "json",
-                "limit": 10
-            }
-
-            response = requests.get(url, params=params, headers=self.mb_headers, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            artists = []
-
-            for artist in data.get("artists", []):
-                artist_info = {
-                    "id": artist.get("id"),
-                    "name": artist.get("name"),
-                    "disambiguation": artist.get("disambiguation", ""),
-                    "country": artist.get("country", ""),
-                    "type": artist.get("type", ""),
-                    "score": artist.get("score", 0)
-                }
-
-                # Añadir información adicional si está disponible
-                if "life-span" in artist:
-                    life_span = artist["life-span"]
-                    if "begin" in life_span:
-                        artist_info["begin"] = life_span["begin"]
-                    if "end" in life_span:
-                        artist_info["end"] = life_span["end"]
-
-                artists.append(artist_info)
-
-            # Ordenar por score (relevancia)
-            artists.sort(key=lambda x: x["score"], reverse=True)
-
-            return artists
-
+            return await self.api.search_artist(artist_name)
         except Exception as e:
             logger.error(f"Error buscando en MusicBrainz: {e}")
             return []
@@ -1125,16 +1052,16 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
             params = {"mbid": mbid}
             auth = (email, password)
 
-            response = requests.get(url, auth=auth, params=params, timeout=15)
-
-            if response.status_code == 401:
-                await message.edit_text("❌ Error de autenticación con Muspy. Verifica las credenciales.")
-                return
-            elif response.status_code != 200:
-                await message.edit_text(f"❌ Error al consultar Muspy (código {response.status_code})")
+            try:
+                result = await self.poll_muspy(url, auth, params=params, respect_schedule=False)
+            except requests.HTTPError as e:
+                if e.response.status_code == 401:
+                    await message.edit_text("❌ Error de autenticación con Muspy. Verifica las credenciales.")
+                else:
+                    await message.edit_text(f"❌ Error al consultar Muspy (código {e.response.status_code})")
                 return
 
-            releases = response.json()
+            releases = result.entries
 
             # Guardar/actualizar artista en la base de datos
             artist_id = self.db.get_or_create_artist(
@@ -1380,15 +1307,15 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
             params = {"mbid": mbid}
             auth = (email, password)
 
-            response = requests.get(url, auth=auth, params=params, timeout=15)
-
-            if response.status_code != 200:
+            try:
+                result = await self.poll_muspy(url, auth, params=params, respect_schedule=False)
+            except requests.HTTPError:
                 await query.edit_message_text(
                     f"❌ Error al consultar lanzamientos para {artist_name}"
                 )
                 return
 
-            releases = response.json()
+            releases = result.entries
 
             if not releases:
                 await query.edit_message_text(
@@ -1639,10 +1566,19 @@ Para usar todas las funcionalidades, configura tu cuenta de Muspy con `/muspy`.
             "Usa /help para ver los comandos disponibles."
         )
 
+    async def post_shutdown(self, application: Application) -> None:
+        """Cierra la sesión HTTP compartida al detener el bot"""
+        await self.api.aclose()
+
     def run(self):
         """Inicia el bot"""
         # Crear aplicación
-        application = Application.builder().token(self.telegram_token).build()
+        application = (
+            Application.builder()
+            .token(self.telegram_token)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
 
         # ConversationHandler para el login de Muspy
         login_conv_handler = ConversationHandler(
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Cliente asíncrono para Muspy y MusicBrainz usado por muspy_bot.py
+
+- Una única sesión httpx.AsyncClient compartida por todos los chats
+- Las peticiones a MusicBrainz pasan por una cola global limitada a 1 req/s
+  (norma de uso de su API), así que varios usuarios buscando a la vez no
+  provocan 503 ni bloquean el bucle de eventos
+- Las PUT de Muspy se lanzan en paralelo con un límite de concurrencia
+- La resolución nombre -> MBID se cachea en memoria
+"""
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MUSICBRAINZ_URL = "https://musicbrainz.org/ws/2"
+MB_MIN_INTERVAL = 1.0       # segundos entre peticiones a MusicBrainz
+MB_CACHE_TTL = 24 * 3600    # segundos que se guarda una búsqueda de artista
+
+
+class MusicBrainzQueue:
+    """Serializa las peticiones a MusicBrainz respetando 1 petición por segundo"""
+
+    def __init__(self, min_interval: float = MB_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._lock: Optional[asyncio.Lock] = None
+        self._last_request = 0.0
+
+    async def wait_turn(self):
+        # El lock se crea dentro del bucle de eventos que lo va a usar
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            elapsed = time.monotonic() - self._last_request
+            if elapsed < self.min_interval:
+                await asyncio.sleep(self.min_interval - elapsed)
+            self._last_request = time.monotonic()
+
+
+class AsyncMuspyClient:
+    def __init__(self, muspy_base_url: str, user_agent: str, max_parallel_puts: int = 8):
+        """
+        Args:
+            muspy_base_url: URL base de la API de Muspy
+            user_agent: User-Agent para MusicBrainz (obligatorio según su política)
+            max_parallel_puts: PUT simultáneas como máximo contra Muspy
+        """
+        self.muspy_base_url = muspy_base_url
+        self.headers = {"User-Agent": user_agent}
+        self.max_parallel_puts = max_parallel_puts
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._mb_queue = MusicBrainzQueue()
+        self._search_cache: Dict[str, Tuple[float, List[Dict]]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(15.0, connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ------------------------------------------------------------------
+    # Muspy
+    # ------------------------------------------------------------------
+
+    async def check_credentials(self, email: str, password: str, userid: str) -> int:
+        """Devuelve el código HTTP de consultar los artistas del usuario"""
+        response = await self.client.get(
+            f"{self.muspy_base_url}/artists/{userid}", auth=(email, password), timeout=10
+        )
+        return response.status_code
+
+    async def follow_artist(self, mbid: str, email: str, password: str, userid: str) -> bool:
+        """Sigue un artista en Muspy. Un 400 (ya seguido) cuenta como éxito"""
+        response = await self.client.put(
+            f"{self.muspy_base_url}/artists/{userid}",
+            auth=(email, password),
+            data={'mbid': mbid},
+            timeout=8
+        )
+        if response.status_code in (200, 201, 400):
+            return True
+        logger.warning(f"Error API Muspy {response.status_code} para {mbid}")
+        return False
+
+    async def follow_artists(self, artists: List[Dict], email: str, password: str, userid: str,
+                             progress: Optional[Callable[[int, int], Awaitable[None]]] = None
+                             ) -> Tuple[List[Dict], List[Tuple[Dict, str]]]:
+        """
+        Sigue en paralelo una lista de artistas.
+
+        Los artistas sin MBID se resuelven antes por nombre en MusicBrainz
+        (a 1 req/s, con caché) mientras los demás ya se están enviando.
+
+        Args:
+            artists: dicts con al menos 'name' y opcionalmente 'mbid'
+            progress: corrutina opcional llamada como progress(hechos, total)
+        Returns:
+            (añadidos, errores) donde errores es [(artista, motivo)]
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel_puts)
+        added: List[Dict] = []
+        errors: List[Tuple[Dict, str]] = []
+        done = 0
+        total = len(artists)
+
+        async def _follow(artist: Dict):
+            nonlocal done
+            try:
+                mbid = artist.get('mbid')
+                if not mbid:
+                    mbid = await self.resolve_mbid(artist['name'])
+                    if not mbid:
+                        errors.append((artist, "Sin MBID"))
+                        return
+                    artist['mbid'] = mbid
+
+                async with semaphore:
+                    ok = await self.follow_artist(mbid, email, password, userid)
+
+                if ok:
+                    added.append(artist)
+                else:
+                    errors.append((artist, "Error API"))
+            except httpx.HTTPError as e:
+                logger.error(f"Error añadiendo artista {artist.get('name')} a Muspy: {e}")
+                errors.append((artist, "Error de conexión"))
+            finally:
+                done += 1
+                if progress:
+                    try:
+                        await progress(done, total)
+                    except Exception as e:
+                        logger.error(f"Error actualizando progreso: {e}")
+
+        await asyncio.gather(*(_follow(artist) for artist in artists))
+        return added, errors
+
+    # ------------------------------------------------------------------
+    # MusicBrainz
+    # ------------------------------------------------------------------
+
+    async def search_artist(self, artist_name: str, limit: int = 10) -> List[Dict]:
+        """
+        Busca un artista en MusicBrainz (cacheado)
+
+        Returns:
+            Lista de artistas con id, name, disambiguation, country, type, score,
+            begin/end, ordenada por score
+        """
+        key = f"{artist_name.strip().lower()}|{limit}"
+        cached = self._search_cache.get(key)
+        if cached and time.time() - cached[0] < MB_CACHE_TTL:
+            return cached[1]
+
+        await self._mb_queue.wait_turn()
+        response = await self.client.get(
+            f"{MUSICBRAINZ_URL}/artist/",
+            params={"query": f"artist:{artist_name}", "fmt": "json", "limit": limit},
+            timeout=10
+        )
+        response.raise_for_status()
+
+        artists = []
+        for artist in response.json().get("artists", []):
+            artist_info = {
+                "id": artist.get("id"),
+                "name": artist.get("name"),
+                "disambiguation": artist.get("disambiguation", ""),
+                "country": artist.get("country", ""),
+                "type": artist.get("type", ""),
+                "score": artist.get("score", 0)
+            }
+
+            # Añadir información adicional si está disponible
+            if "life-span" in artist:
+                life_span = artist["life-span"]
+                if "begin" in life_span:
+                    artist_info["begin"] = life_span["begin"]
+                if "end" in life_span:
+                    artist_info["end"] = life_span["end"]
+
+            artists.append(artist_info)
+
+        # Ordenar por score (relevancia)
+        artists.sort(key=lambda x: x["score"], reverse=True)
+
+        self._search_cache[key] = (time.time(), artists)
+        return artists
+
+    async def resolve_mbid(self, artist_name: str) -> Optional[str]:
+        """MBID del mejor resultado si coincide el nombre o el score es 100"""
+        try:
+            artists = await self.search_artist(artist_name, limit=5)
+        except httpx.HTTPError as e:
+            logger.error(f"Error resolviendo MBID de {artist_name}: {e}")
+            return None
+
+        wanted = artist_name.strip().lower()
+        for artist in artists:
+            if artist["name"].lower() == wanted or artist["score"] == 100:
+                return artist["id"]
+        return None
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Índice de canciones de Airsonic (API Subsonic) para emparejar playlists en memoria.
+
+Recorre la biblioteca completa por álbumes (getAlbumList2 paginado + getAlbum
+en paralelo), sin el límite de 10000 canciones de un único search3, y guarda
+en JSON un mapa compacto clave normalizada -> id de canción.
+
+Las actualizaciones son incrementales: getIndexes con ifModifiedSince dice si
+el servidor ha escaneado algo desde la última vez; si es así, solo se piden
+los álbumes nuevos o con otra fecha (changed/created) y se quitan los que ya
+no existen.
+"""
+
+import json
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+INDEX_VERSION = 2
+ALBUM_PAGE_SIZE = 500   # Máximo que admite getAlbumList2
+FETCH_WORKERS = 8
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+def normalize_key(text: str) -> str:
+    """Minúsculas, sin acentos ni puntuación y con espacios simples"""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION_RE.sub(' ', text.lower())
+    return ' '.join(text.split())
+
+
+def song_keys(artist: str, title: str, album: str = '') -> List[str]:
+    """Claves con las que se guarda una canción (artista|título y artista|título|álbum)"""
+    artist, title, album = normalize_key(artist), normalize_key(title), normalize_key(album)
+    if not title:
+        return []
+    keys = [f"{artist}|{title}"]
+    if album:
+        keys.append(f"{artist}|{title}|{album}")
+    return keys
+
+
+def _first_id(value) -> Optional[str]:
+    """Algunos servidores devuelven el id como lista"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value) if value else None
+
+
+class AirsonicSongIndex:
+    """
+    Mapa clave normalizada -> id de canción de toda la biblioteca.
+
+    Args:
+        cache_file: JSON donde se persiste el índice
+        request: función (endpoint, params) -> respuesta subsonic o None
+        logger: logger del sincronizador
+    """
+
+    def __init__(self, cache_file: Path, request: Callable[[str, Dict], Optional[Dict]],
+                 logger, workers: int = FETCH_WORKERS):
+        self.cache_file = Path(cache_file)
+        self.request = request
+        self.logger = logger
+        self.workers = workers
+
+        self.songs: Dict[str, str] = {}           # clave -> id de canción
+        self.albums: Dict[str, Dict] = {}         # id de álbum -> {'changed': str, 'songs': [ids]}
+        self.last_modified = 0                    # lastModified de getIndexes (ms)
+        self.built_at = 0.0
+        self.load()
+
+    def __len__(self):
+        return len(self.songs)
+
+    # ---------- Persistencia ----------
+
+    def load(self):
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                self.logger.info("Cache de canciones en formato antiguo, se reconstruirá")
+                return
+            self.songs = data.get('songs', {})
+            self.albums = data.get('albums', {})
+            self.last_modified = data.get('last_modified', 0)
+            self.built_at = data.get('built_at', 0.0)
+            self.logger.info(f"Índice cargado: {len(self.albums)} álbumes, {len(self.songs)} claves")
+        except Exception as e:
+            self.logger.warning(f"Error cargando índice de canciones: {e}")
+            self.songs, self.albums = {}, {}
+
+    def save(self):
+        try:
+            data = {
+                'version': INDEX_VERSION,
+                'last_modified': self.last_modified,
+                'built_at': self.built_at,
+                'albums': self.albums,
+                'songs': self.songs,
+            }
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            tmp_file.replace(self.cache_file)
+            self.logger.debug("Índice de canciones guardado")
+        except Exception as e:
+            self.logger.error(f"Error guardando índice de canciones: {e}")
+
+    # ---------- Búsqueda ----------
+
+    def lookup(self, artist: str, title: str, album: str = '') -> Optional[str]:
+        """Id de la canción, probando también artista y título intercambiados"""
+        for first, second in ((artist, title), (title, artist)):
+            # La clave con álbum primero: desambigua canciones repetidas en varios discos
+            for key in reversed(song_keys(first, second, album)):
+                song_id = self.songs.get(key)
+                if song_id:
+                    return song_id
+        return None
+
+    # ---------- Construcción ----------
+
+    def _server_last_modified(self) -> Optional[int]:
+        """lastModified del servidor, o None si no ha cambiado desde el último escaneo conocido"""
+        params = {'ifModifiedSince': self.last_modified} if self.last_modified else {}
+        response = self.request('getIndexes', params)
+        if not response:
+            return 0  # No se sabe: comprobar álbumes
+        indexes = response.get('indexes') or {}
+        last_modified = int(indexes.get('lastModified') or 0)
+        if self.last_modified and last_modified and last_modified <= self.last_modified:
+            return None
+        return last_modified
+
+    def _list_albums(self) -> Dict[str, str]:
+        """Todos los álbumes con su fecha de cambio (changed, o created si el servidor no la da)"""
+        albums = {}
+        offset = 0
+        while True:
+            response = self.request('getAlbumList2', {
+                'type': 'alphabeticalByName',
+                'size': ALBUM_PAGE_SIZE,
+                'offset': offset
+            })
+            if response is None:
+                raise RuntimeError("getAlbumList2 falló")
+            page = (response.get('albumList2') or {}).get('album', [])
+            for album in page:
+                album_id = _first_id(album.get('id'))
+                if album_id:
+                    albums[album_id] = str(album.get('changed') or album.get('created') or '')
+            if len(page) < ALBUM_PAGE_SIZE:
+                return albums
+            offset += ALBUM_PAGE_SIZE
+
+    def _fetch_album(self, album_id: str) -> Tuple[str, Optional[List[Dict]]]:
+        response = self.request('getAlbum', {'id': album_id})
+        if not response:
+            return album_id, None
+        return album_id, (response.get('album') or {}).get('song', [])
+
+    def _remove_albums(self, album_ids: Iterable[str]):
+        removed = set()
+        for album_id in album_ids:
+            album = self.albums.pop(album_id, None)
+            if album:
+                removed.update(album['songs'])
+        if removed:
+            self.songs = {key: song_id for key, song_id in self.songs.items() if song_id not in removed}
+
+    def _add_album(self, album_id: str, changed: str, songs: List[Dict]):
+        song_ids = []
+        for song in songs:
+            song_id = _first_id(song.get('id'))
+            if not song_id:
+                continue
+            song_ids.append(song_id)
+            for key in song_keys(song.get('artist', ''), song.get('title', ''), song.get('album', '')):
+                self.songs[key] = song_id
+        self.albums[album_id] = {'changed': changed, 'songs': song_ids}
+
+    def update(self, force_rebuild: bool = False) -> bool:
+        """
+        Pone el índice al día (completo si está vacío o force_rebuild).
+
+        Returns:
+            True si el índice quedó utilizable
+        """
+        start = time.time()
+        if force_rebuild:
+            self.songs, self.albums, self.last_modified = {}, {}, 0
+
+        try:
+            last_modified = self._server_last_modified()
+            if last_modified is None and self.songs:
+                self.logger.info("Biblioteca sin cambios desde el último escaneo, índice al día")
+                return True
+
+            server_albums = self._list_albums()
+        except Exception as e:
+            self.logger.error(f"Error listando la biblioteca de Airsonic: {e}")
+            return bool(self.songs)
+
+        gone = [album_id for album_id in self.albums if album_id not in server_albums]
+        changed = [album_id for album_id, stamp in server_albums.items()
+                   if self.albums.get(album_id, {}).get('changed') != stamp]
+
+        self._remove_albums(gone + changed)
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for album_id, songs in executor.map(self._fetch_album, changed):
+                if songs is None:
+                    failed += 1
+                    continue
+                self._add_album(album_id, server_albums[album_id], songs)
+
+        # Con álbumes fallidos no se avanza lastModified: la próxima vez se reintentan
+        if not failed and last_modified:
+            self.last_modified = last_modified
+        self.built_at = time.time()
+        self.save()
+
+        self.logger.info(
+            f"Índice actualizado en {time.time() - start:.1f}s: {len(changed)} álbumes leídos, "
+            f"{len(gone)} eliminados, {failed} fallidos; {len(self.albums)} álbumes, {len(self.songs)} claves"
+        )
+        return True
@@ -9,7 +9,6 @@ MEJORA: Extrae metadata de archivos cuando el regex no encuentra artista/título
 
 import os
 import re
-import sqlite3
 import requests
 import hashlib
 import json
@@ -17,22 +16,20 @@ import argparse
 import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional
 from urllib.parse import urlencode
 import logging
 import sys
 from dotenv import load_dotenv
 
-# Intentar importar mutagen para leer metadata
-try:
-    from mutagen import File as MutagenFile
-    from mutagen.easyid3 import EasyID3
-    from mutagen.mp3 import MP3
-    from mutagen.flac import FLAC
-    from mutagen.mp4 import MP4
-    MUTAGEN_AVAILABLE = True
-except ImportError:
-    MUTAGEN_AVAILABLE = False
+from airsonic_index import AirsonicSongIndex
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from music_library import MusicLibrary
+from tag_cache import TagCache, MUTAGEN_AVAILABLE
+
+# Los tags se leen con mutagen a través de tag_cache
+if not MUTAGEN_AVAILABLE:
     print("⚠️  Advertencia: mutagen no está instalado. No se podrá leer metadata de archivos.", file=sys.stderr)
     print("   Instala con: pip install mutagen", file=sys.stderr)
 
@@ -56,6 +53,10 @@ DEFAULT_DB_PATH = os.getenv('DB_PATH', str(script_dir / "music.db"))
 DEFAULT_M3U_FOLDER = os.getenv('M3U_FOLDER', str(script_dir))
 DEFAULT_DATA_DIR = os.getenv('DATA_DIR', str(CACHE_DIR))
 
+# Actualización de playlists
+MAX_IDS_PER_REQUEST = 200   # Parámetros repetidos por petición (límite de longitud de URL)
+REPLACE_RATIO = 0.5         # Si el diff supera esta fracción de la playlist, se reemplaza entera
+
 class AirsonicSyncer:
     def __init__(self, db_path: str, interactive: bool = True, data_dir: str = None):
         """
@@ -67,6 +68,8 @@ class AirsonicSyncer:
             data_dir: Directorio para archivos de estado y cache
         """
         self.db_path = db_path
+        self.library = MusicLibrary(db_path)
+        self.tag_cache = TagCache()
         self.interactive = interactive
 
         # Configurar directorio de datos PRIMERO
@@ -127,40 +130,17 @@ class AirsonicSyncer:
         # Cargar estado de sincronización
         self.sync_state = self._load_sync_state()
 
-        # Cache para búsquedas
-        self._song_cache = {}
-        self._load_song_cache()
-
-        # MEJORAR LÓGICA DE CACHE: Solo reconstruir si realmente es necesario
-        cache_needs_rebuild = False
-        cache_status = ""
-
-        if not self._song_cache:
-            cache_needs_rebuild = True
-            cache_status = "Cache vacío"
-        elif self._is_cache_stale():
-            cache_needs_rebuild = True
-            cache_status = "Cache obsoleto (>24h)"
-        else:
-            cache_status = f"Cache válido con {len(self._song_cache)} entradas"
+        # Índice de canciones de toda la biblioteca (se actualiza de forma incremental)
+        self.song_index = AirsonicSongIndex(self.song_cache_file, self._make_request, self.logger)
 
         if interactive:
             print(f"📁 Directorio de datos: {self.data_dir}")
             print(f"💾 Archivo de cache: {self.song_cache_file}")
-            print(f"🔍 Estado del cache: {cache_status}")
-
-        self.logger.info(f"Inicializado - {cache_status}")
+            print(f"🔍 Estado del cache: {len(self.song_index)} claves en el índice")
+            print("🔄 Comprobando cambios en la biblioteca de Airsonic...")
 
-        # Solo reconstruir cache si es necesario
-        if cache_needs_rebuild:
-            if interactive:
-                print("🔨 Reconstruyendo cache de canciones...")
-            self.logger.info("Reconstruyendo cache de canciones")
-            self._build_song_cache()
-        else:
-            if interactive:
-                print("✅ Usando cache existente")
-            self.logger.info("Usando cache existente")
+        self.song_index.update()
+        self.logger.info(f"Inicializado - índice con {len(self.song_index)} claves")
 
     def _test_connection(self) -> bool:
         """Verifica la conexión con Airsonic"""
@@ -265,96 +245,6 @@ class AirsonicSyncer:
         with open(m3u_path, 'rb') as f:
             return hashlib.sha256(f.read()).hexdigest()
 
-    def _load_song_cache(self):
-        """Carga el cache de canciones desde archivo"""
-        if self.song_cache_file.exists():
-            try:
-                with open(self.song_cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                    self._song_cache = cache_data.get('songs', {})
-                    self._cache_timestamp = cache_data.get('timestamp', 0)
-                    self.logger.info(f"Cache cargado: {len(self._song_cache)} entradas")
-            except Exception as e:
-                self.logger.warning(f"Error cargando cache: {e}")
-                self._song_cache = {}
-                self._cache_timestamp = 0
-        else:
-            self._cache_timestamp = 0
-
-    def _save_song_cache(self):
-        """Guarda el cache de canciones"""
-        try:
-            cache_data = {
-                'timestamp': time.time(),
-                'songs': self._song_cache
-            }
-            with open(self.song_cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
-            self.logger.debug("Cache guardado correctamente")
-        except Exception as e:
-            self.logger.error(f"Error guardando cache: {e}")
-
-    def _is_cache_stale(self, max_age_hours: int = 24) -> bool:
-        """Verifica si el cache está obsoleto"""
-        if not hasattr(self, '_cache_timestamp'):
-            return True
-        age_hours = (time.time() - self._cache_timestamp) / 3600
-        return age_hours > max_age_hours
-
-    def _build_song_cache(self):
-        """Construye cache de todas las canciones en Airsonic"""
-        self.logger.info("Construyendo cache de canciones...")
-
-        try:
-            # Obtener todas las canciones de Airsonic
-            response = self._make_request('search3', {'query': '*', 'songCount': 10000})
-
-            if response and 'searchResult3' in response:
-                songs = response['searchResult3'].get('song', [])
-
-                for song in songs:
-                    # Obtener y validar el ID
-                    song_id = song.get('id')
-                    if isinstance(song_id, list):
-                        song_id = song_id[0] if song_id else None
-                    if not song_id:
-                        continue
-                    song_id = str(song_id)
-
-                    # Normalizar para búsqueda
-                    artist = self._normalize_text(song.get('artist', ''))
-                    title = self._normalize_text(song.get('title', ''))
-                    album = self._normalize_text(song.get('album', ''))
-
-                    # Crear múltiples claves de búsqueda
-                    keys = [
-                        f"{artist}|{title}",
-                        f"{title}|{artist}",
-                    ]
-
-                    # Agregar clave con álbum si está disponible
-                    if album:
-                        keys.append(f"{artist}|{title}|{album}")
-                        keys.append(f"{artist}|{album}|{title}")
-
-                    # Guardar en cache
-                    for key in keys:
-                        self._song_cache[key] = song_id
-
-                self._save_song_cache()
-                self.logger.info(f"Cache construido: {len(songs)} canciones, {len(self._song_cache)} claves")
-            else:
-                self.logger.warning("No se pudieron obtener canciones de Airsonic")
-
-        except Exception as e:
-            self.logger.error(f"Error construyendo cache: {e}")
-
-    def _normalize_text(self, text: str) -> str:
-        """Normaliza texto para búsqueda (lowercase, sin espacios extra)"""
-        if not text:
-            return ""
-        return ' '.join(text.lower().strip().split())
-
     def parse_m3u_file(self, m3u_path: str) -> List[Dict[str, str]]:
         """
         Parsea archivo M3U y extrae información de las canciones.
@@ -365,6 +255,7 @@ class AirsonicSyncer:
         with open(m3u_path, 'r', encoding='utf-8', errors='ignore') as f:
             lines = f.readlines()
 
+        entries = []
         current_info = {}
         for line in lines:
             line = line.strip()
@@ -380,34 +271,39 @@ class AirsonicSyncer:
 
             # Líneas de archivo
             elif line and not line.startswith('#'):
-                file_path = line
-
                 # Si no tenemos info del EXTINF, intentar extraer del nombre de archivo
                 if not current_info:
-                    current_info = self._extract_info_from_filename(file_path)
-
-                # Si aún no tenemos info completa, intentar extraer metadata del archivo
-                if not current_info.get('artist') or not current_info.get('title'):
-                    metadata_info = self._extract_metadata_from_file(file_path)
-                    if metadata_info:
-                        # Usar metadata solo si no tenemos la info
-                        if not current_info.get('artist'):
-                            current_info['artist'] = metadata_info.get('artist', '')
-                        if not current_info.get('title'):
-                            current_info['title'] = metadata_info.get('title', '')
-                        if metadata_info.get('album'):
-                            current_info['album'] = metadata_info['album']
-
-                # Agregar path del archivo
-                current_info['path'] = file_path
-
-                # Solo agregar si tenemos al menos artista o título
-                if current_info.get('artist') or current_info.get('title'):
-                    tracks.append(current_info.copy())
+                    current_info = self._extract_info_from_filename(line)
+                entries.append((line, current_info))
 
                 # Reset para siguiente canción
                 current_info = {}
 
+        # Leer en paralelo (o desde la caché) los tags de los archivos con info incompleta
+        if MUTAGEN_AVAILABLE:
+            self.tag_cache.read_many(file_path for file_path, info in entries
+                                     if not info.get('artist') or not info.get('title'))
+
+        for file_path, current_info in entries:
+            # Si aún no tenemos info completa, intentar extraer metadata del archivo
+            if not current_info.get('artist') or not current_info.get('title'):
+                metadata_info = self._extract_metadata_from_file(file_path)
+                if metadata_info:
+                    # Usar metadata solo si no tenemos la info
+                    if not current_info.get('artist'):
+                        current_info['artist'] = metadata_info.get('artist', '')
+                    if not current_info.get('title'):
+                        current_info['title'] = metadata_info.get('title', '')
+                    if metadata_info.get('album'):
+                        current_info['album'] = metadata_info['album']
+
+            # Agregar path del archivo
+            current_info['path'] = file_path
+
+            # Solo agregar si tenemos al menos artista o título
+            if current_info.get('artist') or current_info.get('title'):
+                tracks.append(current_info.copy())
+
         return tracks
 
     def _extract_info_from_filename(self, file_path: str) -> Dict[str, str]:
@@ -467,66 +363,37 @@ class AirsonicSyncer:
             self.logger.debug(f"Archivo no encontrado para metadata: {file_path}")
             return None
 
-        try:
-            audio = MutagenFile(file_path, easy=True)
-
-            if audio is None:
-                return None
-
-            metadata = {}
-
-            # Intentar extraer artista
-            if 'artist' in audio:
-                artists = audio['artist']
-                metadata['artist'] = artists[0] if isinstance(artists, list) else str(artists)
-            elif 'albumartist' in audio:
-                artists = audio['albumartist']
-                metadata['artist'] = artists[0] if isinstance(artists, list) else str(artists)
-
-            # Intentar extraer título
-            if 'title' in audio:
-                titles = audio['title']
-                metadata['title'] = titles[0] if isinstance(titles, list) else str(titles)
-
-            # Intentar extraer álbum
-            if 'album' in audio:
-                albums = audio['album']
-                metadata['album'] = albums[0] if isinstance(albums, list) else str(albums)
+        # Caché compartida por (ruta, tamaño, mtime): solo se abre el archivo si ha cambiado
+        tags = self.tag_cache.get(file_path)
+        if tags is None:
+            self.logger.debug(f"No se pudo leer metadata de {file_path}")
+            return None
 
-            if metadata.get('artist') or metadata.get('title'):
-                self.logger.debug(f"Metadata extraída: {metadata.get('artist', 'N/A')} - {metadata.get('title', 'N/A')}")
-                return metadata
+        metadata = {}
+        if tags['artist'] or tags['albumartist']:
+            metadata['artist'] = tags['artist'] or tags['albumartist']
+        if tags['title']:
+            metadata['title'] = tags['title']
+        if tags['album']:
+            metadata['album'] = tags['album']
 
-        except Exception as e:
-            self.logger.debug(f"No se pudo leer metadata de {file_path}: {e}")
+        if metadata.get('artist') or metadata.get('title'):
+            self.logger.debug(f"Metadata extraída: {metadata.get('artist', 'N/A')} - {metadata.get('title', 'N/A')}")
+            return metadata
 
         return None
 
     def find_track_in_db(self, track_info: Dict[str, str]) -> Optional[Dict]:
-        """Busca una canción en la base de datos local"""
+        """Busca una canción en la base de datos local (por claves normalizadas con índice)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            artist = track_info.get('artist', '')
-            title = track_info.get('title', '')
-
-            # Búsqueda exacta
-            cursor.execute("""
-                SELECT artist, title, album, path
-                FROM tracks
-                WHERE LOWER(artist) = LOWER(?) AND LOWER(title) = LOWER(?)
-            """, (artist, title))
-
-            result = cursor.fetchone()
-            conn.close()
-
-            if result:
+            song = self.library.find_song(track_info.get('artist', ''), track_info.get('title', ''),
+                                          track_info.get('album'))
+            if song:
                 return {
-                    'artist': result[0],
-                    'title': result[1],
-                    'album': result[2],
-                    'path': result[3]
+                    'artist': song['artist'],
+                    'title': song['title'],
+                    'album': song['album'],
+                    'path': song['file_path']
                 }
 
         except Exception as e:
@@ -546,28 +413,21 @@ class AirsonicSyncer:
         if not artist and not title:
             return None
 
-        # 1. Búsqueda en cache con múltiples variantes
-        cache_keys = []
-
-        if artist and title:
-            cache_keys.append(f"{self._normalize_text(artist)}|{self._normalize_text(title)}")
-            cache_keys.append(f"{self._normalize_text(title)}|{self._normalize_text(artist)}")
-
-            if album:
-                cache_keys.append(f"{self._normalize_text(artist)}|{self._normalize_text(title)}|{self._normalize_text(album)}")
-                cache_keys.append(f"{self._normalize_text(artist)}|{self._normalize_text(album)}|{self._normalize_text(title)}")
-
-        for key in cache_keys:
-            if key in self._song_cache:
-                cached_id = self._song_cache[key]
-                # CORRECCIÓN: Asegurarse de que el ID es un string
-                if isinstance(cached_id, list):
-                    cached_id = cached_id[0] if cached_id else None
-                if cached_id:
-                    self.logger.debug(f"✓ Cache hit: {artist} - {title}")
-                    return str(cached_id)
+        # 1. Búsqueda en el índice de la biblioteca completa
+        song_id = self.song_index.lookup(artist, title, album)
+        if song_id:
+            self.logger.debug(f"✓ Cache hit: {artist} - {title}")
+            return song_id
+
+        # El índice solo casa claves normalizadas exactas; la API (coincidencia
+        # por subcadenas) sigue cubriendo sus fallos cuando hay artista y título.
+        # Sin artista o título solo se consulta si no se pudo construir el índice
+        if len(self.song_index) and not (artist and title):
+            self.logger.debug(f"✗ No encontrado: {artist} - {title}")
+            return None
 
         # 2. Búsqueda en API de Airsonic
+        time.sleep(0.05)  # Rate limiting solo para las búsquedas que van a la API
         search_queries = []
 
         # Construir queries de búsqueda
@@ -680,63 +540,82 @@ class AirsonicSyncer:
             self.logger.error(f"Error creando playlist: {e}")
             return None
 
-    def update_airsonic_playlist(self, playlist_id: str, new_song_ids: Set[str], current_song_ids: Set[str]) -> bool:
+    def _chunks(self, items: List, size: int = MAX_IDS_PER_REQUEST):
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def _add_songs_to_playlist(self, playlist_id: str, song_ids: List[str]) -> bool:
+        for chunk in self._chunks(song_ids):
+            if not self._make_request('updatePlaylist', {'playlistId': playlist_id, 'songIdToAdd': chunk}):
+                return False
+        return True
+
+    def _replace_playlist_songs(self, playlist_id: str, song_ids: List[str]) -> bool:
+        """Reemplaza todas las canciones (createPlaylist con playlistId conserva la playlist)"""
+        first, rest = song_ids[:MAX_IDS_PER_REQUEST], song_ids[MAX_IDS_PER_REQUEST:]
+        if not self._make_request('createPlaylist', {'playlistId': playlist_id, 'songId': first}):
+            return False
+        return self._add_songs_to_playlist(playlist_id, rest)
+
+    def update_airsonic_playlist(self, playlist_id: str, new_song_ids: List[str], current_entries: List[Dict]) -> bool:
         """
-        Actualiza una playlist existente con sincronización incremental.
-        Solo añade canciones nuevas y elimina las que ya no existen.
+        Actualiza una playlist existente aplicando el diff en el menor número de peticiones.
+
+        Los índices a eliminar se calculan de una vez sobre las entradas ya
+        descargadas (incluidos duplicados) y se envían en orden descendente,
+        así cada eliminación no desplaza las siguientes. Si el diff es grande
+        se reemplaza la playlist entera.
         """
         try:
-            to_add = new_song_ids - current_song_ids
-            to_remove = current_song_ids - new_song_ids
+            wanted = set(new_song_ids)
+            current_ids = [str(entry.get('id')) for entry in current_entries]
+
+            seen = set()
+            to_remove = []
+            for index, song_id in enumerate(current_ids):
+                if song_id not in wanted or song_id in seen:
+                    to_remove.append(index)
+                seen.add(song_id)
+            to_remove.reverse()
+
+            to_add = [song_id for song_id in new_song_ids if song_id not in seen]
 
             self.logger.info(f"Cambios: +{len(to_add)} canciones, -{len(to_remove)} canciones")
+            if not to_add and not to_remove:
+                return True
 
-            # Añadir nuevas canciones
-            if to_add:
-                params = {
-                    'playlistId': playlist_id,
-                    'songIdToAdd': list(to_add)
-                }
-                response = self._make_request('updatePlaylist', params)
-                if not response:
-                    self.logger.error("Error añadiendo canciones")
+            if not new_song_ids:
+                self.logger.warning("La playlist quedaría vacía, no se modifica")
+                return True
+
+            if len(to_add) + len(to_remove) > len(new_song_ids) * REPLACE_RATIO:
+                if not self._replace_playlist_songs(playlist_id, new_song_ids):
+                    self.logger.error("Error reemplazando canciones")
                     return False
-                self.logger.info(f"✅ {len(to_add)} canciones añadidas")
+                self.logger.info(f"✅ Playlist reemplazada con {len(new_song_ids)} canciones")
+                return True
 
-            # Eliminar canciones obsoletas
+            # Eliminar canciones obsoletas: trozos de índices descendentes, siguen siendo válidos
+            for chunk in self._chunks(to_remove):
+                if not self._make_request('updatePlaylist', {'playlistId': playlist_id, 'songIndexToRemove': chunk}):
+                    self.logger.error("Error eliminando canciones")
+                    return False
             if to_remove:
-                for song_id in to_remove:
-                    # Obtener índice de la canción en la playlist
-                    index = self._get_song_index_in_playlist(playlist_id, song_id)
-                    if index is not None:
-                        params = {
-                            'playlistId': playlist_id,
-                            'songIndexToRemove': index
-                        }
-                        self._make_request('updatePlaylist', params)
-
                 self.logger.info(f"✅ {len(to_remove)} canciones eliminadas")
 
+            # Añadir nuevas canciones
+            if not self._add_songs_to_playlist(playlist_id, to_add):
+                self.logger.error("Error añadiendo canciones")
+                return False
+            if to_add:
+                self.logger.info(f"✅ {len(to_add)} canciones añadidas")
+
             return True
 
         except Exception as e:
             self.logger.error(f"Error actualizando playlist: {e}")
             return False
 
-    def _get_song_index_in_playlist(self, playlist_id: str, song_id: str) -> Optional[int]:
-        """Obtiene el índice de una canción en una playlist (necesario para eliminar en API 1.15.0)"""
-        try:
-            response = self._make_request('getPlaylist', {'id': playlist_id})
-            if response and 'playlist' in response:
-                entries = response['playlist'].get('entry', [])
-                for i, entry in enumerate(entries):
-                    if entry.get('id') == song_id:
-                        return i
-            return None
-        except Exception as e:
-            self.logger.warning(f"Error obteniendo índice de canción {song_id}: {e}")
-            return None
-
     def sync_m3u_to_airsonic(self, m3u_path: str, playlist_name: Optional[str] = None, force_full_sync: bool = False) -> bool:
         """
         Sincroniza un archivo M3U con Airsonic usando sincronización incremental.
@@ -764,7 +643,8 @@ class AirsonicSyncer:
         self.logger.info(f"Encontradas {len(tracks)} canciones en el archivo M3U")
 
         # Buscar canciones en Airsonic
-        airsonic_song_ids = set()
+        airsonic_song_ids = []  # En el orden del M3U, sin repetidos
+        seen_ids = set()
         not_found = []
         found_with_metadata = 0
 
@@ -780,25 +660,24 @@ class AirsonicSyncer:
             song_id = self.search_track_in_airsonic(track_info, db_track)
 
             if song_id:
-                airsonic_song_ids.add(song_id)
+                if song_id not in seen_ids:
+                    seen_ids.add(song_id)
+                    airsonic_song_ids.append(song_id)
                 if track_info.get('album'):
                     found_with_metadata += 1
             else:
                 album_info = f" ({track_info['album']})" if track_info.get('album') else ""
                 not_found.append(f"{track_info['artist']} - {track_info['title']}{album_info}")
 
-            time.sleep(0.05)  # Rate limiting más suave
-
         # Sincronizar con Airsonic
         if airsonic_song_ids or force_full_sync:
             # Verificar si la playlist ya existe
             existing_playlist = self.get_airsonic_playlist(playlist_name)
 
             if existing_playlist:
-                # Actualización incremental
-                current_song_ids = set(entry['id'] for entry in existing_playlist.get('entry', []))
-
-                if self.update_airsonic_playlist(existing_playlist['id'], airsonic_song_ids, current_song_ids):
+                # Actualización incremental sobre las entradas ya descargadas
+                if self.update_airsonic_playlist(existing_playlist['id'], airsonic_song_ids,
+                                                 existing_playlist.get('entry', [])):
                     success = True
                     playlist_id = existing_playlist['id']
                 else:
@@ -806,7 +685,7 @@ class AirsonicSyncer:
                     playlist_id = None
             else:
                 # Crear nueva playlist
-                playlist_id = self.create_airsonic_playlist(playlist_name, list(airsonic_song_ids))
+                playlist_id = self.create_airsonic_playlist(playlist_name, airsonic_song_ids)
                 success = playlist_id is not None
 
             if success:
@@ -880,8 +759,7 @@ def main():
         # Reconstruir cache si se solicita
         if args.rebuild_cache:
             syncer.logger.info("Reconstruyendo cache de canciones...")
-            syncer._song_cache = {}
-            syncer._build_song_cache()
+            syncer.song_index.update(force_rebuild=True)
             syncer.logger.info("Cache reconstruido")
             if not args.playlist:
                 return
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Consultas compartidas a la base de datos de la biblioteca musical
+(songs, albums, artists, song_links, lyrics), usada por los scripts de
+spotify/, airsonic/ y spotify/descargar_playlist/.
+
+Cada tabla tiene columnas de clave normalizada (minúsculas, sin acentos ni
+puntuación; los álbumes además sin "(Deluxe Edition)" y similares) con
+índices compuestos, así que buscar una canción es una consulta por índice en
+lugar de LOWER(x) = LOWER(?), LIKE o bucles de similitud en Python.
+
+Las claves se calculan aquí (SQLite no puede llamar a funciones de Python
+desde una columna generada sin romper la base de datos para otros
+programas): unos triggers las ponen a NULL cuando cambia el texto y
+connect() rellena las pendientes al abrir, con un índice parcial para
+encontrarlas sin recorrer la tabla. MusicLibrary vuelve a rellenarlas antes
+de cada búsqueda por clave, para ver las filas que otros procesos han
+añadido o cambiado mientras la conexión seguía abierta.
+
+Las letras se buscan en una tabla FTS5 (lyrics_fts, rowid = rowid de lyrics)
+que guarda ya el título, artista, álbum y año de cada canción, así que una
+búsqueda no hace ningún join. Se crea la primera vez que se busca y los
+triggers la mantienen al día con lyrics, songs y albums.
+"""
+
+import re
+import sqlite3
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+_EDITION_RE = re.compile(
+    r'\s*[\(\[][^)\]]*(?:Edition|Deluxe|Remaster|Anniversary|Special|Bonus|Version|Expanded)[^)\]]*[\)\]]',
+    re.IGNORECASE
+)
+_PARENS_RE = re.compile(r'\s*[\(\[][^)\]]*[\)\]]')
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+ALBUM_SIMILARITY = 0.3
+TITLE_SIMILARITY = 0.5
+BACKFILL_BATCH = 5000
+SNIPPET_TOKENS = 16
+
+_QUERY_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """Minúsculas, sin acentos ni puntuación y con espacios simples"""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION_RE.sub(' ', text.lower())
+    return ' '.join(text.split())
+
+
+def album_key(text: Optional[str]) -> str:
+    """Clave de álbum: sin paréntesis de edición (Deluxe, Remaster...)"""
+    return normalize_key(_EDITION_RE.sub('', text or ''))
+
+
+def base_title_key(text: Optional[str]) -> str:
+    """Clave de título sin ningún paréntesis, para coincidencias aproximadas"""
+    return normalize_key(_PARENS_RE.sub('', text or ''))
+
+
+def similarity(a: str, b: str) -> float:
+    """Similitud entre dos claves: 1 si son iguales, proporción si una contiene a la otra, si no palabras comunes"""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    if a in b or b in a:
+        return len(min(a, b, key=len)) / len(max(a, b, key=len))
+    words_a, words_b = set(a.split()), set(b.split())
+    common = words_a & words_b
+    return len(common) / max(len(words_a), len(words_b)) if common else 0.0
+
+
+# tabla -> {columna clave: (columna de texto, función)}
+KEY_COLUMNS = {
+    'songs': {
+        'artist_key': ('artist', normalize_key),
+        'album_key': ('album', album_key),
+        'title_key': ('title', normalize_key),
+    },
+    'artists': {
+        'name_key': ('name', normalize_key),
+    },
+    'albums': {
+        'name_key': ('name', album_key),
+    },
+}
+
+INDEXES = {
+    'songs': [
+        'CREATE INDEX IF NOT EXISTS idx_songs_keys ON songs(artist_key, album_key, title_key)',
+        'CREATE INDEX IF NOT EXISTS idx_songs_title_key ON songs(title_key, artist_key)',
+    ],
+    'artists': [
+        'CREATE INDEX IF NOT EXISTS idx_artists_name_key ON artists(name_key)',
+    ],
+    'albums': [
+        'CREATE INDEX IF NOT EXISTS idx_albums_artist_name_key ON albums(artist_id, name_key)',
+        'CREATE INDEX IF NOT EXISTS idx_albums_name_key ON albums(name_key)',
+    ],
+}
+
+# Índices de apoyo para los joins por id de las otras tablas
+EXTRA_INDEXES = {
+    'song_links': ('song_id', 'CREATE INDEX IF NOT EXISTS idx_song_links_song_id ON song_links(song_id)'),
+    'lyrics': ('track_id', 'CREATE INDEX IF NOT EXISTS idx_lyrics_track_id ON lyrics(track_id)'),
+}
+
+_connections: Dict[str, sqlite3.Connection] = {}
+
+
+def ensure_keys(conn: sqlite3.Connection):
+    """Crea columnas, triggers e índices de claves si faltan y rellena las claves pendientes"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+    for table, keys in KEY_COLUMNS.items():
+        if table not in tables:
+            continue
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if not all(source in columns for source, _ in keys.values()):
+            continue
+
+        for key in keys:
+            if key not in columns:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {key} TEXT')
+
+        first_key = next(iter(keys))
+        sources = ', '.join(source for source, _ in keys.values())
+        nulls = ', '.join(f'{key} = NULL' for key in keys)
+        conn.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_keys_update
+            AFTER UPDATE OF {sources} ON {table} BEGIN
+                UPDATE {table} SET {nulls} WHERE id = NEW.id;
+            END;
+
+            CREATE INDEX IF NOT EXISTS idx_{table}_pending_keys ON {table}(id) WHERE {first_key} IS NULL;
+        ''')
+        for statement in INDEXES[table]:
+            conn.execute(statement)
+
+        _backfill(conn, table, keys, first_key)
+
+    for table, (column, statement) in EXTRA_INDEXES.items():
+        if table in tables and column in {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}:
+            conn.execute(statement)
+
+    conn.commit()
+
+
+def refresh_keys(conn: sqlite3.Connection):
+    """Calcula las claves que los triggers han puesto a NULL desde que se abrió la conexión"""
+    for table, keys in KEY_COLUMNS.items():
+        first_key = next(iter(keys))
+        if conn.execute(f"SELECT 1 FROM sqlite_master WHERE name = 'idx_{table}_pending_keys'").fetchone():
+            _backfill(conn, table, keys, first_key)
+    conn.commit()
+
+
+def _backfill(conn: sqlite3.Connection, table: str, keys: Dict, first_key: str):
+    sources = ', '.join(source for source, _ in keys.values())
+    assignments = ', '.join(f'{key} = ?' for key in keys)
+    while True:
+        rows = conn.execute(
+            f'SELECT id, {sources} FROM {table} WHERE {first_key} IS NULL LIMIT {BACKFILL_BATCH}'
+        ).fetchall()
+        if not rows:
+            return
+        conn.executemany(
+            f'UPDATE {table} SET {assignments} WHERE id = ?',
+            [[func(value) for (_, func), value in zip(keys.values(), row[1:])] + [row[0]] for row in rows]
+        )
+
+
+# Año del álbum de la canción {s} (del mismo artista), por las claves normalizadas
+_YEAR_SQL = '''(SELECT year FROM albums
+                WHERE artist_id = (SELECT id FROM artists WHERE name_key = {s}.artist_key LIMIT 1)
+                AND name_key = {s}.album_key LIMIT 1)'''
+
+
+def ensure_lyrics_fts(conn: sqlite3.Connection):
+    """
+    Crea lyrics_fts y sus triggers si faltan, y la rellena si está vacía.
+
+    Activa recursive_triggers en la conexión: sin él, el DELETE implícito de
+    un INSERT OR REPLACE no dispara los triggers de borrado.
+    """
+    conn.execute('PRAGMA recursive_triggers = ON')
+
+    insert_row = f'''
+            INSERT INTO lyrics_fts (rowid, lyrics, track_id, title, artist, album, year)
+            SELECT NEW.rowid, NEW.lyrics, NEW.track_id, s.title, s.artist, s.album, {_YEAR_SQL.format(s='s')}
+            FROM (SELECT NEW.track_id AS id) t LEFT JOIN songs s ON s.id = t.id;'''
+
+    conn.executescript(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS lyrics_fts USING fts5(
+            lyrics, track_id UNINDEXED, title UNINDEXED, artist UNINDEXED,
+            album UNINDEXED, year UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS lyrics_fts_insert AFTER INSERT ON lyrics BEGIN
+            {insert_row}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS lyrics_fts_update AFTER UPDATE ON lyrics BEGIN
+            DELETE FROM lyrics_fts WHERE rowid = OLD.rowid;
+            {insert_row}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS lyrics_fts_delete AFTER DELETE ON lyrics BEGIN
+            DELETE FROM lyrics_fts WHERE rowid = OLD.rowid;
+        END;
+
+        -- Un cambio de título/artista/álbum pone las claves a NULL y connect()
+        -- las recalcula: en los dos pasos se refresca lo guardado en lyrics_fts
+        CREATE TRIGGER IF NOT EXISTS songs_lyrics_fts_update
+        AFTER UPDATE OF artist_key, album_key, title_key ON songs BEGIN
+            UPDATE lyrics_fts SET title = NEW.title, artist = NEW.artist, album = NEW.album,
+                year = {_YEAR_SQL.format(s='NEW')}
+            WHERE rowid IN (SELECT rowid FROM lyrics WHERE track_id = NEW.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS songs_lyrics_fts_delete AFTER DELETE ON songs BEGIN
+            DELETE FROM lyrics_fts WHERE rowid IN (SELECT rowid FROM lyrics WHERE track_id = OLD.id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS albums_lyrics_fts_year AFTER UPDATE OF year ON albums BEGIN
+            UPDATE lyrics_fts SET year = NEW.year
+            WHERE rowid IN (
+                SELECT l.rowid FROM songs s JOIN lyrics l ON l.track_id = s.id
+                WHERE s.artist_key = (SELECT name_key FROM artists WHERE id = NEW.artist_id)
+                AND s.album_key = NEW.name_key
+            );
+        END;
+    ''')
+
+    # Bases de datos con letras anteriores al índice: rellenarlo una vez
+    if (not conn.execute('SELECT 1 FROM lyrics_fts LIMIT 1').fetchone()
+            and conn.execute('SELECT 1 FROM lyrics LIMIT 1').fetchone()):
+        rebuild_lyrics_fts(conn)
+    conn.commit()
+
+
+def rebuild_lyrics_fts(conn: sqlite3.Connection):
+    """Vuelve a generar lyrics_fts completa desde lyrics, songs y albums"""
+    conn.execute('DELETE FROM lyrics_fts')
+    conn.execute(f'''
+        INSERT INTO lyrics_fts (rowid, lyrics, track_id, title, artist, album, year)
+        SELECT l.rowid, l.lyrics, l.track_id, s.title, s.artist, s.album, {_YEAR_SQL.format(s='s')}
+        FROM lyrics l LEFT JOIN songs s ON s.id = l.track_id
+    ''')
+    conn.commit()
+
+
+def lyrics_match_expression(text: str) -> str:
+    """
+    Consulta FTS5 a partir del texto del usuario: "entre comillas" es una
+    frase, palabra* busca por prefijo y el resto son palabras sueltas (AND).
+    """
+    terms = []
+    for phrase, word in _QUERY_TERM_RE.findall(text or ''):
+        prefix = not phrase and word.endswith('*')
+        term = (phrase or word.rstrip('*')).replace('"', '""').strip()
+        if term:
+            terms.append(f'"{term}"' + (' *' if prefix else ''))
+    return ' '.join(terms)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Conexión compartida (una por base de datos y proceso) con las claves al día"""
+    path = str(db_path)
+    conn = _connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute('PRAGMA cache_size = 10000')
+        try:
+            ensure_keys(conn)
+        except sqlite3.OperationalError as e:
+            # Base de datos de solo lectura: se usan las claves que ya tenga
+            print(f"⚠️  No se pudieron actualizar las claves normalizadas de {path}: {e}")
+        _connections[path] = conn
+    return conn
+
+
+def close(db_path: str):
+    conn = _connections.pop(str(db_path), None)
+    if conn is not None:
+        conn.close()
+
+
+class MusicLibrary:
+    """Búsquedas de canciones, álbumes y artistas por clave normalizada"""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self.conn = connect(self.db_path)
+        self._lyrics_fts_ready = False
+        self._read_only = False
+
+    def _refresh_keys(self):
+        """Claves pendientes antes de buscar (barato: solo mira el índice parcial)"""
+        if self._read_only:
+            return
+        try:
+            refresh_keys(self.conn)
+        except sqlite3.OperationalError:
+            self._read_only = True  # Solo lectura: se usan las claves que ya tenga
+
+    def _one(self, query: str, params) -> Optional[Dict]:
+        row = self.conn.execute(query, params).fetchone()
+        return dict(row) if row else None
+
+    def find_artist(self, name: str) -> Optional[Dict]:
+        self._refresh_keys()
+        return self._one('SELECT * FROM artists WHERE name_key = ? LIMIT 1', (normalize_key(name),))
+
+    def find_album(self, artist: str, album: str) -> Optional[Dict]:
+        self._refresh_keys()
+        return self._one('''
+            SELECT al.* FROM albums al
+            JOIN artists ar ON ar.id = al.artist_id
+            WHERE ar.name_key = ? AND al.name_key = ?
+            LIMIT 1
+        ''', (normalize_key(artist), album_key(album)))
+
+    def find_song(self, artist: str, title: str, album: Optional[str] = None) -> Optional[Dict]:
+        """
+        Canción por artista y título (y álbum si se da y coincide).
+
+        Si no hay coincidencia exacta de claves, prueba las canciones con el
+        mismo título cuyo artista contiene al buscado o al revés
+        (p.ej. "Artista feat. Otro").
+        """
+        artist_k, title_k = normalize_key(artist), normalize_key(title)
+        if not title_k:
+            return None
+        self._refresh_keys()
+
+        if album:
+            song = self._one('SELECT * FROM songs WHERE artist_key = ? AND album_key = ? AND title_key = ? LIMIT 1',
+                             (artist_k, album_key(album), title_k))
+            if song:
+                return song
+
+        song = self._one('SELECT * FROM songs WHERE title_key = ? AND artist_key = ? LIMIT 1', (title_k, artist_k))
+        if song or not artist_k:
+            return song
+
+        for row in self.conn.execute('SELECT * FROM songs WHERE title_key = ?', (title_k,)):
+            candidate = row['artist_key'] or ''
+            if candidate and (artist_k in candidate or candidate in artist_k):
+                return dict(row)
+        return None
+
+    def artist_albums(self, artist: str) -> List[str]:
+        """Nombres de álbum distintos de un artista en songs"""
+        self._refresh_keys()
+        rows = self.conn.execute('SELECT DISTINCT album FROM songs WHERE artist_key = ?', (normalize_key(artist),))
+        return [row[0] for row in rows if row[0]]
+
+    def album_songs(self, artist: str, album: str) -> List[Dict]:
+        self._refresh_keys()
+        rows = self.conn.execute('SELECT * FROM songs WHERE artist_key = ? AND album_key = ? ORDER BY track_number',
+                                 (normalize_key(artist), album_key(album)))
+        return [dict(row) for row in rows]
+
+    def find_song_fuzzy(self, artist: str, album: str, title: str) -> Optional[Dict]:
+        """
+        Como find_song, y si falla elige el álbum más parecido del artista
+        (similitud >= 0.3) y dentro de él el título más parecido (>= 0.5).
+        """
+        song = self.find_song(artist, title, album)
+        if song:
+            return song
+
+        wanted_album = album_key(album)
+        best_album, best_score = None, 0.0
+        for name in self.artist_albums(artist):
+            score = similarity(album_key(name), wanted_album)
+            if score > best_score:
+                best_album, best_score = name, score
+        if not best_album or best_score < ALBUM_SIMILARITY:
+            return None
+
+        wanted_title = base_title_key(title)
+        best_song, best_score = None, 0.0
+        for candidate in self.album_songs(artist, best_album):
+            score = similarity(base_title_key(candidate['title']), wanted_title)
+            if score > best_score:
+                best_song, best_score = candidate, score
+        return best_song if best_score >= TITLE_SIMILARITY else None
+
+    def search_lyrics(self, text: str, limit: Optional[int] = None,
+                      highlight: Tuple[str, str] = ('[', ']')) -> List[Dict]:
+        """
+        Canciones cuya letra contiene el texto, de más a menos relevante (BM25).
+
+        Args:
+            text: palabras, "frases exactas" y prefijos (palabra*)
+            limit: máximo de resultados (None para todos)
+            highlight: marcas alrededor de las coincidencias en el fragmento
+        """
+        expression = lyrics_match_expression(text)
+        if not expression:
+            return []
+        if not self._lyrics_fts_ready:
+            ensure_lyrics_fts(self.conn)
+            self._lyrics_fts_ready = True
+        else:
+            self._refresh_keys()
+
+        query = f"""
+            SELECT track_id, artist, album, title, year, lyrics,
+                snippet(lyrics_fts, 0, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet
+            FROM lyrics_fts
+            WHERE lyrics_fts MATCH ? AND title IS NOT NULL
+            ORDER BY rank
+        """
+        params = [highlight[0], highlight[1], expression]
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(query, params)]
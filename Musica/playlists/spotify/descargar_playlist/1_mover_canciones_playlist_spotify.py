@@ -10,6 +10,10 @@ from tabulate import tabulate
 import sys
 import time
 import re
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from music_library import MusicLibrary
 
 
 
@@ -268,139 +272,21 @@ def get_file_path(artista, album, cancion, db_path):
     """
     Obtiene la ruta del archivo directamente de la base de datos
     con soporte para coincidencias parciales en los nombres de álbumes
+
+    La búsqueda exacta es una consulta por las claves normalizadas de
+    music_library; solo si falla se compara con los álbumes del artista.
     """
-    import sqlite3
-    import re
-    
     print(f"Consultando directamente en la base de datos: {db_path}")
     print(f"Buscando: Artista='{artista}', Album='{album}', Canción='{cancion}'")
     
     try:
-        # Conectar a la base de datos
-        conn = sqlite3.connect(db_path)
-        conn.create_function("REGEXP", 2, lambda x, y: 1 if re.search(x, y, re.IGNORECASE) else 0)
-        cursor = conn.cursor()
-        
-        # 1. Primero, veamos qué álbumes tenemos de este artista
-        cursor.execute("""
-            SELECT DISTINCT album FROM songs 
-            WHERE LOWER(artist) = LOWER(?)
-        """, (artista,))
-        
-        albums_in_db = cursor.fetchall()
-        print(f"Álbumes encontrados para {artista}: {[a[0] for a in albums_in_db]}")
-        
-        # 2. Normalizar el nombre del álbum de Spotify (quitar paréntesis con ediciones)
-        album_normalizado = re.sub(r'\s*\([^)]*(?:Edition|Deluxe|Remaster|Anniversary|Special|Bonus|Version|Expanded)[^)]*\)', '', album, flags=re.IGNORECASE)
-        album_normalizado = album_normalizado.strip()
-        print(f"Álbum normalizado: '{album_normalizado}'")
-        
-        # 3. Encontrar el mejor álbum coincidente
-        best_album_match = None
-        highest_similarity = 0
-        
-        for db_album in albums_in_db:
-            db_album_name = db_album[0]
-            # Normalizar también el álbum de la BD
-            db_album_norm = re.sub(r'\s*\([^)]*(?:Edition|Deluxe|Remaster|Anniversary|Special|Bonus|Version|Expanded)[^)]*\)', '', db_album_name, flags=re.IGNORECASE)
-            db_album_norm = db_album_norm.strip()
-            
-            # Calcular una similitud simple (considera coincidencia de substrings)
-            if db_album_norm.lower() == album_normalizado.lower():
-                similarity = 1.0  # Coincidencia exacta
-            elif db_album_norm.lower() in album_normalizado.lower() or album_normalizado.lower() in db_album_norm.lower():
-                # Calcular longitud relativa del substring coincidente
-                similarity = len(min(db_album_norm, album_normalizado, key=len)) / len(max(db_album_norm, album_normalizado, key=len))
-            else:
-                # Contar cuántas palabras coinciden
-                db_words = set(db_album_norm.lower().split())
-                search_words = set(album_normalizado.lower().split())
-                common_words = db_words.intersection(search_words)
-                if common_words:
-                    similarity = len(common_words) / max(len(db_words), len(search_words))
-                else:
-                    similarity = 0
-            
-            print(f"Álbum en BD: '{db_album_name}' (norm: '{db_album_norm}') - Similitud: {similarity:.2f}")
-            
-            if similarity > highest_similarity:
-                highest_similarity = similarity
-                best_album_match = db_album_name
-        
-        if not best_album_match or highest_similarity < 0.3:  # Umbral mínimo de similitud
-            print(f"No se encontró ningún álbum similar a '{album}' para el artista '{artista}'")
+        song = MusicLibrary(db_path).find_song_fuzzy(artista, album, cancion)
+        if not song:
+            print(f"No se encontró '{cancion}' del álbum '{album}' para el artista '{artista}'")
             return None
-        
-        print(f"Mejor coincidencia de álbum: '{best_album_match}' (similitud: {highest_similarity:.2f})")
-        
-        # 4. Buscar la canción en el álbum seleccionado
-        # Primero intentamos una coincidencia directa
-        cursor.execute("""
-            SELECT file_path FROM songs 
-            WHERE LOWER(artist) = LOWER(?) 
-            AND LOWER(album) = LOWER(?) 
-            AND LOWER(title) = LOWER(?)
-        """, (artista, best_album_match, cancion))
-        
-        result = cursor.fetchone()
-        
-        # Si no hay resultado, intentamos coincidencia parcial de título
-        if not result:
-            print(f"No se encontró coincidencia exacta para '{cancion}'. Intentando coincidencia parcial...")
-            
-            # Obtener todas las canciones del álbum
-            cursor.execute("""
-                SELECT title, file_path FROM songs 
-                WHERE LOWER(artist) = LOWER(?) 
-                AND LOWER(album) = LOWER(?)
-            """, (artista, best_album_match))
-            
-            songs_in_album = cursor.fetchall()
-            
-            # Normalizar el nombre de la canción (quitar paréntesis, etc.)
-            cancion_norm = re.sub(r'\s*\([^)]*\)', '', cancion, flags=re.IGNORECASE).strip()
-            
-            best_song_match = None
-            best_path = None
-            highest_song_similarity = 0
-            
-            for db_song, path in songs_in_album:
-                # Normalizar el título de la canción en la BD
-                db_song_norm = re.sub(r'\s*\([^)]*\)', '', db_song, flags=re.IGNORECASE).strip()
-                
-                # Calcular similitud
-                if db_song_norm.lower() == cancion_norm.lower():
-                    similarity = 1.0  # Coincidencia exacta
-                elif db_song_norm.lower() in cancion_norm.lower() or cancion_norm.lower() in db_song_norm.lower():
-                    # Substring
-                    similarity = len(min(db_song_norm, cancion_norm, key=len)) / len(max(db_song_norm, cancion_norm, key=len))
-                else:
-                    # Palabras comunes
-                    db_words = set(db_song_norm.lower().split())
-                    search_words = set(cancion_norm.lower().split())
-                    common_words = db_words.intersection(search_words)
-                    if common_words:
-                        similarity = len(common_words) / max(len(db_words), len(search_words))
-                    else:
-                        similarity = 0
-                
-                print(f"Canción en BD: '{db_song}' (norm: '{db_song_norm}') - Similitud: {similarity:.2f}")
-                
-                if similarity > highest_song_similarity:
-                    highest_song_similarity = similarity
-                    best_song_match = db_song
-                    best_path = path
-            
-            if highest_song_similarity >= 0.5:  # Umbral para coincidencia de canción
-                print(f"Mejor coincidencia de canción: '{best_song_match}' (similitud: {highest_song_similarity:.2f})")
-                return best_path
-            else:
-                print(f"No se encontró una canción suficientemente similar a '{cancion}' en el álbum '{best_album_match}'")
-                return None
-        
-        # Si llegamos aquí, es porque encontramos una coincidencia exacta de canción
-        path = result[0]
-        print(f"Ruta encontrada: {path}")
+
+        path = song['file_path']
+        print(f"Ruta encontrada: {path} ({song['album']} - {song['title']})")
 
         # Ajustar la ruta encontrada
         adjusted_path = adjust_path(path)
@@ -412,9 +298,6 @@ def get_file_path(artista, album, cancion, db_path):
         import traceback
         traceback.print_exc()
         return None
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 def adjust_path(original_path):
     """
@@ -4,7 +4,8 @@ import json
 import os
 import re
 import shutil
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import threading
 import time
 import logging
@@ -29,6 +30,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Torrents que se procesan a la vez (el resto espera en la cola del pool)
+PROCESS_WORKERS = 4
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.wav', '.ogg', '.m4a')
+
+# Expresiones de normalizar_texto, compiladas una sola vez
+_PARENTESIS_RE = re.compile(r'\([^)]*\)')
+_ANIO_RE = re.compile(r'\b\d{4}\b')
+_PALABRAS_CLAVE_RE = re.compile(
+    r'\b(?:remaster(ed)?|deluxe|edition|version|expanded|anniversary|special|bonus|track|disc \d+'
+    r'|downloads)\b',  # downloads: rutas como '/downloads/...'
+    re.IGNORECASE
+)
+_PUNTUACION_RE = re.compile(r'[:\-,;/]')
+_ESPACIOS_RE = re.compile(r'[\s\-_\.]+')
+_ARTICULOS_RE = re.compile(r'^(the|a|an|el|la|los|las)\s+', re.IGNORECASE)
+_PISTA_RE = re.compile(r'^\s*(\d+)[\s\.\-]+(.+)')
+
+
 class TorrentProcessor:
     def __init__(self, json_file, output_path, carpeta_descargas_qbitorrent, num_torrents=0):
         self.json_file = json_file
@@ -77,6 +96,29 @@ class TorrentProcessor:
             logger.error(f"Error cargando el archivo JSON: {e}")
             self.canciones = []
             self.formato_agrupado = False
+        self.indexar_albumes()
+
+    def indexar_albumes(self):
+        """
+        Índice (artista, álbum) -> nombres normalizados y primera canción, para
+        no normalizar todo el JSON en cada torrent que termina.
+        """
+        self.indice_albumes = {}
+        for cancion in self.canciones:
+            artista_json = cancion.get('artista', '')
+            album_json = cancion.get('album', '')
+
+            # Saltar entradas sin artista o álbum
+            if not artista_json or not album_json:
+                continue
+
+            clave = (artista_json, album_json)
+            if clave not in self.indice_albumes:
+                self.indice_albumes[clave] = {
+                    'artista_norm': self.normalizar_texto(artista_json),
+                    'album_norm': self.normalizar_texto(album_json),
+                    'cancion': cancion
+                }
 
     def normalizar_texto(self, texto):
         """
@@ -85,34 +127,14 @@ class TorrentProcessor:
         """
         if not texto:
             return ""
-        
-        
-        
-        # Eliminar texto entre paréntesis
-        texto = re.sub(r'\([^)]*\)', '', texto)
-        
-        # Eliminar años (incluso los que no están entre paréntesis)
-        texto = re.sub(r'\b\d{4}\b', '', texto)
-        
-        # Eliminar palabras clave específicas que pueden aparecer sin paréntesis
-        palabras_clave = [
-            'remaster(ed)?', 'deluxe', 'edition', 'version', 'expanded',
-            'anniversary', 'special', 'bonus', 'track', 'disc \d+',
-            'downloads'  # Añadido para manejar rutas como '/downloads/...'
-        ]
-        
-        for palabra in palabras_clave:
-            texto = re.sub(r'\b' + palabra + r'\b', '', texto, flags=re.IGNORECASE)
-        
-        # Eliminar cualquier símbolo de puntuación (dos puntos, comas, punto y coma, etc.)
-        texto = re.sub(r'[:\-,;/]', ' ', texto)
-        
-        # Simplificar espacios múltiples y caracteres especiales
-        texto = re.sub(r'[\s\-_\.]+', ' ', texto)
-        
-        # Eliminar artículos del inicio ("The", "A", "El", etc) para mejor comparación
-        texto = re.sub(r'^(the|a|an|el|la|los|las)\s+', '', texto, flags=re.IGNORECASE)
-        
+
+        texto = _PARENTESIS_RE.sub('', texto)     # Texto entre paréntesis
+        texto = _ANIO_RE.sub('', texto)           # Años (incluso sin paréntesis)
+        texto = _PALABRAS_CLAVE_RE.sub('', texto) # Remaster, deluxe, edition...
+        texto = _PUNTUACION_RE.sub(' ', texto)    # Dos puntos, comas, punto y coma, etc.
+        texto = _ESPACIOS_RE.sub(' ', texto)      # Espacios múltiples y caracteres especiales
+        texto = _ARTICULOS_RE.sub('', texto)      # Artículos del inicio ("The", "A", "El"...)
+
         return texto.strip().lower()
             
   
@@ -179,17 +201,11 @@ class TorrentProcessor:
         canciones_coincidentes = []
         album_coincidencias = {}
         
-        for cancion in self.canciones:
-            artista_json = cancion.get('artista', '')
-            album_json = cancion.get('album', '')
-            
-            # Saltar entradas sin artista o álbum
-            if not artista_json or not album_json:
-                continue
-                
-            artista_json_norm = self.normalizar_texto(artista_json)
-            album_json_norm = self.normalizar_texto(album_json)
-            
+        for (artista_json, album_json), entrada in self.indice_albumes.items():
+            artista_json_norm = entrada['artista_norm']
+            album_json_norm = entrada['album_norm']
+            cancion = entrada['cancion']
+
             # Calcular similitud de artista
             similitud_artista = calcular_similitud(artista_json_norm, artista_ruta_norm)
             
@@ -238,7 +254,7 @@ class TorrentProcessor:
         archivos_musica = []
         for root, dirs, files in os.walk(ruta_completa):
             for file in files:
-                if file.lower().endswith(('.mp3', '.flac', '.wav', '.ogg', '.m4a')):
+                if file.lower().endswith(AUDIO_EXTENSIONS):
                     archivos_musica.append(os.path.join(root, file))
         
         if not archivos_musica:
@@ -246,9 +262,22 @@ class TorrentProcessor:
             return False
         
         logger.info(f"Se encontraron {len(archivos_musica)} archivos de música")
+
+        # Nombres normalizados de los archivos, calculados una vez por torrent
+        # (antes se recalculaban para cada canción)
+        nombres_archivos = {}
+        for archivo in archivos_musica:
+            nombre_norm = self.normalizar_texto(os.path.splitext(os.path.basename(archivo))[0]).lower()
+            track_match = _PISTA_RE.match(nombre_norm)
+            nombres_archivos[archivo] = (
+                nombre_norm,
+                set(nombre_norm.split()),
+                track_match.group(2).strip() if track_match else None
+            )
         
         # Para cada canción en el JSON, buscar un archivo correspondiente
         canciones_procesadas = 0
+        errores_copia = 0
         
         for cancion_info in canciones_coincidentes:
             nombre_cancion = cancion_info.get('cancion')
@@ -256,50 +285,41 @@ class TorrentProcessor:
                 continue
             
             # Normalizar nombre de canción (eliminar remaster, version, etc.)
-            nombre_cancion_norm = self.normalizar_texto(nombre_cancion)
+            nombre_cancion_norm = self.normalizar_texto(nombre_cancion).lower()
+            palabras_cancion = set(nombre_cancion_norm.split())
             logger.info(f"Buscando coincidencia para: '{nombre_cancion}' (norm: '{nombre_cancion_norm}')")
             
             encontrado = False
             mejor_coincidencia = None
             mejor_puntaje = 0
             
-            for archivo in archivos_musica[:]:  # Trabajamos con una copia para poder eliminar elementos
+            for archivo in archivos_musica:
                 nombre_archivo = os.path.basename(archivo)
-                nombre_sin_extension = os.path.splitext(nombre_archivo)[0]
-                
-                # Normalizar nombre de archivo
-                nombre_archivo_norm = self.normalizar_texto(nombre_sin_extension)
-                
+                nombre_archivo_norm, palabras_archivo, nombre_sin_track = nombres_archivos[archivo]
+
                 # Calcular puntaje de similitud
-                if nombre_archivo_norm.lower() == nombre_cancion_norm.lower():
+                if nombre_archivo_norm == nombre_cancion_norm:
                     puntaje = 1.0  # Coincidencia exacta
-                elif nombre_archivo_norm.lower() in nombre_cancion_norm.lower() or nombre_cancion_norm.lower() in nombre_archivo_norm.lower():
+                elif nombre_archivo_norm in nombre_cancion_norm or nombre_cancion_norm in nombre_archivo_norm:
                     # Substring
                     puntaje = 0.8
                 else:
                     # Verificar palabras en común
-                    palabras_archivo = set(nombre_archivo_norm.lower().split())
-                    palabras_cancion = set(nombre_cancion_norm.lower().split())
                     comunes = palabras_archivo.intersection(palabras_cancion)
                     if comunes:
                         puntaje = len(comunes) / max(len(palabras_archivo), len(palabras_cancion))
-                    else:
-                        # Buscar números de pista al inicio del nombre del archivo
+                    elif nombre_sin_track:
+                        # Número de pista al inicio del nombre del archivo
                         # Por ejemplo: "01 - Canción" o "1. Canción"
-                        track_match = re.match(r'^\s*(\d+)[\s\.\-]+(.+)', nombre_archivo_norm)
-                        if track_match:
-                            # Extraer el nombre sin el número de pista
-                            nombre_sin_track = track_match.group(2).strip()
-                            # Recalcular similitud
-                            if nombre_sin_track.lower() == nombre_cancion_norm.lower():
-                                puntaje = 0.9
-                            elif nombre_sin_track.lower() in nombre_cancion_norm.lower() or nombre_cancion_norm.lower() in nombre_sin_track.lower():
-                                puntaje = 0.7
-                            else:
-                                puntaje = 0
+                        if nombre_sin_track == nombre_cancion_norm:
+                            puntaje = 0.9
+                        elif nombre_sin_track in nombre_cancion_norm or nombre_cancion_norm in nombre_sin_track:
+                            puntaje = 0.7
                         else:
                             puntaje = 0
-                
+                    else:
+                        puntaje = 0
+
                 logger.info(f"  Archivo: '{nombre_archivo}', puntaje: {puntaje:.2f}")
                 
                 if puntaje > mejor_puntaje:
@@ -322,13 +342,17 @@ class TorrentProcessor:
                 
                 # Copiar archivo
                 try:
+                    # copy2 ya usa sendfile en Linux (sin pasar los datos por Python)
                     shutil.copy2(mejor_coincidencia, destino)
+                    if os.path.getsize(destino) != os.path.getsize(mejor_coincidencia):
+                        raise OSError(f"copia incompleta de '{mejor_coincidencia}'")
                     logger.info(f"Copiado: '{nombre_archivo}' a '{destino}' (puntaje: {mejor_puntaje:.2f})")
                     canciones_procesadas += 1
                     archivos_musica.remove(mejor_coincidencia)  # Eliminar de la lista para que no se use para otra canción
                     encontrado = True
                 except Exception as e:
                     logger.error(f"Error copiando '{mejor_coincidencia}': {e}")
+                    errores_copia += 1
             
             if not encontrado:
                 logger.warning(f"No se encontró archivo con suficiente similitud para la canción '{nombre_cancion}'")
@@ -336,7 +360,10 @@ class TorrentProcessor:
         logger.info(f"Procesamiento completado. {canciones_procesadas} canciones copiadas")
         
         # Si se procesaron canciones correctamente, eliminar la carpeta original
-        if canciones_procesadas > 0:
+        # (nunca si alguna copia falló: sería la única copia del archivo)
+        if errores_copia:
+            logger.warning(f"No se elimina '{ruta_completa}': {errores_copia} copias fallidas")
+        elif canciones_procesadas > 0:
             try:
                 logger.info(f"Eliminando carpeta de descarga original: {ruta_completa}")
                 shutil.rmtree(ruta_completa)
@@ -351,14 +378,43 @@ class RequestHandler(BaseHTTPRequestHandler):
     processed_count = 0
     max_torrents = 0
     shutdown_event = threading.Event()
+    executor = None             # Pool de PROCESS_WORKERS hilos, creado en run_server
+    en_proceso = set()          # Rutas en cola o procesándose (qBittorrent puede avisar dos veces)
+    lock = threading.Lock()
     
     @classmethod
     def increment_count(cls):
-        cls.processed_count += 1
+        with cls.lock:
+            cls.processed_count += 1
         logger.info(f"Torrents procesados: {cls.processed_count}/{cls.max_torrents if cls.max_torrents > 0 else 'ilimitado'}")
         if cls.max_torrents > 0 and cls.processed_count >= cls.max_torrents:
             logger.info("Se completaron todos los torrents solicitados. Preparando para cerrar servidor...")
             cls.shutdown_event.set()
+
+    @classmethod
+    def encolar_descarga(cls, album, ruta):
+        """Manda la descarga al pool. False si esa ruta ya está en cola"""
+        with cls.lock:
+            if ruta in cls.en_proceso:
+                return False
+            cls.en_proceso.add(ruta)
+        cls.executor.submit(cls.procesar_descarga, album, ruta)
+        return True
+
+    @classmethod
+    def procesar_descarga(cls, album, ruta):
+        try:
+            success = cls.processor.process_download(album, ruta)
+            if success:
+                logger.info(f"Procesamiento completado: '{ruta}'")
+            else:
+                logger.error(f"Error procesando la descarga '{ruta}'")
+        except Exception as e:
+            logger.error(f"Error procesando la descarga '{ruta}': {e}")
+        finally:
+            with cls.lock:
+                cls.en_proceso.discard(ruta)
+            cls.increment_count()
     
     def do_POST(self):
         logger.info(f"Recibida solicitud POST desde {self.client_address}")
@@ -432,18 +488,21 @@ class RequestHandler(BaseHTTPRequestHandler):
                 if album and ruta:
                     logger.info(f"Procesando con: Album '{album}', Ruta '{ruta}'")
                     
-                    if self.processor:
-                        success = self.processor.process_download(album, ruta)
-                        self.__class__.increment_count()
-                        
-                        if success:
-                            self.send_response(200)
-                            self.send_header('Content-type', 'text/plain')
-                            self.end_headers()
-                            self.wfile.write(b'Procesamiento completado')
-                            return
+                    if self.processor and self.executor:
+                        # Responder ya: el procesado (comparar, copiar, borrar) va en el pool
+                        # y qBittorrent no se queda esperando
+                        if self.__class__.encolar_descarga(album, ruta):
+                            mensaje = b'Descarga en cola'
+                        else:
+                            logger.info(f"La ruta '{ruta}' ya está en cola, se ignora el aviso repetido")
+                            mensaje = b'Descarga ya en cola'
+                        self.send_response(202)
+                        self.send_header('Content-type', 'text/plain')
+                        self.end_headers()
+                        self.wfile.write(mensaje)
+                        return
                     
-                    # Si llegamos aquí, el procesamiento falló
+                    # Si llegamos aquí, no hay procesador
                     self.send_response(500)
                     self.send_header('Content-type', 'text/plain')
                     self.end_headers()
@@ -491,9 +550,12 @@ def run_server(server_address, processor, num_canciones, num_torrents):
     RequestHandler.processed_count = 0
     RequestHandler.max_torrents = num_torrents  # Ahora recibe el parámetro correctamente
     RequestHandler.shutdown_event.clear()
+    RequestHandler.en_proceso = set()
+    RequestHandler.executor = ThreadPoolExecutor(max_workers=PROCESS_WORKERS)
     
     # Crear una subclase de HTTPServer que permita reutilizar la dirección
-    class ReuseAddrHTTPServer(HTTPServer):
+    # (con un hilo por petición para que varios avisos a la vez no esperen)
+    class ReuseAddrHTTPServer(ThreadingHTTPServer):
         allow_reuse_address = True
     
     httpd = ReuseAddrHTTPServer(server_address, RequestHandler)
@@ -523,9 +585,10 @@ def run_server(server_address, processor, num_canciones, num_torrents):
     except KeyboardInterrupt:
         logger.info("Recibida señal de interrupción. Cerrando servidor...")
     
-    # Cerrar el servidor
+    # Cerrar el servidor y esperar a las descargas en curso
     httpd.shutdown()
     httpd.server_close()
+    RequestHandler.executor.shutdown(wait=True)
     logger.info("Servidor cerrado correctamente")
 
 def load_config(config_file):
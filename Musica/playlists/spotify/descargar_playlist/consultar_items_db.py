@@ -1,16 +1,26 @@
-import sqlite3
+import sys
 import argparse
 import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from music_library import MusicLibrary, album_key, close, normalize_key
 
 class MusicDatabaseQuery:
     def __init__(self, db_path):
         """
         Inicializa la conexión con la base de datos
         
+        Las búsquedas por nombre usan las claves normalizadas de music_library
+        (sin mayúsculas, acentos ni puntuación), que tienen índice.
+        
         :param db_path: Ruta al archivo de base de datos SQLite
         """
-        self.conn = sqlite3.connect(db_path)
+        self.db_path = db_path
+        self.library = MusicLibrary(db_path)
+        self.conn = self.library.conn
         self.cursor = self.conn.cursor()
+        self.cursor.row_factory = None
 
     def get_mbid_by_album_artist(self, artist, album):
         """
@@ -23,9 +33,9 @@ class MusicDatabaseQuery:
         query = """
         SELECT albums.mbid FROM albums 
         JOIN artists ON albums.artist_id = artists.id 
-        WHERE LOWER(artists.name) = LOWER(?) AND LOWER(albums.name) = LOWER(?)
+        WHERE artists.name_key = ? AND albums.name_key = ?
         """
-        self.cursor.execute(query, (artist, album))
+        self.cursor.execute(query, (normalize_key(artist), album_key(album)))
         result = self.cursor.fetchone()
         return result[0] if result else None
 
@@ -39,9 +49,9 @@ class MusicDatabaseQuery:
         """
         query = """
         SELECT songs.mbid FROM songs 
-        WHERE LOWER(songs.album) = LOWER(?) AND LOWER(songs.title) = LOWER(?)
+        WHERE songs.album_key = ? AND songs.title_key = ?
         """
-        self.cursor.execute(query, (album, track))
+        self.cursor.execute(query, (album_key(album), normalize_key(track)))
         result = self.cursor.fetchone()
         return result[0] if result else None
 
@@ -62,9 +72,9 @@ class MusicDatabaseQuery:
             albums.wikipedia_url
         FROM albums 
         JOIN artists ON albums.artist_id = artists.id
-        WHERE LOWER(albums.name) = LOWER(?) AND LOWER(artists.name) = LOWER(?)
+        WHERE albums.name_key = ? AND artists.name_key = ?
         """
-        self.cursor.execute(query, (album, artist))
+        self.cursor.execute(query, (album_key(album), normalize_key(artist)))
         result = self.cursor.fetchone()
         
         if result:
@@ -81,7 +91,7 @@ class MusicDatabaseQuery:
     def get_track_links(self, album, track, services=None):
         """
         Obtiene los links de servicios para una canción de forma optimizada
-        - Usa índices en la tabla songs mediante subquery
+        - Usa el índice de claves de la tabla songs mediante subquery
         
         :param album: Nombre del álbum
         :param track: Nombre de la canción
@@ -97,12 +107,11 @@ class MusicDatabaseQuery:
         FROM song_links
         WHERE song_links.song_id IN (
             SELECT id FROM songs 
-            WHERE album LIKE ? COLLATE NOCASE 
-            AND title LIKE ? COLLATE NOCASE
+            WHERE title_key = ? AND album_key = ?
             LIMIT 1
         )
         """
-        self.cursor.execute(query, (album, track))
+        self.cursor.execute(query, (normalize_key(track), album_key(album)))
         result = self.cursor.fetchone()
         
         if result:
@@ -134,9 +143,9 @@ class MusicDatabaseQuery:
         SELECT albums.wikipedia_content 
         FROM albums 
         JOIN artists ON albums.artist_id = artists.id
-        WHERE LOWER(artists.name) = LOWER(?) AND LOWER(albums.name) = LOWER(?)
+        WHERE artists.name_key = ? AND albums.name_key = ?
         """
-        self.cursor.execute(query, (artist, album))
+        self.cursor.execute(query, (normalize_key(artist), album_key(album)))
         result = self.cursor.fetchone()
         return result[0] if result else None
 
@@ -147,15 +156,14 @@ class MusicDatabaseQuery:
         :param artist_name: Nombre del artista
         :return: MBID del artista o None si no se encuentra
         """
-        query = "SELECT mbid FROM artists WHERE LOWER(name) = LOWER(?)"
-        self.cursor.execute(query, (artist_name,))
+        query = "SELECT mbid FROM artists WHERE name_key = ?"
+        self.cursor.execute(query, (normalize_key(artist_name),))
         result = self.cursor.fetchone()
         return result[0] if result else None
 
     def get_artist_links(self, artist_name):
         """
         Obtiene los links de servicios para un artista usando índices (case insensitive)
-        - Optimizado para añadir LOWER() solo en la condición, no en la columna
         
         :param artist_name: Nombre del artista
         :return: Diccionario con links de servicios
@@ -168,10 +176,9 @@ class MusicDatabaseQuery:
             discogs_url, 
             rateyourmusic_url,
             wikipedia_url
-        FROM artists WHERE name LIKE ?
-        COLLATE NOCASE
+        FROM artists WHERE name_key = ?
         """
-        self.cursor.execute(query, (artist_name,))
+        self.cursor.execute(query, (normalize_key(artist_name),))
         result = self.cursor.fetchone()
         
         if result:
@@ -193,15 +200,15 @@ class MusicDatabaseQuery:
         :param artist_name: Nombre del artista
         :return: Contenido de Wikipedia o None
         """
-        query = "SELECT wikipedia_content FROM artists WHERE LOWER(name) = LOWER(?)"
-        self.cursor.execute(query, (artist_name,))
+        query = "SELECT wikipedia_content FROM artists WHERE name_key = ?"
+        self.cursor.execute(query, (normalize_key(artist_name),))
         result = self.cursor.fetchone()
         return result[0] if result else None
 
     def get_artist_albums(self, artist_name):
         """
         Obtiene los álbumes de un artista de forma optimizada
-        - Usa índices existentes con COLLATE NOCASE para mejor rendimiento
+        - Usa el índice de claves normalizadas de artists
         - Usa una subquery para obtener artist_id primero
         
         :param artist_name: Nombre del artista
@@ -211,11 +218,11 @@ class MusicDatabaseQuery:
         SELECT albums.name, albums.year, albums.genre 
         FROM albums 
         WHERE albums.artist_id = (
-            SELECT id FROM artists WHERE name LIKE ? COLLATE NOCASE LIMIT 1
+            SELECT id FROM artists WHERE name_key = ? LIMIT 1
         )
         ORDER BY albums.year DESC, albums.name
         """
-        self.cursor.execute(query, (artist_name,))
+        self.cursor.execute(query, (normalize_key(artist_name),))
         return self.cursor.fetchall()   
 
     def get_albums_by_label(self, label):
@@ -279,17 +286,17 @@ class MusicDatabaseQuery:
             SELECT lyrics.lyrics 
             FROM lyrics 
             JOIN songs ON lyrics.track_id = songs.id 
-            WHERE LOWER(songs.title) = LOWER(?) AND LOWER(songs.artist) = LOWER(?)
+            WHERE songs.title_key = ? AND songs.artist_key = ?
             """
-            self.cursor.execute(query, (song_title, artist_name))
+            self.cursor.execute(query, (normalize_key(song_title), normalize_key(artist_name)))
         else:
             query = """
             SELECT lyrics.lyrics 
             FROM lyrics 
             JOIN songs ON lyrics.track_id = songs.id 
-            WHERE LOWER(songs.title) = LOWER(?)
+            WHERE songs.title_key = ?
             """
-            self.cursor.execute(query, (song_title,))
+            self.cursor.execute(query, (normalize_key(song_title),))
         
         result = self.cursor.fetchone()
         return result[0] if result else None
@@ -304,9 +311,9 @@ class MusicDatabaseQuery:
         query = """
         SELECT DISTINCT genre 
         FROM songs 
-        WHERE LOWER(artist) = LOWER(?)
+        WHERE artist_key = ?
         """
-        self.cursor.execute(query, (artist_name,))
+        self.cursor.execute(query, (normalize_key(artist_name),))
         return [genre[0] for genre in self.cursor.fetchall() if genre[0]]
 
     def get_artist_info(self, artist_name):
@@ -338,9 +345,9 @@ class MusicDatabaseQuery:
             albums.album_art_path 
         FROM albums 
         JOIN artists ON albums.artist_id = artists.id 
-        WHERE LOWER(artists.name) = LOWER(?)
+        WHERE artists.name_key = ?
         """
-        self.cursor.execute(albums_query, (artist_name,))
+        self.cursor.execute(albums_query, (normalize_key(artist_name),))
         albums = []
         
         for album_row in self.cursor.fetchall():
@@ -361,9 +368,9 @@ class MusicDatabaseQuery:
             songs_query = """
             SELECT id, title, track_number, duration, file_path
             FROM songs 
-            WHERE LOWER(artist) = LOWER(?) AND LOWER(album) = LOWER(?)
+            WHERE artist_key = ? AND album_key = ?
             """
-            self.cursor.execute(songs_query, (artist_name, album['name']))
+            self.cursor.execute(songs_query, (normalize_key(artist_name), album_key(album['name'])))
             album['songs'] = [{
                 'id': song[0],
                 'title': song[1], 
@@ -380,9 +387,9 @@ class MusicDatabaseQuery:
         songs_query = """
         SELECT id, title, album, duration, file_path, album_art_path_denorm
         FROM songs 
-        WHERE LOWER(artist) = LOWER(?)
+        WHERE artist_key = ?
         """
-        self.cursor.execute(songs_query, (artist_name,))
+        self.cursor.execute(songs_query, (normalize_key(artist_name),))
         artist_info['songs'] = [{
             'id': song[0],
             'title': song[1], 
@@ -423,11 +430,11 @@ class MusicDatabaseQuery:
                 a.folder_path
             FROM albums a
             JOIN artists art ON a.artist_id = art.id 
-            WHERE a.name LIKE ? COLLATE NOCASE 
-            AND art.name LIKE ? COLLATE NOCASE
+            WHERE a.name_key = ?
+            AND art.name_key = ?
             LIMIT 1
             """
-            self.cursor.execute(album_query, (album_name, artist_name))
+            self.cursor.execute(album_query, (album_key(album_name), normalize_key(artist_name)))
         else:
             album_query = """
             SELECT 
@@ -442,10 +449,10 @@ class MusicDatabaseQuery:
                 a.folder_path
             FROM albums a
             JOIN artists art ON a.artist_id = art.id 
-            WHERE a.name LIKE ? COLLATE NOCASE
+            WHERE a.name_key = ?
             LIMIT 1
             """
-            self.cursor.execute(album_query, (album_name,))
+            self.cursor.execute(album_query, (album_key(album_name),))
         
         album_row = self.cursor.fetchone()
         
@@ -458,10 +465,10 @@ class MusicDatabaseQuery:
         songs_query = """
         SELECT id, title, track_number, duration, file_path, has_lyrics
         FROM songs 
-        WHERE album LIKE ? COLLATE NOCASE
+        WHERE album_key = ?
         ORDER BY track_number
         """
-        self.cursor.execute(songs_query, (album_name,))
+        self.cursor.execute(songs_query, (album_key(album_name),))
         album_info['songs'] = [{
             'id': song[0],
             'title': song[1], 
@@ -501,17 +508,17 @@ class MusicDatabaseQuery:
             songs.album_art_path_denorm,
             songs.has_lyrics
         FROM songs 
-        WHERE LOWER(songs.title) = LOWER(?)
+        WHERE songs.title_key = ?
         """
-        params.append(song_title)
+        params.append(normalize_key(song_title))
         
         if artist_name:
-            query += " AND LOWER(songs.artist) = LOWER(?)"
-            params.append(artist_name)
+            query += " AND songs.artist_key = ?"
+            params.append(normalize_key(artist_name))
         
         if album_name:
-            query += " AND LOWER(songs.album) = LOWER(?)"
-            params.append(album_name)
+            query += " AND songs.album_key = ?"
+            params.append(album_key(album_name))
         
         self.cursor.execute(query, params)
         song_row = self.cursor.fetchone()
@@ -573,61 +580,40 @@ class MusicDatabaseQuery:
         params = []
         
         if song:
-            query += " AND LOWER(title) = LOWER(?)"
-            params.append(song)
+            query += " AND title_key = ?"
+            params.append(normalize_key(song))
         
         if artist:
-            query += " AND LOWER(artist) = LOWER(?)"
-            params.append(artist)
+            query += " AND artist_key = ?"
+            params.append(normalize_key(artist))
         
         if album:
-            query += " AND LOWER(album) = LOWER(?)"
-            params.append(album)
+            query += " AND album_key = ?"
+            params.append(album_key(album))
         
         self.cursor.execute(query, params)
         result = self.cursor.fetchone()
         
         return result[0] if result else None
 
-    def search_lyrics(self, text):
+    def search_lyrics(self, text, limit=None):
         """
         Busca un texto dentro de las letras de canciones
+        - Usa el índice FTS5 de letras (frases "entre comillas" y prefijos con *)
+        - Resultados ordenados por relevancia, con el fragmento coincidente resaltado
         
         :param text: Texto a buscar en las letras
+        :param limit: Número máximo de resultados (opcional)
         :return: Lista de canciones que contienen el texto
         """
-        query = """
-        SELECT 
-            songs.artist,
-            songs.album,
-            songs.title,
-            albums.year,
-            lyrics.lyrics
-        FROM lyrics
-        JOIN songs ON lyrics.track_id = songs.id
-        LEFT JOIN albums ON LOWER(songs.album) = LOWER(albums.name)
-        AND albums.artist_id = (
-            SELECT id FROM artists WHERE LOWER(name) = LOWER(songs.artist) LIMIT 1
-        )
-        WHERE lyrics.lyrics LIKE ?
-        """
-        
-        # Usamos % para buscar el texto en cualquier parte de la letra
-        search_param = f'%{text}%'
-        self.cursor.execute(query, (search_param,))
-        
-        results = []
-        for row in self.cursor.fetchall():
-            result = {
-                'artist': row[0],
-                'album': row[1],
-                'title': row[2],
-                'year': row[3],
-                'lyrics': row[4]
-            }
-            results.append(result)
-        
-        return results
+        return [{
+            'artist': row['artist'],
+            'album': row['album'],
+            'title': row['title'],
+            'year': row['year'],
+            'snippet': row['snippet'],
+            'lyrics': row['lyrics']
+        } for row in self.library.search_lyrics(text, limit)]
 
 
 
@@ -635,7 +621,7 @@ class MusicDatabaseQuery:
         """
         Cierra la conexión con la base de datos
         """
-        self.conn.close()
+        close(self.db_path)
 
 def main():
     parser = argparse.ArgumentParser(description='Consultas a base de datos musical')
@@ -659,6 +645,7 @@ def main():
     parser.add_argument('--song-info', action='store_true', help='Obtener información completa de la canción')
     parser.add_argument('--path-existente', action='store_true', help='Verificar si existe un archivo y devolver su ruta')
     parser.add_argument('--letra-desconocida', help='Buscar texto en letras de canciones')
+    parser.add_argument('--limit', type=int, help='Máximo de resultados de --letra-desconocida')
 
     args = parser.parse_args()
 
@@ -730,7 +717,7 @@ def main():
                 print("Error: Se requiere al menos un parámetro de búsqueda (--song, --album o --artist)")
         
         elif args.letra_desconocida:
-            results = db.search_lyrics(args.letra_desconocida)
+            results = db.search_lyrics(args.letra_desconocida, args.limit)
             print(json.dumps(results))
         
         else:
@@ -15,6 +15,8 @@ import logging
 import glob
 from pathlib import Path
 
+from spotify_playlist_sync import PlaylistSyncEngine
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -70,7 +72,7 @@ class DiscogsSpotifySync:
         # Inicializar clientes
         self.discogs = discogs_client.Client('DiscogsSpotifySync/1.0', user_token=self.discogs_token)
 
-        scope = "playlist-modify-public playlist-modify-private"
+        scope = "playlist-modify-public playlist-modify-private playlist-read-private"
         self.spotify = spotipy.Spotify(
             auth_manager=SpotifyOAuth(
                 client_id=self.spotify_client_id,
@@ -80,6 +82,8 @@ class DiscogsSpotifySync:
             )
         )
 
+        self.playlist_sync = PlaylistSyncEngine(self.spotify, log=logger)
+
         logger.info("Clientes de Discogs y Spotify inicializados correctamente")
 
     def clear_spotify_cache(self):
@@ -291,38 +295,13 @@ class DiscogsSpotifySync:
         """Crea o actualiza una playlist en Spotify"""
         logger.info(f"Procesando playlist: {name}")
 
-        # Obtener usuario actual
-        user_id = self.spotify.current_user()['id']
-
-        # Buscar si la playlist ya existe
-        playlist_id = None
-        playlists = self.spotify.current_user_playlists()
-        for playlist in playlists['items']:
-            if playlist['name'] == name and playlist['owner']['id'] == user_id:
-                playlist_id = playlist['id']
-                logger.info(f"Playlist '{name}' encontrada, será actualizada")
-                break
-
-        # Crear playlist si no existe
-        if not playlist_id:
-            playlist = self.spotify.user_playlist_create(
-                user_id,
-                name,
-                public=False,
-                description=f"Generada automáticamente desde Discogs - {len(album_keys)} álbumes"
-            )
-            playlist_id = playlist['id']
-            logger.info(f"Playlist '{name}' creada")
-
-        # Limpiar playlist existente
-        self.spotify.user_playlist_replace_tracks(user_id, playlist_id, [])
-
         # Buscar álbumes en Spotify y recopilar todas las canciones
+        # (en orden fijo, para que entre ejecuciones solo cambien los álbumes nuevos o quitados)
         all_tracks = []
         found_albums = 0
         not_found = []
 
-        for i, album_key in enumerate(album_keys):
+        for i, album_key in enumerate(sorted(album_keys)):
             logger.info(f"Buscando álbum {i+1}/{len(album_keys)}: {album_key.replace('|', ' - ')}")
 
             track_uris = self.search_spotify_album(album_key)
@@ -335,15 +314,13 @@ class DiscogsSpotifySync:
 
             time.sleep(0.1)  # Rate limiting
 
-        # Añadir canciones a la playlist (Spotify permite máximo 100 por llamada)
-        if all_tracks:
-            for i in range(0, len(all_tracks), 100):
-                batch = all_tracks[i:i+100]
-                try:
-                    self.spotify.user_playlist_add_tracks(user_id, playlist_id, batch)
-                    logger.info(f"Añadidas {len(batch)} canciones a la playlist")
-                except Exception as e:
-                    logger.error(f"Error añadiendo batch de canciones: {e}")
+        # Aplicar solo las diferencias con la playlist actual (o crearla)
+        self.playlist_sync.sync(
+            name,
+            all_tracks,
+            description=f"Generada automáticamente desde Discogs - {len(album_keys)} álbumes",
+            public=False
+        )
 
         logger.info(f"Playlist '{name}' completada:")
         logger.info(f"  - Álbumes encontrados en Spotify: {found_albums}")
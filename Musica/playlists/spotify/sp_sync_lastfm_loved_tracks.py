@@ -14,6 +14,8 @@ from urllib.parse import quote
 import json
 from pathlib import Path
 
+from spotify_playlist_sync import PlaylistSyncEngine
+
 class LastFmSpotifySync:
     def __init__(self):
         # Configuración de rutas
@@ -52,6 +54,7 @@ class LastFmSpotifySync:
         # Inicializar Spotify
         self.sp = self._init_spotify()
         self.user_id = self.sp.me()['id']
+        self.playlist_sync = PlaylistSyncEngine(self.sp)
 
     def _init_spotify(self):
         """Inicializa la conexión con Spotify"""
@@ -139,43 +142,18 @@ class LastFmSpotifySync:
 
         return None
 
-    def find_existing_playlist(self):
-        """Busca si ya existe una playlist con el nombre especificado"""
-        playlists = self.sp.user_playlists(self.user_id)
-
-        for playlist in playlists['items']:
-            if playlist['name'] == self.playlist_name:
-                return playlist['id']
-
-        return None
-
     def create_or_update_playlist(self, spotify_uris):
-        """Crea una nueva playlist o actualiza una existente"""
-        playlist_id = self.find_existing_playlist()
-
-        if playlist_id:
-            print(f"📝 Actualizando playlist existente: {self.playlist_name}")
-
-            # Limpiar la playlist existente
-            self.sp.playlist_replace_items(playlist_id, [])
-
-        else:
-            print(f"🆕 Creando nueva playlist: {self.playlist_name}")
-
-            # Crear nueva playlist
-            playlist = self.sp.user_playlist_create(
-                self.user_id,
-                self.playlist_name,
-                description="Mis loved tracks de Last.fm sincronizados automáticamente"
-            )
-            playlist_id = playlist['id']
-
-        # Agregar canciones en lotes de 100 (límite de Spotify)
-        batch_size = 100
-        for i in range(0, len(spotify_uris), batch_size):
-            batch = spotify_uris[i:i + batch_size]
-            self.sp.playlist_add_items(playlist_id, batch)
-            print(f"➕ Agregadas {len(batch)} canciones a la playlist")
+        """Crea una nueva playlist o actualiza una existente aplicando solo los cambios"""
+        print(f"📝 Sincronizando playlist: {self.playlist_name}")
+
+        playlist_id = self.playlist_sync.sync(
+            self.playlist_name,
+            spotify_uris,
+            description="Mis loved tracks de Last.fm sincronizados automáticamente",
+            public=True
+        )
+        if not playlist_id:
+            raise RuntimeError(f"No se pudo sincronizar la playlist {self.playlist_name}")
 
         return playlist_id
 
@@ -7,31 +7,26 @@ Lee los metadatos de los archivos de audio directamente en lugar de parsear nomb
 
 import os
 import re
-import sqlite3
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv, dotenv_values
 from pathlib import Path
 import logging
-import time
 import json
 import hashlib
 import argparse
-from typing import List, Dict, Optional, Set
+from typing import List, Dict, Optional
 import sys
 from datetime import datetime
 
-# Importar mutagen para leer tags de audio
-try:
-    from mutagen import File as MutagenFile
-    from mutagen.easyid3 import EasyID3
-    from mutagen.mp3 import MP3
-    from mutagen.flac import FLAC
-    from mutagen.mp4 import MP4
-    from mutagen.oggvorbis import OggVorbis
-    MUTAGEN_AVAILABLE = True
-except ImportError:
-    MUTAGEN_AVAILABLE = False
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from music_library import MusicLibrary
+from spotify_playlist_sync import PlaylistSyncEngine
+from spotify_resolver import SpotifyResolver
+from tag_cache import TagCache, MUTAGEN_AVAILABLE
+
+# Los tags se leen con mutagen a través de tag_cache
+if not MUTAGEN_AVAILABLE:
     print("⚠️  ADVERTENCIA: mutagen no está instalado. Instálalo con: pip install mutagen")
     print("   Sin mutagen, el script intentará parsear nombres de archivo (menos preciso)")
 
@@ -76,6 +71,8 @@ class PlaylistSyncer:
             music_base_path: Ruta base donde están los archivos de música (para resolver rutas relativas en M3U)
         """
         self.db_path = db_path
+        self.library = MusicLibrary(db_path)
+        self.tag_cache = TagCache()
         self.interactive = interactive
         self.music_base_path = Path(music_base_path) if music_base_path else project_root
         self.sync_state_file = CACHE_DIR / "playlist_sync_state.json"
@@ -137,6 +134,12 @@ class PlaylistSyncer:
 
         self.sp = spotipy.Spotify(auth=token_info['access_token'])
 
+        # Validación por lotes y búsquedas en paralelo, con escritura en song_links
+        self.resolver = SpotifyResolver(self.sp, self.db_path, log=self.logger)
+        self.playlist_sync = PlaylistSyncEngine(
+            self.sp, CACHE_DIR / "spotify_playlist_snapshots.json", call=self.resolver.call, log=self.logger
+        )
+
         # Obtener información del usuario
         try:
             user = self.sp.current_user()
@@ -227,41 +230,26 @@ class PlaylistSyncer:
         if not MUTAGEN_AVAILABLE:
             return None
 
-        try:
-            audio = MutagenFile(file_path, easy=True)
-
-            if audio is None:
-                self.logger.debug(f"No se pudo leer metadata de: {file_path}")
-                return None
+        # Caché compartida por (ruta, tamaño, mtime): solo se abre el archivo si ha cambiado
+        tags = self.tag_cache.get(str(file_path))
+        if tags is None:
+            self.logger.debug(f"No se pudo leer metadata de: {file_path}")
+            return None
 
-            # Función helper para extraer primer valor de lista
-            def get_tag(tag_name):
-                value = audio.get(tag_name, [''])
-                if isinstance(value, list) and len(value) > 0:
-                    return str(value[0]).strip()
-                return str(value).strip() if value else ''
-
-            artist = get_tag('artist') or get_tag('albumartist')
-            title = get_tag('title')
-            album = get_tag('album')
-            year = get_tag('date') or get_tag('year')
-
-            # Solo devolver si al menos tenemos artista y título
-            if artist and title:
-                return {
-                    'artist': artist,
-                    'title': title,
-                    'album': album,
-                    'year': year,
-                    'file_path': str(file_path)
-                }
-            else:
-                self.logger.debug(f"Tags incompletos en: {file_path} (artist={artist}, title={title})")
-                return None
+        artist = tags['artist'] or tags['albumartist']
+        title = tags['title']
 
-        except Exception as e:
-            self.logger.debug(f"Error leyendo tags de {file_path}: {e}")
-            return None
+        # Solo devolver si al menos tenemos artista y título
+        if artist and title:
+            return {
+                'artist': artist,
+                'title': title,
+                'album': tags['album'],
+                'year': tags['year'],
+                'file_path': str(file_path)
+            }
+        self.logger.debug(f"Tags incompletos en: {file_path} (artist={artist}, title={title})")
+        return None
 
     def parse_m3u_file(self, m3u_path: str) -> List[Dict[str, str]]:
         """
@@ -274,6 +262,7 @@ class PlaylistSyncer:
 
         try:
             with open(m3u_path, 'r', encoding='utf-8') as file:
+                entries = []
                 for line in file:
                     line = line.strip()
                     if line and not line.startswith('#'):
@@ -288,24 +277,31 @@ class PlaylistSyncer:
                         if not file_path.exists():
                             file_path = self.music_base_path / line
 
-                        track_info = None
+                        entries.append((line, file_path))
+
+            # Leer en paralelo los tags que no estén ya en la caché
+            if MUTAGEN_AVAILABLE:
+                self.tag_cache.read_many(str(file_path) for _, file_path in entries)
 
-                        # MÉTODO 1: Intentar leer tags de metadatos (PREFERIDO)
-                        if file_path.exists() and MUTAGEN_AVAILABLE:
-                            track_info = self._read_audio_tags(file_path)
-                            if track_info:
-                                self.logger.debug(f"✓ Tags leídos: {track_info['artist']} - {track_info['title']}")
+            for line, file_path in entries:
+                track_info = None
 
-                        # MÉTODO 2: Fallback - parsear nombre de archivo
-                        if not track_info:
-                            track_info = self._parse_track_filename(line)
-                            if track_info:
-                                self.logger.debug(f"⚠ Parseado de filename: {track_info['artist']} - {track_info['title']}")
+                # MÉTODO 1: Intentar leer tags de metadatos (PREFERIDO)
+                if file_path.exists() and MUTAGEN_AVAILABLE:
+                    track_info = self._read_audio_tags(file_path)
+                    if track_info:
+                        self.logger.debug(f"✓ Tags leídos: {track_info['artist']} - {track_info['title']}")
 
-                        if track_info:
-                            tracks.append(track_info)
-                        else:
-                            self.logger.warning(f"❌ No se pudo extraer info de: {line}")
+                # MÉTODO 2: Fallback - parsear nombre de archivo
+                if not track_info:
+                    track_info = self._parse_track_filename(line)
+                    if track_info:
+                        self.logger.debug(f"⚠ Parseado de filename: {track_info['artist']} - {track_info['title']}")
+
+                if track_info:
+                    tracks.append(track_info)
+                else:
+                    self.logger.warning(f"❌ No se pudo extraer info de: {line}")
 
         except Exception as e:
             self.logger.error(f"Error leyendo archivo M3U {m3u_path}: {e}")
@@ -384,64 +380,13 @@ class PlaylistSyncer:
         return None
 
     def find_track_in_db(self, track_info: Dict[str, str]) -> Optional[Dict[str, any]]:
-        """Busca una canción en la base de datos local."""
+        """Busca una canción en la base de datos local (por claves normalizadas con índice)."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            query = """
-            SELECT s.*, a.name as artist_name, al.name as album_name
-            FROM songs s
-            LEFT JOIN artists a ON s.artist = a.name
-            LEFT JOIN albums al ON s.album = al.name
-            WHERE LOWER(s.artist) LIKE LOWER(?)
-            AND LOWER(s.title) LIKE LOWER(?)
-            ORDER BY
-                CASE
-                    WHEN LOWER(s.artist) = LOWER(?) AND LOWER(s.title) = LOWER(?) THEN 1
-                    ELSE 2
-                END
-            LIMIT 1
-            """
-
-            artist = track_info['artist'].strip()
-            title = track_info['title'].strip()
-
-            cursor.execute(query, (f"%{artist}%", f"%{title}%", artist, title))
-            result = cursor.fetchone()
-
-            if result:
-                return dict(result)
-
-            # Búsqueda FTS alternativa
-            try:
-                fts_query = """
-                SELECT s.*, a.name as artist_name, al.name as album_name
-                FROM song_fts
-                JOIN songs s ON song_fts.id = s.id
-                LEFT JOIN artists a ON s.artist = a.name
-                LEFT JOIN albums al ON s.album = al.name
-                WHERE song_fts MATCH ?
-                LIMIT 1
-                """
-                search_term = f'"{artist}" "{title}"'
-                cursor.execute(fts_query, (search_term,))
-                result = cursor.fetchone()
-
-                if result:
-                    return dict(result)
-            except:
-                pass
-
-            return None
-
+            return self.library.find_song(track_info['artist'].strip(), track_info['title'].strip(),
+                                          track_info.get('album'))
         except Exception as e:
             self.logger.error(f"Error buscando en DB: {e}")
             return None
-        finally:
-            if conn:
-                conn.close()
 
     def search_track_on_spotify(self, track_info: Dict[str, str], db_track: Optional[Dict] = None) -> Optional[str]:
         """Busca una canción en Spotify y retorna su URI."""
@@ -472,7 +417,7 @@ class PlaylistSyncer:
             search_queries = [q for q in search_queries if q]
 
             for query in search_queries:
-                results = self.sp.search(q=query, type='track', limit=10)
+                results = self.resolver.call(self.sp.search, q=query, type='track', limit=10)
 
                 if results['tracks']['items']:
                     best_match = self._find_best_match(results['tracks']['items'], artist, title, album)
@@ -487,6 +432,14 @@ class PlaylistSyncer:
             self.logger.error(f"Error buscando en Spotify: {e}")
             return None
 
+    def _link_matches(self, entry: Dict, track: Dict) -> bool:
+        """Comprueba si la canción de un enlace guardado corresponde a la entrada del M3U"""
+        source = entry['db_track'] or entry['track_info']
+        artist = self._clean_search_string(source.get('artist') or '')
+        title = self._clean_search_string(source.get('title') or '')
+        album = self._clean_search_string(source.get('album') or '')
+        return self._find_best_match([track], artist, title, album) is not None
+
     def _clean_search_string(self, text: str) -> str:
         """Limpia strings para mejorar las búsquedas en Spotify."""
         text = re.sub(r'\([^)]*\)', '', text)
@@ -520,122 +473,21 @@ class PlaylistSyncer:
 
         return best_track if best_score >= 3 else None
 
-    def get_spotify_playlist_tracks(self, playlist_id: str) -> Set[str]:
-        """Obtiene todas las canciones de una playlist de Spotify."""
-        try:
-            tracks = set()
-            results = self.sp.playlist_tracks(playlist_id)
-
-            while results:
-                for item in results['items']:
-                    if item['track'] and item['track']['uri']:
-                        tracks.add(item['track']['uri'])
-
-                if results['next']:
-                    results = self.sp.next(results)
-                else:
-                    break
-
-            return tracks
-        except Exception as e:
-            self.logger.error(f"Error obteniendo canciones de playlist {playlist_id}: {e}")
-            return set()
-
-    def sync_playlist_incremental(self, playlist_name: str, new_track_uris: Set[str], existing_playlist_id: Optional[str] = None) -> Optional[str]:
+    def sync_playlist_incremental(self, playlist_name: str, new_track_uris: List[str], existing_playlist_id: Optional[str] = None) -> Optional[str]:
         """
         Sincroniza una playlist de forma incremental.
-        Añade solo las canciones nuevas y elimina las que ya no existen.
+        Añade solo las canciones nuevas y elimina las que ya no existen; si el
+        snapshot de Spotify no ha cambiado no descarga la playlist.
         """
-        try:
-            # Buscar playlist existente si no se proporciona ID
-            if not existing_playlist_id:
-                results = self.sp.current_user_playlists()
-                for playlist in results['items']:
-                    if playlist['name'] == playlist_name:
-                        existing_playlist_id = playlist['id']
-                        self.logger.info(f"Playlist existente encontrada: {playlist_name}")
-                        break
-
-            # Si no existe, crear nueva
-            if not existing_playlist_id:
-                new_playlist = self.sp.user_playlist_create(
-                    self.user_id,
-                    playlist_name,
-                    public=True,
-                    description=f"Sincronizada automáticamente desde M3U | {len(new_track_uris)} canciones"
-                )
-                existing_playlist_id = new_playlist['id']
-                self.logger.info(f"Nueva playlist creada: {playlist_name}")
-
-                # Añadir todas las canciones en batches
-                track_list = list(new_track_uris)
-                batch_size = 100
-                for i in range(0, len(track_list), batch_size):
-                    batch = track_list[i:i + batch_size]
-                    self.sp.playlist_add_items(existing_playlist_id, batch)
-                    time.sleep(0.1)
-
-                self.logger.info(f"Añadidas {len(new_track_uris)} canciones a la nueva playlist")
-                return existing_playlist_id
-
-            # Sincronización incremental para playlist existente
-            current_spotify_tracks = self.get_spotify_playlist_tracks(existing_playlist_id)
-
-            # Calcular diferencias
-            tracks_to_add = new_track_uris - current_spotify_tracks
-            tracks_to_remove = current_spotify_tracks - new_track_uris
-
-            changes_made = False
-
-            # Eliminar canciones que ya no están
-            if tracks_to_remove:
-                try:
-                    # Spotify requiere formato específico para eliminar
-                    remove_list = [{"uri": uri} for uri in tracks_to_remove]
-                    batch_size = 100
-                    for i in range(0, len(remove_list), batch_size):
-                        batch = remove_list[i:i + batch_size]
-                        self.sp.playlist_remove_all_occurrences_of_items(existing_playlist_id, [item["uri"] for item in batch])
-                        time.sleep(0.1)
-
-                    self.logger.info(f"Eliminadas {len(tracks_to_remove)} canciones")
-                    changes_made = True
-                except Exception as e:
-                    self.logger.error(f"Error eliminando canciones: {e}")
-
-            # Añadir canciones nuevas
-            if tracks_to_add:
-                try:
-                    track_list = list(tracks_to_add)
-                    batch_size = 100
-                    for i in range(0, len(track_list), batch_size):
-                        batch = track_list[i:i + batch_size]
-                        self.sp.playlist_add_items(existing_playlist_id, batch)
-                        time.sleep(0.1)
-
-                    self.logger.info(f"Añadidas {len(tracks_to_add)} canciones nuevas")
-                    changes_made = True
-                except Exception as e:
-                    self.logger.error(f"Error añadiendo canciones: {e}")
-
-            # Actualizar descripción
-            if changes_made or not current_spotify_tracks:
-                try:
-                    description = f"Sincronizada automáticamente | {len(new_track_uris)} canciones | Última sync: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-                    self.sp.playlist_change_details(existing_playlist_id, description=description)
-                except Exception as e:
-                    self.logger.warning(f"Error actualizando descripción: {e}")
-
-            if not changes_made and current_spotify_tracks:
-                self.logger.info("No hay cambios que sincronizar")
-            else:
-                self.logger.info(f"Sincronización incremental completada: +{len(tracks_to_add)} -{len(tracks_to_remove)}")
-
-            return existing_playlist_id
-
-        except Exception as e:
-            self.logger.error(f"Error en sincronización incremental: {e}")
-            return None
+        description = f"Sincronizada automáticamente | {len(new_track_uris)} canciones | Última sync: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        return self.playlist_sync.sync(
+            playlist_name,
+            new_track_uris,
+            description=description,
+            public=True,
+            keep_order=False,
+            playlist_id=existing_playlist_id
+        )
 
     def sync_m3u_to_spotify(self, m3u_path: str, playlist_name: Optional[str] = None, force_full_sync: bool = False) -> bool:
         """
@@ -663,26 +515,28 @@ class PlaylistSyncer:
         tracks = self.parse_m3u_file(m3u_path)
         self.logger.info(f"Encontradas {len(tracks)} canciones en el archivo M3U")
 
-        # Buscar canciones en Spotify
-        spotify_uris = set()
-        not_found = []
-
+        # Buscar en base de datos local (el id permite reutilizar y guardar enlaces de song_links)
+        entries = []
         for i, track_info in enumerate(tracks, 1):
             if self.interactive:
                 self.logger.info(f"Procesando {i}/{len(tracks)}: {track_info['artist']} - {track_info['title']}")
-
-            # Buscar en base de datos local
             db_track = self.find_track_in_db(track_info)
+            entries.append({
+                'id': db_track.get('id') if db_track else None,
+                'track_info': track_info,
+                'db_track': db_track
+            })
+
+        # Buscar en Spotify: enlaces guardados, validación por lotes y búsquedas en paralelo
+        uris = self.resolver.resolve(
+            entries,
+            lambda entry: self.search_track_on_spotify(entry['track_info'], entry['db_track']),
+            self._link_matches
+        )
 
-            # Buscar en Spotify
-            spotify_uri = self.search_track_on_spotify(track_info, db_track)
-
-            if spotify_uri:
-                spotify_uris.add(spotify_uri)
-            else:
-                not_found.append(f"{track_info['artist']} - {track_info['title']}")
-
-            time.sleep(0.1)  # Rate limiting
+        spotify_uris = list(dict.fromkeys(uri for uri in uris if uri))
+        not_found = [f"{entry['track_info']['artist']} - {entry['track_info']['title']}"
+                     for entry, uri in zip(entries, uris) if not uri]
 
         # Sincronizar con Spotify
         if spotify_uris or force_full_sync:
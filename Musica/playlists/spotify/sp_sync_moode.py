@@ -5,11 +5,9 @@ Script para crear una playlist de Spotify con toda la música de una base de dat
 
 import os
 import sys
-import sqlite3
 from dotenv import load_dotenv, dotenv_values
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
-import time
 from typing import List, Dict, Optional, Tuple
 import logging
 import glob
@@ -19,6 +17,11 @@ import unicodedata
 import re
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from music_library import close, connect
+from spotify_playlist_sync import PlaylistSyncEngine
+from spotify_resolver import SpotifyResolver
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -69,11 +72,10 @@ class SQLiteSpotifyPlaylist:
             raise FileNotFoundError(f"No se encontró la base de datos en: {db_path}")
 
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row  # Para acceder a columnas por nombre
+        self.conn = connect(db_path)  # Conexión compartida, filas accesibles por nombre
 
         # Inicializar cliente de Spotify
-        scope = "playlist-modify-public playlist-modify-private"
+        scope = "playlist-modify-public playlist-modify-private playlist-read-private"
         self.spotify = spotipy.Spotify(
             auth_manager=SpotifyOAuth(
                 client_id=self.spotify_client_id,
@@ -83,6 +85,10 @@ class SQLiteSpotifyPlaylist:
             )
         )
 
+        # Validación por lotes y búsquedas en paralelo, con escritura en song_links
+        self.resolver = SpotifyResolver(self.spotify, db_path, log=logger)
+        self.playlist_sync = PlaylistSyncEngine(self.spotify, call=self.resolver.call, log=logger)
+
         logger.info("Cliente de Spotify inicializado correctamente")
         logger.info(f"Conectado a la base de datos: {db_path}")
 
@@ -170,7 +176,9 @@ class SQLiteSpotifyPlaylist:
             albums_cols = [row[1] for row in cursor.fetchall()]
             logger.debug(f"Columnas en albums: {albums_cols}")
 
-            # Construir query adaptativa basada en las columnas disponibles
+            # Construir query adaptativa basada en las columnas disponibles.
+            # Álbum y artista se enlazan por las claves normalizadas de music_library
+            # (una consulta por índice por canción); el álbum del mismo artista tiene preferencia
             if has_song_links and 'spotify_url' in song_links_cols:
                 query = """
                     SELECT
@@ -182,7 +190,7 @@ class SQLiteSpotifyPlaylist:
                         s.date as year,
                         s.duration,
                         s.origen,
-                        a.name as album_artist_name,
+                        ar.name as album_artist_name,
                         -- Enlaces de Spotify de la canción
                         sl.spotify_url as song_spotify_url,
                         sl.spotify_id as song_spotify_id,
@@ -192,8 +200,12 @@ class SQLiteSpotifyPlaylist:
                         -- Enlaces de Spotify del artista
                         ar.spotify_url as artist_spotify_url
                     FROM songs s
-                    LEFT JOIN albums al ON s.album = al.name
-                    LEFT JOIN artists ar ON al.artist_id = ar.id OR s.artist = ar.name
+                    LEFT JOIN artists sa ON sa.id = (SELECT id FROM artists WHERE name_key = s.artist_key LIMIT 1)
+                    LEFT JOIN albums al ON al.id = COALESCE(
+                        (SELECT id FROM albums WHERE artist_id = sa.id AND name_key = s.album_key LIMIT 1),
+                        (SELECT id FROM albums WHERE name_key = s.album_key LIMIT 1)
+                    )
+                    LEFT JOIN artists ar ON ar.id = COALESCE(al.artist_id, sa.id)
                     LEFT JOIN song_links sl ON s.id = sl.song_id
                     WHERE s.title IS NOT NULL
                     AND s.artist IS NOT NULL
@@ -213,15 +225,19 @@ class SQLiteSpotifyPlaylist:
                         s.date as year,
                         s.duration,
                         s.origen,
-                        a.name as album_artist_name,
+                        ar.name as album_artist_name,
                         -- Solo enlaces del álbum si existen
                         al.spotify_url as album_spotify_url,
                         al.spotify_id as album_spotify_id,
                         -- Solo enlaces del artista si existen
                         ar.spotify_url as artist_spotify_url
                     FROM songs s
-                    LEFT JOIN albums al ON s.album = al.name
-                    LEFT JOIN artists ar ON al.artist_id = ar.id OR s.artist = ar.name
+                    LEFT JOIN artists sa ON sa.id = (SELECT id FROM artists WHERE name_key = s.artist_key LIMIT 1)
+                    LEFT JOIN albums al ON al.id = COALESCE(
+                        (SELECT id FROM albums WHERE artist_id = sa.id AND name_key = s.album_key LIMIT 1),
+                        (SELECT id FROM albums WHERE name_key = s.album_key LIMIT 1)
+                    )
+                    LEFT JOIN artists ar ON ar.id = COALESCE(al.artist_id, sa.id)
                     WHERE s.title IS NOT NULL
                     AND s.artist IS NOT NULL
                     AND s.title != ''
@@ -252,6 +268,7 @@ class SQLiteSpotifyPlaylist:
             artists_with_spotify_links = 0
 
             for row in results:
+                row = dict(row)
                 song = {
                     'id': row['id'],
                     'title': row['title'],
@@ -324,6 +341,7 @@ class SQLiteSpotifyPlaylist:
         return text
 
 
+    @staticmethod
     def extract_spotify_track_id(url_or_id: str) -> Optional[str]:
         """
         Extrae el track ID de una URL o ID de Spotify
@@ -366,6 +384,7 @@ class SQLiteSpotifyPlaylist:
         return None
 
 
+    @staticmethod
     def extract_spotify_album_id(url_or_id: str) -> Optional[str]:
         """
         Extrae el album ID de una URL o ID de Spotify
@@ -397,6 +416,7 @@ class SQLiteSpotifyPlaylist:
 
         return None
 
+    @staticmethod
     def extract_spotify_artist_id(url_or_id: str) -> Optional[str]:
         """
         Extrae el artist ID de una URL o ID de Spotify
@@ -428,6 +448,7 @@ class SQLiteSpotifyPlaylist:
 
         return None
 
+    @staticmethod
     def create_spotify_track_uri(track_id: str) -> str:
         """
         Crea un URI de track de Spotify a partir de un ID
@@ -440,6 +461,7 @@ class SQLiteSpotifyPlaylist:
         """
         return f"spotify:track:{track_id}"
 
+    @staticmethod
     def create_spotify_album_uri(album_id: str) -> str:
         """
         Crea un URI de álbum de Spotify a partir de un ID
@@ -452,6 +474,7 @@ class SQLiteSpotifyPlaylist:
         """
         return f"spotify:album:{album_id}"
 
+    @staticmethod
     def create_spotify_artist_uri(artist_id: str) -> str:
         """
         Crea un URI de artista de Spotify a partir de un ID
@@ -464,6 +487,7 @@ class SQLiteSpotifyPlaylist:
         """
         return f"spotify:artist:{artist_id}"
 
+    @staticmethod
     def validate_spotify_id(spotify_id: str) -> bool:
         """
         Valida si un string es un ID válido de Spotify
@@ -479,6 +503,7 @@ class SQLiteSpotifyPlaylist:
 
         return bool(re.match(r'^[0-9A-Za-z]{22}$', spotify_id))
 
+    @staticmethod
     def detect_spotify_entity_type(url_or_uri: str) -> Optional[str]:
         """
         Detecta el tipo de entidad de Spotify (track, album, artist) de una URL o URI
@@ -503,6 +528,7 @@ class SQLiteSpotifyPlaylist:
         return None
 
     # Función principal para extraer cualquier ID de Spotify
+    @staticmethod
     def extract_spotify_id(url_or_id: str) -> Optional[tuple[str, str]]:
         """
         Extrae ID y tipo de una URL/URI de Spotify
@@ -520,16 +546,16 @@ class SQLiteSpotifyPlaylist:
         if not url_or_id:
             return None
 
-        entity_type = detect_spotify_entity_type(url_or_id)
+        entity_type = SQLiteSpotifyPlaylist.detect_spotify_entity_type(url_or_id)
 
         if entity_type == 'track':
-            track_id = extract_spotify_track_id(url_or_id)
+            track_id = SQLiteSpotifyPlaylist.extract_spotify_track_id(url_or_id)
             return (track_id, 'track') if track_id else None
         elif entity_type == 'album':
-            album_id = extract_spotify_album_id(url_or_id)
+            album_id = SQLiteSpotifyPlaylist.extract_spotify_album_id(url_or_id)
             return (album_id, 'album') if album_id else None
         elif entity_type == 'artist':
-            artist_id = extract_spotify_artist_id(url_or_id)
+            artist_id = SQLiteSpotifyPlaylist.extract_spotify_artist_id(url_or_id)
             return (artist_id, 'artist') if artist_id else None
 
         return None
@@ -539,12 +565,12 @@ class SQLiteSpotifyPlaylist:
     def get_tracks_from_spotify_album(self, album_spotify_id: str, target_song: Dict) -> Optional[str]:
         """Busca una canción específica dentro de un álbum de Spotify"""
         try:
-            album_id = self.extract_spotify_track_id(album_spotify_id)
+            album_id = self.extract_spotify_album_id(album_spotify_id)
             if not album_id:
                 return None
 
             # Obtener todas las canciones del álbum
-            tracks = self.spotify.album_tracks(album_id, limit=50)
+            tracks = self.resolver.call(self.spotify.album_tracks, album_id, limit=50)
 
             for track in tracks['items']:
                 if self.validate_spotify_match(target_song, track):
@@ -559,29 +585,11 @@ class SQLiteSpotifyPlaylist:
             return None
 
     def get_spotify_track_uri(self, song: Dict) -> Optional[str]:
-        """Obtiene el URI de Spotify de una canción, priorizando enlaces existentes"""
-
-        # 1. PRIORIDAD MÁXIMA: Enlace directo de la canción
-        if song.get('song_spotify_url') or song.get('song_spotify_id'):
-            spotify_track_id = self.extract_spotify_track_id(
-                song.get('song_spotify_url') or song.get('song_spotify_id')
-            )
-            if spotify_track_id:
-                track_uri = f"spotify:track:{spotify_track_id}"
-                logger.debug(f"🔗 Usando enlace directo de canción: {song['artist']} - {song['title']}")
-
-                # Opcional: Validar que el enlace sigue siendo válido
-                try:
-                    track_info = self.spotify.track(spotify_track_id)
-                    if self.validate_spotify_match(song, track_info):
-                        return track_uri
-                    else:
-                        logger.warning(f"⚠️ El enlace directo no coincide con la canción: {song['artist']} - {song['title']}")
-                except Exception as e:
-                    logger.warning(f"⚠️ Error validando enlace directo: {e}")
-                    # Continuar con otros métodos
-
-        # 2. SEGUNDA PRIORIDAD: Buscar en el álbum si tenemos enlace del álbum
+        """
+        Busca el URI de Spotify de una canción sin enlace directo válido.
+        Los enlaces de song_links ya los ha validado en lotes SpotifyResolver.
+        """
+        # 1. Buscar en el álbum si tenemos enlace del álbum
         if song.get('album_spotify_url') or song.get('album_spotify_id'):
             album_link = song.get('album_spotify_url') or song.get('album_spotify_id')
             track_uri = self.get_tracks_from_spotify_album(album_link, song)
@@ -589,9 +597,11 @@ class SQLiteSpotifyPlaylist:
                 logger.debug(f"📀 Encontrado en álbum conocido: {song['artist']} - {song['title']}")
                 return track_uri
 
-        # 3. ÚLTIMA OPCIÓN: Búsqueda por texto en Spotify
+        # 2. ÚLTIMA OPCIÓN: Búsqueda por texto en Spotify
         logger.debug(f"🔍 Buscando por texto: {song['artist']} - {song['title']}")
         return self.search_spotify_track(song)
+
+    def texts_match(self, text1: str, text2: str, similarity_threshold: float = 0.8) -> bool:
         """Comprueba si dos textos son lo suficientemente similares"""
         norm1 = self.normalize_text(text1)
         norm2 = self.normalize_text(text2)
@@ -669,6 +679,8 @@ class SQLiteSpotifyPlaylist:
         except Exception as e:
             logger.debug(f"Error validando coincidencia: {e}")
             return False
+
+    def search_spotify_track(self, song: Dict) -> Optional[str]:
         """Busca una canción en Spotify y retorna su URI"""
         try:
             # Construir query de búsqueda
@@ -689,7 +701,7 @@ class SQLiteSpotifyPlaylist:
 
             for query in search_queries:
                 try:
-                    results = self.spotify.search(q=query, type='track', limit=1)
+                    results = self.resolver.call(self.spotify.search, q=query, type='track', limit=1)
                     if results['tracks']['items']:
                         track = results['tracks']['items'][0]
                         logger.debug(f"Encontrado: {artist} - {title} -> {track['artists'][0]['name']} - {track['name']}")
@@ -704,76 +716,21 @@ class SQLiteSpotifyPlaylist:
             logger.warning(f"Error buscando '{song['artist']} - {song['title']}': {e}")
             return None
 
-    def create_playlist(self, name: str, songs: List[Dict], batch_size: int = 1000) -> bool:
-        """Crea una playlist de Spotify con las canciones proporcionadas"""
+    def create_playlist(self, name: str, songs: List[Dict]) -> bool:
+        """Crea o actualiza una playlist de Spotify con las canciones proporcionadas"""
         try:
-            # Obtener usuario actual
-            user_id = self.spotify.current_user()['id']
-            logger.info(f"Usuario de Spotify: {user_id}")
-
-            # Buscar si la playlist ya existe
-            playlist_id = None
-            playlists = self.spotify.current_user_playlists(limit=50)
-
-            while playlists:
-                for playlist in playlists['items']:
-                    if playlist['name'] == name and playlist['owner']['id'] == user_id:
-                        playlist_id = playlist['id']
-                        logger.info(f"Playlist '{name}' encontrada, será actualizada")
-                        break
-
-                if playlist_id or not playlists['next']:
-                    break
-
-                playlists = self.spotify.next(playlists)
-
-            # Crear playlist si no existe
-            if not playlist_id:
-                description = f"Mi biblioteca musical completa - {len(songs)} canciones - Generada el {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-                playlist = self.spotify.user_playlist_create(
-                    user_id,
-                    name,
-                    public=False,
-                    description=description
-                )
-                playlist_id = playlist['id']
-                logger.info(f"Playlist '{name}' creada")
-            else:
-                # Limpiar playlist existente
-                self.spotify.user_playlist_replace_tracks(user_id, playlist_id, [])
-                logger.info(f"Playlist '{name}' limpiada")
-
-            # Procesar canciones en lotes
-            found_tracks = []
-            not_found = []
-            total_songs = len(songs)
-
-            for i, song in enumerate(songs, 1):
-                if i % 100 == 0 or i == total_songs:
-                    logger.info(f"Procesando canción {i}/{total_songs}: {song['artist']} - {song['title']}")
-
-                spotify_uri = self.search_spotify_track(song)
-                if spotify_uri:
-                    found_tracks.append(spotify_uri)
-                else:
-                    not_found.append(f"{song['artist']} - {song['title']}")
+            # Resolver todas las canciones: enlaces guardados, validación por lotes y búsquedas en paralelo
+            logger.info(f"Resolviendo {len(songs)} canciones en Spotify...")
+            uris = self.resolver.resolve(songs, self.get_spotify_track_uri, self.validate_spotify_match)
 
-                # Rate limiting
-                time.sleep(0.1)
+            found_tracks = [uri for uri in uris if uri]
+            not_found = [f"{song['artist']} - {song['title']}" for song, uri in zip(songs, uris) if not uri]
 
-                # Procesar en lotes para evitar memory issues
-                if len(found_tracks) >= batch_size:
-                    self._add_tracks_to_playlist(user_id, playlist_id, found_tracks)
-                    found_tracks = []
-
-            # Añadir últimos tracks si quedan
-            if found_tracks:
-                self._add_tracks_to_playlist(user_id, playlist_id, found_tracks)
-
-            # Actualizar descripción con estadísticas
+            # Aplicar solo las diferencias con la playlist actual (o crearla)
             total_found = len(songs) - len(not_found)
-            new_description = f"Mi biblioteca musical - {total_found} canciones encontradas de {len(songs)} totales - Actualizada el {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            self.spotify.user_playlist_change_details(playlist_id, description=new_description)
+            description = f"Mi biblioteca musical - {total_found} canciones encontradas de {len(songs)} totales - Actualizada el {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+            if not self.playlist_sync.sync(name, found_tracks, description=description, public=False):
+                return False
 
             # Mostrar estadísticas
             logger.info(f"✅ Playlist '{name}' completada:")
@@ -795,16 +752,6 @@ class SQLiteSpotifyPlaylist:
             logger.error(f"Error creando playlist: {e}")
             return False
 
-    def _add_tracks_to_playlist(self, user_id: str, playlist_id: str, track_uris: List[str]):
-        """Añade tracks a la playlist en lotes de 100 (límite de Spotify)"""
-        for i in range(0, len(track_uris), 100):
-            batch = track_uris[i:i+100]
-            try:
-                self.spotify.user_playlist_add_tracks(user_id, playlist_id, batch)
-                logger.debug(f"Añadidas {len(batch)} canciones a la playlist")
-            except Exception as e:
-                logger.error(f"Error añadiendo lote de canciones: {e}")
-
     def get_available_origenes(self) -> List[str]:
         """Obtiene los valores únicos de 'origen' disponibles en la BD"""
         try:
@@ -819,7 +766,8 @@ class SQLiteSpotifyPlaylist:
     def close(self):
         """Cierra la conexión a la base de datos"""
         if self.conn:
-            self.conn.close()
+            close(self.db_path)
+            self.conn = None
 
 def main():
     """Función principal"""
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Sincronización incremental de playlists de Spotify compartida por los scripts
+sp_sync_*.py (mixxx, moode, lastfm_loved_tracks, discogs).
+
+Guarda en local el snapshot_id y la lista de canciones de cada playlist. Un
+solo listado paginado de las playlists del usuario trae el snapshot_id de
+todas: si coincide con el guardado no hace falta descargar sus canciones, y si
+además la lista deseada es la misma no se hace ninguna petición más.
+
+Los cambios se aplican con las operaciones mínimas, en lotes de 100:
+eliminar posiciones concretas, añadir las nuevas al final y reordenar solo
+las canciones fuera de la subsecuencia creciente más larga. Si reordenar
+costase más peticiones que reescribir la playlist, se reescribe.
+"""
+
+import json
+import logging
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BATCH_SIZE = 100    # Máximo de canciones por petición de Spotify
+
+DEFAULT_CACHE_FILE = Path(__file__).parent.absolute().parent / ".content/cache/spotify_playlist_snapshots.json"
+
+logger = logging.getLogger(__name__)
+
+
+def _batches(items: List, size: int = BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _longest_increasing(sequence: List[int]) -> set:
+    """Índices de una subsecuencia creciente más larga (O(n log n))"""
+    tails, tail_index = [], []
+    previous = [-1] * len(sequence)
+    for i, value in enumerate(sequence):
+        pos = bisect_left(tails, value)
+        if pos == len(tails):
+            tails.append(value)
+            tail_index.append(i)
+        else:
+            tails[pos] = value
+            tail_index[pos] = i
+        previous[i] = tail_index[pos - 1] if pos else -1
+
+    result = set()
+    i = tail_index[-1] if tail_index else -1
+    while i != -1:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
+def plan_moves(current: List[str], desired: List[str]) -> List[tuple]:
+    """
+    Movimientos (range_start, insert_before) que convierten current en desired
+    (mismas canciones, sin repetidos), con la semántica de playlist_reorder_items.
+    """
+    target = {uri: i for i, uri in enumerate(desired)}
+    keep = {current[i] for i in _longest_increasing([target[uri] for uri in current])}
+
+    items = list(current)
+    moves = []
+    for i, uri in enumerate(desired):
+        if uri in keep:
+            continue
+        start = items.index(uri)
+        insert_before = items.index(desired[i - 1]) + 1 if i else 0
+        moves.append((start, insert_before))
+        items.pop(start)
+        items.insert(insert_before if insert_before < start else insert_before - 1, uri)
+        keep.add(uri)
+    return moves
+
+
+class PlaylistSyncEngine:
+    """
+    Mantiene playlists de Spotify iguales a una lista de URIs transfiriendo solo las diferencias.
+
+    Args:
+        sp: cliente spotipy autenticado
+        cache_file: JSON con snapshot_id y canciones de cada playlist
+        call: envoltorio opcional para las peticiones (p.ej. SpotifyResolver.call)
+    """
+
+    def __init__(self, sp, cache_file: Optional[Path] = None, call: Optional[Callable] = None,
+                 log: Optional[logging.Logger] = None):
+        self.sp = sp
+        self.cache_file = Path(cache_file or DEFAULT_CACHE_FILE)
+        self.call = call or (lambda method, *args, **kwargs: method(*args, **kwargs))
+        self.logger = log or logger
+
+        self.state = self._load_state()
+        self._user_id = None
+        self._remote = None     # id -> {'name', 'snapshot_id', 'owner'} del listado actual
+
+    # ---------- Estado local ----------
+
+    def _load_state(self) -> Dict:
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                self.logger.warning(f"Error cargando snapshots de playlists: {e}")
+        return {}
+
+    def _save_state(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, separators=(',', ':'), ensure_ascii=False)
+        except Exception as e:
+            self.logger.error(f"Error guardando snapshots de playlists: {e}")
+
+    # ---------- Lecturas ----------
+
+    @property
+    def user_id(self) -> str:
+        if self._user_id is None:
+            self._user_id = self.call(self.sp.current_user)['id']
+        return self._user_id
+
+    def remote_playlists(self) -> Dict[str, Dict]:
+        """Playlists del usuario con su snapshot_id (un único listado paginado por ejecución)"""
+        if self._remote is None:
+            self._remote = {}
+            page = self.call(self.sp.current_user_playlists, limit=50)
+            while page:
+                for playlist in page['items']:
+                    if playlist:
+                        self._remote[playlist['id']] = {
+                            'name': playlist['name'],
+                            'snapshot_id': playlist.get('snapshot_id'),
+                            'owner': playlist.get('owner', {}).get('id')
+                        }
+                page = self.call(self.sp.next, page) if page.get('next') else None
+        return self._remote
+
+    def find_playlist(self, name: str, playlist_id: Optional[str] = None) -> Optional[str]:
+        """Id de la playlist propia con ese nombre (o playlist_id si sigue existiendo)"""
+        remote = self.remote_playlists()
+        if playlist_id and playlist_id in remote:
+            return playlist_id
+        cached_id = self.state.get(name, {}).get('id')
+        if cached_id in remote:
+            return cached_id
+        for pid, info in remote.items():
+            if info['name'] == name and info['owner'] == self.user_id:
+                return pid
+        return None
+
+    def _fetch_tracks(self, playlist_id: str) -> List[str]:
+        uris = []
+        page = self.call(self.sp.playlist_items, playlist_id,
+                         fields='items(track(uri)),next', limit=100, additional_types=('track',))
+        while page:
+            uris.extend(item['track']['uri'] for item in page['items']
+                        if item.get('track') and item['track'].get('uri'))
+            page = self.call(self.sp.next, page) if page.get('next') else None
+        return uris
+
+    # ---------- Escrituras ----------
+
+    def _add(self, playlist_id: str, uris: List[str], snapshot_id: Optional[str]) -> Optional[str]:
+        for batch in _batches(uris):
+            snapshot_id = self.call(self.sp.playlist_add_items, playlist_id, batch)['snapshot_id']
+        return snapshot_id
+
+    def _replace(self, playlist_id: str, uris: List[str], snapshot_id: Optional[str]) -> Optional[str]:
+        snapshot_id = self.call(self.sp.playlist_replace_items, playlist_id, uris[:BATCH_SIZE])['snapshot_id']
+        return self._add(playlist_id, uris[BATCH_SIZE:], snapshot_id)
+
+    def _remove_positions(self, playlist_id: str, current: List[str], positions: List[int],
+                          snapshot_id: Optional[str]) -> Optional[str]:
+        """Elimina posiciones concretas; todas referidas al mismo snapshot, así no se desplazan"""
+        by_uri: Dict[str, List[int]] = {}
+        for position in positions:
+            by_uri.setdefault(current[position], []).append(position)
+        items = [{'uri': uri, 'positions': pos} for uri, pos in by_uri.items()]
+
+        base_snapshot = snapshot_id
+        for batch in _batches(items):
+            snapshot_id = self.call(self.sp.playlist_remove_specific_occurrences_of_items,
+                                    playlist_id, batch, snapshot_id=base_snapshot)['snapshot_id']
+        return snapshot_id
+
+    def _create(self, name: str, uris: List[str], description: str, public: bool) -> str:
+        playlist = self.call(self.sp.user_playlist_create, self.user_id, name,
+                             public=public, description=description or '')
+        snapshot_id = self._add(playlist['id'], uris, playlist.get('snapshot_id'))
+        self.logger.info(f"Playlist '{name}' creada con {len(uris)} canciones")
+        self._remember(name, playlist['id'], snapshot_id, uris)
+        return playlist['id']
+
+    def _remember(self, name: str, playlist_id: str, snapshot_id: Optional[str], uris: List[str]):
+        self.state[name] = {'id': playlist_id, 'snapshot_id': snapshot_id, 'tracks': uris}
+        if self._remote is not None:
+            self._remote[playlist_id] = {'name': name, 'snapshot_id': snapshot_id, 'owner': self.user_id}
+        self._save_state()
+
+    # ---------- Sincronización ----------
+
+    def sync(self, name: str, uris: List[str], description: Optional[str] = None,
+             public: bool = False, keep_order: bool = True,
+             playlist_id: Optional[str] = None) -> Optional[str]:
+        """
+        Deja la playlist 'name' con exactamente estas canciones.
+
+        Args:
+            uris: canciones deseadas (los repetidos se ignoran)
+            description: descripción a poner si hay cambios
+            keep_order: si False no se reordena (las nuevas quedan al final)
+            playlist_id: id conocido de la playlist, si lo hay
+
+        Returns:
+            Id de la playlist, o None si hubo un error
+        """
+        desired = list(dict.fromkeys(uris))
+        try:
+            playlist_id = self.find_playlist(name, playlist_id)
+            if not playlist_id:
+                return self._create(name, desired, description, public)
+
+            remote_snapshot = self.remote_playlists()[playlist_id]['snapshot_id']
+            cached = self.state.get(name, {})
+            if cached.get('id') == playlist_id and cached.get('snapshot_id') == remote_snapshot:
+                current = cached['tracks']
+            else:
+                self.logger.debug(f"Snapshot de '{name}' distinto, descargando canciones")
+                current = self._fetch_tracks(playlist_id)
+
+            if current == desired or (not keep_order and len(current) == len(desired)
+                                      and set(current) == set(desired)):
+                self.logger.info(f"Playlist '{name}' sin cambios")
+                self._remember(name, playlist_id, remote_snapshot, current)
+                return playlist_id
+
+            snapshot_id, tracks = self._apply_diff(playlist_id, current, desired, remote_snapshot, keep_order)
+
+            if description:
+                self.call(self.sp.playlist_change_details, playlist_id, description=description)
+            self._remember(name, playlist_id, snapshot_id, tracks)
+            return playlist_id
+
+        except Exception as e:
+            self.logger.error(f"Error sincronizando playlist '{name}': {e}")
+            # El estado local ya no es fiable para esta playlist
+            self.state.pop(name, None)
+            self._save_state()
+            return None
+
+    def _apply_diff(self, playlist_id: str, current: List[str], desired: List[str],
+                    snapshot_id: Optional[str], keep_order: bool) -> Tuple[Optional[str], List[str]]:
+        """Aplica el diff y devuelve (snapshot_id, canciones resultantes)"""
+        wanted = set(desired)
+        seen = set()
+        remove_positions = []
+        kept = []
+        for position, uri in enumerate(current):
+            if uri not in wanted or uri in seen:
+                remove_positions.append(position)
+            else:
+                kept.append(uri)
+            seen.add(uri)
+        to_add = [uri for uri in desired if uri not in seen]
+
+        after_changes = kept + to_add
+        moves = plan_moves(after_changes, desired) if keep_order else []
+
+        remove_requests = -(-len({current[p] for p in remove_positions}) // BATCH_SIZE)
+        add_requests = -(-len(to_add) // BATCH_SIZE)
+        incremental_cost = remove_requests + add_requests + len(moves)
+        replace_cost = max(1, -(-len(desired) // BATCH_SIZE))
+
+        self.logger.info(f"Cambios: +{len(to_add)} -{len(remove_positions)} "
+                         f"movimientos {len(moves)} ({incremental_cost} peticiones, "
+                         f"reescribir costaría {replace_cost})")
+
+        if keep_order and incremental_cost > replace_cost:
+            return self._replace(playlist_id, desired, snapshot_id), desired
+
+        if remove_positions:
+            snapshot_id = self._remove_positions(playlist_id, current, remove_positions, snapshot_id)
+        if to_add:
+            snapshot_id = self._add(playlist_id, to_add, snapshot_id)
+        for range_start, insert_before in moves:
+            snapshot_id = self.call(self.sp.playlist_reorder_items, playlist_id,
+                                    range_start=range_start, insert_before=insert_before)['snapshot_id']
+        return snapshot_id, desired if keep_order else after_changes
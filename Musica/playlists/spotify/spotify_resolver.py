@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Resolución de canciones a URIs de Spotify compartida por los sincronizadores
+(sp_sync_moode.py, sp_sync_mixxx.py).
+
+- Los enlaces guardados en song_links se validan en lotes de 50 con el
+  endpoint de varias canciones (sp.tracks) en lugar de un sp.track por canción.
+- Las búsquedas por texto se lanzan en paralelo con un limitador de ritmo
+  común que respeta Retry-After cuando Spotify responde 429.
+- Los enlaces validados con sp.tracks se escriben en song_links con la fecha
+  de verificación, y las siguientes ejecuciones los usan sin ninguna petición.
+  Los resultados de las búsquedas se guardan sin verificar (y sin pisar un
+  enlace existente): la siguiente ejecución los valida con matches.
+"""
+
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from spotipy.exceptions import SpotifyException
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from music_library import connect
+
+TRACKS_PER_REQUEST = 50     # Máximo del endpoint /tracks
+SEARCH_WORKERS = 8
+REQUESTS_PER_SECOND = 15
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 5
+
+logger = logging.getLogger(__name__)
+
+
+def track_id_from_link(link: str) -> Optional[str]:
+    """ID de canción de una URL, URI o ID directo de Spotify"""
+    if not link:
+        return None
+    link = link.strip()
+    for marker in ('spotify:track:', '/track/'):
+        if marker in link:
+            link = link.split(marker, 1)[1]
+            break
+    track_id = link.split('?', 1)[0].split('/', 1)[0]
+    return track_id if len(track_id) == 22 and track_id.isalnum() else None
+
+
+class RateLimiter:
+    """Reparte las peticiones de todos los hilos a un ritmo fijo y se detiene si Spotify lo pide"""
+
+    def __init__(self, per_second: float = REQUESTS_PER_SECOND):
+        self.interval = 1.0 / per_second
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """Retrasa todas las peticiones pendientes (Retry-After)"""
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+class SpotifyResolver:
+    """
+    Resuelve canciones de la base de datos a URIs de Spotify.
+
+    Args:
+        sp: cliente spotipy ya autenticado
+        db_path: base de datos con songs/song_links (None para no usar enlaces guardados)
+        workers: búsquedas simultáneas
+    """
+
+    def __init__(self, sp, db_path: Optional[str] = None, workers: int = SEARCH_WORKERS,
+                 per_second: float = REQUESTS_PER_SECOND, log: Optional[logging.Logger] = None):
+        self.sp = sp
+        self.db_path = db_path
+        self.workers = workers
+        self.limiter = RateLimiter(per_second)
+        self.logger = log or logger
+        self.link_columns = self._song_links_columns()
+
+    # ---------- Peticiones ----------
+
+    def call(self, method: Callable, *args, **kwargs):
+        """Llama a un método de spotipy respetando el ritmo y reintentando los 429"""
+        for attempt in range(MAX_RETRIES):
+            self.limiter.wait()
+            try:
+                return method(*args, **kwargs)
+            except SpotifyException as e:
+                if e.http_status != 429 or attempt == MAX_RETRIES - 1:
+                    raise
+                headers = getattr(e, 'headers', None) or {}
+                retry_after = int(headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+                self.logger.warning(f"⏳ Límite de Spotify alcanzado, esperando {retry_after}s")
+                self.limiter.pause(retry_after)
+
+    def fetch_tracks(self, track_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Datos de varias canciones en lotes de 50 (None si el ID ya no existe)"""
+        tracks = {}
+        unique_ids = list(dict.fromkeys(track_ids))
+        for start in range(0, len(unique_ids), TRACKS_PER_REQUEST):
+            batch = unique_ids[start:start + TRACKS_PER_REQUEST]
+            try:
+                response = self.call(self.sp.tracks, batch)
+                for track_id, track in zip(batch, response.get('tracks', [])):
+                    tracks[track_id] = track
+            except Exception as e:
+                self.logger.warning(f"⚠️ Error validando lote de enlaces: {e}")
+        return tracks
+
+    # ---------- song_links ----------
+
+    def _connect(self):
+        # Conexión compartida de music_library; "with" solo delimita la transacción
+        return connect(self.db_path)
+
+    def _song_links_columns(self) -> List[str]:
+        """Columnas de song_links, añadiendo spotify_verified si falta ([] si no hay tabla)"""
+        if not self.db_path:
+            return []
+        try:
+            with self._connect() as conn:
+                columns = [row[1] for row in conn.execute('PRAGMA table_info(song_links)')]
+                if 'song_id' not in columns or not {'spotify_url', 'spotify_id'} & set(columns):
+                    return []
+                if 'spotify_verified' not in columns:
+                    conn.execute('ALTER TABLE song_links ADD COLUMN spotify_verified INTEGER')
+                    columns.append('spotify_verified')
+                return columns
+        except sqlite3.Error as e:
+            self.logger.warning(f"⚠️ No se pueden usar los enlaces de song_links: {e}")
+            return []
+
+    def known_links(self, song_ids: List) -> Dict:
+        """song_id -> (track_id, verificado) de los enlaces guardados"""
+        if not self.link_columns or not song_ids:
+            return {}
+
+        link_columns = [c for c in ('spotify_id', 'spotify_url') if c in self.link_columns]
+        links = {}
+        unique_ids = list(dict.fromkeys(song_ids))
+        with self._connect() as conn:
+            for start in range(0, len(unique_ids), 500):
+                batch = unique_ids[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(
+                    f"SELECT song_id, {', '.join(link_columns)}, spotify_verified "
+                    f"FROM song_links WHERE song_id IN ({placeholders})", batch)
+                for row in rows:
+                    track_id = next(filter(None, (track_id_from_link(v) for v in row[1:-1])), None)
+                    if track_id:
+                        links[row[0]] = (track_id, bool(row[-1]))
+        return links
+
+    def save_links(self, links: Dict, verified: bool = True):
+        """
+        Guarda song_id -> track_id en song_links.
+
+        Args:
+            links: enlaces a guardar
+            verified: True para los validados con fetch_tracks (sustituyen al
+                      enlace guardado); False para resultados de búsqueda, que
+                      solo rellenan canciones sin enlace y quedan sin verificar
+        """
+        if not self.link_columns or not links:
+            return
+
+        values = {'spotify_url': lambda t: f"https://open.spotify.com/track/{t}",
+                  'spotify_id': lambda t: t}
+        columns = [c for c in ('spotify_url', 'spotify_id') if c in self.link_columns]
+        assignments = ', '.join(f'{c} = ?' for c in columns + ['spotify_verified'])
+        without_link = ' AND '.join(f"COALESCE({c}, '') = ''" for c in columns)
+        stamp = int(time.time()) if verified else None
+
+        saved = 0
+        with self._connect() as conn:
+            for song_id, track_id in links.items():
+                row = [values[c](track_id) for c in columns] + [stamp]
+                if verified:
+                    cursor = conn.execute(f'UPDATE song_links SET {assignments} WHERE song_id = ?',
+                                          row + [song_id])
+                else:
+                    cursor = conn.execute(f'UPDATE song_links SET {assignments} '
+                                          f'WHERE song_id = ? AND {without_link}', row + [song_id])
+                    if cursor.rowcount == 0 and conn.execute(
+                            'SELECT 1 FROM song_links WHERE song_id = ?', (song_id,)).fetchone():
+                        continue  # Ya tiene enlace: una búsqueda no lo sustituye
+                if cursor.rowcount == 0:
+                    conn.execute(
+                        f"INSERT INTO song_links (song_id, {', '.join(columns)}, spotify_verified) "
+                        f"VALUES ({','.join('?' * (len(columns) + 2))})", [song_id] + row)
+                saved += 1
+        if saved:
+            state = 'verificados' if verified else 'sin verificar'
+            self.logger.info(f"💾 {saved} enlaces de Spotify guardados en song_links ({state})")
+
+    # ---------- Resolución ----------
+
+    def resolve(self, songs: List[Dict], search: Callable[[Dict], Optional[str]],
+                matches: Optional[Callable[[Dict, Dict], bool]] = None,
+                id_key: str = 'id') -> List[Optional[str]]:
+        """
+        URI de Spotify de cada canción (None si no se encuentra), en el mismo orden.
+
+        Args:
+            songs: canciones; song[id_key] es su id en songs (puede faltar)
+            search: búsqueda por texto de una canción; debe pasar sus peticiones por call()
+            matches: comprueba si un track de Spotify corresponde a la canción
+                     (para validar enlaces guardados sin verificar)
+        """
+        uris: List[Optional[str]] = [None] * len(songs)
+        links = self.known_links([song.get(id_key) for song in songs if song.get(id_key) is not None])
+        to_save = {}    # Validados con fetch_tracks
+        found = {}      # Resultados de búsqueda, sin verificar
+
+        # 1. Enlaces ya verificados: sin peticiones
+        unverified = []
+        for index, song in enumerate(songs):
+            link = links.get(song.get(id_key))
+            if not link:
+                continue
+            track_id, verified = link
+            if verified:
+                uris[index] = f"spotify:track:{track_id}"
+            else:
+                unverified.append((index, track_id))
+
+        # 2. Enlaces sin verificar: validación en lotes
+        if unverified:
+            tracks = self.fetch_tracks([track_id for _, track_id in unverified])
+            for index, track_id in unverified:
+                track = tracks.get(track_id)
+                if track and (matches is None or matches(songs[index], track)):
+                    uris[index] = track.get('uri') or f"spotify:track:{track_id}"
+                    to_save[songs[index][id_key]] = track_id
+                elif track:
+                    self.logger.debug(f"⚠️ El enlace guardado no coincide: {track_id}")
+
+        # 3. Búsquedas por texto en paralelo
+        pending = [index for index, uri in enumerate(uris) if uri is None]
+        self.logger.info(f"🔗 {len(songs) - len(pending)} canciones con enlace, "
+                         f"{len(pending)} requieren búsqueda")
+
+        def run_search(index):
+            try:
+                return search(songs[index])
+            except Exception as e:
+                self.logger.debug(f"Error buscando canción: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for done, (index, uri) in enumerate(zip(pending, executor.map(run_search, pending)), 1):
+                if uri:
+                    uris[index] = uri
+                    song_id = songs[index].get(id_key)
+                    track_id = track_id_from_link(uri)
+                    if song_id is not None and track_id:
+                        found[song_id] = track_id
+                if done % 100 == 0 or done == len(pending):
+                    self.logger.info(f"Búsquedas: {done}/{len(pending)}")
+
+        self.save_links(to_save)
+        self.save_links(found, verified=False)
+        return uris
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Caché en disco (SQLite) de los tags de los archivos de audio que aparecen en
+las playlists M3U, compartida por spotify/sp_sync_mixxx.py y
+airsonic/airsonic_sync_mix_playlists.py.
+
+Cada archivo se guarda con su (tamaño, mtime_ns): mientras no cambien se
+devuelven los tags guardados sin abrir el archivo, así que volver a
+sincronizar playlists sin cambios solo hace un stat por canción. Los archivos
+que no están en la caché (o han cambiado) se leen con mutagen en paralelo.
+"""
+
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+try:
+    from mutagen import File as MutagenFile
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+TAG_CACHE_PATH = os.path.expanduser("~/.cache/playlist_tag_cache.db")
+READ_WORKERS = 8
+
+TAG_FIELDS = ('artist', 'albumartist', 'title', 'album', 'year')
+
+
+def read_tags(path: str) -> Optional[Dict[str, str]]:
+    """Tags (TAG_FIELDS, '' si faltan) leídos con mutagen, o None si no se puede leer el archivo"""
+    try:
+        audio = MutagenFile(path, easy=True)
+    except Exception:
+        return None
+    if audio is None:
+        return None
+
+    def get_tag(tag_name):
+        value = audio.get(tag_name, [''])
+        if isinstance(value, list):
+            return str(value[0]).strip() if value else ''
+        return str(value).strip() if value else ''
+
+    return {
+        'artist': get_tag('artist'),
+        'albumartist': get_tag('albumartist'),
+        'title': get_tag('title'),
+        'album': get_tag('album'),
+        'year': get_tag('date') or get_tag('year'),
+    }
+
+
+class TagCache:
+    def __init__(self, db_path: str = TAG_CACHE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS tags (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                readable INTEGER,
+                {', '.join(f'{field} TEXT' for field in TAG_FIELDS)}
+            )
+        ''')
+        self.conn.commit()
+        self._memory = {}     # ruta -> tags ya devueltos en esta ejecución
+
+    def read_many(self, paths: Iterable[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Tags de varios archivos, leyendo en paralelo solo los que no están en
+        la caché o han cambiado.
+
+        Returns:
+            {ruta: tags o None} para las rutas que existen (con la ruta tal
+            como se pasó)
+        """
+        stamps = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamps[path] = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+        result, missing = {}, {}
+        for path, (key, size, mtime_ns) in stamps.items():
+            cached = self._memory.get(key)
+            if cached and cached[0] == (size, mtime_ns):
+                result[path] = cached[1]
+                continue
+            row = self.conn.execute(
+                f"SELECT size, mtime_ns, readable, {', '.join(TAG_FIELDS)} FROM tags WHERE path = ?",
+                (key,)).fetchone()
+            if row and (row[0], row[1]) == (size, mtime_ns):
+                tags = dict(zip(TAG_FIELDS, row[3:])) if row[2] else None
+                self._memory[key] = ((size, mtime_ns), tags)
+                result[path] = tags
+            else:
+                missing[key] = path
+
+        if missing and MUTAGEN_AVAILABLE:
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+                read = dict(zip(missing, executor.map(read_tags, missing)))
+            rows = []
+            for key, tags in read.items():
+                _, size, mtime_ns = stamps[missing[key]]
+                self._memory[key] = ((size, mtime_ns), tags)
+                result[missing[key]] = tags
+                rows.append((key, size, mtime_ns, int(tags is not None),
+                             *((tags or {}).get(field) for field in TAG_FIELDS)))
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO tags VALUES ({', '.join('?' * (4 + len(TAG_FIELDS)))})", rows)
+        return result
+
+    def get(self, path: str) -> Optional[Dict[str, str]]:
+        """Tags de un archivo (ver read_many), o None si no existe o no se puede leer"""
+        return self.read_many([path]).get(path)
+
+    def close(self):
+        self.conn.close()
@@ -3,17 +3,29 @@
 Dotfiles Indexer - Indexa archivos de configuración en una base de datos SQLite
 para búsquedas rápidas por nombre y ruta.
 Author: volteret4
-Dependencies: sqlite3, pathlib, hashlib, argparse
+Dependencies: sqlite3, pathlib, argparse, xxhash (opcional)
 """
 
+import os
+import sys
 import sqlite3
-import hashlib
 import argparse
 import mimetypes
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from file_changes import ChangeDetector, ensure_signature_columns, fast_hash, upsert_sql, walk_files
+from fts_search import DOTFILES, ensure_fts
+
+# UPSERT y no INSERT OR REPLACE: conserva el id y las etiquetas/categorías (ON DELETE CASCADE)
+DOTFILES_UPSERT = upsert_sql('dotfiles', (
+    'path', 'filename', 'directory', 'extension', 'size_bytes', 'hash', 'mime_type',
+    'is_config', 'is_executable', 'source_root', 'relative_path', 'last_modified',
+    'last_indexed', 'updated_at', 'mtime_ns', 'inode'
+))
+
 # ==================== CONFIGURACIÓN ====================
 # Edita estas variables según tus necesidades
 
@@ -128,6 +140,7 @@ class DotfilesIndexer:
         self.config_filenames = CONFIG_FILENAMES
         self.max_file_size = MAX_FILE_SIZE
 
+        self.changes = None
         self.setup_database()
 
     def setup_database(self):
@@ -157,9 +170,12 @@ class DotfilesIndexer:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_modified TIMESTAMP,
-                last_indexed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                last_indexed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                mtime_ns INTEGER,
+                inode INTEGER
             )
         ''')
+        ensure_signature_columns(self.conn, 'dotfiles')
 
         # Tabla de categorías para clasificar archivos
         self.conn.execute('''
@@ -219,12 +235,16 @@ class DotfilesIndexer:
             GROUP BY d.id, d.path, d.filename, d.directory, d.extension,
                      d.size_bytes, d.hash, d.mime_type, d.is_config,
                      d.is_executable, d.source_root, d.relative_path,
-                     d.created_at, d.updated_at, d.last_modified, d.last_indexed
+                     d.created_at, d.updated_at, d.last_modified, d.last_indexed,
+                     d.mtime_ns, d.inode
         ''')
 
         # Insertar categorías básicas
         self.insert_default_categories()
 
+        # Índice FTS de búsqueda, sincronizado por triggers
+        ensure_fts(self.conn, DOTFILES)
+
         self.conn.commit()
 
     def insert_default_categories(self):
@@ -311,15 +331,8 @@ class DotfilesIndexer:
         return False
 
     def get_file_hash(self, file_path: Path) -> str:
-        """Calcula el hash MD5 de un archivo"""
-        try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except (IOError, OSError):
-            return ""
+        """Calcula un hash rápido (no criptográfico) de un archivo"""
+        return fast_hash(str(file_path))
 
     def get_mime_type(self, file_path: Path) -> str:
         """Obtiene el tipo MIME de un archivo"""
@@ -329,28 +342,17 @@ class DotfilesIndexer:
         except Exception:
             return 'application/octet-stream'
 
-    def is_file_changed(self, file_path: Path) -> bool:
-        """Verifica si un archivo ha cambiado desde la última indexación"""
-        cursor = self.conn.execute(
-            'SELECT last_modified, hash FROM dotfiles WHERE path = ?',
-            (str(file_path),)
-        )
-        result = cursor.fetchone()
-
-        if not result:
-            return True  # Archivo nuevo
+    def get_change_detector(self) -> ChangeDetector:
+        """Firmas (tamaño, mtime_ns, inodo) de todos los archivos, cargadas una sola vez"""
+        if self.changes is None:
+            self.changes = ChangeDetector(self.conn, 'dotfiles')
+        return self.changes
 
-        db_modified, db_hash = result
+    def is_file_changed(self, file_path: Path, stat: Optional[os.stat_result] = None) -> bool:
+        """Verifica si un archivo ha cambiado desde la última indexación"""
         try:
-            file_modified = datetime.fromtimestamp(file_path.stat().st_mtime)
-
-            # Comparar por fecha de modificación primero (más rápido)
-            if db_modified != file_modified.isoformat():
-                return True
-
-            # Si las fechas coinciden, comparar hash para estar seguros
-            current_hash = self.get_file_hash(file_path)
-            return current_hash != db_hash
+            stat = stat or file_path.stat()
+            return self.get_change_detector().is_changed(str(file_path), stat)
         except (OSError, IOError):
             return True  # Error al acceder al archivo, marcarlo como cambiado
 
@@ -365,7 +367,8 @@ class DotfilesIndexer:
         # Si no se encuentra, usar el directorio padre
         return file_path.parent
 
-    def index_file(self, file_path: Path, force_update: bool = False) -> bool:
+    def index_file(self, file_path: Path, force_update: bool = False,
+                   stat: Optional[os.stat_result] = None) -> bool:
         """Indexa un archivo individual"""
         try:
             # Verificar si debe ser excluido
@@ -373,19 +376,19 @@ class DotfilesIndexer:
                 return False
 
             # Verificar tamaño de archivo
-            stat = file_path.stat()
+            stat = stat or file_path.stat()
             if stat.st_size > self.max_file_size:
                 return False
 
             # Verificar si el archivo ha cambiado
-            if not force_update and not self.is_file_changed(file_path):
+            if not force_update and not self.is_file_changed(file_path, stat):
                 return False  # No necesita actualización
 
             # Obtener información del archivo
             source_root = self.find_source_root(file_path)
             relative_path = file_path.relative_to(source_root)
 
-            hash_value = self.get_file_hash(file_path)
+            hash_value = self.get_change_detector().file_hash(str(file_path))
             mime_type = self.get_mime_type(file_path)
             is_config = self.is_config_file(file_path)
             is_executable = file_path.is_file() and stat.st_mode & 0o111
@@ -405,23 +408,20 @@ class DotfilesIndexer:
                 'relative_path': str(relative_path),
                 'last_modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
                 'last_indexed': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'updated_at': datetime.now().isoformat(),
+                'mtime_ns': stat.st_mtime_ns,
+                'inode': stat.st_ino
             }
 
             # Insertar o actualizar en la base de datos
-            self.conn.execute('''
-                INSERT OR REPLACE INTO dotfiles
-                (path, filename, directory, extension, size_bytes, hash, mime_type,
-                 is_config, is_executable, source_root, relative_path,
-                 last_modified, last_indexed, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.conn.execute(DOTFILES_UPSERT, (
                 data['path'], data['filename'], data['directory'], data['extension'],
                 data['size_bytes'], data['hash'], data['mime_type'],
                 data['is_config'], data['is_executable'], data['source_root'],
                 data['relative_path'], data['last_modified'], data['last_indexed'],
-                data['updated_at']
+                data['updated_at'], data['mtime_ns'], data['inode']
             ))
+            self.get_change_detector().record(data['path'], stat, hash_value)
 
             return True
 
@@ -440,16 +440,12 @@ class DotfilesIndexer:
 
         print(f"Indexando: {directory}")
 
-        # Obtener todos los archivos
-        files_to_process = []
-        try:
-            if recursive:
-                files_to_process = [f for f in directory.rglob('*') if f.is_file()]
-            else:
-                files_to_process = [f for f in directory.iterdir() if f.is_file()]
-        except (PermissionError, OSError) as e:
-            print(f"Error accediendo a {directory}: {e}")
-            return stats
+        # Obtener todos los archivos (sin entrar en las carpetas excluidas)
+        files_to_process = [
+            (Path(path), stat) for path, stat in walk_files(
+                str(directory), recursive,
+                skip_dir=lambda _, path: self.should_exclude_path(Path(path)))
+        ]
 
         total_files = len(files_to_process)
         print(f"Encontrados {total_files} archivos")
@@ -458,9 +454,9 @@ class DotfilesIndexer:
             return stats
 
         # Procesar archivos
-        for i, file_path in enumerate(files_to_process):
+        for i, (file_path, stat) in enumerate(files_to_process):
             try:
-                if self.index_file(file_path):
+                if self.index_file(file_path, stat=stat):
                     stats['updated'] += 1
                 else:
                     stats['skipped'] += 1
@@ -475,6 +471,7 @@ class DotfilesIndexer:
 
                 # Commit cada 200 archivos para mejorar rendimiento
                 if (i + 1) % 200 == 0:
+                    self.get_change_detector().flush()
                     self.conn.commit()
 
             except Exception as e:
@@ -482,6 +479,7 @@ class DotfilesIndexer:
                 print(f"Error procesando {file_path}: {e}")
 
         # Commit final para este directorio
+        self.get_change_detector().flush()
         self.conn.commit()
         print(f"Completado {directory}: {stats['updated']} actualizados, {stats['skipped']} sin cambios, {stats['errors']} errores")
 
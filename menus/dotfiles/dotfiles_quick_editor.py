@@ -17,87 +17,70 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout
                             QMessageBox, QSplitter, QLineEdit, QRadioButton,
                             QButtonGroup, QTableWidget, QTableWidgetItem, QHeaderView,
                             QCheckBox, QComboBox)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread, QProcess
 from PyQt6.QtGui import QKeySequence, QShortcut, QFont
 import yaml
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fts_search import DOTFILES, ensure_fts, open_reader, search_sql
+
 
 class DatabaseSearchThread(QThread):
     """Hilo para realizar búsquedas en la base de datos sin bloquear la UI"""
     results_ready = pyqtSignal(list)
 
-    def __init__(self, db_path, query, filters):
+    def __init__(self, reader, query, filters):
         super().__init__()
-        self.db_path = db_path
+        self.reader = reader  # Conexión de lectura persistente, compartida entre búsquedas
         self.query = query
         self.filters = filters
 
     def run(self):
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            conn.row_factory = sqlite3.Row
-
-            # Construir query SQL con filtros
-            base_query = '''
-                SELECT * FROM dotfiles_with_categories
-                WHERE 1=1
-            '''
+            # Filtros sobre la vista
+            conditions = []
             params = []
 
-            # Filtro de búsqueda por texto
-            if self.query.strip():
-                query_lower = f"%{self.query.lower()}%"
-                base_query += '''
-                    AND (
-                        LOWER(filename) LIKE ? OR
-                        LOWER(relative_path) LIKE ? OR
-                        LOWER(path) LIKE ? OR
-                        LOWER(categories) LIKE ?
-                    )
-                '''
-                params.extend([query_lower, query_lower, query_lower, query_lower])
-
             # Filtro por tipo de archivo
             if self.filters.get('config_only'):
-                base_query += ' AND is_config = 1'
+                conditions.append('b.is_config = 1')
             if self.filters.get('executable_only'):
-                base_query += ' AND is_executable = 1'
+                conditions.append('b.is_executable = 1')
 
             # Filtro por fuente
             if self.filters.get('source_root'):
-                base_query += ' AND source_root = ?'
+                conditions.append('b.source_root = ?')
                 params.append(self.filters['source_root'])
 
             # Filtro por extensión
             if self.filters.get('extension'):
-                base_query += ' AND extension = ?'
+                conditions.append('b.extension = ?')
                 params.append(self.filters['extension'])
 
-            # Ordenamiento por relevancia
-            base_query += '''
-                ORDER BY
-                    CASE
-                        WHEN LOWER(filename) = LOWER(?) THEN 1
-                        WHEN LOWER(filename) LIKE ? THEN 2
-                        WHEN LOWER(relative_path) LIKE ? THEN 3
-                        ELSE 4
-                    END,
-                    is_config DESC,
-                    filename
-                LIMIT 500
-            '''
+            where = ' AND '.join(conditions)
 
             if self.query.strip():
-                params.extend([self.query.lower(), f"{self.query.lower()}%", f"%{self.query.lower()}%"])
+                # Búsqueda por texto en el índice FTS, ordenada por relevancia
+                sql, sql_params = search_sql(DOTFILES, self.query, source='dotfiles_with_categories',
+                                             select='b.*', where=where, params=tuple(params))
             else:
-                params.extend(['', '', ''])
+                sql = 'SELECT b.* FROM dotfiles_with_categories b'
+                if where:
+                    sql += f' WHERE {where}'
+                sql += ' ORDER BY b.is_config DESC, b.filename'
+                sql_params = tuple(params)
 
-            cursor = conn.execute(base_query, params)
+            cursor = self.reader.execute(sql + ' LIMIT 500', sql_params)
             results = [dict(row) for row in cursor.fetchall()]
 
-            conn.close()
             self.results_ready.emit(results)
 
+        except sqlite3.OperationalError as e:
+            # Búsqueda cancelada por una más reciente (reader.interrupt())
+            if 'interrupted' not in str(e):
+                print(f"Error en búsqueda: {e}")
+                self.results_ready.emit([])
+
         except Exception as e:
             print(f"Error en búsqueda: {e}")
             self.results_ready.emit([])
@@ -158,6 +141,16 @@ class DotfilesEditor(QMainWindow):
         self.conn.execute('PRAGMA temp_store = MEMORY')
         self.conn.execute('PRAGMA cache_size = 10000')
 
+        # Índice FTS (se crea la primera vez) y conexión de lectura para las búsquedas
+        ensure_fts(self.conn, DOTFILES)
+        self.reader = open_reader(str(self.db_path))
+
+    def stop_search(self):
+        """Cancela la búsqueda en curso sin matar el hilo (la conexión de lectura sigue usable)"""
+        if self.search_thread and self.search_thread.isRunning():
+            self.reader.interrupt()
+            self.search_thread.wait()
+
     def load_theme(self) -> dict:
         """Carga la configuración del tema"""
         if not self.themes_file.exists():
@@ -647,14 +640,12 @@ class DotfilesEditor(QMainWindow):
 
     def perform_search(self):
         """Realiza la búsqueda en la base de datos"""
-        if self.search_thread and self.search_thread.isRunning():
-            self.search_thread.terminate()
-            self.search_thread.wait()
+        self.stop_search()
 
         query = self.search_input.text().strip()
         filters = self.get_current_filters()
 
-        self.search_thread = DatabaseSearchThread(self.db_path, query, filters)
+        self.search_thread = DatabaseSearchThread(self.reader, query, filters)
         self.search_thread.results_ready.connect(self.update_results)
         self.search_thread.start()
 
@@ -833,44 +824,47 @@ class DotfilesEditor(QMainWindow):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
 
-        if reply == QMessageBox.StandardButton.Yes:
-            try:
-                # Cerrar conexión temporalmente
-                self.conn.close()
-
-                # Ejecutar el indexador
-                indexer_script = self.script_dir / 'dotfiles_indexer.py'
-                if indexer_script.exists():
-                    self.status_label.setText("Reindexando...")
-                    self.reindex_btn.setEnabled(False)
-
-                    # Ejecutar en segundo plano
-                    process = subprocess.Popen([
-                        sys.executable, str(indexer_script)
-                    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-                    stdout, stderr = process.communicate()
-
-                    if process.returncode == 0:
-                        QMessageBox.information(self, "Éxito",
-                                              "Base de datos reindexada correctamente")
-                        # Reconectar y recargar
-                        self.setup_database()
-                        self.load_filter_options()
-                        self.perform_search()
-                    else:
-                        QMessageBox.warning(self, "Error",
-                                          f"Error durante el reindexado:\n{stderr}")
-                else:
-                    QMessageBox.warning(self, "Error",
-                                      "No se encontró dotfiles_indexer.py")
-
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error ejecutando reindexado: {e}")
-            finally:
-                self.reindex_btn.setEnabled(True)
-                if not hasattr(self, 'conn') or not self.conn:
-                    self.setup_database()
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        indexer_script = self.script_dir / 'dotfiles_indexer.py'
+        if not indexer_script.exists():
+            QMessageBox.warning(self, "Error", "No se encontró dotfiles_indexer.py")
+            return
+
+        # El indexador corre en segundo plano; las búsquedas siguen funcionando
+        # mientras tanto y los triggers FTS mantienen el índice al día
+        self.status_label.setText("Reindexando...")
+        self.reindex_btn.setEnabled(False)
+
+        self.reindex_process = QProcess(self)
+        self.reindex_process.setStandardOutputFile(QProcess.nullDevice())
+        self.reindex_process.finished.connect(self.on_reindex_finished)
+        self.reindex_process.errorOccurred.connect(self.on_reindex_error)
+        self.reindex_process.start(sys.executable, [str(indexer_script)])
+
+    def on_reindex_finished(self, exit_code, exit_status):
+        """Recarga filtros y resultados cuando termina el indexador"""
+        self.reindex_btn.setEnabled(True)
+        self.status_label.setText("Listo")
+
+        if exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0:
+            QMessageBox.information(self, "Éxito",
+                                  "Base de datos reindexada correctamente")
+            self.load_filter_options()
+            self.perform_search()
+        else:
+            stderr = bytes(self.reindex_process.readAllStandardError()).decode(errors='replace')
+            QMessageBox.warning(self, "Error",
+                              f"Error durante el reindexado:\n{stderr}")
+
+    def on_reindex_error(self, error):
+        """El indexador no se pudo lanzar"""
+        if error == QProcess.ProcessError.FailedToStart:
+            self.reindex_btn.setEnabled(True)
+            self.status_label.setText("Listo")
+            QMessageBox.critical(self, "Error",
+                               f"Error ejecutando reindexado: {self.reindex_process.errorString()}")
 
     def get_database_stats(self):
         """Obtiene estadísticas de la base de datos"""
@@ -909,10 +903,8 @@ Estadísticas:
 
     def closeEvent(self, event):
         """Manejar el cierre de la aplicación"""
-        # Terminar hilo de búsqueda si está ejecutándose
-        if self.search_thread and self.search_thread.isRunning():
-            self.search_thread.terminate()
-            self.search_thread.wait()
+        # Cancelar la búsqueda si está ejecutándose
+        self.stop_search()
 
         # Verificar cambios sin guardar
         if self.current_file and self.text_editor.toPlainText() != self.current_content:
@@ -933,7 +925,9 @@ Estadísticas:
                 event.ignore()
                 return
 
-        # Cerrar conexión a la base de datos
+        # Cerrar conexiones a la base de datos
+        if hasattr(self, 'reader'):
+            self.reader.close()
         if hasattr(self, 'conn'):
             self.conn.close()
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+File Changes - Detección de cambios compartida por los indexadores de menus/
+(iconos/icon_indexer.py, scripts/fuzzy_scripts_indexer.py, dotfiles/dotfiles_indexer.py)
+
+Cada fila guarda la firma (size_bytes, mtime_ns, inode) del archivo indexado.
+Las firmas de la tabla se cargan de una vez en un dict, así que comprobar un
+archivo es un stat y una consulta en memoria, sin un SELECT por archivo.
+El contenido solo se lee cuando la firma no coincide pero el tamaño sí
+(p.ej. un touch o una copia que conserva el contenido), y entonces se usa
+un hash rápido no criptográfico (xxhash si está instalado, si no crc32).
+
+Las filas de versiones anteriores (sin mtime_ns y con hash MD5) se comprueban
+una vez con MD5 y, si el contenido no ha cambiado, se actualizan firma y hash
+sin reindexarlas. Los indexadores escriben con upsert_sql (ON CONFLICT DO
+UPDATE) y no con INSERT OR REPLACE, que borraría la fila y con ella (ON DELETE
+CASCADE) sus etiquetas y categorías.
+"""
+
+import hashlib
+import os
+import zlib
+from typing import Dict, Iterator, Sequence, Tuple
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def fast_hash(path: str) -> str:
+    """Hash rápido del contenido, con prefijo del algoritmo ('' si no se puede leer)"""
+    try:
+        with open(path, 'rb') as f:
+            if XXHASH_AVAILABLE:
+                hasher = xxhash.xxh3_64()
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+                return f"xxh3:{hasher.hexdigest()}"
+
+            crc = 0
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                crc = zlib.crc32(chunk, crc)
+            return f"crc32:{crc:08x}"
+    except (IOError, OSError):
+        return ""
+
+
+def legacy_md5(path: str) -> str:
+    """Hash MD5 como lo guardaban las versiones anteriores de los indexadores"""
+    try:
+        hash_md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hash_md5.update(chunk)
+        return hash_md5.hexdigest()
+    except (IOError, OSError):
+        return ""
+
+
+def upsert_sql(table: str, columns: Sequence[str], key: str = 'path') -> str:
+    """
+    INSERT ... ON CONFLICT(key) DO UPDATE: actualiza la fila existente
+    conservando su id y las filas que dependen de ella (etiquetas, categorías)
+    """
+    updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column != key)
+    return (f'INSERT INTO {table} ({", ".join(columns)}) '
+            f'VALUES ({", ".join("?" * len(columns))}) '
+            f'ON CONFLICT({key}) DO UPDATE SET {updates}')
+
+
+def ensure_signature_columns(conn, table: str):
+    """Añade las columnas mtime_ns e inode a una tabla existente si faltan"""
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for column in ('mtime_ns', 'inode'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER')
+    conn.commit()
+
+
+def walk_files(directory: str, recursive: bool = True,
+               skip_dir=None) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Recorre un directorio con os.scandir y devuelve (ruta, stat) de cada archivo.
+
+    Args:
+        skip_dir: función opcional (nombre, ruta) -> bool para no entrar en una carpeta
+    """
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and not (skip_dir and skip_dir(entry.name, entry.path)):
+                                pending.append(entry.path)
+                        elif entry.is_file():
+                            yield entry.path, entry.stat()
+                    except OSError:
+                        continue
+        except (PermissionError, OSError) as e:
+            print(f"Error accediendo a {current}: {e}")
+
+
+class ChangeDetector:
+    """Compara archivos con las firmas guardadas en una tabla (columnas path, size_bytes, mtime_ns, inode, hash)"""
+
+    def __init__(self, conn, table: str):
+        self.conn = conn
+        self.table = table
+        ensure_signature_columns(conn, table)
+
+        self.known: Dict[str, Tuple] = {
+            path: (size, mtime_ns, inode, file_hash)
+            for path, size, mtime_ns, inode, file_hash in conn.execute(
+                f'SELECT path, size_bytes, mtime_ns, inode, hash FROM {table}')
+        }
+        self.hashes: Dict[str, str] = {}
+        self.refreshed = []
+
+    def is_changed(self, path: str, stat: os.stat_result) -> bool:
+        """True si el archivo es nuevo o su contenido ha cambiado"""
+        known = self.known.get(path)
+        if known is None:
+            return True  # Archivo nuevo
+
+        size, mtime_ns, inode, old_hash = known
+        if (stat.st_size, stat.st_mtime_ns, stat.st_ino) == (size, mtime_ns, inode):
+            return False
+
+        # Otro tamaño: cambiado seguro, no hace falta leerlo
+        if stat.st_size != size:
+            return True
+
+        # Misma longitud pero otra firma: decidir por contenido
+        current_hash = fast_hash(path)
+        self.hashes[path] = current_hash
+        if old_hash and ':' not in old_hash:
+            # Fila de una versión anterior (MD5): comparar con MD5 una sola vez
+            if legacy_md5(path) != old_hash:
+                return True
+        elif current_hash != old_hash:
+            return True
+
+        # Contenido igual: actualizar solo la firma (y el hash, si era MD5) para no volver a leerlo
+        self.refreshed.append((stat.st_mtime_ns, stat.st_ino, current_hash, path))
+        self.known[path] = (size, stat.st_mtime_ns, stat.st_ino, current_hash)
+        self.hashes.pop(path, None)
+        return False
+
+    def record(self, path: str, stat: os.stat_result, file_hash: str):
+        """Anota la firma de un archivo recién indexado (p.ej. si otra carpeta lo vuelve a incluir)"""
+        self.known[path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino, file_hash)
+
+    def forget(self, path: str):
+        """Olvida la firma de un archivo borrado del índice"""
+        self.known.pop(path, None)
+        self.hashes.pop(path, None)
+
+    def file_hash(self, path: str) -> str:
+        """Hash del archivo, reutilizando el calculado en is_changed"""
+        return self.hashes.pop(path, None) or fast_hash(path)
+
+    def flush(self):
+        """Guarda las firmas de los archivos tocados sin cambios de contenido"""
+        if self.refreshed:
+            self.conn.executemany(
+                f'UPDATE {self.table} SET mtime_ns = ?, inode = ?, hash = ? WHERE path = ?',
+                self.refreshed
+            )
+            self.refreshed = []
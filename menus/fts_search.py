@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+FTS Search - Búsqueda compartida por los lanzadores de menus/
+(iconos/icon_browser.py, scripts/fuzzy_scripts.py, dotfiles/dotfiles_quick_editor.py)
+
+Cada base de datos tiene una tabla FTS5 con tokenizer trigram ({tabla}_fts)
+cuyo rowid es el id de la tabla principal. Las columnas de texto y los tags
+(o categorías) se mantienen sincronizados con triggers, así que los
+indexadores y los editores de tags no tienen que hacer nada más.
+
+Con el tokenizer trigram, MATCH encuentra subcadenas igual que el antiguo
+LIKE '%texto%', pero usando el índice. Los resultados se ordenan por
+coincidencia exacta, prefijo y después BM25. Los términos de menos de 3
+caracteres no caben en un trigrama y se filtran con LIKE '%texto%' sobre las
+columnas FTS: junto a otros más largos solo las filas que ya ha dado MATCH, y
+solos recorriendo la tabla FTS.
+"""
+
+import sqlite3
+from typing import List, Optional, Tuple
+
+MIN_TRIGRAM_LENGTH = 3
+
+
+class SearchSpec:
+    """Describe qué columnas de una tabla se indexan y de dónde salen sus tags"""
+
+    def __init__(self, table: str, columns: List[str], weights: List[float],
+                 tag_table: str, link_table: str, link_key: str,
+                 link_tag_key: str = 'tag_id', name_column: str = 'filename'):
+        self.table = table
+        self.columns = columns          # Columnas de texto de la tabla principal
+        self.weights = weights          # Pesos BM25 (columnas + tags)
+        self.tag_table = tag_table
+        self.link_table = link_table
+        self.link_key = link_key        # Columna de la tabla de relación con el id principal
+        self.link_tag_key = link_tag_key
+        self.name_column = name_column  # Columna para coincidencia exacta/prefijo
+        self.fts_table = f'{table}_fts'
+
+    @property
+    def fts_columns(self) -> List[str]:
+        return self.columns + ['tags']
+
+
+ICONS = SearchSpec('icons', ['filename', 'path'], [10.0, 1.0, 5.0],
+                   tag_table='tags', link_table='icon_tags', link_key='icon_id')
+
+SCRIPTS = SearchSpec('scripts', ['filename', 'description', 'author', 'notes'],
+                     [10.0, 3.0, 1.0, 1.0, 5.0],
+                     tag_table='tags', link_table='script_tags', link_key='script_id')
+
+DOTFILES = SearchSpec('dotfiles', ['filename', 'relative_path', 'path'], [10.0, 3.0, 1.0, 2.0],
+                      tag_table='categories', link_table='file_categories',
+                      link_key='file_id', link_tag_key='category_id')
+
+
+def _tags_subquery(spec: SearchSpec, id_expr: str) -> str:
+    return (f"(SELECT GROUP_CONCAT(t.name, ',') FROM {spec.link_table} l "
+            f"JOIN {spec.tag_table} t ON t.id = l.{spec.link_tag_key} "
+            f"WHERE l.{spec.link_key} = {id_expr})")
+
+
+def ensure_fts(conn: sqlite3.Connection, spec: SearchSpec):
+    """
+    Crea la tabla FTS y sus triggers si faltan, y la rellena si está vacía.
+
+    Activa también recursive_triggers en la conexión: sin él, el DELETE
+    implícito de un INSERT OR REPLACE no dispara los triggers de borrado.
+    """
+    conn.execute('PRAGMA recursive_triggers = ON')
+
+    columns = ', '.join(spec.fts_columns)
+    new_values = ', '.join(f'NEW.{column}' for column in spec.columns)
+    insert_row = (f"INSERT INTO {spec.fts_table} (rowid, {columns}) "
+                  f"VALUES (NEW.id, {new_values}, {_tags_subquery(spec, 'NEW.id')});")
+
+    conn.executescript(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {spec.fts_table}
+            USING fts5({columns}, tokenize='trigram');
+
+        CREATE TRIGGER IF NOT EXISTS {spec.table}_fts_insert
+        AFTER INSERT ON {spec.table} BEGIN
+            {insert_row}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS {spec.table}_fts_update
+        AFTER UPDATE OF {', '.join(spec.columns)} ON {spec.table} BEGIN
+            DELETE FROM {spec.fts_table} WHERE rowid = OLD.id;
+            {insert_row}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS {spec.table}_fts_delete
+        AFTER DELETE ON {spec.table} BEGIN
+            DELETE FROM {spec.fts_table} WHERE rowid = OLD.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS {spec.link_table}_fts_insert
+        AFTER INSERT ON {spec.link_table} BEGIN
+            UPDATE {spec.fts_table} SET tags = {_tags_subquery(spec, f'NEW.{spec.link_key}')}
+            WHERE rowid = NEW.{spec.link_key};
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS {spec.link_table}_fts_delete
+        AFTER DELETE ON {spec.link_table} BEGIN
+            UPDATE {spec.fts_table} SET tags = {_tags_subquery(spec, f'OLD.{spec.link_key}')}
+            WHERE rowid = OLD.{spec.link_key};
+        END;
+    ''')
+
+    # Índice para las búsquedas cortas por prefijo (LIKE usa índices NOCASE)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{spec.table}_{spec.name_column}_nocase '
+                 f'ON {spec.table}({spec.name_column} COLLATE NOCASE)')
+
+    # Bases de datos creadas antes del índice: rellenarlo una vez
+    indexed = conn.execute(f'SELECT COUNT(*) FROM {spec.fts_table}').fetchone()[0]
+    if indexed == 0 and conn.execute(f'SELECT 1 FROM {spec.table} LIMIT 1').fetchone():
+        rebuild_fts(conn, spec)
+
+    conn.commit()
+
+
+def rebuild_fts(conn: sqlite3.Connection, spec: SearchSpec):
+    """Vuelve a generar la tabla FTS completa desde la tabla principal"""
+    columns = ', '.join(spec.fts_columns)
+    values = ', '.join(f'b.{column}' for column in spec.columns)
+    conn.execute(f'DELETE FROM {spec.fts_table}')
+    conn.execute(f'''
+        INSERT INTO {spec.fts_table} (rowid, {columns})
+        SELECT b.id, {values}, {_tags_subquery(spec, 'b.id')}
+        FROM {spec.table} b
+    ''')
+    conn.commit()
+
+
+def _match_expression(terms: List[str]) -> str:
+    """Cada término como frase entre comillas; FTS5 los combina con AND"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_sql(spec: SearchSpec, query: str, source: Optional[str] = None,
+               select: str = 'b.*, f.tags AS tags', where: str = '',
+               params: Tuple = ()) -> Tuple[str, Tuple]:
+    """
+    Construye la consulta de búsqueda (sin LIMIT, para que el llamador pagine).
+
+    Args:
+        spec: tabla a buscar
+        query: texto tal como lo escribe el usuario
+        source: tabla o vista de la que salen las filas (por defecto spec.table)
+        select: columnas a devolver; 'b' es source y 'f' la tabla FTS
+        where: condiciones extra sobre 'b' (p.ej. filtros), unidas con AND
+        params: parámetros de where
+
+    Returns:
+        (sql, parámetros)
+    """
+    source = source or spec.table
+    terms = query.lower().split()
+    name = f'f.{spec.name_column}'
+
+    sql = f'SELECT {select} FROM {spec.fts_table} f JOIN {source} b ON b.id = f.rowid'
+    conditions = []
+    query_params = []
+
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_LENGTH]
+    use_match = bool(long_terms)
+
+    if use_match:
+        conditions.append(f'{spec.fts_table} MATCH ?')
+        query_params.append(_match_expression(long_terms))
+
+    # Demasiado cortos para trigramas: LIKE sobre las columnas FTS (tags
+    # incluidos). Junto a MATCH solo filtran las filas que ya ha dado; solos
+    # recorren la tabla FTS, igual que el antiguo LIKE '%texto%'
+    for term in short_terms:
+        conditions.append('(' + ' OR '.join(
+            f"f.{column} LIKE ? ESCAPE '\\'" for column in spec.fts_columns) + ')')
+        query_params.extend([f'%{_escape_like(term)}%'] * len(spec.fts_columns))
+
+    if where:
+        conditions.append(f'({where})')
+        query_params.extend(params)
+
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+
+    # Exacto > prefijo > BM25 > nombre
+    whole = ' '.join(terms)
+    order = [f'LOWER({name}) = ? DESC', f"{name} LIKE ? ESCAPE '\\' DESC"]
+    query_params.extend([whole, f'{_escape_like(whole)}%'])
+    if use_match:
+        weights = ', '.join(str(weight) for weight in spec.weights)
+        order.append(f'bm25({spec.fts_table}, {weights})')
+    order.append(name)
+    sql += ' ORDER BY ' + ', '.join(order)
+
+    return sql, tuple(query_params)
+
+
+def open_reader(db_path: str) -> sqlite3.Connection:
+    """Conexión de solo lectura para reutilizar entre búsquedas (también desde otros hilos)"""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA temp_store = MEMORY')
+    conn.execute('PRAGMA cache_size = 10000')
+    return conn
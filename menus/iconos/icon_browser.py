@@ -9,117 +9,201 @@ import sqlite3
 import shutil
 import argparse
 import subprocess
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                            QHBoxLayout, QLineEdit, QScrollArea, QLabel,
+                            QHBoxLayout, QLineEdit, QListView, QLabel,
                             QPushButton, QDialog, QTextEdit, QDialogButtonBox,
-                            QGridLayout, QFrame, QMessageBox, QProgressBar,
+                            QAbstractItemView, QMessageBox, QProgressBar,
                             QStatusBar)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread, pyqtSlot
-from PyQt6.QtGui import QPixmap, QIcon, QKeySequence, QShortcut, QFont
+from PyQt6.QtCore import (Qt, QTimer, pyqtSignal, QThread, pyqtSlot, QObject,
+                          QRunnable, QThreadPool, QAbstractListModel, QModelIndex,
+                          QSize)
+from PyQt6.QtGui import QPixmap, QImage, QIcon, QKeySequence, QShortcut, QFont
 from fuzzywuzzy import fuzz
 import yaml
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fts_search import ICONS, ensure_fts, search_sql
 
-class IconItem(QFrame):
-    """Widget individual para mostrar un icono"""
-    clicked = pyqtSignal(str)  # Emite la ruta del archivo
 
-    def __init__(self, icon_data: Dict, tags: List[str] = None):
+PAGE_SIZE = 200            # Filas que se piden a SQLite cada vez que el scroll llega al final
+PIXMAP_CACHE_SIZE = 2000   # Miniaturas que se guardan en memoria (LRU)
+ICON_SIZE = 64
+
+
+class PixmapLoadSignals(QObject):
+    loaded = pyqtSignal(str, QImage)
+
+
+class PixmapLoadTask(QRunnable):
+    """Carga y escala un icono fuera del hilo de la interfaz (QImage, a diferencia de QPixmap, es seguro entre hilos)"""
+
+    def __init__(self, path: str, signals: PixmapLoadSignals):
         super().__init__()
-        self.icon_path = icon_data['path']
-        self.icon_data = icon_data
-        self.tags = tags or []
-        self.is_selected = False
-        self.setup_ui()
+        self.path = path
+        self.signals = signals
 
-    def setup_ui(self):
-        layout = QVBoxLayout()
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        # Imagen del icono
-        self.icon_label = QLabel()
-        self.icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.icon_label.setFixedSize(64, 64)
-        self.icon_label.setScaledContents(True)
-
-        # Cargar imagen
-        pixmap = QPixmap(self.icon_path)
-        if not pixmap.isNull():
-            self.icon_label.setPixmap(pixmap)
-        else:
-            self.icon_label.setText("No img")
+    def run(self):
+        image = QImage(self.path)
+        if not image.isNull():
+            image = image.scaled(ICON_SIZE, ICON_SIZE,
+                                 Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        self.signals.loaded.emit(self.path, image)
 
-        # Nombre del archivo
-        filename = self.icon_data['filename']
-        self.name_label = QLabel(filename)
-        self.name_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.name_label.setWordWrap(True)
 
-        layout.addWidget(self.icon_label)
-        layout.addWidget(self.name_label)
-        self.setLayout(layout)
+class PixmapCache(QObject):
+    """Caché LRU de miniaturas; las que faltan se cargan en un QThreadPool"""
+    loaded = pyqtSignal(str)  # Emite la ruta del icono ya disponible
 
-        # Estilo base
-        self.setFrameStyle(QFrame.Shape.Box)
-        self.setFixedSize(80, 100)
+    def __init__(self, max_items: int = PIXMAP_CACHE_SIZE):
+        super().__init__()
+        self.max_items = max_items
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        self.pool = QThreadPool()
+        self.signals = PixmapLoadSignals()
+        self.signals.loaded.connect(self.on_loaded)
+
+    def get(self, path: str) -> Optional[QPixmap]:
+        """Miniatura en caché o None (y entonces se encola su carga)"""
+        pixmap = self.pixmaps.get(path)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(path)
+            return pixmap
+
+        if path not in self.pending:
+            self.pending.add(path)
+            self.pool.start(PixmapLoadTask(path, self.signals))
+        return None
+
+    def on_loaded(self, path: str, image: QImage):
+        self.pending.discard(path)
+        self.pixmaps[path] = QPixmap.fromImage(image)
+        while len(self.pixmaps) > self.max_items:
+            self.pixmaps.popitem(last=False)
+        self.loaded.emit(path)
+
+    def cancel_pending(self):
+        """Descarta las cargas aún no empezadas (p.ej. al cambiar la búsqueda)"""
+        self.pool.clear()
+        self.pending.clear()
+
+
+class IconListModel(QAbstractListModel):
+    """
+    Resultados de la búsqueda, paginados desde SQLite.
+
+    La vista solo pide datos de las celdas visibles, así que las miniaturas
+    se cargan a medida que aparecen; al llegar al final del scroll,
+    fetchMore trae la siguiente página de PAGE_SIZE iconos.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, pixmaps: PixmapCache):
+        super().__init__()
+        self.conn = conn
+        self.pixmaps = pixmaps
+        self.pixmaps.loaded.connect(self.on_pixmap_loaded)
+
+        self.icons: List[Dict] = []
+        self.row_by_path: Dict[str, int] = {}
+        self.sql = None
+        self.params: Tuple = ()
+        self.total = 0
+        self.exhausted = True
+
+        self.placeholder = QPixmap(ICON_SIZE, ICON_SIZE)
+        self.placeholder.fill(Qt.GlobalColor.transparent)
+
+    def set_query(self, sql: str, params: Tuple = ()):
+        """Cambia la consulta y carga su primera página"""
+        self.pixmaps.cancel_pending()
+        self.beginResetModel()
+        self.sql = sql
+        self.params = params
+        self.icons = []
+        self.row_by_path = {}
+        self.total = self.conn.execute(f'SELECT COUNT(*) FROM ({sql})', params).fetchone()[0]
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.icons)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
 
-        # Tooltip mejorado
-        tooltip_parts = []
-        if self.tags:
-            tooltip_parts.append(f"Tags: {', '.join(self.tags)}")
+        cursor = self.conn.execute(f'{self.sql} LIMIT ? OFFSET ?',
+                                   (*self.params, PAGE_SIZE, len(self.icons)))
+        rows = [dict(row) for row in cursor.fetchall()]
+        if len(rows) < PAGE_SIZE:
+            self.exhausted = True
+        if not rows:
+            return
 
-        if self.icon_data.get('width') and self.icon_data.get('height'):
-            tooltip_parts.append(f"Tamaño: {self.icon_data['width']}x{self.icon_data['height']}")
+        first = len(self.icons)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for offset, icon_data in enumerate(rows):
+            self.row_by_path[icon_data['path']] = first + offset
+        self.icons.extend(rows)
+        self.endInsertRows()
 
-        if self.icon_data.get('format'):
-            tooltip_parts.append(f"Formato: {self.icon_data['format']}")
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        icon_data = self.icons[index.row()]
 
-        tooltip_parts.append(f"Archivo: {filename}")
-        tooltip_parts.append(f"Ruta: {self.icon_path}")
+        if role == Qt.ItemDataRole.DisplayRole:
+            return icon_data['filename']
 
-        self.setToolTip('\n'.join(tooltip_parts))
+        if role == Qt.ItemDataRole.DecorationRole:
+            pixmap = self.pixmaps.get(icon_data['path'])
+            if pixmap is None or pixmap.isNull():
+                return self.placeholder
+            return pixmap
 
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            self.clicked.emit(self.icon_path)
-        super().mousePressEvent(event)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            # Tooltip mejorado
+            tooltip_parts = []
+            tags = self.icon_tags(icon_data)
+            if tags:
+                tooltip_parts.append(f"Tags: {', '.join(tags)}")
 
-    def apply_theme(self, theme_config: Dict):
-        """Aplica el tema al widget"""
-        bg_color = theme_config.get('widget_bg', '#2e2e2e')
-        text_color = theme_config.get('text_color', '#ffffff')
-        border_color = theme_config.get('border_color', '#555555')
-        accent_color = theme_config.get('accent_color', '#0078d4')
+            if icon_data.get('width') and icon_data.get('height'):
+                tooltip_parts.append(f"Tamaño: {icon_data['width']}x{icon_data['height']}")
 
-        if self.is_selected:
-            border_style = f"2px solid {accent_color}"
-            bg_color = theme_config.get('selected_bg', bg_color)
-        else:
-            border_style = f"1px solid {border_color}"
+            if icon_data.get('format'):
+                tooltip_parts.append(f"Formato: {icon_data['format']}")
 
-        self.setStyleSheet(f"""
-            IconItem {{
-                background-color: {bg_color};
-                border: {border_style};
-                border-radius: 4px;
-            }}
-            IconItem:hover {{
-                border: 2px solid {accent_color};
-            }}
-            QLabel {{
-                color: {text_color};
-                background: transparent;
-                border: none;
-            }}
-        """)
+            tooltip_parts.append(f"Archivo: {icon_data['filename']}")
+            tooltip_parts.append(f"Ruta: {icon_data['path']}")
+            return '\n'.join(tooltip_parts)
+
+        return None
 
-    def set_selected(self, selected: bool, theme_config: Dict):
-        """Marca o desmarca el icono como seleccionado"""
-        self.is_selected = selected
-        self.apply_theme(theme_config)
+    @staticmethod
+    def icon_tags(icon_data: Dict) -> List[str]:
+        """Tags que vienen ya en la consulta principal (GROUP_CONCAT)"""
+        return sorted(filter(None, (icon_data.get('tags') or '').split(',')))
+
+    def icon_at(self, row: int) -> Optional[Dict]:
+        if 0 <= row < len(self.icons):
+            return self.icons[row]
+        return None
+
+    def on_pixmap_loaded(self, path: str):
+        row = self.row_by_path.get(path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
 
 
 class TagEditDialog(QDialog):
@@ -202,10 +286,13 @@ class IconBrowser(QMainWindow):
         self.conn.execute('PRAGMA temp_store = MEMORY')
         self.conn.execute('PRAGMA cache_size = 10000')
 
+        # Índice FTS para la búsqueda (se crea la primera vez)
+        ensure_fts(self.conn, ICONS)
+
         # Datos
-        self.filtered_icons = []
         self.theme_config = self.load_theme()
-        self.icon_widgets = []  # Lista de widgets de iconos
+        self.pixmap_cache = PixmapCache()
+        self.icon_model = IconListModel(self.conn, self.pixmap_cache)
         self.current_icon_index = -1  # Índice del icono seleccionado
         self.focus_mode = 'search'  # 'search' o 'icons'
 
@@ -240,20 +327,21 @@ class IconBrowser(QMainWindow):
         # Barra de estado - CORREGIDO: usar statusBar() de QMainWindow
         self.update_status()
 
-        # Área de scroll para los iconos
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.scroll_area.installEventFilter(self)  # Para capturar eventos de teclado
-
-        # Widget contenedor para el grid de iconos
-        self.icons_widget = QWidget()
-        self.icons_layout = QGridLayout(self.icons_widget)
-        self.icons_layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-
-        self.scroll_area.setWidget(self.icons_widget)
-        main_layout.addWidget(self.scroll_area)
+        # Grid virtualizado: solo se pintan (y cargan) las celdas visibles
+        self.icons_view = QListView()
+        self.icons_view.setViewMode(QListView.ViewMode.IconMode)
+        self.icons_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.icons_view.setMovement(QListView.Movement.Static)
+        self.icons_view.setUniformItemSizes(True)
+        self.icons_view.setGridSize(QSize(80, 100))
+        self.icons_view.setIconSize(QSize(ICON_SIZE, ICON_SIZE))
+        self.icons_view.setWordWrap(True)
+        self.icons_view.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.icons_view.setModel(self.icon_model)
+        self.icons_view.clicked.connect(self.on_icon_clicked)
+        self.icons_view.selectionModel().currentChanged.connect(self.on_current_changed)
+        self.icons_view.installEventFilter(self)  # Para capturar eventos de teclado
+        main_layout.addWidget(self.icons_view)
 
         # Timer para búsqueda con delay
         self.search_timer = QTimer()
@@ -273,9 +361,9 @@ class IconBrowser(QMainWindow):
 
             search_text = self.search_edit.text().strip() if hasattr(self, 'search_edit') else ""
             if search_text:
-                status_text = f"Mostrando {len(self.filtered_icons)} iconos (de {total_icons} total, {tagged_icons} con tags)"
+                status_text = f"Mostrando {self.icon_model.total} iconos (de {total_icons} total, {tagged_icons} con tags)"
             else:
-                status_text = f"Mostrando {len(self.filtered_icons)} iconos con tags (de {total_icons} total)"
+                status_text = f"Mostrando {self.icon_model.total} iconos con tags (de {total_icons} total)"
 
             # CORREGIDO: usar statusBar() en lugar de status_bar
             self.statusBar().showMessage(status_text)
@@ -303,90 +391,38 @@ class IconBrowser(QMainWindow):
         """Filtra los iconos según el texto de búsqueda"""
         search_text = self.search_edit.text().strip().lower() if hasattr(self, 'search_edit') else ""
 
+        # Sin LIMIT: el modelo pagina la consulta a medida que se hace scroll
         if not search_text:
             # Sin búsqueda: mostrar solo iconos con tags
-            cursor = self.conn.execute('''
-                SELECT DISTINCT i.* FROM icons i
+            self.icon_model.set_query('''
+                SELECT i.*, GROUP_CONCAT(t.name, ',') as tags FROM icons i
                 JOIN icon_tags it ON i.id = it.icon_id
+                JOIN tags t ON it.tag_id = t.id
+                GROUP BY i.id
                 ORDER BY i.filename
-                LIMIT 200
             ''')
         else:
-            # Con búsqueda: buscar en todos los iconos
-            cursor = self.conn.execute('''
-                SELECT i.*, GROUP_CONCAT(t.name, ',') as tags FROM icons i
-                LEFT JOIN icon_tags it ON i.id = it.icon_id
-                LEFT JOIN tags t ON it.tag_id = t.id
-                WHERE
-                    LOWER(i.filename) LIKE ? OR
-                    LOWER(i.path) LIKE ? OR
-                    EXISTS (
-                        SELECT 1 FROM tags t2
-                        JOIN icon_tags it2 ON t2.id = it2.tag_id
-                        WHERE it2.icon_id = i.id AND LOWER(t2.name) LIKE ?
-                    )
-                GROUP BY i.id
-                ORDER BY i.filename
-                LIMIT 200
-            ''', (f'%{search_text}%', f'%{search_text}%', f'%{search_text}%'))
+            # Con búsqueda: índice FTS de nombre, ruta y tags de todos los iconos
+            self.icon_model.set_query(*search_sql(ICONS, search_text))
 
-        # Convertir resultados a lista de diccionarios
-        self.filtered_icons = []
-        for row in cursor.fetchall():
-            icon_data = dict(row)
-            self.filtered_icons.append(icon_data)
-
-        self.update_icons_display()
-        self.update_status()
-
-    def update_icons_display(self):
-        """Actualiza la visualización de los iconos"""
-        # Limpiar layout existente
-        while self.icons_layout.count():
-            child = self.icons_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
-        # Limpiar lista de widgets
-        self.icon_widgets = []
         self.current_icon_index = -1
 
-        # Agregar iconos filtrados
-        row, col = 0, 0
-        max_cols = 10
-
-        for icon_data in self.filtered_icons:
-            # Obtener tags del icono
-            tags = self.get_icon_tags(icon_data['id'])
-
-            # Crear widget del icono
-            icon_item = IconItem(icon_data, tags)
-            icon_item.clicked.connect(self.on_icon_clicked)
-            icon_item.apply_theme(self.theme_config)
-
-            self.icons_layout.addWidget(icon_item, row, col)
-            self.icon_widgets.append(icon_item)
-
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
-
         # Seleccionar el primer icono si hay iconos
-        if self.icon_widgets and self.focus_mode == 'icons':
+        if self.icon_model.rowCount() and self.focus_mode == 'icons':
             self.select_icon(0)
 
-        # Actualizar la UI
-        self.icons_widget.update()
+        self.update_status()
 
-    def on_icon_clicked(self, icon_path: str):
+    def on_icon_clicked(self, index: QModelIndex):
         """Maneja el clic en un icono"""
-        self.selected_icon = icon_path
-        # Encontrar el índice del icono clickeado
-        for i, widget in enumerate(self.icon_widgets):
-            if widget.icon_path == icon_path:
-                self.select_icon(i)
-                break
+        self.select_icon(index.row())
+
+    def on_current_changed(self, current: QModelIndex, previous: QModelIndex):
+        """Mantiene el icono seleccionado al moverse con el teclado o el ratón"""
+        icon_data = self.icon_model.icon_at(current.row())
+        if icon_data:
+            self.current_icon_index = current.row()
+            self.selected_icon = icon_data['path']
 
     def copy_to_clipboard(self, text: str) -> bool:
         """Copia texto al clipboard usando diferentes métodos según la plataforma"""
@@ -587,6 +623,8 @@ class IconBrowser(QMainWindow):
 
     def closeEvent(self, event):
         """Maneja el cierre de la aplicación"""
+        self.pixmap_cache.cancel_pending()
+        self.pixmap_cache.pool.waitForDone()
         if hasattr(self, 'conn'):
             self.conn.close()
         event.accept()
@@ -783,35 +821,18 @@ class IconBrowser(QMainWindow):
                 self.toggle_focus_mode()
                 return True
 
-            # Si estamos en modo iconos, manejar navegación
-            if self.focus_mode == 'icons' and self.icon_widgets:
-                if key == Qt.Key.Key_Up:
-                    self.navigate_icons(-10)  # Fila anterior
-                    return True
-                elif key == Qt.Key.Key_Down:
-                    self.navigate_icons(10)  # Fila siguiente
-                    return True
-                elif key == Qt.Key.Key_Left:
-                    self.navigate_icons(-1)  # Icono anterior
-                    return True
-                elif key == Qt.Key.Key_Right:
-                    self.navigate_icons(1)  # Icono siguiente
-                    return True
-                elif key == Qt.Key.Key_Home:
-                    self.select_icon(0)  # Primer icono
-                    return True
-                elif key == Qt.Key.Key_End:
-                    self.select_icon(len(self.icon_widgets) - 1)  # Último icono
-                    return True
-                elif key == Qt.Key.Key_Return or key == Qt.Key.Key_Enter:
+            # Si estamos en modo iconos, la vista se encarga de flechas, Inicio y Fin
+            if self.focus_mode == 'icons' and self.icon_model.rowCount():
+                if key == Qt.Key.Key_Return or key == Qt.Key.Key_Enter:
                     self.copy_selected_path()
                     return True
 
             # Si estamos en búsqueda y presionamos Enter
             elif self.focus_mode == 'search' and (key == Qt.Key.Key_Return or key == Qt.Key.Key_Enter):
-                if self.icon_widgets:
+                if self.icon_model.rowCount():
                     self.focus_mode = 'icons'
                     self.select_icon(0)
+                    self.icons_view.setFocus()
                     self.update_focus_style()
                 return True
 
@@ -820,11 +841,11 @@ class IconBrowser(QMainWindow):
     def toggle_focus_mode(self):
         """Cambia entre modo búsqueda e iconos"""
         if self.focus_mode == 'search':
-            if self.icon_widgets:
+            if self.icon_model.rowCount():
                 self.focus_mode = 'icons'
                 if self.current_icon_index == -1:
                     self.select_icon(0)
-                self.scroll_area.setFocus()
+                self.icons_view.setFocus()
         else:
             self.focus_mode = 'search'
             self.search_edit.setFocus()
@@ -856,38 +877,24 @@ class IconBrowser(QMainWindow):
                 }}
             """)
 
-    def navigate_icons(self, delta: int):
-        """Navega entre iconos usando un delta"""
-        if not self.icon_widgets:
-            return
-
-        new_index = self.current_icon_index + delta
-
-        # Asegurar que el índice esté en rango
-        new_index = max(0, min(new_index, len(self.icon_widgets) - 1))
-
-        self.select_icon(new_index)
-
     def select_icon(self, index: int):
         """Selecciona un icono por índice"""
-        if not self.icon_widgets or index < 0 or index >= len(self.icon_widgets):
+        icon_data = self.icon_model.icon_at(index)
+        if not icon_data:
             return
 
-        # Deseleccionar icono anterior
-        if 0 <= self.current_icon_index < len(self.icon_widgets):
-            self.icon_widgets[self.current_icon_index].set_selected(False, self.theme_config)
-
-        # Seleccionar nuevo icono
         self.current_icon_index = index
-        selected_widget = self.icon_widgets[index]
-        selected_widget.set_selected(True, self.theme_config)
-        self.selected_icon = selected_widget.icon_path
+        self.selected_icon = icon_data['path']
 
-        # Asegurar que el icono esté visible
-        self.scroll_area.ensureWidgetVisible(selected_widget)
+        # Seleccionar y asegurar que el icono esté visible
+        model_index = self.icon_model.index(index)
+        self.icons_view.setCurrentIndex(model_index)
+        self.icons_view.scrollTo(model_index)
 
     def apply_theme(self):
         """Aplica el tema a la interfaz"""
+        widget_bg = self.theme_config.get('widget_bg', '#2e2e2e')
+        border_color = self.theme_config.get('border_color', '#555555')
         style = f"""
             QMainWindow {{
                 background-color: {self.theme_config['bg_color']};
@@ -904,13 +911,28 @@ class IconBrowser(QMainWindow):
             QLineEdit:focus {{
                 border-color: {self.theme_config['accent_color']};
             }}
-            QScrollArea {{
+            QWidget {{
+                background-color: {self.theme_config['bg_color']};
+                color: {self.theme_config['text_color']};
+            }}
+            QListView {{
                 background-color: {self.theme_config['bg_color']};
                 border: none;
+                outline: none;
             }}
-            QWidget {{
-                background-color: {self.theme_config['bg_color']};
+            QListView::item {{
+                background-color: {widget_bg};
+                border: 1px solid {border_color};
+                border-radius: 4px;
+                margin: 2px;
+            }}
+            QListView::item:hover {{
+                border: 2px solid {self.theme_config['accent_color']};
+            }}
+            QListView::item:selected {{
+                background-color: {self.theme_config.get('selected_bg', widget_bg)};
                 color: {self.theme_config['text_color']};
+                border: 2px solid {self.theme_config['accent_color']};
             }}
         """
         self.setStyleSheet(style)
@@ -3,9 +3,12 @@
 Icon Indexer - Indexa todos los iconos del sistema en una base de datos SQLite
 """
 
+import os
+import re
+import sys
+import struct
 import sqlite3
 import json
-import hashlib
 import argparse
 from pathlib import Path
 from typing import List, Dict, Optional
@@ -13,12 +16,144 @@ from datetime import datetime
 import yaml
 from PIL import Image
 import mimetypes
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from file_changes import ChangeDetector, ensure_signature_columns, fast_hash, upsert_sql, walk_files
+from fts_search import ICONS, ensure_fts
+
+# UPSERT y no INSERT OR REPLACE: conserva el id y las etiquetas/categorías (ON DELETE CASCADE)
+ICONS_UPSERT = upsert_sql('icons', (
+    'path', 'filename', 'directory', 'size_bytes', 'width', 'height', 'format', 'hash',
+    'last_modified', 'updated_at', 'mtime_ns', 'inode'
+))
+
+HEADER_BYTES = 4096  # Lo que se lee de cada icono para sacar formato y dimensiones
+POOL_MIN_FILES = 64  # Con menos iconos cambiados no compensa arrancar procesos
+
+SVG_LENGTH_RE = re.compile(r'^\s*([\d.]+)\s*(px)?\s*$')
+SVG_ATTR_RE = re.compile(r'\b(width|height|viewBox)\s*=\s*["\']([^"\']*)["\']')
+XPM_VALUES_RE = re.compile(rb'"\s*(\d+)\s+(\d+)\s+\d+\s+\d+')
+
+
+def _svg_size(head: bytes):
+    """width/height del elemento <svg> raíz (o su viewBox); None si son relativos"""
+    text = head.decode('utf-8', errors='ignore')
+    start = text.find('<svg')
+    if start == -1:
+        return None, None
+    end = text.find('>', start)
+    attrs = dict(SVG_ATTR_RE.findall(text[start:end if end != -1 else len(text)]))
+
+    width = SVG_LENGTH_RE.match(attrs.get('width', ''))
+    height = SVG_LENGTH_RE.match(attrs.get('height', ''))
+    if width and height:
+        return round(float(width.group(1))), round(float(height.group(1)))
+
+    view_box = attrs.get('viewBox', '').replace(',', ' ').split()
+    if len(view_box) == 4:
+        try:
+            return round(float(view_box[2])), round(float(view_box[3]))
+        except ValueError:
+            pass
+    return None, None
+
+
+def read_image_header(file_path: str) -> Dict:
+    """
+    Formato y dimensiones leyendo solo la cabecera del archivo.
+
+    PNG (IHDR), GIF, BMP, ICO, XPM y SVG (atributos del <svg> raíz) se
+    resuelven con los primeros HEADER_BYTES; el resto (JPEG, WebP, TIFF,
+    TGA) con Image.open, que tampoco decodifica la imagen.
+    """
+    info = {
+        'width': None,
+        'height': None,
+        'format': None
+    }
+
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(HEADER_BYTES)
+
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+            info['width'], info['height'] = struct.unpack('>II', head[16:24])
+            info['format'] = 'PNG'
+            return info
+
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            info['width'], info['height'] = struct.unpack('<HH', head[6:10])
+            info['format'] = 'GIF'
+            return info
+
+        if head.startswith(b'BM') and len(head) >= 26:
+            width, height = struct.unpack('<ii', head[18:26])
+            info['width'], info['height'] = width, abs(height)
+            info['format'] = 'BMP'
+            return info
+
+        if head.startswith(b'\x00\x00\x01\x00') and len(head) >= 8:
+            # Primera imagen del ICO; 0 significa 256
+            info['width'] = head[6] or 256
+            info['height'] = head[7] or 256
+            info['format'] = 'ICO'
+            return info
+
+        if file_path.lower().endswith('.svg'):
+            info['width'], info['height'] = _svg_size(head)
+            info['format'] = 'SVG'
+            return info
+
+        if head.startswith(b'/* XPM */'):
+            match = XPM_VALUES_RE.search(head)
+            if match:
+                info['width'], info['height'] = int(match.group(1)), int(match.group(2))
+            info['format'] = 'XPM'
+            return info
+
+        # Para otros formatos, usar PIL (solo lee la cabecera)
+        try:
+            with Image.open(file_path) as img:
+                info['width'] = img.width
+                info['height'] = img.height
+                info['format'] = img.format
+                return info
+        except Exception:
+            # Si PIL falla, intentar con información básica del archivo
+            pass
+
+    except Exception:
+        # Error general al acceder al archivo
+        pass
+
+    # Fallback: usar mimetypes para al menos determinar el formato
+    try:
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if mime_type and mime_type.startswith('image/'):
+            info['format'] = mime_type.split('/')[-1].upper()
+    except Exception:
+        # Si todo falla, usar la extensión del archivo
+        suffix = os.path.splitext(file_path)[1]
+        info['format'] = suffix[1:].upper() if suffix else 'UNKNOWN'
+
+    return info
+
+
+def _read_icon(task):
+    """Tarea del pool: (ruta, hash, info de la imagen, error)"""
+    path, known_hash = task
+    try:
+        return path, known_hash or fast_hash(path), read_image_header(path), None
+    except Exception as e:
+        return path, None, None, str(e)
+
 
 
 class IconIndexer:
     """Indexador de iconos para base de datos SQLite"""
 
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, workers: Optional[int] = None):
         self.script_dir = Path(__file__).parent
         self.db_path = db_path or (self.script_dir / 'icons.db')
         self.config_file = self.script_dir / 'config.yaml'
@@ -30,6 +165,10 @@ class IconIndexer:
             '.gif', '.xpm', '.webp', '.tiff', '.tga'
         }
 
+        # Procesos para leer los iconos (por defecto, uno por CPU)
+        self.workers = workers
+
+        self.changes = None
         self.setup_database()
 
     def setup_database(self):
@@ -52,9 +191,12 @@ class IconIndexer:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_modified TIMESTAMP,
-                is_valid BOOLEAN DEFAULT 1
+                is_valid BOOLEAN DEFAULT 1,
+                mtime_ns INTEGER,
+                inode INTEGER
             )
         ''')
+        ensure_signature_columns(self.conn, 'icons')
 
         # Tabla de tags
         self.conn.execute('''
@@ -95,9 +237,12 @@ class IconIndexer:
             LEFT JOIN tags t ON it.tag_id = t.id
             GROUP BY i.id, i.path, i.filename, i.directory, i.size_bytes,
                      i.width, i.height, i.format, i.hash, i.created_at,
-                     i.updated_at, i.last_modified, i.is_valid
+                     i.updated_at, i.last_modified, i.is_valid, i.mtime_ns, i.inode
         ''')
 
+        # Índice FTS de búsqueda, sincronizado por triggers
+        ensure_fts(self.conn, ICONS)
+
         self.conn.commit()
 
     def get_icon_folders(self) -> List[Path]:
@@ -158,90 +303,36 @@ class IconIndexer:
         return existing_folders
 
     def get_file_hash(self, file_path: Path) -> str:
-        """Calcula el hash MD5 de un archivo"""
-        try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except (IOError, OSError):
-            return ""
+        """Calcula un hash rápido (no criptográfico) de un archivo"""
+        return fast_hash(str(file_path))
 
     def get_image_info(self, file_path: Path) -> Dict:
         """Obtiene información de la imagen"""
-        info = {
-            'width': None,
-            'height': None,
-            'format': None
-        }
+        return read_image_header(str(file_path))
 
-        try:
-            # Para SVG, intentar parsear básicamente
-            if file_path.suffix.lower() == '.svg':
-                info['format'] = 'SVG'
-                # Podríamos parsear el SVG para obtener dimensiones, pero es complejo
-                # Por ahora dejamos las dimensiones como None
-                return info
+    def get_change_detector(self) -> ChangeDetector:
+        """Firmas (tamaño, mtime_ns, inodo) de todos los iconos, cargadas una sola vez"""
+        if self.changes is None:
+            self.changes = ChangeDetector(self.conn, 'icons')
+        return self.changes
 
-            # Para otros formatos, usar PIL
-            try:
-                with Image.open(file_path) as img:
-                    info['width'] = img.width
-                    info['height'] = img.height
-                    info['format'] = img.format
-                    return info
-            except Exception as pil_error:
-                # Si PIL falla, intentar con información básica del archivo
-                pass
-
-        except Exception as e:
-            # Error general al acceder al archivo
-            pass
-
-        # Fallback: usar mimetypes para al menos determinar el formato
-        try:
-            mime_type, _ = mimetypes.guess_type(str(file_path))
-            if mime_type and mime_type.startswith('image/'):
-                info['format'] = mime_type.split('/')[-1].upper()
-        except Exception:
-            # Si todo falla, usar la extensión del archivo
-            info['format'] = file_path.suffix[1:].upper() if file_path.suffix else 'UNKNOWN'
-
-        return info
-
-    def is_icon_changed(self, file_path: Path) -> bool:
+    def is_icon_changed(self, file_path: Path, stat: Optional[os.stat_result] = None) -> bool:
         """Verifica si un icono ha cambiado desde la última indexación"""
-        cursor = self.conn.execute(
-            'SELECT last_modified, hash FROM icons WHERE path = ?',
-            (str(file_path),)
-        )
-        result = cursor.fetchone()
-
-        if not result:
-            return True  # Archivo nuevo
+        stat = stat or file_path.stat()
+        return self.get_change_detector().is_changed(str(file_path), stat)
 
-        db_modified, db_hash = result
-        file_modified = datetime.fromtimestamp(file_path.stat().st_mtime)
-
-        # Comparar por fecha de modificación primero (más rápido)
-        if db_modified != file_modified.isoformat():
-            return True
-
-        # Si las fechas coinciden, comparar hash para estar seguros
-        current_hash = self.get_file_hash(file_path)
-        return current_hash != db_hash
-
-    def index_file(self, file_path: Path, force_update: bool = False) -> bool:
+    def index_file(self, file_path: Path, force_update: bool = False,
+                   stat: Optional[os.stat_result] = None) -> bool:
         """Indexa un archivo de icono individual"""
         try:
+            # Obtener información del archivo
+            stat = stat or file_path.stat()
+
             # Verificar si el archivo ha cambiado
-            if not force_update and not self.is_icon_changed(file_path):
+            if not force_update and not self.is_icon_changed(file_path, stat):
                 return False  # No necesita actualización
 
-            # Obtener información del archivo
-            stat = file_path.stat()
-            hash_value = self.get_file_hash(file_path)
+            hash_value = self.get_change_detector().file_hash(str(file_path))
             image_info = self.get_image_info(file_path)
 
             # Preparar datos
@@ -255,19 +346,19 @@ class IconIndexer:
                 'format': image_info['format'],
                 'hash': hash_value,
                 'last_modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'updated_at': datetime.now().isoformat()
+                'updated_at': datetime.now().isoformat(),
+                'mtime_ns': stat.st_mtime_ns,
+                'inode': stat.st_ino
             }
 
             # Insertar o actualizar en la base de datos
-            self.conn.execute('''
-                INSERT OR REPLACE INTO icons
-                (path, filename, directory, size_bytes, width, height, format, hash, last_modified, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.conn.execute(ICONS_UPSERT, (
                 data['path'], data['filename'], data['directory'],
                 data['size_bytes'], data['width'], data['height'],
-                data['format'], data['hash'], data['last_modified'], data['updated_at']
+                data['format'], data['hash'], data['last_modified'], data['updated_at'],
+                data['mtime_ns'], data['inode']
             ))
+            self.get_change_detector().record(data['path'], stat, hash_value)
 
             return True
 
@@ -276,8 +367,14 @@ class IconIndexer:
             return False
 
     def index_directory(self, directory: Path, recursive: bool = True,
-                       progress_callback=None) -> Dict[str, int]:
-        """Indexa todos los iconos en un directorio"""
+                       progress_callback=None, force_update: bool = False) -> Dict[str, int]:
+        """
+        Indexa todos los iconos en un directorio
+
+        Los iconos sin cambios se descartan por firma (solo stat). Los demás se
+        leen en un pool de procesos (hash + cabecera de la imagen) y se guardan
+        todos con un único executemany en una transacción.
+        """
         stats = {'indexed': 0, 'updated': 0, 'errors': 0, 'skipped': 0}
 
         if not directory.exists() or not directory.is_dir():
@@ -288,17 +385,11 @@ class IconIndexer:
 
         # Obtener todos los archivos de imagen
         files_to_process = []
-        pattern = "**/*" if recursive else "*"
 
         print("Buscando archivos de imagen...")
-        try:
-            for file_path in directory.glob(pattern):
-                if (file_path.is_file() and
-                    file_path.suffix.lower() in self.supported_extensions):
-                    files_to_process.append(file_path)
-        except (PermissionError, OSError) as e:
-            print(f"Error accediendo a {directory}: {e}")
-            return stats
+        for path, stat in walk_files(str(directory), recursive):
+            if os.path.splitext(path)[1].lower() in self.supported_extensions:
+                files_to_process.append((path, stat))
 
         total_files = len(files_to_process)
         print(f"Encontrados {total_files} archivos de imagen")
@@ -306,32 +397,65 @@ class IconIndexer:
         if total_files == 0:
             return stats
 
-        # Procesar archivos
-        for i, file_path in enumerate(files_to_process):
-            try:
-                if self.index_file(file_path):
-                    stats['updated'] += 1
-                else:
-                    stats['skipped'] += 1
-
-                stats['indexed'] += 1
-
-                # Callback de progreso
-                if progress_callback:
-                    progress_callback(i + 1, total_files, file_path)
-                elif (i + 1) % 50 == 0:  # Mostrar progreso cada 50 archivos
-                    print(f"Procesados {i + 1}/{total_files} archivos... ({((i + 1) / total_files) * 100:.1f}%)")
-
-                # Commit cada 100 archivos para mejorar rendimiento
-                if (i + 1) % 100 == 0:
-                    self.conn.commit()
-
-            except Exception as e:
-                stats['errors'] += 1
-                print(f"Error procesando {file_path}: {e}")
+        def report(done, path):
+            # Callback de progreso
+            if progress_callback:
+                progress_callback(done, total_files, Path(path))
+            elif done % 500 == 0:  # Mostrar progreso cada 500 archivos
+                print(f"Procesados {done}/{total_files} archivos... ({(done / total_files) * 100:.1f}%)")
+
+        # Descartar por firma los iconos sin cambios
+        changes = self.get_change_detector()
+        stats_by_path = {}
+        tasks = []
+        done = 0
+        for path, stat in files_to_process:
+            if force_update or changes.is_changed(path, stat):
+                stats_by_path[path] = stat
+                tasks.append((path, changes.hashes.pop(path, None)))
+            else:
+                stats['skipped'] += 1
+                done += 1
+                report(done, path)
+
+        # Hash y cabeceras en paralelo
+        if len(tasks) >= POOL_MIN_FILES:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+            results = executor.map(_read_icon, tasks, chunksize=64)
+        else:
+            executor = None
+            results = map(_read_icon, tasks)
 
-        # Commit final para este directorio
-        self.conn.commit()
+        rows = []
+        updated_at = datetime.now().isoformat()
+        try:
+            for path, hash_value, image_info, error in results:
+                done += 1
+                if error:
+                    stats['errors'] += 1
+                    print(f"Error procesando {path}: {error}")
+                else:
+                    stat = stats_by_path[path]
+                    changes.record(path, stat, hash_value)
+                    rows.append((
+                        path, os.path.basename(path), os.path.dirname(path),
+                        stat.st_size, image_info['width'], image_info['height'],
+                        image_info['format'], hash_value,
+                        datetime.fromtimestamp(stat.st_mtime).isoformat(), updated_at,
+                        stat.st_mtime_ns, stat.st_ino
+                    ))
+                report(done, path)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        # Una sola transacción para todo el directorio
+        with self.conn:
+            self.conn.executemany(ICONS_UPSERT, rows)
+            changes.flush()
+
+        stats['updated'] = len(rows)
+        stats['indexed'] = stats['updated'] + stats['skipped']
         print(f"Completado {directory}: {stats['updated']} actualizados, {stats['skipped']} sin cambios, {stats['errors']} errores")
 
         return stats
@@ -469,7 +593,7 @@ class IconIndexer:
 
         # Indexar cada carpeta
         for folder in folders:
-            stats = self.index_directory(folder, recursive=True)
+            stats = self.index_directory(folder, recursive=True, force_update=force)
             for key in total_stats:
                 total_stats[key] += stats[key]
 
@@ -508,10 +632,12 @@ def main():
                        help='Ruta personalizada para la base de datos')
     parser.add_argument('--stats', '-s', action='store_true',
                        help='Mostrar solo estadísticas')
+    parser.add_argument('--workers', '-w', type=int,
+                       help='Procesos para leer los iconos (por defecto, uno por CPU)')
 
     args = parser.parse_args()
 
-    indexer = IconIndexer(args.db)
+    indexer = IconIndexer(args.db, workers=args.workers)
 
     try:
         if args.stats:
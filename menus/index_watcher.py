@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Index Watcher - Reindexado en vivo de iconos, scripts y dotfiles
+
+Servicio opcional que mantiene al día icons.db, scripts.db y dotfiles.db sin
+pasadas completas: se suscribe a inotify (vía watchdog) en las carpetas que
+ya usa cada indexador y aplica los cambios archivo a archivo. Los eventos se
+agrupan por ruta y se aplican cuando la ruta lleva DEBOUNCE_SECONDS quieta,
+así que un guardado que genera varios eventos acaba en un solo upsert.
+index_file de cada indexador escribe con INSERT ... ON CONFLICT(path) DO
+UPDATE (file_changes.upsert_sql), que conserva el id de la fila y con él sus
+etiquetas y categorías; un INSERT OR REPLACE las borraría en cascada en cada
+guardado.
+
+Las carpetas en sistemas de archivos de red (NFS, SMB, sshfs...), donde
+inotify no ve los cambios hechos desde otras máquinas, y las que no se pueden
+vigilar (watchdog no instalado o límite de watches agotado) se revisan con
+un barrido periódico por mtime.
+
+Uso:
+    python index_watcher.py                      # los tres índices
+    python index_watcher.py --only icons scripts
+    python index_watcher.py --poll               # solo barridos periódicos
+
+Dependencies: watchdog (opcional), más las de cada indexador
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+
+MENUS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(MENUS_DIR))
+for subdir in ('iconos', 'scripts', 'dotfiles'):
+    sys.path.insert(0, str(MENUS_DIR / subdir))
+
+from file_changes import walk_files
+
+DEBOUNCE_SECONDS = 1.0      # Tiempo sin eventos antes de aplicar los cambios de una ruta
+SWEEP_INTERVAL = 300        # Segundos entre barridos de las carpetas sin inotify
+TICK_SECONDS = 0.5
+
+NETWORK_FILESYSTEMS = {
+    'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'fuse.sshfs', 'sshfs', '9p',
+    'afs', 'ceph', 'glusterfs', 'fuse.glusterfs', 'fuse.rclone', 'davfs', 'fuse.davfs2',
+}
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+SWEEP = 'sweep'
+
+
+def filesystem_type(path: Path) -> str:
+    """Tipo de sistema de archivos del punto de montaje que contiene la ruta"""
+    best_mount, best_type = '', ''
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                path_str = str(path)
+                if (path_str == mount_point or path_str.startswith(mount_point.rstrip('/') + '/')) \
+                        and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        pass
+    return best_type
+
+
+def is_network_path(path: Path) -> bool:
+    return filesystem_type(path) in NETWORK_FILESYSTEMS
+
+
+def outermost_roots(roots: Iterable[Path]) -> List[Path]:
+    """Quita las carpetas que ya están dentro de otra (p.ej. /usr/share/icons/hicolor)"""
+    resolved = sorted({Path(os.path.abspath(root)) for root in roots}, key=lambda p: len(p.parts))
+    result = []
+    for root in resolved:
+        if not any(root == parent or parent in root.parents for parent in result):
+            result.append(root)
+    return result
+
+
+class WatchedIndex:
+    """Un indexador existente más lo necesario para aplicarle cambios sueltos"""
+
+    def __init__(self, name: str, indexer, table: str, roots: List[Path],
+                 accepts: Callable[[str], bool],
+                 skip_dir: Optional[Callable[[str, str], bool]] = None):
+        self.name = name
+        self.indexer = indexer
+        self.table = table
+        self.roots = outermost_roots(roots)
+        self.accepts = accepts
+        self.skip_dir = skip_dir
+
+    def is_skipped(self, path: str, is_dir: bool = False) -> bool:
+        """True si alguna carpeta de la ruta (o la propia ruta, si es carpeta) está excluida"""
+        if not self.skip_dir:
+            return False
+        folders = list(Path(path).parents)
+        if is_dir:
+            folders.insert(0, Path(path))
+        for parent in folders:
+            if parent in self.roots:
+                return False
+            if self.skip_dir(parent.name, str(parent)):
+                return True
+        return False
+
+    def wants(self, path: str) -> bool:
+        return self.accepts(path) and not self.is_skipped(path)
+
+    def apply(self, actions: Dict[str, str]) -> Dict[str, int]:
+        """Aplica upserts y borrados en una sola transacción"""
+        stats = {'updated': 0, 'removed': 0}
+        changes = self.indexer.get_change_detector()
+        conn = self.indexer.conn
+        removed = []
+        folders = []
+
+        for path, action in actions.items():
+            if action == UPSERT:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    action = DELETE  # Ya no existe: se borró antes de aplicar el cambio
+                else:
+                    # Upsert ON CONFLICT: la fila conserva su id y sus etiquetas
+                    if self.indexer.index_file(Path(path), stat=stat):
+                        stats['updated'] += 1
+
+            if action == DELETE:
+                if path in changes.known:
+                    removed.append((path,))
+                else:
+                    folders.append(path.rstrip(os.sep) + os.sep)  # Carpeta completa
+
+        # Una sola pasada por las firmas para todas las carpetas borradas
+        if folders:
+            prefixes = tuple(folders)
+            removed.extend((path,) for path in changes.known if path.startswith(prefixes))
+
+        for (path,) in removed:
+            changes.forget(path)
+
+        if removed:
+            conn.executemany(f'DELETE FROM {self.table} WHERE path = ?', removed)
+            stats['removed'] = len(removed)
+
+        changes.flush()
+        conn.commit()
+        return stats
+
+    def sweep(self, root: Path) -> Dict[str, str]:
+        """Compara una carpeta con el índice por firma (stat) y devuelve las acciones pendientes"""
+        changes = self.indexer.get_change_detector()
+        actions = {}
+        seen = set()
+
+        for path, stat in walk_files(str(root), True, skip_dir=self.skip_dir):
+            if not self.accepts(path):
+                continue
+            seen.add(path)
+            if changes.is_changed(path, stat):
+                actions[path] = UPSERT
+
+        prefix = str(root).rstrip(os.sep) + os.sep
+        for path in changes.known:
+            if path.startswith(prefix) and path not in seen:
+                actions[path] = DELETE
+
+        # Firmas refrescadas sin cambios de contenido (touch, copias...)
+        changes.flush()
+        self.indexer.conn.commit()
+        return actions
+
+
+class EventQueue:
+    """Cambios pendientes por (índice, ruta); el último evento de cada ruta gana"""
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self.lock = threading.Lock()
+        self.pending = {}  # (índice, ruta) -> (acción, hora del último evento)
+
+    def push(self, index: WatchedIndex, path: str, action: str):
+        with self.lock:
+            self.pending[(index.name, path)] = (action, time.monotonic())
+
+    def pop_ready(self) -> Dict[str, Dict[str, str]]:
+        """Rutas que llevan `debounce` segundos sin eventos, agrupadas por índice"""
+        now = time.monotonic()
+        ready = {}
+        with self.lock:
+            for key, (action, stamp) in list(self.pending.items()):
+                if now - stamp >= self.debounce:
+                    del self.pending[key]
+                    name, path = key
+                    ready.setdefault(name, {})[path] = action
+        return ready
+
+
+class IndexEventHandler(FileSystemEventHandler):
+    """Traduce los eventos de watchdog a acciones en la cola (se ejecuta en el hilo del observer)"""
+
+    def __init__(self, index: WatchedIndex, queue: EventQueue):
+        super().__init__()
+        self.index = index
+        self.queue = queue
+
+    def _file_changed(self, path: str):
+        if self.index.wants(path):
+            self.queue.push(self.index, path, UPSERT)
+
+    def on_created(self, event):
+        if event.is_directory:
+            # Una carpeta movida desde fuera llega como un solo evento: barrerla
+            if not self.index.is_skipped(event.src_path, is_dir=True):
+                self.queue.push(self.index, event.src_path, SWEEP)
+        else:
+            self._file_changed(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._file_changed(event.src_path)
+
+    def on_closed(self, event):
+        self._file_changed(event.src_path)
+
+    def on_deleted(self, event):
+        if event.is_directory or self.index.wants(event.src_path):
+            self.queue.push(self.index, event.src_path, DELETE)
+
+    def on_moved(self, event):
+        if event.is_directory or self.index.wants(event.src_path):
+            self.queue.push(self.index, event.src_path, DELETE)
+        if event.is_directory:
+            self.queue.push(self.index, event.dest_path, SWEEP)
+        else:
+            self._file_changed(event.dest_path)
+
+
+class IndexWatcher:
+    """Bucle principal: vigila las carpetas y aplica los cambios a cada índice"""
+
+    def __init__(self, indexes: List[WatchedIndex], debounce: float = DEBOUNCE_SECONDS,
+                 sweep_interval: int = SWEEP_INTERVAL, poll_only: bool = False):
+        self.indexes = {index.name: index for index in indexes}
+        self.queue = EventQueue(debounce)
+        self.sweep_interval = sweep_interval
+        self.observer = None
+        self.polled = []  # (índice, carpeta) que se revisan por barrido
+
+        use_inotify = WATCHDOG_AVAILABLE and not poll_only
+        if not WATCHDOG_AVAILABLE and not poll_only:
+            print("⚠️  watchdog no está instalado, se usarán barridos periódicos (pip install watchdog)")
+
+        if use_inotify:
+            self.observer = Observer()
+
+        for index in indexes:
+            for root in index.roots:
+                if not use_inotify:
+                    self.polled.append((index, root))
+                elif is_network_path(root):
+                    print(f"🌐 {index.name}: {root} está en red, se revisará cada {sweep_interval}s")
+                    self.polled.append((index, root))
+                else:
+                    try:
+                        self.observer.schedule(IndexEventHandler(index, self.queue), str(root),
+                                               recursive=True)
+                        print(f"👁️  {index.name}: vigilando {root}")
+                    except OSError as e:
+                        # Normalmente fs.inotify.max_user_watches agotado
+                        print(f"⚠️  {index.name}: no se puede vigilar {root} ({e}), se usarán barridos")
+                        self.polled.append((index, root))
+
+    def sweep_polled(self):
+        for index, root in self.polled:
+            for path, action in index.sweep(root).items():
+                self.queue.push(index, path, action)
+
+    def apply_ready(self):
+        for name, actions in self.queue.pop_ready().items():
+            index = self.indexes[name]
+
+            # Las carpetas nuevas o movidas se convierten en acciones por archivo
+            for path in [p for p, action in actions.items() if action == SWEEP]:
+                del actions[path]
+                if os.path.isdir(path):
+                    actions.update(index.sweep(Path(path)))
+
+            if not actions:
+                continue
+            try:
+                stats = index.apply(actions)
+                if stats['updated'] or stats['removed']:
+                    print(f"🔄 {name}: {stats['updated']} actualizados, {stats['removed']} eliminados")
+            except Exception as e:
+                index.indexer.conn.rollback()
+                print(f"❌ {name}: error aplicando cambios: {e}")
+
+    def run(self):
+        if self.observer:
+            self.observer.start()
+
+        # Barrido inicial de las carpetas sin inotify para partir de un índice al día
+        self.sweep_polled()
+        next_sweep = time.monotonic() + self.sweep_interval
+
+        try:
+            while True:
+                time.sleep(TICK_SECONDS)
+                self.apply_ready()
+                if self.polled and time.monotonic() >= next_sweep:
+                    self.sweep_polled()
+                    next_sweep = time.monotonic() + self.sweep_interval
+        except KeyboardInterrupt:
+            print("\nDeteniendo watcher...")
+        finally:
+            if self.observer:
+                self.observer.stop()
+                self.observer.join()
+            # Lo que quede pendiente se aplica antes de salir
+            self.queue.debounce = 0
+            self.apply_ready()
+            for index in self.indexes.values():
+                index.indexer.close()
+
+
+def icons_index() -> WatchedIndex:
+    from icon_indexer import IconIndexer
+    indexer = IconIndexer()
+    return WatchedIndex(
+        'icons', indexer, 'icons', indexer.get_icon_folders(),
+        accepts=lambda path: os.path.splitext(path)[1].lower() in indexer.supported_extensions
+    )
+
+
+def scripts_index() -> WatchedIndex:
+    from fuzzy_scripts_indexer import ScriptIndexer
+    indexer = ScriptIndexer()
+    return WatchedIndex(
+        'scripts', indexer, 'scripts', indexer.get_script_folders(),
+        accepts=lambda path: os.path.splitext(path)[1].lower() in indexer.supported_extensions,
+        skip_dir=lambda name, _: name in indexer.excluded_folders
+    )
+
+
+def dotfiles_index() -> WatchedIndex:
+    from dotfiles_indexer import DotfilesIndexer
+    indexer = DotfilesIndexer()
+    return WatchedIndex(
+        'dotfiles', indexer, 'dotfiles', [p for p in indexer.search_paths if p.is_dir()],
+        accepts=lambda path: not indexer.should_exclude_path(Path(path)),
+        skip_dir=lambda _, path: indexer.should_exclude_path(Path(path))
+    )
+
+
+INDEX_FACTORIES = {
+    'icons': icons_index,
+    'scripts': scripts_index,
+    'dotfiles': dotfiles_index,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reindexado en vivo de iconos, scripts y dotfiles')
+    parser.add_argument('--only', nargs='+', choices=sorted(INDEX_FACTORIES),
+                       help='Índices a vigilar (por defecto, todos)')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                       help='Segundos sin eventos antes de aplicar los cambios de un archivo')
+    parser.add_argument('--sweep-interval', type=int, default=SWEEP_INTERVAL,
+                       help='Segundos entre barridos de carpetas en red o sin inotify')
+    parser.add_argument('--poll', action='store_true',
+                       help='No usar inotify, solo barridos periódicos')
+
+    args = parser.parse_args()
+
+    indexes = [INDEX_FACTORIES[name]() for name in (args.only or INDEX_FACTORIES)]
+    watcher = IndexWatcher(indexes, debounce=args.debounce,
+                           sweep_interval=args.sweep_interval, poll_only=args.poll)
+    watcher.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,9 @@ from PIL import Image, ImageTk  # Necesitamos añadir esta importación
 import subprocess
 import platform
 import re
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from mutagen.easyid3 import EasyID3
 from mutagen.mp3 import MP3
 from mutagen.flac import FLAC
@@ -22,6 +25,7 @@ from dotenv import load_dotenv
 from bs4 import BeautifulSoup
 import wikipedia
 import requests
+from cover_cache import CoverCache, MISSING, find_cover_image
 
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
@@ -36,6 +40,10 @@ LASTFM_API_KEY = os.getenv('LASTFM_API_KEY')
 RUTA_LIBRERIA = "/mnt/NFS/moode/moode"
 #RUTA_LIBRERIA = "/mnt/NFS/moode/moode/I/"
 #RUTA_LIBRERIA = "/mnt/NFS/lidarr"
+NFS_SCAN_WORKERS = 16  # Hilos del escaneo: sobre NFS cada stat/lectura espera a la red
+SEARCH_DEBOUNCE_MS = 30  # Espera tras la última tecla antes de buscar
+RENDER_CHUNK = 500  # Filas que se insertan en la lista por cada vuelta del bucle de Tk
+COVER_PREFETCH_RADIUS = 5  # Portadas que se preparan por encima y por debajo de la selección
 
 @dataclass
 class Album:
@@ -449,10 +457,13 @@ class LastFMClient:
 
 class MusicLibraryDB:
     def __init__(self, MUSIC_LIBRARY_DB: str):
+        self.db_path = MUSIC_LIBRARY_DB
         self.conn = sqlite3.connect(MUSIC_LIBRARY_DB)
         self.create_tables()
     
     def create_tables(self):
+        # WAL: la interfaz puede seguir leyendo mientras el escaneo escribe
+        self.conn.execute("PRAGMA journal_mode=WAL")
         self.conn.executescript('''
             -- Tabla principal de álbumes
             CREATE TABLE IF NOT EXISTS albums (
@@ -552,6 +563,19 @@ class MusicLibraryDB:
                 last_updated TIMESTAMP,
                 FOREIGN KEY(album_path) REFERENCES albums(path)
             );
+
+            -- Carpetas ya escaneadas: si el mtime no cambia no se vuelven a listar
+            CREATE TABLE IF NOT EXISTS scanned_dirs (
+                path TEXT PRIMARY KEY,
+                mtime REAL,
+                subdirs TEXT,
+                flac_file TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS scan_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
         ''')
         self.conn.commit()
 
@@ -647,50 +671,156 @@ class MusicLibraryDB:
         
         self.conn.commit()
 
-    def scan_library(self, force_update=True):
-        for root, dirs, files in os.walk(RUTA_LIBRERIA):
-            try:
-                # Buscar archivos FLAC en la carpeta actual
-                flac_files = [f for f in files if f.lower().endswith('.flac')]
-                if not flac_files:
-                    continue
-                
-                # Determinar si estamos en una carpeta de disco o en la carpeta principal del álbum
-                current_dir = os.path.basename(root)
-                if current_dir.lower().startswith("disc"):
-                    album_dir = os.path.dirname(root)
-                    disc_number = current_dir.split()[1]
-                else:
-                    album_dir = root
-                    disc_number = "1"  # Asumimos disco 1 si no hay subcarpeta de disco
-                
-                last_modified = os.path.getmtime(root)
-                
-                # Skip if not forced and already up to date
-                if not force_update:
-                    cursor = self.conn.execute(
-                        "SELECT last_modified FROM albums WHERE path = ?", 
-                        (album_dir,))
-                    result = cursor.fetchone()
-                    if result and result[0] >= last_modified:
+    def last_scan(self) -> float:
+        """Fecha (timestamp) del último escaneo completado, 0 si nunca se ha escaneado."""
+        row = self.conn.execute("SELECT value FROM scan_meta WHERE key = 'last_scan'").fetchone()
+        return float(row[0]) if row else 0
+
+    @staticmethod
+    def _album_dir_for(root):
+        """Carpeta del álbum y número de disco para una carpeta con FLACs."""
+        current_dir = os.path.basename(root)
+        if current_dir.lower().startswith("disc"):
+            parts = current_dir.split()
+            disc_number = parts[1] if len(parts) > 1 else (current_dir[4:].strip() or "1")
+            return os.path.dirname(root), disc_number
+        return root, "1"  # Asumimos disco 1 si no hay subcarpeta de disco
+
+    @staticmethod
+    def _visit_dir(path, known):
+        """
+        Lista una carpeta solo si su mtime ha cambiado desde el último escaneo.
+        known: (mtime, subdirs, flac_file) guardados en scanned_dirs, o None.
+        """
+        mtime = os.stat(path).st_mtime
+        if known and known[0] == mtime:
+            return path, mtime, known[1], known[2], False
+
+        subdirs, flac_files = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith('.flac'):
+                    flac_files.append(entry.name)
+        return path, mtime, subdirs, (min(flac_files) if flac_files else None), True
+
+    @staticmethod
+    def _read_album_tags(flac_path):
+        """Metadatos del álbum a partir de un FLAC."""
+        audio = FLAC(flac_path)
+        return {
+            'artist': audio.get('artist', ['Unknown'])[0],
+            'album': audio.get('album', ['Unknown'])[0],
+            'date': audio.get('date', ['Unknown'])[0],
+            'label': audio.get('label', ['Unknown'])[0],
+        }
+
+    def scan_library(self, force_update=False, workers=NFS_SCAN_WORKERS):
+        """
+        Escaneo incremental de RUTA_LIBRERIA.
+
+        Las carpetas cuyo mtime coincide con el guardado en scanned_dirs no se
+        vuelven a listar (se reutilizan sus subcarpetas y su primer FLAC), y solo
+        se leen las etiquetas de los álbumes con carpetas nuevas o modificadas.
+        Los stat/listados y la lectura de etiquetas van en un pool de hilos
+        (sobre NFS cada operación espera la red) y todo se guarda en una sola
+        transacción. Usa su propia conexión, así que puede lanzarse desde un hilo.
+
+        Args:
+            force_update: ignorar scanned_dirs y releer toda la biblioteca
+        Returns:
+            número de álbumes añadidos, actualizados o eliminados
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            known = {} if force_update else {
+                path: (mtime, json.loads(subdirs), flac_file)
+                for path, mtime, subdirs, flac_file in conn.execute(
+                    "SELECT path, mtime, subdirs, flac_file FROM scanned_dirs")
+            }
+            stored_albums = {row[0] for row in conn.execute("SELECT path FROM albums")}
+
+            visited = {}
+            failed = []
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Recorrido por niveles: todas las carpetas de un nivel a la vez
+                level = [RUTA_LIBRERIA]
+                while level:
+                    futures = {executor.submit(self._visit_dir, path, known.get(path)): path
+                               for path in level}
+                    level = []
+                    for future in as_completed(futures):
+                        try:
+                            path, mtime, subdirs, flac_file, changed = future.result()
+                        except OSError as e:
+                            print(f"Error processing {futures[future]}: {e}")
+                            failed.append(futures[future])
+                            continue
+                        visited[path] = (mtime, subdirs, flac_file, changed)
+                        level.extend(os.path.join(path, d) for d in subdirs)
+
+                if RUTA_LIBRERIA not in visited:
+                    print(f"Library path not available: {RUTA_LIBRERIA}")
+                    return 0
+
+                # Agrupar las carpetas con FLAC por álbum ("Disc N" cuenta para el álbum padre)
+                albums = {}
+                for path, (mtime, subdirs, flac_file, changed) in visited.items():
+                    if not flac_file:
                         continue
-                
-                # Obtener metadatos del primer archivo FLAC
-                audio = FLAC(os.path.join(root, flac_files[0]))
-                
-                album = Album(
-                    artist=audio.get('artist', ['Unknown'])[0],
-                    album=audio.get('album', ['Unknown'])[0],
-                    date=audio.get('date', ['Unknown'])[0],
-                    label=audio.get('label', ['Unknown'])[0],
-                    path=album_dir,
-                    discs=[disc_number],  # Mantenemos el formato original de lista
-                    last_modified=last_modified
+                    album_dir, disc_number = self._album_dir_for(path)
+                    album = albums.setdefault(album_dir, {'discs': set(), 'mtime': 0, 'changed': []})
+                    album['discs'].add(disc_number)
+                    album['mtime'] = max(album['mtime'], mtime)
+                    if changed or album_dir not in stored_albums:
+                        album['changed'].append(os.path.join(path, flac_file))
+
+                pending = {album_dir: min(album['changed'])
+                           for album_dir, album in albums.items() if album['changed']}
+                futures = {executor.submit(self._read_album_tags, flac_path): album_dir
+                           for album_dir, flac_path in pending.items()}
+
+                album_rows, disc_rows = [], []
+                for future in as_completed(futures):
+                    album_dir = futures[future]
+                    try:
+                        tags = future.result()
+                    except Exception as e:
+                        print(f"Error processing {pending[album_dir]}: {e}")
+                        continue
+                    album = albums[album_dir]
+                    album_rows.append((album_dir, tags['artist'], tags['album'], tags['date'],
+                                       tags['label'], album['mtime']))
+                    disc_rows.extend((album_dir, disc) for disc in sorted(album['discs']))
+
+            # Lo que ya no existe (sin tocar lo que cuelga de carpetas que han fallado)
+            def _removable(path):
+                return (path.startswith(RUTA_LIBRERIA) and
+                        not any(path == f or path.startswith(f + os.sep) for f in failed))
+
+            removed_albums = [(p,) for p in stored_albums - albums.keys() if _removable(p)]
+            removed_dirs = [(p,) for p in known.keys() - visited.keys() if _removable(p)]
+
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO albums VALUES (?, ?, ?, ?, ?, ?)", album_rows)
+                conn.executemany("DELETE FROM discs WHERE album_path = ?", [(row[0],) for row in album_rows])
+                conn.executemany("INSERT OR IGNORE INTO discs VALUES (?, ?)", disc_rows)
+                conn.executemany("DELETE FROM discs WHERE album_path = ?", removed_albums)
+                conn.executemany("DELETE FROM albums WHERE path = ?", removed_albums)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO scanned_dirs VALUES (?, ?, ?, ?)",
+                    [(path, mtime, json.dumps(subdirs), flac_file)
+                     for path, (mtime, subdirs, flac_file, changed) in visited.items() if changed]
                 )
-                self.update_album(album)
-                
-            except Exception as e:
-                print(f"Error processing {root}: {e}")
+                conn.executemany("DELETE FROM scanned_dirs WHERE path = ?", removed_dirs)
+                conn.execute("INSERT OR REPLACE INTO scan_meta VALUES ('last_scan', ?)", (str(time.time()),))
+
+            print(f"Library scan: {len(visited)} folders, {len(album_rows)} albums updated, "
+                  f"{len(removed_albums)} removed")
+            return len(album_rows) + len(removed_albums)
+        finally:
+            conn.close()
 
     def update_discogs_metadata(self, album_path: str, metadata: DiscogsMetadata):
         try:
@@ -1001,10 +1131,95 @@ def open_with_default_app(path, is_folder=False):
 
     
     # return music_index
+class AlbumSearchIndex:
+    """
+    Índice en memoria para buscar álbumes mientras se escribe.
+
+    Los álbumes se ordenan una sola vez (artista - álbum) y se guardan las claves
+    en minúsculas con las cadenas internadas. Cada búsqueda devuelve posiciones
+    en ese orden, por niveles: coincidencia al inicio de palabra, subcadena y
+    subsecuencia (las letras en orden, con huecos). Si la consulta amplía la
+    anterior solo se filtra el resultado previo, continuando cada subsecuencia
+    desde donde terminó (un str.find por álbum y letra nueva).
+    """
+
+    CACHE_SIZE = 64
+    WORD_STARTS = ' -(['
+
+    def __init__(self, albums: List[Dict]):
+        for album in albums:
+            album['artist'] = sys.intern(album['artist'] or '')
+            album['album'] = sys.intern(album['album'] or '')
+
+        self.albums = sorted(albums, key=lambda x: (x['artist'].lower(), x['album'].lower()))
+        self.keys = [f"{a['artist']} - {a['album']}".lower() for a in self.albums]
+        self.displays = [f"{a['artist']} - {a['album']} ({a.get('date', 'No date')})" for a in self.albums]
+        self.all = list(range(len(self.albums)))
+        self._cache = {}
+        self._last = ('', self.all, None)
+
+    def __len__(self):
+        return len(self.albums)
+
+    def search(self, query: str) -> List[int]:
+        """Posiciones de los álbumes que coinciden, ordenadas por relevancia."""
+        query = query.lower().strip()
+        if not query:
+            return self.all
+
+        cached = self._cache.get(query)
+        if cached is not None:
+            self._last = (query, cached[1], cached[2])
+            return cached[0]
+
+        # Refinamiento: lo que coincide con "abc" es un subconjunto de lo que coincidía con "ab"
+        last_query, last_matches, last_ends = self._last
+        if last_query and last_ends is not None and query.startswith(last_query):
+            candidates, ends, added = last_matches, last_ends, query[len(last_query):]
+        else:
+            candidates, ends, added = self.all, None, query
+
+        keys = self.keys
+        word_starts = self.WORD_STARTS
+        first, substring, scattered, matches, new_ends = [], [], [], [], []
+
+        for n, i in enumerate(candidates):
+            key = keys[i]
+
+            # Subsecuencia: seguir buscando las letras nuevas tras la última encontrada
+            end = ends[n] if ends is not None else 0
+            for char in added:
+                end = key.find(char, end) + 1
+                if not end:
+                    break
+            if not end:
+                continue
+
+            pos = key.find(query) if len(query) > 1 else end - 1
+            if pos == 0 or (pos > 0 and key[pos - 1] in word_starts):
+                first.append(i)
+            elif pos > 0:
+                substring.append(i)
+            else:
+                scattered.append(i)
+            matches.append(i)
+            new_ends.append(end)
+
+        ranked = first + substring + scattered
+
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[query] = (ranked, matches, new_ends)
+        self._last = (query, matches, new_ends)
+        return ranked
+
+
 class MusicLibrarySearchApp:
     def __init__(self, root):
         self.root = root
         self.db = MusicLibraryDB(MUSIC_LIBRARY_DB)
+        self.covers = CoverCache(size=(400, 400))
+        self._cover_album = None
         self.discogs_updater = DiscogsUpdater('cVyFrzzUgWFORRCZfXErXrHygsUDIaqJNFJBfGgL')
         self.musicbrainz_updater = MusicBrainzUpdater()
         self.root.title("Music Library Search")
@@ -1023,6 +1238,11 @@ class MusicLibrarySearchApp:
         self.right_container = tk.Frame(self.main_container, bg='#14141e')
         self.main_container.add(self.right_container, width=800)
 
+        # Search state (debounced input, chunked rendering)
+        self.shown = []
+        self._update_job = None
+        self._render_job = None
+
         # Load music library
         self.load_library()
 
@@ -1044,40 +1264,91 @@ class MusicLibrarySearchApp:
         # Variable para mantener referencia a la imagen
         self.current_photo = None
 
+        # Show the whole library
+        self.render_results()
+
 
     def load_library(self):
         """Load the music library from SQLite database."""
         try:
-            # Scan for updates if needed
-            last_scan = os.path.getmtime(MUSIC_LIBRARY_DB) if os.path.exists(MUSIC_LIBRARY_DB) else 0
-            if last_scan < datetime.now().timestamp() - 86400:  # 24 hours
-                print("Updating library index...")
-                self.db.scan_library()
-            
-            # Load all albums
-            self.library = self.db.get_all_albums()
-            self.library.sort(key=lambda x: f"{x['artist'].lower()} - {x['album'].lower()}")
-            
+            # Load all albums from the existing index
+            albums = self.db.get_all_albums()
         except Exception as e:
             print(f"Error loading library: {e}")
-            self.library = []
+            albums = []
+
+        self.search_index = AlbumSearchIndex(albums)
+        self.library = self.search_index.albums
+
+        # Scan for updates if needed, without blocking the UI
+        if self.db.last_scan() < datetime.now().timestamp() - 86400:  # 24 hours
+            self.start_background_scan()
+
+    def start_background_scan(self):
+        """Run the incremental library scan in a worker thread."""
+        print("Updating library index in background...")
+        self.scan_queue = queue.Queue()
+
+        def _scan():
+            try:
+                updated = self.db.scan_library()
+            except Exception as e:
+                print(f"Error scanning library: {e}")
+                updated = 0
+            self.scan_queue.put(updated)
+
+        threading.Thread(target=_scan, daemon=True).start()
+        self.root.after(500, self.check_background_scan)
+
+    def check_background_scan(self):
+        """Poll the scan thread from the Tk loop and reload the index when it finishes."""
+        try:
+            updated = self.scan_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(500, self.check_background_scan)
+            return
+
+        if updated:
+            self.search_index = AlbumSearchIndex(self.db.get_all_albums())
+            self.library = self.search_index.albums
+            self.render_results()
     
-    def update_results(self, event=None):
-        """Update search results using SQLite search."""
-        query = self.search_entry.get()
+    def schedule_update(self, event=None):
+        """Debounce: search once typing pauses for SEARCH_DEBOUNCE_MS."""
+        if self._update_job:
+            self.root.after_cancel(self._update_job)
+        self._update_job = self.root.after(SEARCH_DEBOUNCE_MS, self.render_results)
+
+    def render_results(self):
+        """Search the in-memory index and refill the listbox in chunks."""
+        self._update_job = None
+        if self._render_job:
+            self.root.after_cancel(self._render_job)
+            self._render_job = None
+
+        self.shown = self.search_index.search(self.search_entry.get())
         self.result_list.delete(0, tk.END)
-        
-        if query:
-            results = self.db.search_albums(query)
+        self._render_chunk(0)
+
+    def _render_chunk(self, start):
+        """Insert the next RENDER_CHUNK results, leaving the Tk loop free in between."""
+        displays = self.search_index.displays
+        chunk = self.shown[start:start + RENDER_CHUNK]
+        if chunk:
+            self.result_list.insert(tk.END, *[displays[i] for i in chunk])
+
+        start += len(chunk)
+        if start < len(self.shown):
+            self._render_job = self.root.after(1, self._render_chunk, start)
         else:
-            results = self.db.get_all_albums()
-        
-        results.sort(key=lambda x: f"{x['artist'].lower()} - {x['album'].lower()}")
-        
-        for album in results:
-            display = f"{album['artist']} - {album['album']} ({album.get('date', 'No date')})"
-            self.result_list.insert(tk.END, display)
-   
+            self._render_job = None
+
+    def update_results(self, event=None):
+        """Update search results immediately."""
+        self.render_results()
+        self.search_entry.select_range(0, tk.END)
+        return "break"
+
     def create_search_frame(self):
         """Create search input frame."""
         search_frame = tk.Frame(self.left_container, bg='#14141e')
@@ -1117,7 +1388,7 @@ class MusicLibrarySearchApp:
         self.search_entry.pack(fill=tk.X, padx=5)
         
         # Bind events
-        self.search_entry.bind("<KeyRelease>", self.update_results)
+        self.search_entry.bind("<KeyRelease>", self.schedule_update)
         self.search_entry.bind("<Return>", self.update_results)
         
 
@@ -1187,72 +1458,44 @@ class MusicLibrarySearchApp:
     def find_cover_image(self, album_path):
         """Find cover image in album directory."""
         try:
-            # Primero buscar en el directorio del álbum
-            cover_names = ['cover', 'folder', 'front', 'artwork', 'albumart']
-            image_extensions = ['.jpg', '.jpeg', '.png']
-
-            # Buscar en el directorio del álbum y en sus subdirectorios inmediatos
-            search_paths = [album_path]
-            # Añadir subdirectorios que empiecen con "Disc"
-            for item in os.listdir(album_path):
-                if item.startswith("Disc ") and os.path.isdir(os.path.join(album_path, item)):
-                    search_paths.append(os.path.join(album_path, item))
-
-            # Buscar en todas las rutas
-            for search_path in search_paths:
-                # Primero buscar nombres específicos
-                for name in cover_names:
-                    for ext in image_extensions:
-                        file_path = os.path.join(search_path, name + ext)
-                        if os.path.exists(file_path):
-                            print(f"Found cover image: {file_path}")  # Debug
-                            return file_path
-
-                # Si no se encuentra, buscar cualquier imagen
-                for file in os.listdir(search_path):
-                    if any(file.lower().endswith(ext) for ext in image_extensions):
-                        file_path = os.path.join(search_path, file)
-                        print(f"Found generic image: {file_path}")  # Debug
-                        return file_path
-
-            print("No cover image found")  # Debug
-            return None
+            return find_cover_image(album_path)
         except Exception as e:
             print(f"Error finding cover image: {e}")
             return None
 
+    def show_cover(self, album_path):
+        """Show the cached thumbnail, resolving it in the background on a miss."""
+        self._cover_album = album_path
+        thumbnail = self.covers.cached(album_path)
+        if thumbnail is MISSING:
+            self.cover_frame.configure(image='')
+            self.current_photo = None
+            self._wait_for_cover(self.covers.fetch(album_path), album_path)
+        else:
+            self.display_cover_image(thumbnail)
+
+        # Prefetch covers of the albums around the selection
+        self.covers.prefetch(self.neighbour_paths())
+
+    def _wait_for_cover(self, future, album_path):
+        """Poll a cover future from the Tk loop (PhotoImage must be created here)."""
+        if not future.done():
+            self.root.after(30, self._wait_for_cover, future, album_path)
+        elif album_path == self._cover_album:
+            self.display_cover_image(future.result())
+
     def display_cover_image(self, image_path):
-        """Display cover image in the cover frame."""
+        """Display an already scaled cover thumbnail in the cover frame."""
         try:
-            if image_path and os.path.exists(image_path):
-                print(f"Loading image from: {image_path}")  # Debug
-                # Cargar y redimensionar la imagen
-                image = Image.open(image_path)
-                
-                # Obtener dimensiones originales
-                width, height = image.size
-                print(f"Original dimensions: {width}x{height}")  # Debug
-                
-                # Calcular nueva dimensión manteniendo proporción
-                max_size = (400, 400)
-                ratio = min(max_size[0]/width, max_size[1]/height)
-                new_size = (int(width * ratio), int(height * ratio))
-                print(f"New dimensions: {new_size}")  # Debug
-                
-                # Redimensionar
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-                
-                # Convertir a PhotoImage
-                photo = ImageTk.PhotoImage(image)
-                
+            if image_path:
+                photo = ImageTk.PhotoImage(Image.open(image_path))
+
                 # Mantener referencia a la imagen
                 self.current_photo = photo
-                
+
                 # Mostrar la imagen
                 self.cover_frame.configure(image=photo)
-                print("Image displayed successfully")  # Debug
             else:
-                print(f"Invalid image path: {image_path}")  # Debug
                 self.cover_frame.configure(image='')
                 self.current_photo = None
         except Exception as e:
@@ -1260,22 +1503,26 @@ class MusicLibrarySearchApp:
             self.cover_frame.configure(image='')
             self.current_photo = None
 
+    def neighbour_paths(self):
+        """Album paths around the current selection, nearest first."""
+        selection = self.result_list.curselection()
+        if not selection:
+            return []
+        current = selection[0]
+        paths = []
+        for offset in range(1, COVER_PREFETCH_RADIUS + 1):
+            for pos in (current + offset, current - offset):
+                if 0 <= pos < len(self.shown):
+                    paths.append(self.search_index.albums[self.shown[pos]]['path'])
+        return paths
+
     def get_selected_album(self):
         """Get the selected album from the results list."""
         selection = self.result_list.curselection()
-        if not selection:
+        if not selection or selection[0] >= len(self.shown):
             return None
 
-        # Get the selected item's text
-        selected_text = self.result_list.get(selection[0])
-        
-        # Find the corresponding album
-        for album in self.library:
-            display_text = f"{album['artist']} - {album['album']} ({album.get('date', 'No date')})"
-            if display_text == selected_text:
-                return album
-        
-        return None
+        return self.search_index.albums[self.shown[selection[0]]]
 
     def play_selected_album(self):
         """Play the selected album using the system's default music player."""
@@ -1414,8 +1661,7 @@ class MusicLibrarySearchApp:
             
             # Show cover image
             if 'path' in album:
-                cover_path = self.find_cover_image(album['path'])
-                self.display_cover_image(cover_path)
+                self.show_cover(album['path'])
 
 
     def add_keyboard_shortcuts(self):
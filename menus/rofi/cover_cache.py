@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+#
+# Script Name: cover_cache.py
+# Description:  Caché local de miniaturas de portadas para NFS_fuzzy.py y nfs_fuzzy_funcional.py
+# Author: volteret4
+# Repository: https://github.com/volteret4/
+# License:
+# Notes:
+#   Dependencies:   - python3, pillow, sqlite3
+#
+#   carpeta del álbum -> ruta de la portada -> miniatura ya escalada en disco local.
+#   Las miniaturas se nombran por el sha1 del contenido de la imagen, así una
+#   misma portada (discos de un álbum, reediciones...) se guarda una sola vez.
+#   Un pool de hilos resuelve y escala en segundo plano las portadas de los
+#   álbumes cercanos a la selección, de modo que al moverse por la lista sobre
+#   NFS solo se lee un JPEG pequeño del disco local.
+
+import io
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+COVER_CACHE_DIR = os.path.expanduser("~/.cache/nfs_fuzzy_covers")
+COVER_NAMES = ['cover', 'folder', 'front', 'artwork', 'albumart']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+RECHECK_AFTER = 7 * 86400  # Volver a buscar la portada en la carpeta pasada una semana
+
+MISSING = object()  # Álbum aún no resuelto (distinto de None = sin portada)
+
+
+def find_cover_image(album_path):
+    """
+    Busca la portada en la carpeta del álbum y en sus subcarpetas "Disc N".
+
+    Lista cada carpeta una sola vez en lugar de probar os.path.exists con
+    cada combinación de nombre y extensión.
+    """
+    entries = os.listdir(album_path)
+    search_paths = [(album_path, entries)]
+    # Añadir subdirectorios que empiecen con "Disc"
+    for item in entries:
+        disc_path = os.path.join(album_path, item)
+        if item.startswith("Disc ") and os.path.isdir(disc_path):
+            search_paths.append((disc_path, os.listdir(disc_path)))
+
+    for search_path, files in search_paths:
+        images = {f.lower(): f for f in files if f.lower().endswith(tuple(IMAGE_EXTENSIONS))}
+
+        # Primero buscar nombres específicos
+        for name in COVER_NAMES:
+            for ext in IMAGE_EXTENSIONS:
+                if name + ext in images:
+                    return os.path.join(search_path, images[name + ext])
+
+        # Si no se encuentra, cualquier imagen
+        if images:
+            return os.path.join(search_path, next(iter(images.values())))
+
+    return None
+
+
+class CoverCache:
+    def __init__(self, size=(400, 400), cache_dir=COVER_CACHE_DIR, workers=4):
+        """
+        Args:
+            size: caja máxima de la miniatura (la imagen se escala para llenarla)
+            cache_dir: carpeta local para las miniaturas y el índice
+            workers: hilos para resolver portadas en segundo plano
+        """
+        self.size = size
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "covers.db"), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS covers (
+                album_path TEXT,
+                width INTEGER,
+                height INTEGER,
+                cover_path TEXT,
+                thumbnail TEXT,
+                checked REAL,
+                PRIMARY KEY(album_path, width, height)
+            )
+        ''')
+        self.conn.commit()
+
+        # Índice completo en memoria: la consulta al seleccionar no toca ni SQLite
+        self.entries = {
+            row[0]: (row[1], row[2])
+            for row in self.conn.execute(
+                "SELECT album_path, thumbnail, checked FROM covers WHERE width = ? AND height = ?",
+                size)
+        }
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = {}
+
+    def thumbnail_path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def cached(self, album_path):
+        """
+        Miniatura local ya generada, sin acceder a NFS.
+
+        Returns:
+            ruta de la miniatura, None si el álbum no tiene portada,
+            o MISSING si aún no se ha resuelto.
+        """
+        entry = self.entries.get(album_path)
+        if entry is None:
+            return MISSING
+        name, checked = entry
+        if checked < time.time() - RECHECK_AFTER:
+            self.prefetch([album_path])
+        if name is None:
+            return None
+        path = self.thumbnail_path(name)
+        return path if os.path.exists(path) else MISSING
+
+    def fetch(self, album_path):
+        """Future con la ruta de la miniatura (o None), resolviéndola si hace falta."""
+        with self.lock:
+            future = self.pending.get(album_path)
+            if future is None:
+                future = self.executor.submit(self._resolve, album_path)
+                self.pending[album_path] = future
+                future.add_done_callback(lambda f: self._done(album_path))
+        return future
+
+    def prefetch(self, album_paths):
+        """Resuelve en segundo plano los álbumes que no estén ya en caché."""
+        now = time.time()
+        for album_path in album_paths:
+            entry = self.entries.get(album_path)
+            if entry is None or entry[1] < now - RECHECK_AFTER:
+                self.fetch(album_path)
+
+    def _done(self, album_path):
+        with self.lock:
+            self.pending.pop(album_path, None)
+
+    def _resolve(self, album_path):
+        try:
+            cover_path = find_cover_image(album_path)
+            name = self._make_thumbnail(cover_path) if cover_path else None
+        except Exception as e:
+            print(f"Error caching cover for {album_path}: {e}")
+            return None
+
+        now = time.time()
+        with self.lock:
+            self.entries[album_path] = (name, now)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO covers VALUES (?, ?, ?, ?, ?, ?)",
+                (album_path, self.size[0], self.size[1], cover_path, name, now)
+            )
+            self.conn.commit()
+        return self.thumbnail_path(name) if name else None
+
+    def _make_thumbnail(self, cover_path):
+        """Lee la portada una vez, la escala a self.size y la guarda por su sha1."""
+        with open(cover_path, 'rb') as f:
+            data = f.read()
+
+        name = f"{hashlib.sha1(data).hexdigest()}_{self.size[0]}x{self.size[1]}.jpg"
+        path = self.thumbnail_path(name)
+        if os.path.exists(path):
+            return name
+
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        # Calcular nueva dimensión manteniendo proporción
+        ratio = min(self.size[0] / width, self.size[1] / height)
+        new_size = (int(width * ratio), int(height * ratio))
+        # En JPEG, decodificar directamente a una escala reducida
+        image.draft('RGB', new_size)
+        image = image.convert('RGB').resize(new_size, Image.Resampling.LANCZOS)
+
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, 'JPEG', quality=90)
+        os.replace(tmp_path, path)
+        return name
@@ -14,6 +14,7 @@
 import os
 import json
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional
 import mutagen
@@ -27,6 +28,91 @@ import argparse
 
 load_dotenv()
 
+SCAN_BATCH_SIZE = 2000  # Canciones por transacción al escribir
+SCAN_CHUNK_SIZE = 64    # Archivos que recibe cada proceso por envío
+
+
+def _to_datetime(value):
+    """TIMESTAMP de SQLite (con o sin microsegundos) a datetime."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _to_datetime_or_none(value):
+    if not value:
+        return None
+    try:
+        return _to_datetime(value)
+    except ValueError:
+        return None
+
+
+def _set_added(metadata, added):
+    metadata['added_timestamp'] = added
+    metadata['added_week'] = int(added.strftime('%V'))  # ISO week number
+    metadata['added_month'] = added.month
+    metadata['added_year'] = added.year
+
+
+def read_audio_metadata(file_path: str) -> Optional[Dict]:
+    """
+    Extract comprehensive audio metadata.
+
+    Función de módulo (y no método) para poder ejecutarse en los procesos
+    del pool de scan_library.
+    """
+    audio = None
+    audio_tech = None
+    track_number = '0'
+    suffix = os.path.splitext(file_path)[1].lower()
+
+    # Handle different audio formats
+    if suffix in ['.mp3', '.m4a']:
+        audio = EasyID3(file_path)
+        audio_tech = mutagen.File(file_path)
+        track_number = audio.get('tracknumber', ['0'])[0].split('/')[0]
+    elif suffix == '.flac':
+        audio = FLAC(file_path)
+        audio_tech = audio
+        track_number = str(audio.get('tracknumber', ['0'])[0]).split('/')[0]
+
+    if not audio or not audio_tech:
+        return None
+
+    metadata = {
+        'file_path': file_path,
+        'title': audio.get('title', ['Untitled'])[0],
+        'track_number': int(track_number) if track_number.isdigit() else 0,
+        'artist': audio.get('artist', ['Unknown Artist'])[0],
+        'album_artist': audio.get('albumartist', [''])[0],
+        'album': audio.get('album', ['Unknown Album'])[0],
+        'date': audio.get('date', [''])[0],
+        'genre': audio.get('genre', ['Unknown'])[0],
+        'label': audio.get('organization', [''])[0],
+        'mbid': audio.get('musicbrainz_trackid', [''])[0],
+        'last_modified': datetime.fromtimestamp(os.path.getmtime(file_path))
+    }
+
+    # Technical information
+    if hasattr(audio_tech, 'info'):
+        metadata['bitrate'] = getattr(audio_tech.info, 'bitrate', 0)
+        metadata['sample_rate'] = getattr(audio_tech.info, 'sample_rate', 0)
+        metadata['bit_depth'] = getattr(audio_tech.info, 'bits_per_sample', 0)
+        metadata['duration'] = getattr(audio_tech.info, 'length', 0)
+
+    _set_added(metadata, datetime.now())
+    return metadata
+
+
+def _extract_metadata(file_path):
+    """Tarea del pool: (ruta, metadatos o None, error)"""
+    try:
+        return file_path, read_audio_metadata(file_path), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
 class MusicLibraryManager:
     def __init__(self, root_path: str, db_path: str):
         self.root_path = Path(root_path).resolve()
@@ -137,81 +223,69 @@ class MusicLibraryManager:
             )
         ''')
         
+        # Artistas pendientes de consultar en Last.fm
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS artist_queue (
+                name TEXT PRIMARY KEY,
+                queued TIMESTAMP
+            )
+        ''')
+
         conn.commit()
         conn.close()
 
     def get_audio_metadata(self, file_path: Path) -> Optional[Dict]:
         """Extract comprehensive audio metadata."""
         try:
-            audio = None
-            audio_tech = None
-            track_number = '0'
-            
-            # Handle different audio formats
-            if file_path.suffix.lower() in ['.mp3', '.m4a']:
-                audio = EasyID3(file_path)
-                audio_tech = mutagen.File(file_path)
-                track_number = audio.get('tracknumber', ['0'])[0].split('/')[0]
-            elif file_path.suffix.lower() == '.flac':
-                audio = FLAC(file_path)
-                audio_tech = audio
-                track_number = str(audio.get('tracknumber', ['0'])[0]).split('/')[0]
-            
-            if not audio or not audio_tech:
-                return None
-
-            metadata = {
-                'file_path': str(file_path),
-                'title': audio.get('title', ['Untitled'])[0],
-                'track_number': int(track_number) if track_number.isdigit() else 0,
-                'artist': audio.get('artist', ['Unknown Artist'])[0],
-                'album_artist': audio.get('albumartist', [''])[0],
-                'album': audio.get('album', ['Unknown Album'])[0],
-                'date': audio.get('date', [''])[0],
-                'genre': audio.get('genre', ['Unknown'])[0],
-                'label': audio.get('organization', [''])[0],
-                'mbid': audio.get('musicbrainz_trackid', [''])[0],
-                'last_modified': datetime.fromtimestamp(os.path.getmtime(file_path))
-            }
-
-            # Technical information
-            if hasattr(audio_tech, 'info'):
-                metadata['bitrate'] = getattr(audio_tech.info, 'bitrate', 0)
-                metadata['sample_rate'] = getattr(audio_tech.info, 'sample_rate', 0)
-                metadata['bit_depth'] = getattr(audio_tech.info, 'bits_per_sample', 0)
-                metadata['duration'] = getattr(audio_tech.info, 'length', 0)
-    
-            current_time = datetime.now()
-            
-            metadata = {
-                'file_path': str(file_path),
-                'title': audio.get('title', ['Untitled'])[0],
-                'track_number': int(track_number) if track_number.isdigit() else 0,
-                'artist': audio.get('artist', ['Unknown Artist'])[0],
-                'album_artist': audio.get('albumartist', [''])[0],
-                'album': audio.get('album', ['Unknown Album'])[0],
-                'date': audio.get('date', [''])[0],
-                'genre': audio.get('genre', ['Unknown'])[0],
-                'label': audio.get('organization', [''])[0],
-                'mbid': audio.get('musicbrainz_trackid', [''])[0],
-                'last_modified': datetime.fromtimestamp(os.path.getmtime(file_path)),
-                'added_timestamp': current_time,
-                'added_week': int(current_time.strftime('%V')),  # ISO week number
-                'added_month': current_time.month,
-                'added_year': current_time.year
-            }
-
-            return metadata
-
+            return read_audio_metadata(str(file_path))
         except Exception as e:
             self.logger.error(f"Metadata extraction error for {file_path}: {str(e)}")
             return None
 
-    def scan_library(self, force_update=False):
-        """Comprehensive library scanning with selective updates."""
+    def _scan_audio_files(self):
+        """
+        Etapa 1: recorre el árbol con os.scandir y devuelve {ruta: mtime}.
+
+        El mtime sale del propio DirEntry (sin un os.path.getmtime por archivo).
+        """
+        files = {}
+        pending = [str(self.root_path)]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.name.lower().endswith(self.supported_formats):
+                            files[entry.path] = entry.stat().st_mtime
+            except OSError as e:
+                self.logger.error(f"Cannot read directory {directory}: {e}")
+        return files
+
+    def _load_known_files(self, cursor):
+        """{ruta: (last_modified, added_timestamp)} de todas las canciones en una sola consulta."""
+        known = {}
+        for file_path, last_modified, added in cursor.execute(
+                "SELECT file_path, last_modified, added_timestamp FROM songs"):
+            known[file_path] = (_to_datetime_or_none(last_modified), added)
+        return known
+
+    def scan_library(self, force_update=False, workers=None, enrich=True):
+        """
+        Comprehensive library scanning with selective updates.
+
+        Tres etapas:
+            1. os.scandir + mapa (ruta -> last_modified) cargado de una vez: solo
+               pasan los archivos nuevos o modificados
+            2. lectura de etiquetas en un pool de procesos
+            3. escritura con executemany en transacciones de SCAN_BATCH_SIZE canciones;
+               los artistas van a la cola artist_queue y Last.fm se consulta al final
+               (process_artist_queue), fuera del escaneo
+        """
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
-        
+
         error_log_path = self.root_path / 'music_library_scan_errors.log'
         error_logger = logging.getLogger('error_log')
         error_logger.setLevel(logging.ERROR)
@@ -219,138 +293,168 @@ class MusicLibraryManager:
         error_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
         error_handler.setFormatter(error_formatter)
         error_logger.addHandler(error_handler)
-        
+
         processed_files = 0
         error_files = 0
-        
+
         try:
-            for file_path in self.root_path.rglob('*'):
-                if file_path.suffix.lower() in self.supported_formats:
-                    abs_path = str(file_path.absolute())
-                    
-                    try:
-                        last_modified = datetime.fromtimestamp(os.path.getmtime(file_path))
-                        
-                        # Check if file needs processing
-                        c.execute("SELECT last_modified FROM songs WHERE file_path = ?", (abs_path,))
-                        existing_record = c.fetchone()
-                        
-                        # Modificación aquí: Convertir la fecha de la base de datos a datetime
-                        if existing_record:
-                            try:
-                                db_last_modified = datetime.strptime(existing_record[0], '%Y-%m-%d %H:%M:%S.%f')
-                                original_added_timestamp = datetime.strptime(existing_record[1], '%Y-%m-%d %H:%M:%S.%f') if existing_record[1] else None
-                            except ValueError:
-                                # Si falla, intentamos sin la fracción de segundos
-                                db_last_modified = datetime.strptime(existing_record[0], '%Y-%m-%d %H:%M:%S')
-                                original_added_timestamp = datetime.strptime(existing_record[1], '%Y-%m-%d %H:%M:%S.%f') if existing_record[1] else None
-                        else:
-                            db_last_modified = None
-                            original_added_timestamp = None
-
-                        if force_update or not db_last_modified or last_modified > db_last_modified:
-                            metadata = self.get_audio_metadata(file_path)
-                            
-                            if metadata:
-                                # Preserve original added_timestamp if it exists
-                                if original_added_timestamp:
-                                    metadata['added_timestamp'] = original_added_timestamp
-                                    metadata['added_week'] = int(original_added_timestamp.strftime('%V'))
-                                    metadata['added_month'] = original_added_timestamp.month
-                                    metadata['added_year'] = original_added_timestamp.year
-
-                                # Insert or update song
-                                c.execute('''
-                                    INSERT OR REPLACE INTO songs 
-                                    (file_path, title, track_number, artist, album_artist, 
-                                    album, date, genre, label, mbid, bitrate, 
-                                    bit_depth, sample_rate, last_modified, duration,
-                                    added_timestamp, added_week, added_month, added_year)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                ''', (
-                                    metadata['file_path'], metadata['title'], metadata['track_number'], 
-                                    metadata['artist'], metadata['album_artist'], metadata['album'], 
-                                    metadata['date'], metadata['genre'], metadata['label'], 
-                                    metadata['mbid'], metadata.get('bitrate'), metadata.get('bit_depth'),
-                                    metadata.get('sample_rate'), metadata['last_modified'], 
-                                    metadata.get('duration'), metadata['added_timestamp'],
-                                    metadata['added_week'], metadata['added_month'], metadata['added_year']
-                                ))
-                                processed_files += 1
-                                
-                                # Update/insert artist information
-                                self._update_artist_info(c, metadata['artist'])
-                                
-                                # Update/insert album information
-                                self._update_album_info(c, metadata)
-                                
-                                # Update/insert genre information
-                                self._update_genre_info(c, metadata['genre'])
-                            
-                            else:
-                                error_files += 1
-                                error_logger.error(f"Metadata extraction failed: {abs_path}")
-                        
-                        conn.commit()
-                    
-                    except Exception as file_error:
-                        error_files += 1
-                        error_logger.error(f"File processing error {abs_path}: {str(file_error)}")
-        
+            # Etapa 1: diferencias entre disco y base de datos
+            known = self._load_known_files(c)
+            on_disk = self._scan_audio_files()
+            to_process = [
+                path for path, mtime in on_disk.items()
+                if force_update or path not in known
+                or known[path][0] is None
+                or datetime.fromtimestamp(mtime) > known[path][0]
+            ]
+            self.logger.info(f"Files on disk: {len(on_disk)}, new or modified: {len(to_process)}")
+
+            if to_process:
+                # Etapa 2: etiquetas en paralelo
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = executor.map(_extract_metadata, to_process,
+                                           chunksize=SCAN_CHUNK_SIZE)
+
+                    # Etapa 3: escritura por lotes a medida que llegan resultados
+                    batch = []
+                    for file_path, metadata, error in results:
+                        if metadata is None:
+                            error_files += 1
+                            error_logger.error(f"Metadata extraction failed: {file_path}: {error}")
+                            continue
+
+                        # Preserve original added_timestamp if it exists
+                        original_added = known.get(file_path, (None, None))[1]
+                        if original_added:
+                            _set_added(metadata, _to_datetime(original_added))
+                        batch.append(metadata)
+
+                        if len(batch) >= SCAN_BATCH_SIZE:
+                            self._write_batch(conn, batch)
+                            processed_files += len(batch)
+                            batch = []
+
+                    if batch:
+                        self._write_batch(conn, batch)
+                        processed_files += len(batch)
+
         except Exception as scan_error:
             self.logger.error(f"Library scan error: {str(scan_error)}")
-        
+
         finally:
             conn.close()
             error_logger.removeHandler(error_handler)
             error_handler.close()
-            
+
             self.logger.info("Library scan completed")
             self.logger.info(f"Files processed: {processed_files}")
             self.logger.info(f"Files with errors: {error_files}")
 
+        if enrich:
+            self.process_artist_queue()
+
+    def _write_batch(self, conn, batch):
+        """Etapa 3: guarda un lote de canciones, álbumes y géneros en una transacción."""
+        albums = {}
+        for metadata in batch:
+            albums[(metadata['artist'], metadata['album'])] = metadata
+        now = datetime.now()
+
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO songs
+                (file_path, title, track_number, artist, album_artist,
+                album, date, genre, label, mbid, bitrate,
+                bit_depth, sample_rate, last_modified, duration,
+                added_timestamp, added_week, added_month, added_year)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                metadata['file_path'], metadata['title'], metadata['track_number'],
+                metadata['artist'], metadata['album_artist'], metadata['album'],
+                metadata['date'], metadata['genre'], metadata['label'],
+                metadata['mbid'], metadata.get('bitrate'), metadata.get('bit_depth'),
+                metadata.get('sample_rate'), metadata['last_modified'],
+                metadata.get('duration'), metadata['added_timestamp'],
+                metadata['added_week'], metadata['added_month'], metadata['added_year']
+            ) for metadata in batch])
+
+            # Fila mínima de cada artista para que los álbumes tengan artist_id;
+            # bio, tags, etc. se rellenan después con Last.fm
+            conn.executemany("INSERT OR IGNORE INTO artists (name) VALUES (?)",
+                             [(artist,) for artist in {m['artist'] for m in batch}])
+
+            # Update/insert album information (una vez por álbum del lote)
+            conn.executemany('''
+                INSERT OR REPLACE INTO albums
+                (artist_id, name, year, label, genre, last_updated)
+                VALUES (
+                    (SELECT id FROM artists WHERE name = ?),
+                    ?, ?, ?, ?, ?
+                )
+            ''', [(
+                metadata['artist'], metadata['album'],
+                metadata['date'], metadata['label'],
+                metadata['genre'], now
+            ) for metadata in albums.values()])
+
+            # Update/insert genre information
+            conn.executemany("INSERT OR IGNORE INTO genres (name) VALUES (?)",
+                             [(genre,) for genre in {m['genre'] for m in batch}])
+
+            # Los artistas se enriquecen después con Last.fm
+            conn.executemany("INSERT OR IGNORE INTO artist_queue (name, queued) VALUES (?, ?)",
+                             [(artist, now) for artist in {m['artist'] for m in batch}])
+
+    def process_artist_queue(self):
+        """
+        Consulta Last.fm para los artistas encolados durante el escaneo.
+
+        Solo se piden los que no existen o tienen más de 30 días; cada artista
+        se quita de la cola al procesarlo, así que un corte a mitad no pierde nada.
+        """
+        conn = sqlite3.connect(self.db_path)
+        c = conn.cursor()
+        queued = [row[0] for row in c.execute("SELECT name FROM artist_queue ORDER BY queued")]
+        if not queued:
+            conn.close()
+            return
+
+        self.logger.info(f"Artists queued for Last.fm: {len(queued)}")
+        updated = 0
+        try:
+            for artist_name in queued:
+                if self._update_artist_info(c, artist_name):
+                    updated += 1
+                c.execute("DELETE FROM artist_queue WHERE name = ?", (artist_name,))
+                conn.commit()
+        finally:
+            conn.close()
+            self.logger.info(f"Artists updated from Last.fm: {updated}")
+
     def _update_artist_info(self, cursor, artist_name):
         """Update artist information selectively."""
         cursor.execute("SELECT last_updated FROM artists WHERE name = ?", (artist_name,))
         existing_artist = cursor.fetchone()
-        
-        # Only update if no existing record or older than 30 days
-        if not existing_artist or (datetime.now() - datetime.strptime(existing_artist[0], '%Y-%m-%d %H:%M:%S.%f')) > timedelta(days=30):
+        last_updated = _to_datetime_or_none(existing_artist[0]) if existing_artist else None
+
+        # Only update if never enriched or older than 30 days
+        if not last_updated or (datetime.now() - last_updated) > timedelta(days=30):
             lastfm_info = self.get_lastfm_artist_info(artist_name)
-            
+
             if lastfm_info:
+                # UPDATE (no INSERT OR REPLACE) para conservar el id al que apuntan los álbumes
+                cursor.execute("INSERT OR IGNORE INTO artists (name) VALUES (?)", (artist_name,))
                 cursor.execute('''
-                    INSERT OR REPLACE INTO artists 
-                    (name, bio, tags, similar_artists, last_updated)
-                    VALUES (?, ?, ?, ?, ?)
+                    UPDATE artists
+                    SET bio = ?, tags = ?, similar_artists = ?, last_updated = ?
+                    WHERE name = ?
                 ''', (
-                    lastfm_info['name'], lastfm_info['bio'], 
-                    lastfm_info['tags'], lastfm_info['similar_artists'], 
-                    lastfm_info['last_updated']
+                    lastfm_info['bio'], lastfm_info['tags'],
+                    lastfm_info['similar_artists'], lastfm_info['last_updated'],
+                    lastfm_info['name']
                 ))
-
-    def _update_album_info(self, cursor, metadata):
-        """Update album information selectively."""
-        cursor.execute('''
-            INSERT OR REPLACE INTO albums 
-            (artist_id, name, year, label, genre, last_updated)
-            VALUES (
-                (SELECT id FROM artists WHERE name = ?),
-                ?, ?, ?, ?, ?
-            )
-        ''', (
-            metadata['artist'], metadata['album'], 
-            metadata['date'], metadata['label'], 
-            metadata['genre'], datetime.now()
-        ))
-
-    def _update_genre_info(self, cursor, genre_name):
-        """Update genre information if not exists."""
-        cursor.execute("SELECT * FROM genres WHERE name = ?", (genre_name,))
-        if not cursor.fetchone():
-            cursor.execute('''
-                INSERT INTO genres (name) VALUES (?)
-            ''', (genre_name,))
+                return True
+        return False
 
     def get_lastfm_artist_info(self, artist_name: str) -> Optional[Dict]:
         """Retrieve comprehensive LastFM artist information."""
@@ -375,8 +479,15 @@ if __name__ == "__main__":
     parser.add_argument('root_path', help='Root directory of music library')
     parser.add_argument('db_path', help='Path to SQLite database')
     parser.add_argument('--force-update', action='store_true', help='Force update all files')
-    
+    parser.add_argument('--workers', type=int, default=None, help='Procesos para leer etiquetas (por defecto, uno por CPU)')
+    parser.add_argument('--no-lastfm', action='store_true', help='Solo escanear; dejar los artistas en la cola de Last.fm')
+    parser.add_argument('--lastfm-only', action='store_true', help='Solo procesar la cola de artistas pendientes de Last.fm')
+
     args = parser.parse_args()
-    
+
     manager = MusicLibraryManager(args.root_path, args.db_path)
-    manager.scan_library(force_update=args.force_update)
\ No newline at end of file
+    if args.lastfm_only:
+        manager.process_artist_queue()
+    else:
+        manager.scan_library(force_update=args.force_update, workers=args.workers,
+                             enrich=not args.no_lastfm)
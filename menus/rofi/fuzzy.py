@@ -2,11 +2,12 @@
 import os
 import tkinter as tk
 import re
-import glob
 import subprocess
+import threading
 import tkinter.messagebox as messagebox
 from markdown import markdown
 from tkinterweb import HtmlFrame
+from notes_index import NotesIndex
 
 # Define el directorio donde están tus archivos Markdown
 SEARCH_DIR = "/mnt/windows/FTP/wiki/Obsidian/"
@@ -24,6 +25,9 @@ SECONDARY_PATHS = [
     # Añade más paths aquí
 ]
 
+# Cada cuánto se comprueba el vault en segundo plano para actualizar el índice
+REFRESH_INTERVAL_MS = 60 * 1000
+
 def display_file_content(filename, query):
     """Muestra el contenido del archivo con formato Markdown."""
     global html_viewer
@@ -163,65 +167,26 @@ def get_selected_file():
             return filename
     return None
 
-def extract_tags(content):
-    """Extrae los tags del contenido Markdown."""
-    # Busca tags al estilo #tag o tags en metadatos YAML: tags: [tag1, tag2]
-    yaml_tags = re.search(r'---.*?tags:\s*\[(.*?)\].*?---', content, re.DOTALL)
-    inline_tags = re.findall(r'(?<!\S)#([a-zA-Z0-9_-]+)', content)
-    
-    tags = []
-    if yaml_tags:
-        tags.extend([tag.strip().strip('"\'') for tag in yaml_tags.group(1).split(',')])
-    if inline_tags:
-        tags.extend(inline_tags)
-    
-    return tags
-
 def search_files(query):
     """Realiza la búsqueda de archivos Markdown que coincidan con la consulta."""
-    # Crear listas para cada categoría
-    title_matches = []
-    tag_matches = []
-    content_matches = []
-    wallabag_matches = []
-    
-    for filename in glob.iglob(os.path.join(SEARCH_DIR, '**', '*.md'), recursive=True):
-        title = os.path.basename(filename).replace('.md', '')
-        
-        is_secondary = any(path in filename for path in SECONDARY_PATHS)
-        is_wallabag = "wallabag" in filename.lower()
-        
-        icon = '📁' if is_secondary else '📄'
-        
-        # Buscar coincidencias en el título
-        if re.search(query, title, re.IGNORECASE):
-            title_matches.append((icon, filename, title))
-            continue  # Si coincide en el título, no buscamos en otras categorías
-                
-        try:
-            with open(filename, 'r', encoding='utf-8') as file:
-                content = file.read()
-                
-                # Extraer y comprobar tags
-                tags = extract_tags(content)
-                if any(re.search(query, tag, re.IGNORECASE) for tag in tags):
-                    tag_matches.append((icon, filename, title))
-                    continue  # Si coincide en tags, no buscamos en contenido
-                
-                # Eliminar metadatos para buscar en contenido
-                content = re.sub(r'---.*?---', '', content, flags=re.DOTALL).strip()
-                
-                # Buscar en contenido
-                if re.search(query, content, re.IGNORECASE):
-                    if is_wallabag:
-                        wallabag_matches.append((icon, filename, title))
-                    else:
-                        content_matches.append((icon, filename, title))
-                        
-        except Exception as e:
-            print(f"Error al leer el archivo {filename}: {e}")
-    
-    return title_matches, tag_matches, content_matches, wallabag_matches
+    return notes_index.search(query)
+
+def refresh_index():
+    """Actualiza el índice con las notas nuevas, modificadas o borradas."""
+    try:
+        updated, removed = notes_index.refresh()
+        if updated or removed:
+            print(f"Índice actualizado: {updated} notas nuevas o modificadas, {removed} eliminadas")
+    except Exception as e:
+        print(f"Error al actualizar el índice: {e}")
+
+def schedule_refresh():
+    """Lanza refresh_index en un hilo cada REFRESH_INTERVAL_MS."""
+    global refresh_thread
+    if refresh_thread is None or not refresh_thread.is_alive():
+        refresh_thread = threading.Thread(target=refresh_index, daemon=True)
+        refresh_thread.start()
+    root.after(REFRESH_INTERVAL_MS, schedule_refresh)
 
 def update_results(event):
     """Actualiza la lista de resultados según el texto de búsqueda."""
@@ -292,6 +257,7 @@ def delete_file(event=None):
         if confirm:
             try:
                 os.remove(filename)
+                notes_index.remove(filename)
                 update_results(None)
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo eliminar el archivo: {str(e)}")
@@ -307,7 +273,14 @@ def select_all(event=None):
 
 def create_gui():
     """Crea la interfaz gráfica."""
-    global root, search_entry, result_list, html_viewer, all_results
+    global root, search_entry, result_list, html_viewer, all_results, notes_index, refresh_thread
+    notes_index = NotesIndex(SEARCH_DIR, SECONDARY_PATHS)
+    if notes_index.is_empty():
+        # Primera ejecución: construir el índice antes de abrir la ventana
+        print("Creando el índice de notas...")
+        refresh_index()
+    refresh_thread = None
+
     root = tk.Tk()
     root.title("Buscador de archivos Markdown")
     root.configure(bg='#14141e')
@@ -365,6 +338,7 @@ def create_gui():
 
     all_results = []
 
+    schedule_refresh()
     search_entry.focus_set()
     root.mainloop()
 
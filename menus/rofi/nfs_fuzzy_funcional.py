@@ -11,11 +11,13 @@ from mutagen.easyid3 import EasyID3
 from mutagen.mp3 import MP3
 from mutagen.flac import FLAC
 from mutagen import File 
+from cover_cache import CoverCache, MISSING, find_cover_image
 
 
 # Path to your music library JSON file
 MUSIC_LIBRARY_PATH = "/home/huan/.music_library_index.json"
 RUTA_LIBRERIA="/mnt/NFS/moode/moode"
+COVER_PREFETCH_RADIUS = 5  # Portadas que se preparan por encima y por debajo de la selección
 
 # Define preferred applications (can be customized)
 MUSIC_PLAYERS = {
@@ -148,6 +150,11 @@ class MusicLibrarySearchApp:
         self.root.geometry("1600x800")
         self.root.configure(bg='#14141e')
 
+        # Miniaturas de portadas en disco local
+        self.covers = CoverCache(size=(500, 500))
+        self._cover_album = None
+        self.shown = []
+
         # Load music library
         self.load_library()
 
@@ -352,72 +359,44 @@ class MusicLibrarySearchApp:
     def find_cover_image(self, album_path):
         """Find cover image in album directory."""
         try:
-            # Primero buscar en el directorio del álbum
-            cover_names = ['cover', 'folder', 'front', 'artwork', 'albumart']
-            image_extensions = ['.jpg', '.jpeg', '.png']
-
-            # Buscar en el directorio del álbum y en sus subdirectorios inmediatos
-            search_paths = [album_path]
-            # Añadir subdirectorios que empiecen con "Disc"
-            for item in os.listdir(album_path):
-                if item.startswith("Disc ") and os.path.isdir(os.path.join(album_path, item)):
-                    search_paths.append(os.path.join(album_path, item))
-
-            # Buscar en todas las rutas
-            for search_path in search_paths:
-                # Primero buscar nombres específicos
-                for name in cover_names:
-                    for ext in image_extensions:
-                        file_path = os.path.join(search_path, name + ext)
-                        if os.path.exists(file_path):
-                            print(f"Found cover image: {file_path}")  # Debug
-                            return file_path
-
-                # Si no se encuentra, buscar cualquier imagen
-                for file in os.listdir(search_path):
-                    if any(file.lower().endswith(ext) for ext in image_extensions):
-                        file_path = os.path.join(search_path, file)
-                        print(f"Found generic image: {file_path}")  # Debug
-                        return file_path
-
-            print("No cover image found")  # Debug
-            return None
+            return find_cover_image(album_path)
         except Exception as e:
             print(f"Error finding cover image: {e}")
             return None
 
+    def show_cover(self, album_path):
+        """Show the cached thumbnail, resolving it in the background on a miss."""
+        self._cover_album = album_path
+        thumbnail = self.covers.cached(album_path)
+        if thumbnail is MISSING:
+            self.cover_frame.configure(image='')
+            self.current_photo = None
+            self._wait_for_cover(self.covers.fetch(album_path), album_path)
+        else:
+            self.display_cover_image(thumbnail)
+
+        # Prefetch covers of the albums around the selection
+        self.covers.prefetch(self.neighbour_paths())
+
+    def _wait_for_cover(self, future, album_path):
+        """Poll a cover future from the Tk loop (PhotoImage must be created here)."""
+        if not future.done():
+            self.root.after(30, self._wait_for_cover, future, album_path)
+        elif album_path == self._cover_album:
+            self.display_cover_image(future.result())
+
     def display_cover_image(self, image_path):
-        """Display cover image in the cover frame."""
+        """Display an already scaled cover thumbnail in the cover frame."""
         try:
-            if image_path and os.path.exists(image_path):
-                print(f"Loading image from: {image_path}")  # Debug
-                # Cargar y redimensionar la imagen
-                image = Image.open(image_path)
-                
-                # Obtener dimensiones originales
-                width, height = image.size
-                print(f"Original dimensions: {width}x{height}")  # Debug
-                
-                # Calcular nueva dimensión manteniendo proporción
-                max_size = (500, 500)
-                ratio = min(max_size[0]/width, max_size[1]/height)
-                new_size = (int(width * ratio), int(height * ratio))
-                print(f"New dimensions: {new_size}")  # Debug
-                
-                # Redimensionar
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-                
-                # Convertir a PhotoImage
-                photo = ImageTk.PhotoImage(image)
-                
+            if image_path:
+                photo = ImageTk.PhotoImage(Image.open(image_path))
+
                 # Mantener referencia a la imagen
                 self.current_photo = photo
-                
+
                 # Mostrar la imagen
                 self.cover_frame.configure(image=photo)
-                print("Image displayed successfully")  # Debug
             else:
-                print(f"Invalid image path: {image_path}")  # Debug
                 self.cover_frame.configure(image='')
                 self.current_photo = None
         except Exception as e:
@@ -425,6 +404,19 @@ class MusicLibrarySearchApp:
             self.cover_frame.configure(image='')
             self.current_photo = None
 
+    def neighbour_paths(self):
+        """Album paths around the current selection, nearest first."""
+        selection = self.result_list.curselection()
+        if not selection:
+            return []
+        current = selection[0]
+        paths = []
+        for offset in range(1, COVER_PREFETCH_RADIUS + 1):
+            for pos in (current + offset, current - offset):
+                if 0 <= pos < len(self.shown):
+                    paths.append(self.shown[pos]['path'])
+        return paths
+
     def get_selected_album(self):
         """Get the selected album from the results list."""
         selection = self.result_list.curselection()
@@ -479,13 +471,14 @@ class MusicLibrarySearchApp:
                 # Using artist and album for sorting
                 sort_key = f"{album['artist'].lower()} - {album['album'].lower()}"
                 display = f"{album['artist']} - {album['album']} ({album.get('date', 'No date')})"
-                matching_albums.append((sort_key, display))
+                matching_albums.append((sort_key, display, album))
         
         # Sort the results alphabetically
         matching_albums.sort(key=lambda x: x[0])
+        self.shown = [album for _, _, album in matching_albums]
         
         # Insert sorted results into listbox
-        for _, display in matching_albums:
+        for _, display, _ in matching_albums:
             self.result_list.insert(tk.END, display)
 
     def on_select(self, event):
@@ -504,16 +497,9 @@ class MusicLibrarySearchApp:
             
             self.details_text.insert(tk.END, details)
 
-            # Buscar y mostrar la imagen de portada
+            # Buscar y mostrar la imagen de portada (miniatura en caché)
             if 'path' in album:
-                album_path = album['path']  # Esta es la ruta completa del álbum
-                print(f"Searching for cover in: {album_path}")  # Debug
-                cover_path = self.find_cover_image(album_path)
-                if cover_path:
-                    print(f"Cover found: {cover_path}")  # Debug
-                else:
-                    print("No cover found")  # Debug
-                self.display_cover_image(cover_path)
+                self.show_cover(album['path'])
 
     def add_keyboard_shortcuts(self):
         """Add keyboard shortcuts."""
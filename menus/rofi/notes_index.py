@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+#
+# Script Name: notes_index.py
+# Description:  Índice persistente (SQLite FTS5) de las notas Markdown de Obsidian para fuzzy.py
+# Author: volteret4
+# Repository: https://github.com/volteret4/
+# License:
+# Notes:
+#   Dependencies:   - python3, sqlite3 >= 3.34 (tokenizador trigram)
+#
+#   Cada nota se guarda una vez con su título, tags y contenido sin metadatos.
+#   El tokenizador trigram hace que una frase de 3 o más caracteres sea una
+#   búsqueda de subcadena sin distinguir mayúsculas, como el re.search que se
+#   usaba antes, pero resuelta con el índice en lugar de leer todo el vault.
+#   refresh() solo vuelve a leer las notas cuyo (mtime, tamaño) ha cambiado.
+
+import os
+import re
+import sqlite3
+
+INDEX_DB_PATH = os.path.expanduser("~/.cache/obsidian_fuzzy_index.db")
+
+FRONT_MATTER_RE = re.compile(r'---.*?---', re.DOTALL)
+YAML_TAGS_RE = re.compile(r'---.*?tags:\s*\[(.*?)\].*?---', re.DOTALL)
+INLINE_TAG_RE = re.compile(r'(?<!\S)#([a-zA-Z0-9_-]+)')
+
+
+def extract_tags(content):
+    """Extrae los tags del contenido Markdown."""
+    # Busca tags al estilo #tag o tags en metadatos YAML: tags: [tag1, tag2]
+    yaml_tags = YAML_TAGS_RE.search(content)
+    inline_tags = INLINE_TAG_RE.findall(content)
+
+    tags = []
+    if yaml_tags:
+        tags.extend([tag.strip().strip('"\'') for tag in yaml_tags.group(1).split(',')])
+    if inline_tags:
+        tags.extend(inline_tags)
+
+    return tags
+
+
+def strip_front_matter(content):
+    """Elimina las secciones delimitadas por '---'."""
+    return FRONT_MATTER_RE.sub('', content).strip()
+
+
+class NotesIndex:
+    def __init__(self, search_dir, secondary_paths=(), db_path=INDEX_DB_PATH):
+        """
+        Args:
+            search_dir: raíz del vault
+            secondary_paths: carpetas que se muestran con el icono secundario
+            db_path: base de datos del índice
+        """
+        self.search_dir = search_dir
+        self.secondary_paths = list(secondary_paths)
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self.conn = self.connect()
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE,
+                mtime_ns INTEGER,
+                size INTEGER
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                title, tags, content,
+                tokenize='trigram'
+            );
+        ''')
+        self.conn.commit()
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM notes LIMIT 1").fetchone() is None
+
+    def _walk(self):
+        """{ruta: (mtime_ns, tamaño)} de las notas .md (sin carpetas ocultas, como glob)."""
+        notes = {}
+        pending = [self.search_dir]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir():
+                            pending.append(entry.path)
+                        elif entry.name.endswith('.md'):
+                            st = entry.stat()
+                            notes[entry.path] = (st.st_mtime_ns, st.st_size)
+            except OSError as e:
+                print(f"Error al leer la carpeta {directory}: {e}")
+        return notes
+
+    def refresh(self):
+        """
+        Sincroniza el índice con el vault.
+
+        Usa su propia conexión, así que puede llamarse desde un hilo mientras
+        la interfaz sigue buscando.
+
+        Returns:
+            (notas actualizadas, notas eliminadas)
+        """
+        on_disk = self._walk()
+        conn = self.connect()
+        try:
+            known = {path: (note_id, mtime_ns, size) for note_id, path, mtime_ns, size
+                     in conn.execute("SELECT id, path, mtime_ns, size FROM notes")}
+
+            updated = 0
+            with conn:
+                for path, (mtime_ns, size) in on_disk.items():
+                    old = known.get(path)
+                    if old and old[1] == mtime_ns and old[2] == size:
+                        continue
+                    try:
+                        with open(path, 'r', encoding='utf-8') as file:
+                            content = file.read()
+                    except Exception as e:
+                        print(f"Error al leer el archivo {path}: {e}")
+                        continue
+
+                    title = os.path.basename(path).replace('.md', '')
+                    tags = '\n'.join(extract_tags(content))
+                    if old:
+                        note_id = old[0]
+                        conn.execute("UPDATE notes SET mtime_ns = ?, size = ? WHERE id = ?",
+                                     (mtime_ns, size, note_id))
+                        conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
+                    else:
+                        note_id = conn.execute(
+                            "INSERT INTO notes (path, mtime_ns, size) VALUES (?, ?, ?)",
+                            (path, mtime_ns, size)).lastrowid
+                    conn.execute(
+                        "INSERT INTO notes_fts (rowid, title, tags, content) VALUES (?, ?, ?, ?)",
+                        (note_id, title, tags, strip_front_matter(content)))
+                    updated += 1
+
+                removed = [(known[path][0],) for path in known.keys() - on_disk.keys()]
+                conn.executemany("DELETE FROM notes WHERE id = ?", removed)
+                conn.executemany("DELETE FROM notes_fts WHERE rowid = ?", removed)
+        finally:
+            conn.close()
+
+        return updated, len(removed)
+
+    def remove(self, path):
+        """Quita una nota del índice (p.ej. al borrarla desde la interfaz)."""
+        with self.conn:
+            row = self.conn.execute("SELECT id FROM notes WHERE path = ?", (path,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM notes WHERE id = ?", row)
+                self.conn.execute("DELETE FROM notes_fts WHERE rowid = ?", row)
+
+    def search(self, query):
+        """
+        Busca notas por título, tags y contenido.
+
+        Returns:
+            (title_matches, tag_matches, content_matches, wallabag_matches),
+            listas de (icono, ruta, título). Cada nota aparece solo en la
+            primera categoría que coincide; dentro de cada una se ordena por bm25.
+        """
+        title_matches = []
+        tag_matches = []
+        content_matches = []
+        wallabag_matches = []
+
+        like = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        if not query:
+            rows = self.conn.execute('''
+                SELECT n.path, f.title, 1, 0 FROM notes n JOIN notes_fts f ON f.rowid = n.id
+                ORDER BY n.path
+            ''')
+        elif len(query) >= 3:
+            # Frase trigram = subcadena; el índice filtra y bm25 ordena
+            phrase = '"' + query.replace('"', '""') + '"'
+            rows = self.conn.execute('''
+                SELECT n.path, f.title,
+                       f.title LIKE :like ESCAPE '\\', f.tags LIKE :like ESCAPE '\\'
+                FROM notes_fts f JOIN notes n ON n.id = f.rowid
+                WHERE notes_fts MATCH :phrase
+                ORDER BY bm25(notes_fts, 10.0, 5.0, 1.0)
+            ''', {'phrase': phrase, 'like': like})
+        else:
+            # Menos de 3 caracteres no forman un trigrama: LIKE sobre la tabla
+            rows = self.conn.execute('''
+                SELECT n.path, f.title,
+                       f.title LIKE :like ESCAPE '\\', f.tags LIKE :like ESCAPE '\\'
+                FROM notes_fts f JOIN notes n ON n.id = f.rowid
+                WHERE f.title LIKE :like ESCAPE '\\' OR f.tags LIKE :like ESCAPE '\\'
+                   OR f.content LIKE :like ESCAPE '\\'
+                ORDER BY n.path
+            ''', {'like': like})
+
+        for path, title, in_title, in_tags in rows:
+            is_secondary = any(secondary in path for secondary in self.secondary_paths)
+            icon = '📁' if is_secondary else '📄'
+            result = (icon, path, title)
+
+            if in_title:
+                title_matches.append(result)
+            elif in_tags:
+                tag_matches.append(result)
+            elif "wallabag" in path.lower():
+                wallabag_matches.append(result)
+            else:
+                content_matches.append(result)
+
+        return title_matches, tag_matches, content_matches, wallabag_matches
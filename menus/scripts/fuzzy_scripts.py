@@ -28,6 +28,9 @@ from datetime import datetime
 from fuzzywuzzy import fuzz
 import yaml
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fts_search import SCRIPTS, ensure_fts, search_sql
+
 
 class TagEditDialog(QDialog):
     """Dialog para editar tags de un script"""
@@ -142,6 +145,9 @@ class ScriptManager(QMainWindow):
         self.conn.execute('PRAGMA temp_store = MEMORY')
         self.conn.execute('PRAGMA cache_size = 10000')
 
+        # Índice FTS para la búsqueda (se crea la primera vez)
+        ensure_fts(self.conn, SCRIPTS)
+
         # Datos
         self.filtered_scripts = []
         self.theme_config = self.load_theme()
@@ -319,26 +325,9 @@ class ScriptManager(QMainWindow):
                 LIMIT 500
             ''')
         else:
-            # Con búsqueda: buscar en todos los campos relevantes
-            cursor = self.conn.execute('''
-                SELECT s.*, GROUP_CONCAT(t.name, ',') as tags FROM scripts s
-                LEFT JOIN script_tags st ON s.id = st.script_id
-                LEFT JOIN tags t ON st.tag_id = t.id
-                WHERE
-                    LOWER(s.filename) LIKE ? OR
-                    LOWER(s.description) LIKE ? OR
-                    LOWER(s.author) LIKE ? OR
-                    LOWER(s.notes) LIKE ? OR
-                    EXISTS (
-                        SELECT 1 FROM tags t2
-                        JOIN script_tags st2 ON t2.id = st2.tag_id
-                        WHERE st2.script_id = s.id AND LOWER(t2.name) LIKE ?
-                    )
-                GROUP BY s.id
-                ORDER BY s.filename
-                LIMIT 500
-            ''', (f'%{search_text}%', f'%{search_text}%', f'%{search_text}%',
-                  f'%{search_text}%', f'%{search_text}%'))
+            # Con búsqueda: índice FTS de nombre, descripción, autor, notas y tags
+            sql, params = search_sql(SCRIPTS, search_text)
+            cursor = self.conn.execute(sql + ' LIMIT 500', params)
 
         # Convertir resultados
         self.filtered_scripts = []
@@ -4,7 +4,6 @@ Script Indexer - Indexa scripts en una base de datos SQLite
 """
 
 import sqlite3
-import hashlib
 import argparse
 from pathlib import Path
 from typing import List, Dict, Optional
@@ -14,6 +13,17 @@ import re
 import sys
 import os
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from file_changes import ChangeDetector, ensure_signature_columns, fast_hash, upsert_sql, walk_files
+from fts_search import SCRIPTS, ensure_fts
+
+# UPSERT y no INSERT OR REPLACE: conserva el id y las etiquetas/categorías (ON DELETE CASCADE)
+SCRIPTS_UPSERT = upsert_sql('scripts', (
+    'path', 'filename', 'directory', 'extension', 'size_bytes', 'hash', 'description',
+    'author', 'repository', 'license', 'notes', 'dependencies', 'last_modified',
+    'updated_at', 'is_executable', 'mtime_ns', 'inode'
+))
+
 
 class ScriptIndexer:
     """Indexador de scripts para base de datos SQLite"""
@@ -40,6 +50,7 @@ class ScriptIndexer:
         config_excluded = set(self.config.get('excluded_folders', []))
         self.excluded_folders = self.default_excluded_folders.union(config_excluded)
 
+        self.changes = None
         self.setup_database()
 
     def load_config(self) -> Dict:
@@ -87,9 +98,12 @@ class ScriptIndexer:
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_modified TIMESTAMP,
                 is_executable BOOLEAN DEFAULT 0,
-                is_valid BOOLEAN DEFAULT 1
+                is_valid BOOLEAN DEFAULT 1,
+                mtime_ns INTEGER,
+                inode INTEGER
             )
         ''')
+        ensure_signature_columns(self.conn, 'scripts')
 
         # Tabla de tags
         self.conn.execute('''
@@ -132,9 +146,12 @@ class ScriptIndexer:
             GROUP BY s.id, s.path, s.filename, s.directory, s.extension,
                      s.size_bytes, s.hash, s.description, s.author, s.repository,
                      s.license, s.notes, s.dependencies, s.created_at, s.updated_at,
-                     s.last_modified, s.is_executable, s.is_valid
+                     s.last_modified, s.is_executable, s.is_valid, s.mtime_ns, s.inode
         ''')
 
+        # Índice FTS de búsqueda, sincronizado por triggers
+        ensure_fts(self.conn, SCRIPTS)
+
         self.conn.commit()
 
     def get_script_folders(self) -> List[Path]:
@@ -200,15 +217,8 @@ class ScriptIndexer:
             print(f"Error creando configuración: {e}")
 
     def get_file_hash(self, file_path: Path) -> str:
-        """Calcula el hash MD5 de un archivo"""
-        try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except (IOError, OSError):
-            return ""
+        """Calcula un hash rápido (no criptográfico) de un archivo"""
+        return fast_hash(str(file_path))
 
     def extract_script_metadata(self, file_path: Path) -> Dict:
         """Extrae metadata del header del script"""
@@ -271,38 +281,29 @@ class ScriptIndexer:
 
         return metadata
 
-    def is_script_changed(self, file_path: Path) -> bool:
-        """Verifica si un script ha cambiado desde la última indexación"""
-        cursor = self.conn.execute(
-            'SELECT last_modified, hash FROM scripts WHERE path = ?',
-            (str(file_path),)
-        )
-        result = cursor.fetchone()
-
-        if not result:
-            return True  # Archivo nuevo
+    def get_change_detector(self) -> ChangeDetector:
+        """Firmas (tamaño, mtime_ns, inodo) de todos los scripts, cargadas una sola vez"""
+        if self.changes is None:
+            self.changes = ChangeDetector(self.conn, 'scripts')
+        return self.changes
 
-        db_modified, db_hash = result
-        file_modified = datetime.fromtimestamp(file_path.stat().st_mtime)
-
-        # Comparar por fecha de modificación primero
-        if db_modified != file_modified.isoformat():
-            return True
-
-        # Si las fechas coinciden, comparar hash
-        current_hash = self.get_file_hash(file_path)
-        return current_hash != db_hash
+    def is_script_changed(self, file_path: Path, stat: Optional[os.stat_result] = None) -> bool:
+        """Verifica si un script ha cambiado desde la última indexación"""
+        stat = stat or file_path.stat()
+        return self.get_change_detector().is_changed(str(file_path), stat)
 
-    def index_file(self, file_path: Path, force_update: bool = False) -> bool:
+    def index_file(self, file_path: Path, force_update: bool = False,
+                   stat: Optional[os.stat_result] = None) -> bool:
         """Indexa un archivo de script individual"""
         try:
+            # Obtener información del archivo
+            stat = stat or file_path.stat()
+
             # Verificar si el archivo ha cambiado
-            if not force_update and not self.is_script_changed(file_path):
+            if not force_update and not self.is_script_changed(file_path, stat):
                 return False
 
-            # Obtener información del archivo
-            stat = file_path.stat()
-            hash_value = self.get_file_hash(file_path)
+            hash_value = self.get_change_detector().file_hash(str(file_path))
             metadata = self.extract_script_metadata(file_path)
 
             # Verificar si es ejecutable
@@ -324,22 +325,20 @@ class ScriptIndexer:
                 'dependencies': metadata['dependencies'],
                 'last_modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
                 'updated_at': datetime.now().isoformat(),
-                'is_executable': is_executable
+                'is_executable': is_executable,
+                'mtime_ns': stat.st_mtime_ns,
+                'inode': stat.st_ino
             }
 
             # Insertar o actualizar en la base de datos
-            self.conn.execute('''
-                INSERT OR REPLACE INTO scripts
-                (path, filename, directory, extension, size_bytes, hash, description,
-                 author, repository, license, notes, dependencies, last_modified,
-                 updated_at, is_executable)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            self.conn.execute(SCRIPTS_UPSERT, (
                 data['path'], data['filename'], data['directory'], data['extension'],
                 data['size_bytes'], data['hash'], data['description'], data['author'],
                 data['repository'], data['license'], data['notes'], data['dependencies'],
-                data['last_modified'], data['updated_at'], data['is_executable']
+                data['last_modified'], data['updated_at'], data['is_executable'],
+                data['mtime_ns'], data['inode']
             ))
+            self.get_change_detector().record(data['path'], stat, hash_value)
 
             return True
 
@@ -361,20 +360,12 @@ class ScriptIndexer:
         # Obtener todos los archivos de script
         files_to_process = []
 
-        try:
-            for file_path in directory.rglob("*" if recursive else "*"):
-                if file_path.is_file():
-                    # Verificar si está en carpeta excluida
-                    if any(excluded in file_path.parts for excluded in self.excluded_folders):
-                        continue
-
-                    # Verificar extensión
-                    if file_path.suffix.lower() in self.supported_extensions:
-                        files_to_process.append(file_path)
-
-        except (PermissionError, OSError) as e:
-            print(f"Error accediendo a {directory}: {e}")
-            return stats
+        # Las carpetas excluidas no se llegan a recorrer
+        for path, stat in walk_files(str(directory), recursive,
+                                     skip_dir=lambda name, _: name in self.excluded_folders):
+            # Verificar extensión
+            if os.path.splitext(path)[1].lower() in self.supported_extensions:
+                files_to_process.append((Path(path), stat))
 
         total_files = len(files_to_process)
         print(f"Encontrados {total_files} archivos de script")
@@ -383,9 +374,9 @@ class ScriptIndexer:
             return stats
 
         # Procesar archivos
-        for i, file_path in enumerate(files_to_process):
+        for i, (file_path, stat) in enumerate(files_to_process):
             try:
-                if self.index_file(file_path):
+                if self.index_file(file_path, stat=stat):
                     stats['updated'] += 1
                 else:
                     stats['skipped'] += 1
@@ -400,6 +391,7 @@ class ScriptIndexer:
 
                 # Commit cada 50 archivos
                 if (i + 1) % 50 == 0:
+                    self.get_change_detector().flush()
                     self.conn.commit()
 
             except Exception as e:
@@ -407,6 +399,7 @@ class ScriptIndexer:
                 print(f"Error procesando {file_path}: {e}")
 
         # Commit final
+        self.get_change_detector().flush()
         self.conn.commit()
         print(f"Completado {directory}: {stats['updated']} actualizados, {stats['skipped']} sin cambios")
 